@@ -5,35 +5,145 @@ Provides common functionality for all WikiGen agents including:
 - Default provider and model configuration
 - LLM service integration
 - Common parameter handling
+- Prompt prefix caching for context shared across calls
+- Model cascade: items run on the cheap default model first and only those
+  failing validation are escalated to a stronger model, with per-stage
+  escalation rates
 - Error handling patterns
 """
 
+import logging
+import math
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, Type, Union, AsyncIterator
+from typing import Optional, Dict, Any, Type, TypedDict, TypeVar, Union, AsyncIterator, Awaitable, Callable, List, cast
 from uuid import UUID
 from dataclasses import dataclass, field
 from pydantic import BaseModel
 
 from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.core.exceptions import AuthenticationError, AuthorizationError, BudgetExceededError
 from src.services.llm.llm_service import LLMService
+from src.services.llm.prompt_cache import mark_cacheable_prefix
+from src.services.llm.usage_tracker import normalize_usage
 from src.schemas.llm.models import LLMResponse, ThinkingEffort, ChunkType
 
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMArgs(TypedDict):
+    """Billing and model arguments every LLM call of an agent run gets."""
+    user_id: UUID
+    api_key: Optional[str]
+    provider: Optional[PROVIDER_ID]
+    model: Optional[MODEL_NAME]
+
+
+# Output characters per token, for token estimates before the provider reports usage
+CHARS_PER_TOKEN = 4.0
+
+
 class WindowContentAccumulator:
-    """Accumulates content from streaming chunks by type for a processing window."""
-    thinking: str = ""
-    content: str = ""
-    unknown: str = ""
+    """
+    Accumulates content from streaming chunks by type for a processing window.
+    
+    Chunks are appended to per-type buffers and only joined when the text is
+    read (the joined text is kept until more chunks arrive), so accumulating a
+    long stream is linear in its length. Character and token counts, and the
+    window's stream timing, are kept as chunks arrive.
+    """
+    
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            clock: Monotonic clock in seconds; timing starts when the accumulator is created
+        """
+        self._clock = clock
+        self._parts: Dict[ChunkType, List[str]] = {chunk_type: [] for chunk_type in ChunkType}
+        self.chars: Dict[ChunkType, int] = {chunk_type: 0 for chunk_type in ChunkType}
+        self.chunk_count = 0
+        self.reported_usage: Optional[Dict[str, int]] = None
+        self.started_at = clock()
+        self.first_chunk_at: Optional[float] = None
+        self.last_chunk_at: Optional[float] = None
     
     def add_chunk(self, chunk: LLMResponse) -> None:
-        """Add a streaming chunk's content to the appropriate accumulator."""
-        if chunk.chunk_type == ChunkType.THINKING:
-            self.thinking += chunk.content
-        elif chunk.chunk_type == ChunkType.CONTENT:
-            self.content += chunk.content
-        elif chunk.chunk_type == ChunkType.UNKNOWN:
-            self.unknown += chunk.content
+        """Add a streaming chunk's content to the appropriate buffer."""
+        now = self._clock()
+        self.chunk_count += 1
+        if chunk.usage:
+            self.reported_usage = normalize_usage(chunk.usage)
+        if not chunk.content:
+            return
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+        self.last_chunk_at = now
+        chunk_type = chunk.chunk_type if chunk.chunk_type in self._parts else ChunkType.UNKNOWN
+        self._parts[chunk_type].append(chunk.content)
+        self.chars[chunk_type] += len(chunk.content)
+    
+    def text(self, chunk_type: ChunkType) -> str:
+        """Accumulated text of one chunk type."""
+        parts = self._parts[chunk_type]
+        if len(parts) > 1:
+            parts[:] = ["".join(parts)]
+        return parts[0] if parts else ""
+    
+    @property
+    def thinking(self) -> str:
+        return self.text(ChunkType.THINKING)
+    
+    @property
+    def content(self) -> str:
+        return self.text(ChunkType.CONTENT)
+    
+    @property
+    def unknown(self) -> str:
+        return self.text(ChunkType.UNKNOWN)
+    
+    def estimated_tokens(self, chunk_type: Optional[ChunkType] = None) -> int:
+        """Estimated output tokens of one chunk type (or of all of them), from character counts."""
+        chars = self.chars[chunk_type] if chunk_type is not None else sum(self.chars.values())
+        return math.ceil(chars / CHARS_PER_TOKEN)
+    
+    @property
+    def output_tokens(self) -> int:
+        """Output tokens: as reported by the provider, else estimated."""
+        if self.reported_usage and self.reported_usage.get("completion_tokens"):
+            return self.reported_usage["completion_tokens"]
+        return self.estimated_tokens()
+    
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from the start of the window's call to its first non-empty chunk."""
+        return self.first_chunk_at - self.started_at if self.first_chunk_at is not None else None
+    
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output rate between the first and the last chunk (None for a single chunk)."""
+        if self.first_chunk_at is None or self.last_chunk_at is None or self.last_chunk_at <= self.first_chunk_at:
+            return None
+        return self.output_tokens / (self.last_chunk_at - self.first_chunk_at)
+    
+    @property
+    def thinking_ratio(self) -> Optional[float]:
+        """Share of thinking in the output characters (None before any output)."""
+        total = sum(self.chars.values())
+        return self.chars[ChunkType.THINKING] / total if total else None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Stream statistics of the window, for logging."""
+        return {
+            "chunks": self.chunk_count,
+            "chars": {chunk_type.value: count for chunk_type, count in self.chars.items()},
+            "output_tokens": self.output_tokens,
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+            "thinking_ratio": self.thinking_ratio,
+        }
 
 
 @dataclass  
@@ -46,11 +156,124 @@ class WindowProcessingResult:
     raw_content: WindowContentAccumulator = field(default_factory=WindowContentAccumulator)
     parsed_result: Optional[Any] = None
     error: Optional[str] = None
+    attempts: int = 0
+    input_context_hash: Optional[str] = None  # Hash of the context the window's prompt was built with
+    restored: bool = False  # True if loaded from a checkpoint instead of calling the LLM
+    context_start_chapter: Optional[int] = None  # First chapter sent to the LLM if it precedes start_chapter (overlap margin)
+    escalated: bool = False  # True if the window was re-run on the agent's escalation model
     
     @property
     def chapters_range(self) -> str:
         """Human-readable chapter range."""
         return f"{self.start_chapter}-{self.end_chapter}"
+    
+    def to_checkpoint(self) -> Dict[str, Any]:
+        """Serialize the window (without raw streamed content) for a checkpoint store."""
+        parsed = self.parsed_result
+        return {
+            "window_number": self.window_number,
+            "start_chapter": self.start_chapter,
+            "end_chapter": self.end_chapter,
+            "is_final_window": self.is_final_window,
+            "parsed_result": parsed.model_dump(mode="json") if isinstance(parsed, BaseModel) else parsed,
+            "error": self.error,
+            "attempts": self.attempts,
+            "input_context_hash": self.input_context_hash,
+            "context_start_chapter": self.context_start_chapter,
+            "escalated": self.escalated,
+        }
+    
+    @classmethod
+    def from_checkpoint(cls, data: Dict[str, Any], result_model: Optional[Type[BaseModel]] = None) -> "WindowProcessingResult":
+        """Restore a window saved with to_checkpoint(), validating parsed_result against result_model."""
+        parsed = data.get("parsed_result")
+        if parsed is not None and result_model is not None:
+            parsed = result_model.model_validate(parsed)
+        return cls(
+            window_number=data["window_number"],
+            start_chapter=data["start_chapter"],
+            end_chapter=data["end_chapter"],
+            is_final_window=data["is_final_window"],
+            parsed_result=parsed,
+            error=data.get("error"),
+            attempts=data.get("attempts", 0),
+            input_context_hash=data.get("input_context_hash"),
+            context_start_chapter=data.get("context_start_chapter"),
+            escalated=data.get("escalated", False),
+            restored=True,
+        )
+
+
+@dataclass
+class CascadeStageStats:
+    """Escalation counts of one cascade stage (e.g. an agent's windows)."""
+    items: int = 0
+    escalated: int = 0
+    recovered: int = 0  # Escalated items that passed validation on the escalation model
+    
+    @property
+    def escalation_rate(self) -> float:
+        """Share of items that were escalated."""
+        return self.escalated / self.items if self.items else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "escalated": self.escalated,
+            "recovered": self.recovered,
+            "escalation_rate": self.escalation_rate,
+        }
+
+
+# Errors a stronger model would hit just the same: raised at once, never escalated
+_NOT_ESCALATED = (BudgetExceededError, AuthenticationError, AuthorizationError)
+_AUTH_STATUS_CODES = (401, 403)
+
+
+def _escalates(error: Exception) -> bool:
+    """Whether a failed cascade attempt may be retried on the escalation model."""
+    if isinstance(error, _NOT_ESCALATED):
+        return False
+    # LLMService wraps provider errors; a rejected API key is still an auth error
+    cause = error.__cause__ or error.__context__
+    return getattr(cause, "status_code", None) not in _AUTH_STATUS_CODES
+
+
+@dataclass
+class CascadeItem:
+    """
+    One item's way through the model cascade (see BaseAgent._start_cascade).
+    
+    Attempts run on (provider, model) until escalate() moves the item to the
+    escalation model. _run_cascade drives an item for single awaited calls;
+    agents whose calls stream drive it around their own attempt loop.
+    """
+    agent_name: str
+    stage: str
+    stats: CascadeStageStats
+    provider: PROVIDER_ID                                   # Where the next attempt runs
+    model: MODEL_NAME
+    target: Optional[tuple[PROVIDER_ID, MODEL_NAME]] = None  # Escalation model, None if there is none
+    escalated: bool = False
+    
+    @property
+    def can_escalate(self) -> bool:
+        return self.target is not None and not self.escalated
+    
+    def escalate(self, issue: str) -> bool:
+        """Move the item to the escalation model; False if there is none or the item is on it already."""
+        if self.target is None or self.escalated:
+            return False
+        logger.warning(f"⬆️ {self.agent_name} escalating {self.stage} item {self.model} -> {self.target[1]}: {issue}")
+        self.provider, self.model = self.target
+        self.escalated = True
+        self.stats.escalated += 1
+        return True
+    
+    def passed(self) -> None:
+        """Record that the item's result passed validation."""
+        if self.escalated:
+            self.stats.recovered += 1
 
 
 class BaseAgent(ABC):
@@ -68,6 +291,9 @@ class BaseAgent(ABC):
         temperature: float = 0.7,
         max_tokens: int = 8000,
         thinking: Optional[ThinkingEffort] = None,
+        budget_fallback_model: Optional[MODEL_NAME] = None,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None,
         **kwargs
     ):
         """
@@ -80,6 +306,13 @@ class BaseAgent(ABC):
             temperature: Default temperature for LLM calls
             max_tokens: Default maximum tokens for LLM responses
             thinking: Default thinking effort for models that support thinking modes
+            budget_fallback_model: Cheaper model (same provider) to downgrade to when the
+                                   user's or project's LLM budget is exhausted. If None,
+                                   calls are refused with BudgetExceededError instead.
+            escalation_model: Stronger model that items failing validation on the default
+                              model are re-run on (see _run_cascade). If None, nothing
+                              is escalated.
+            escalation_provider: Provider of the escalation model (default: default_provider)
             **kwargs: Additional agent-specific configuration
         """
         self.llm_service = llm_service
@@ -88,12 +321,17 @@ class BaseAgent(ABC):
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.thinking = thinking
+        self.budget_fallback_model = budget_fallback_model
+        self.escalation_model = escalation_model
+        self.escalation_provider: PROVIDER_ID = escalation_provider or default_provider
+        self.cascade_stats: Dict[str, CascadeStageStats] = {}
         
         # Store additional configuration
         self.config = kwargs
         
-        # Validate that the default model is available
+        # Validate that the default (and escalation) model is available
         self._validate_default_model()
+        self._validate_escalation_model()
     
     def _validate_default_model(self) -> None:
         """
@@ -116,6 +354,20 @@ class BaseAgent(ABC):
                 f"Available models: {model_names}"
             )
     
+    def _validate_escalation_model(self) -> None:
+        """
+        Validate that the configured escalation model, if any, is available.
+        
+        Raises:
+            ValueError: If the escalation model is not found in the LLM catalog
+        """
+        if self.escalation_model is None:
+            return
+        if not LLMService.get_hosted_model_details(self.escalation_provider, self.escalation_model):
+            raise ValueError(
+                f"Escalation model '{self.escalation_model}' not found for provider '{self.escalation_provider}'"
+            )
+    
     def _get_model_params(
         self, 
         provider: Optional[PROVIDER_ID] = None, 
@@ -136,6 +388,167 @@ class BaseAgent(ABC):
             model or self.default_model
         )
     
+    # ------------------------------------------------------------------
+    # Model cascade
+    # ------------------------------------------------------------------
+    
+    def _escalation_target(self, provider: PROVIDER_ID, model: MODEL_NAME) -> Optional[tuple[PROVIDER_ID, MODEL_NAME]]:
+        """
+        Provider and model a failing item is escalated to.
+        
+        Returns:
+            (provider, model) of the escalation model, or None if there is none or
+            the item already ran on it
+        """
+        if self.escalation_model is None:
+            return None
+        if (provider, model) == (self.escalation_provider, self.escalation_model):
+            return None
+        return self.escalation_provider, self.escalation_model
+    
+    def _cascade_stage(self, stage: str) -> CascadeStageStats:
+        """Escalation counts of a stage, created on first use."""
+        return self.cascade_stats.setdefault(stage, CascadeStageStats())
+    
+    def cascade_report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage item, escalation and recovery counts and escalation rates."""
+        return {stage: stats.to_dict() for stage, stats in self.cascade_stats.items()}
+    
+    def _log_cascade_report(self) -> None:
+        for stage, stats in self.cascade_stats.items():
+            if stats.items:
+                logger.info(
+                    f"⬆️ {self.agent_name} {stage}: escalated {stats.escalated}/{stats.items} "
+                    f"({stats.escalation_rate:.0%}), {stats.recovered} passed on {self.escalation_model}"
+                )
+    
+    async def _run_cascade(
+        self,
+        stage: str,
+        call: Callable[[PROVIDER_ID, MODEL_NAME], Awaitable[T]],
+        validate: Callable[[T], Optional[str]],
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+    ) -> T:
+        """
+        Run one item on the cheap model and escalate it only if it fails validation.
+        
+        The item is run with call(provider, model) on the given (or default) model.
+        If validate() reports a problem, or the call raises, it is run again on the
+        escalation model. Budget and authentication errors are raised as they are:
+        the escalation model would fail the same way. The escalated result is returned even if it fails
+        validation too (the caller decides what to do with it); if the escalated
+        call raises, the cheap result is kept when there is one.
+        
+        Args:
+            stage: Name the item's escalation counts are kept under
+            call: Coroutine function running the item on a (provider, model)
+            validate: Returns why a result is not good enough, or None if it passes
+                      (e.g. a schema validation error, or a confidence heuristic)
+            provider: Optional provider override for the cheap attempt
+            model: Optional model override for the cheap attempt
+            
+        Returns:
+            The cheap result if it passed validation, else the escalated result
+            
+        Raises:
+            Exception: Whatever call() raised, if no attempt produced a result
+        """
+        item = self._start_cascade(stage, provider, model)
+        cheap_model = item.model
+        
+        result: Optional[T] = None
+        try:
+            result = await call(item.provider, item.model)
+            issue = validate(result)
+        except Exception as e:
+            if not _escalates(e) or not item.escalate(str(e)):
+                raise
+        else:
+            if issue is None or not item.escalate(issue):
+                return cast(T, result)
+        
+        try:
+            escalated = await call(item.provider, item.model)
+        except Exception:
+            if result is None:
+                raise
+            logger.warning(f"⬆️ {self.agent_name} escalation failed, keeping the {cheap_model} result")
+            return result
+        if validate(escalated) is None:
+            item.passed()
+        return escalated
+    
+    def _start_cascade(
+        self,
+        stage: str,
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+    ) -> CascadeItem:
+        """
+        Count a new item of a cascade stage, starting on the given (or default) model.
+        
+        Agents that cannot use _run_cascade (e.g. streamed calls with their own
+        retries) run their attempts on item.provider / item.model, call
+        item.escalate() when a result fails validation and item.passed() when
+        one succeeds, so their counts match _run_cascade's.
+        """
+        final_provider, final_model = self._get_model_params(provider, model)
+        stats = self._cascade_stage(stage)
+        stats.items += 1
+        return CascadeItem(
+            agent_name=self.agent_name,
+            stage=stage,
+            stats=stats,
+            provider=final_provider,
+            model=final_model,
+            target=self._escalation_target(final_provider, final_model),
+        )
+    
+    async def _apply_budget_policy(
+        self,
+        user_id: Optional[UUID],
+        project_id: Optional[str],
+        provider: PROVIDER_ID,
+        model: MODEL_NAME,
+    ) -> MODEL_NAME:
+        """
+        Check the user's and project's LLM budgets before making a call.
+        
+        Args:
+            user_id: User the call is billed to
+            project_id: Project the call is made for
+            provider: Provider the call will use
+            model: Model the call would use
+            
+        Returns:
+            The model to use - the budget fallback model if a budget is exhausted
+            
+        Raises:
+            BudgetExceededError: If a budget is exhausted and there is no fallback model
+        """
+        usage_tracker = getattr(self.llm_service, "usage_tracker", None)
+        if usage_tracker is None:
+            return model
+        
+        try:
+            await usage_tracker.ensure_within_budget(
+                user_id=str(user_id) if user_id else None,
+                project_id=project_id,
+            )
+            return model
+        except BudgetExceededError as e:
+            if not self.budget_fallback_model or self.budget_fallback_model == model:
+                logger.warning(f"💸 {self.agent_name} refused LLM call: {e.message}")
+                raise
+            
+            if not LLMService.get_hosted_model_details(provider, self.budget_fallback_model):
+                logger.error(f"❌ Budget fallback model '{self.budget_fallback_model}' not found for provider '{provider}'")
+                raise
+            
+            logger.warning(f"💸 {self.agent_name} downgrading {model} -> {self.budget_fallback_model}: {e.message}")
+            return self.budget_fallback_model
+    
     async def _make_llm_call(
         self,
         messages: list,
@@ -146,6 +559,8 @@ class BaseAgent(ABC):
         stream: bool = False,
         response_format: Optional[Type[BaseModel]] = None,
         thinking: Optional[ThinkingEffort] = None,
+        project_id: Optional[str] = None,
+        cache_prefix_messages: int = 0,
         **llm_kwargs
     ) -> Union[LLMResponse, AsyncIterator[LLMResponse]]:
         """
@@ -160,11 +575,20 @@ class BaseAgent(ABC):
             stream: Whether to return streaming response
             response_format: Optional pydantic model type for structured output
             thinking: Optional thinking effort override
+            project_id: Optional project the call is made for (usage attribution and budgets)
+            cache_prefix_messages: Number of leading messages that are identical across this
+                                   agent's calls (e.g. the story text); marked cacheable so
+                                   providers can reuse them. Messages already marked cacheable
+                                   stay marked.
             **llm_kwargs: Additional LLM parameters (will use agent defaults for temperature/max_tokens if not provided)
             
         Returns:
             LLMResponse object for non-streaming, AsyncIterator[LLMResponse] for streaming
             
+        Raises:
+            BudgetExceededError: If a budget is exhausted and no fallback model is configured
+            RuntimeError: If the LLM call fails
+            
         Examples:
             # Non-streaming
             response = await self._make_llm_call(messages, user_id, stream=False)
@@ -177,6 +601,10 @@ class BaseAgent(ABC):
                 print(chunk.content)
         """
         final_provider, final_model = self._get_model_params(provider, model)
+        final_model = await self._apply_budget_policy(user_id, project_id, final_provider, final_model)
+        
+        if cache_prefix_messages:
+            messages = mark_cacheable_prefix(messages, cache_prefix_messages)
         
         # Use agent defaults for temperature, max_tokens, and thinking if not provided
         final_kwargs = {
@@ -190,6 +618,13 @@ class BaseAgent(ABC):
         if final_thinking is not None:
             final_kwargs['thinking'] = final_thinking
         
+        # Attribute usage to this agent (and project) for accounting
+        final_kwargs['metadata'] = {
+            **(final_kwargs.get('metadata') or {}),
+            "agent": self.agent_name,
+            **({"project_id": project_id} if project_id else {}),
+        }
+        
         try:
             response = await self.llm_service.chat_completion(
                 provider=final_provider,
@@ -225,6 +660,7 @@ class BaseAgent(ABC):
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             "thinking": self.thinking.value if self.thinking else None,
+            "budget_fallback_model": self.budget_fallback_model,
             "config": self.config
         }
     
@@ -0,0 +1,193 @@
+# backend/src/agents/wikigen/arc_reconciliation.py
+
+"""
+Arc Reconciliation
+
+Merges arcs from windows that were analyzed independently (ArcSplitterAgent's
+parallel mode) into one consistent ArcAnalysisResult, and measures how far a
+reconciled split drifts from a reference (sequential) split.
+
+Key Features:
+- Seam decisions extend the sequential merge rules: a finalized arc is never
+  continued, and an unfinalized one is continued by the next window's first arc
+- A window that also saw the end of the previous window (overlap margin) has
+  the better view of the seam, so an unfinalized arc is only continued if that
+  window's arc crosses the seam
+- Gaps and overlaps left by the LLM are repaired so the result always covers
+  every chapter exactly once
+- Arcs are renumbered sequentially after merging
+- Boundary precision/recall/F1 for benchmarking reconciliation quality
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WindowArcs:
+    """Arcs one window produced and the chapters it owns."""
+    core_start: int  # First chapter owned by this window
+    core_end: int  # Last chapter owned by this window
+    context_start: int  # First chapter the LLM saw (< core_start when the window has an overlap margin)
+    result: ArcAnalysisResult
+
+    @property
+    def has_overlap(self) -> bool:
+        return self.context_start < self.core_start
+
+
+def _join_text(first: str, second: str) -> str:
+    if not second or second in first:
+        return first
+    return f"{first} {second}".strip()
+
+
+def _continue_arc(arc: Arc, continuation: Arc) -> Arc:
+    """Extend arc with the part of it another window saw."""
+    return arc.model_copy(update={
+        "end_chapter": continuation.end_chapter,
+        "summary": _join_text(arc.summary, continuation.summary),
+        "key_events": _join_text(arc.key_events, continuation.key_events),
+        "is_finalized": continuation.is_finalized,
+    })
+
+
+def make_contiguous(arcs: List[Arc], first_chapter: int, last_chapter: int) -> List[Arc]:
+    """Clip overlaps and close gaps between consecutive arcs, dropping arcs clipped away."""
+    repaired: List[Arc] = []
+    next_start = first_chapter
+    for arc in arcs:
+        end = min(arc.end_chapter, last_chapter)
+        if end < next_start:
+            continue  # Entirely covered by earlier arcs
+        if arc.start_chapter != next_start:
+            if repaired and arc.start_chapter > next_start:
+                # Gap: the previous arc absorbs the uncovered chapters
+                repaired[-1] = repaired[-1].model_copy(update={"end_chapter": arc.start_chapter - 1})
+            else:
+                arc = arc.model_copy(update={"start_chapter": next_start})
+        if end != arc.end_chapter:
+            arc = arc.model_copy(update={"end_chapter": end})
+        repaired.append(arc)
+        next_start = arc.end_chapter + 1
+    if repaired and repaired[-1].end_chapter < last_chapter:
+        repaired[-1] = repaired[-1].model_copy(update={"end_chapter": last_chapter})
+    return repaired
+
+
+def reconcile_windows(windows: List[WindowArcs]) -> ArcAnalysisResult:
+    """
+    Merge independently analyzed windows into a single arc analysis.
+
+    Args:
+        windows: Windows in story order; core ranges must be contiguous
+
+    Returns:
+        ArcAnalysisResult covering the first window's core_start through the
+        last window's core_end, with metadata from the last window
+
+    Raises:
+        ValueError: If there are no windows or no window produced arcs
+    """
+    if not windows:
+        raise ValueError("No windows to reconcile")
+
+    merged: List[Arc] = []
+    for window in windows:
+        arcs = sorted(window.result.arcs, key=lambda a: a.start_chapter)
+        owned = [arc for arc in arcs if arc.end_chapter >= window.core_start]
+        if not owned:
+            logger.warning(f"   ⚠️ Window {window.core_start}-{window.core_end} produced no arcs for its own chapters")
+            continue
+
+        crossing, rest = owned[0], owned[1:]
+        if not merged:
+            merged.append(crossing.model_copy(update={"start_chapter": max(crossing.start_chapter, window.core_start)}))
+        else:
+            last = merged[-1]
+            if last.is_finalized:
+                continues = False
+            elif window.has_overlap:
+                # The window saw the previous chapters: an arc starting before its core continues across the seam
+                continues = crossing.start_chapter < window.core_start
+            else:
+                continues = True
+            if continues:
+                merged[-1] = _continue_arc(last, crossing)
+                logger.info(f"   🔗 Seam at chapter {window.core_start}: continued arc '{last.title}'")
+            else:
+                merged[-1] = last.model_copy(update={"is_finalized": True})
+                merged.append(crossing.model_copy(update={"start_chapter": window.core_start}))
+                logger.info(f"   ✂️ Seam at chapter {window.core_start}: new arc '{crossing.title}'")
+        merged.extend(rest)
+
+    if not merged:
+        raise ValueError("No window produced any arcs")
+
+    merged = make_contiguous(merged, windows[0].core_start, windows[-1].core_end)
+    renumbered = [arc.model_copy(update={"id": index}) for index, arc in enumerate(merged, start=1)]
+
+    last_result = windows[-1].result
+    return ArcAnalysisResult(
+        **last_result.model_dump(exclude={"arcs"}),
+        arcs=renumbered
+    )
+
+
+def _boundaries(result: ArcAnalysisResult) -> List[int]:
+    """Chapters after which an arc ends (the story's last chapter is not a boundary)."""
+    arcs = sorted(result.arcs, key=lambda a: a.start_chapter)
+    return [arc.end_chapter for arc in arcs[:-1]]
+
+
+def compare_arc_boundaries(
+    reference: ArcAnalysisResult,
+    candidate: ArcAnalysisResult,
+    tolerance: int = 0
+) -> Dict[str, float]:
+    """
+    Compare arc boundaries of a candidate split against a reference split.
+
+    A candidate boundary matches a reference boundary if they are at most
+    tolerance chapters apart; each reference boundary matches at most once.
+
+    Args:
+        reference: Reference analysis (e.g. the sequential run)
+        candidate: Analysis to evaluate (e.g. the reconciled parallel run)
+        tolerance: Allowed distance in chapters between matching boundaries
+
+    Returns:
+        reference_arcs, candidate_arcs, precision, recall, f1 and
+        mean_offset (mean chapter distance of matched boundaries)
+    """
+    reference_bounds = _boundaries(reference)
+    candidate_bounds = _boundaries(candidate)
+
+    unmatched = list(reference_bounds)
+    offsets: List[int] = []
+    for boundary in candidate_bounds:
+        best: Optional[int] = None
+        for ref in unmatched:
+            if abs(ref - boundary) <= tolerance and (best is None or abs(ref - boundary) < abs(best - boundary)):
+                best = ref
+        if best is not None:
+            unmatched.remove(best)
+            offsets.append(abs(best - boundary))
+
+    matched = len(offsets)
+    precision = matched / len(candidate_bounds) if candidate_bounds else float(not reference_bounds)
+    recall = matched / len(reference_bounds) if reference_bounds else float(not candidate_bounds)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "reference_arcs": len(reference.arcs),
+        "candidate_arcs": len(candidate.arcs),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "mean_offset": sum(offsets) / matched if matched else 0.0,
+    }
@@ -21,23 +21,60 @@ Key Features:
 - Strong bias toward consolidation over splitting
 - Fallback for short stories with single comprehensive arc
 - Structured XML output format with prediction fields
+- Parallel mode (optional): windows are analyzed concurrently with overlapping
+  margins instead of one after another, then reconciled at the seams
+- Incremental mode: given the previous analysis, only the trailing unfinalized
+  arcs and newly appended chapters are re-analyzed
+- Arcs are surfaced as soon as their JSON object finishes streaming (on_arc
+  callback and chunk metadata), before the window's response is complete
+- Per-window checkpoints (optional): a failed or interrupted analysis resumes
+  from the last good window and only re-runs windows that failed
+- Model cascade (optional): windows run on the cheap default model and only
+  those whose output fails validation (schema and arc gap checks, or arcs that
+  stop short of the window's last chapter) are re-run on escalation_model
 """
 
-from typing import List, Optional, cast, AsyncIterator
+import asyncio
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict, cast, AsyncIterator
 from uuid import UUID, uuid4
 
 from src.core.constants import MODEL_NAME, PROVIDER_ID
 from src.services.llm.llm_service import LLMService
-from src.schemas.llm.models import LLMMessage, LLMResponse, ThinkingEffort
+from src.schemas.llm.models import ChunkType, LLMMessage, LLMResponse, ThinkingEffort
 from src.schemas.wikigen.arc import ArcAnalysisResult, Arc
 from src.schemas.db.story import FullStoryBase
 from src.prompts import prompt_manager
-from src.agents.base_agent import BaseAgent, WindowProcessingResult
-from src.utils import clean_json_from_llm_response
+from src.agents.base_agent import BaseAgent, LLMArgs, WindowContentAccumulator, WindowProcessingResult
+from src.agents.wikigen.arc_reconciliation import WindowArcs, make_contiguous, reconcile_windows
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
+from src.utils import JSONScanner
+from src.utils.json_stream import JSONArrayItemStream
+from src.utils.tokenizers import Tokenizer, get_tokenizer
 
 import logging
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_NAMESPACE = "arc_splitter"
+
+# Share of each parallel window's token budget reserved for the overlap margin
+PARALLEL_OVERLAP_TOKEN_SHARE = 0.2
+
+# Called with each arc as soon as it has streamed in (may be a coroutine function)
+ArcCallback = Callable[[Arc, WindowProcessingResult], Any]
+
+# Called when a window's LLM analysis starts (may be a coroutine function)
+WindowCallback = Callable[[WindowProcessingResult], Any]
+
+
+class StoryPromptArgs(TypedDict):
+    """Prompt variables that are the same for every window of a story."""
+    story_title: str
+    total_chapters: int
+    is_short_story: bool
+    genre: Optional[str]
+
 
 class ArcSplitterAgent(BaseAgent):
     """
@@ -56,7 +93,13 @@ class ArcSplitterAgent(BaseAgent):
         default_model: MODEL_NAME = "gemini-2.5-flash-lite-preview-06-17",
         temperature: float = 0.7,
         max_tokens: int = 16000,
-        thinking: Optional[ThinkingEffort] = None
+        thinking: Optional[ThinkingEffort] = None,
+        checkpoint_repository: Optional[CheckpointRepository] = None,
+        max_window_retries: int = 1,
+        parallel_overlap_chapters: int = 2,
+        max_parallel_windows: int = 4,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None
     ):
         """
         Initializes agent with LLM service and default model.
@@ -68,6 +111,14 @@ class ArcSplitterAgent(BaseAgent):
             temperature: Temperature for LLM calls (low for consistent analysis)
             max_tokens: Maximum tokens for LLM responses
             thinking: Thinking level for story analysis (default: MEDIUM for balanced reasoning)
+            checkpoint_repository: Store for per-window checkpoints (None disables resuming)
+            max_window_retries: Extra attempts for a window whose LLM call or parsing fails
+            parallel_overlap_chapters: Chapters before each window's own chapters that are
+                included as context in parallel mode
+            max_parallel_windows: Maximum concurrent window LLM calls in parallel mode
+            escalation_model: Stronger model a window is re-run on when its output fails
+                validation on the default model (None disables escalation)
+            escalation_provider: Provider of the escalation model (default: default_provider)
         """
         super().__init__(
             llm_service=llm_service,
@@ -75,17 +126,31 @@ class ArcSplitterAgent(BaseAgent):
             default_model=default_model,
             temperature=temperature,
             max_tokens=max_tokens,
-            thinking=thinking
+            thinking=thinking,
+            escalation_model=escalation_model,
+            escalation_provider=escalation_provider
         )
         
+        self.checkpoint_repository = checkpoint_repository
+        self.max_window_retries = max(0, max_window_retries)
+        self.parallel_overlap_chapters = max(0, parallel_overlap_chapters)
+        self.max_parallel_windows = max(1, max_parallel_windows)
+        
         # State management for window processing
         self._window_results: List[WindowProcessingResult] = []
         self._current_analysis_id: Optional[str] = None
+        self._current_run_key: Optional[str] = None
+        self._parallel = False
+        self._on_arc: Optional[ArcCallback] = None
+        self._on_window: Optional[WindowCallback] = None
     
     def _reset_analysis_state(self) -> None:
         """Reset internal state for a new analysis."""
         self._window_results.clear()
         self._current_analysis_id = str(uuid4())
+        self._current_run_key = None
+        self._parallel = False
+        self.cascade_stats.clear()
         logger.info(f"🔄 Starting new analysis: {self._current_analysis_id}")
     
     def get_window_results(self) -> List[WindowProcessingResult]:
@@ -116,6 +181,20 @@ class ArcSplitterAgent(BaseAgent):
         if not parsed_results:
             raise ValueError("No chunks were successfully parsed.")
         
+        if self._parallel:
+            # Windows were analyzed without each other's arcs; reconcile them at the seams
+            reconciled = reconcile_windows([
+                WindowArcs(
+                    core_start=r.start_chapter,
+                    core_end=r.end_chapter,
+                    context_start=r.context_start_chapter or r.start_chapter,
+                    result=cast(ArcAnalysisResult, r.parsed_result)
+                )
+                for r in self._window_results if r.parsed_result
+            ])
+            logger.info(f"🎯 Final result: {len(reconciled.arcs)} total arcs reconciled from {len(parsed_results)} parallel windows")
+            return reconciled
+        
         # Merge arcs from all chunks
         all_arcs: List[Arc] = []
         for i, chunk_result in enumerate(parsed_results):
@@ -147,6 +226,11 @@ class ArcSplitterAgent(BaseAgent):
                     all_arcs.extend(chunk_arcs)
                     logger.info(f"   ➕ Chunk {i+1}: Added {len(chunk_arcs)} arcs (edge case)")
         
+        # Windows that split an oversized chapter share its number at the seam; clip the overlapping arcs
+        windows = self._window_results
+        if all_arcs and any(prev.end_chapter == cur.start_chapter for prev, cur in zip(windows, windows[1:])):
+            all_arcs = make_contiguous(all_arcs, all_arcs[0].start_chapter, max(arc.end_chapter for arc in all_arcs))
+        
         # Use metadata from the last chunk (most complete)
         last_result = parsed_results[-1]
         final_metadata = last_result.model_dump(exclude={'arcs'})
@@ -165,7 +249,12 @@ class ArcSplitterAgent(BaseAgent):
         user_id: UUID,
         api_key: Optional[str] = None,
         provider: Optional[PROVIDER_ID] = None,
-        model: Optional[MODEL_NAME] = None
+        model: Optional[MODEL_NAME] = None,
+        resume: bool = True,
+        previous_result: Optional[ArcAnalysisResult] = None,
+        parallel: bool = False,
+        on_arc: Optional[ArcCallback] = None,
+        on_window: Optional[WindowCallback] = None
     ) -> ArcAnalysisResult:
         """
         Main analysis method that splits story into arcs with growth-aware planning.
@@ -179,6 +268,19 @@ class ArcSplitterAgent(BaseAgent):
             api_key: Optional API key for direct usage
             provider: Optional LLM provider override
             model: Optional LLM model override
+            resume: Reuse checkpointed windows from an earlier run of the same story,
+                prompt version and model (requires a checkpoint repository)
+            previous_result: Analysis of an earlier version of the story. Its leading
+                finalized arcs are kept as-is and only the chapters after them are
+                analyzed (incremental mode for stories that grow over time)
+            parallel: Analyze all windows concurrently without previous-arc context and
+                reconcile arcs at the window seams (lower latency for long stories)
+            on_arc: Called with each arc (and its window) as soon as the arc's JSON
+                object has streamed in. Arcs are as the window reported them; an
+                unfinalized arc may still be extended by the next window, and parallel
+                windows are renumbered when reconciled
+            on_window: Called when a window starts its LLM analysis (windows restored
+                from checkpoints are not analyzed and not reported)
             
         Returns:
             A single ArcAnalysisResult object containing all arcs for the entire story.
@@ -189,7 +291,12 @@ class ArcSplitterAgent(BaseAgent):
             user_id=user_id,
             api_key=api_key,
             provider=provider,
-            model=model
+            model=model,
+            resume=resume,
+            previous_result=previous_result,
+            parallel=parallel,
+            on_arc=on_arc,
+            on_window=on_window
         ):
             pass  # Just consume the stream to accumulate internal state
         
@@ -202,7 +309,12 @@ class ArcSplitterAgent(BaseAgent):
         user_id: UUID,
         api_key: Optional[str] = None,
         provider: Optional[PROVIDER_ID] = None,
-        model: Optional[MODEL_NAME] = None
+        model: Optional[MODEL_NAME] = None,
+        resume: bool = True,
+        previous_result: Optional[ArcAnalysisResult] = None,
+        parallel: bool = False,
+        on_arc: Optional[ArcCallback] = None,
+        on_window: Optional[WindowCallback] = None
     ) -> AsyncIterator[LLMResponse]:
         """
         Streaming version of story analysis that yields raw LLM responses while managing internal state.
@@ -210,19 +322,43 @@ class ArcSplitterAgent(BaseAgent):
         This method processes the story in token-aware chunks and yields all LLM responses
         as they arrive. Internal state is accumulated for later retrieval via get_final_result().
         
+        With a checkpoint repository, every successful window is saved as soon as it
+        is parsed. On the next run for the same story content, prompt version, model
+        and chunk size, windows whose chapter range and input context are unchanged
+        are restored without an LLM call (nothing is yielded for them).
+        
+        In incremental mode (previous_result given) the finalized arcs at the start
+        of the previous analysis become the first window, and windows start at the
+        first chapter not covered by them, with those arcs as prior context.
+        
+        In parallel mode every window is analyzed as a fresh chunk that also
+        includes up to parallel_overlap_chapters preceding chapters, so the LLM
+        can see whether an arc continues across the seam. Chunks from concurrent
+        windows are yielded interleaved (see chunk metadata window_number), and
+        get_final_result() reconciles the windows instead of chaining them.
+        
         Args:
             story: Story object containing all story data
             user_id: UUID of the user making the request
             api_key: Optional API key for direct usage
             provider: Optional LLM provider override
             model: Optional LLM model override
+            resume: Reuse checkpointed windows (see analyze_story)
+            previous_result: Previous analysis for incremental mode (see analyze_story)
+            parallel: Analyze windows concurrently (see analyze_story)
+            on_arc: Callback for arcs as they stream in (see analyze_story)
+            on_window: Callback for windows as they start (see analyze_story)
             
         Yields:
             Raw LLLResponse chunks as they arrive from the LLM, with proper chunk type labels.
-            Internal state is accumulated for later merging.
+            A chunk that completes one or more arcs carries them (as dicts) in
+            metadata["completed_arcs"]. Internal state is accumulated for later merging.
         """
         # Reset state for new analysis
         self._reset_analysis_state()
+        self._parallel = parallel
+        self._on_arc = on_arc
+        self._on_window = on_window
         
         # Setup and Configuration
         story_title = story.metadata.title
@@ -231,44 +367,95 @@ class ArcSplitterAgent(BaseAgent):
         
         # Calculate chunk token limit based on model's input context window
         chunk_token_limit = self._calculate_chunk_token_limit(provider, model)
+        tokenizer = get_tokenizer(*self._get_model_params(provider, model))
 
         is_short_story = story.is_short_story
         
         logger.info(f"🔍 ArcSplitter Analysis Starting:")
         logger.info(f"   📖 Story: {story_title}")
         logger.info(f"   📊 Chapters: {total_chapters}, Words: {story.word_count}")
-        logger.info(f"   🧮 Total tokens: {story.total_tokens}, Chunk limit: {chunk_token_limit}")
+        logger.info(f"   🧮 Total tokens: {story.count_tokens(tokenizer)} ({tokenizer.name}), Chunk limit: {chunk_token_limit}")
         logger.info(f"   📏 Short story: {is_short_story}")
 
-        # Process chunks using story's efficient chunking
+        # Incremental mode: keep the previous analysis' finalized arcs as window 1
         previous_arcs_json: Optional[str] = None
         last_processed_chapter = 0
+        start_chapter = 1
+        if previous_result is not None:
+            kept_result = self._finalized_prefix(previous_result)
+            if kept_result is not None:
+                last_processed_chapter = kept_result.arcs[-1].end_chapter
+                start_chapter = last_processed_chapter + 1
+                previous_arcs_json = kept_result.model_dump_json()
+                self._window_results.append(WindowProcessingResult(
+                    window_number=1,
+                    start_chapter=kept_result.arcs[0].start_chapter,
+                    end_chapter=last_processed_chapter,
+                    is_final_window=last_processed_chapter >= total_chapters,
+                    parsed_result=kept_result,
+                    restored=True
+                ))
+            reopened = len(previous_result.arcs) - (len(kept_result.arcs) if kept_result else 0)
+            logger.info(f"   ♻️ Incremental: keeping {len(previous_result.arcs) - reopened} finalized arcs, re-opening {reopened}, analyzing from chapter {start_chapter}")
 
-        for chunk_chapters, story_content_chunk, actual_chunk_tokens in story.get_content_chunks(chunk_token_limit):
-            # Create window processing result
+        # Load checkpoints of an earlier run of this exact analysis
+        checkpoints: Dict[int, Dict[str, Any]] = {}
+        if self.checkpoint_repository is not None:
+            self._current_run_key = self._checkpoint_run_key(
+                story, provider, model, chunk_token_limit, start_chapter,
+                mode=f"parallel:{self.parallel_overlap_chapters}" if parallel else "sequential"
+            )
+            if resume:
+                checkpoints = await self._load_checkpoints(self._current_run_key)
+
+        prompt_args = StoryPromptArgs(
+            story_title=story_title,
+            total_chapters=total_chapters,
+            is_short_story=is_short_story,
+            genre=genre,
+        )
+        llm_args = LLMArgs(user_id=user_id, api_key=api_key, provider=provider, model=model)
+        
+        if parallel:
+            async for llm_chunk in self._analyze_windows_parallel(
+                story, chunk_token_limit, start_chapter, checkpoints, prompt_args, llm_args, tokenizer
+            ):
+                yield llm_chunk
+            logger.info(f"✅ Streaming completed: {len(self._window_results)} windows processed")
+            self._log_cascade_report()
+            return
+
+        # Process chunks using story's balanced chunking
+        chunks = story.pack_windows(chunk_token_limit, start_chapter=start_chapter, tokenizer=tokenizer)
+        for index, chunk in enumerate(chunks):
             window_number = len(self._window_results) + 1
-            chunk_start_chapter = chunk_chapters[0].chapter_number
-            chunk_end_chapter = chunk_chapters[-1].chapter_number
-            is_final_chunk = (chunk_end_chapter == total_chapters)
+            chunk_start_chapter = chunk.start_chapter
+            chunk_end_chapter = chunk.end_chapter
+            story_content_chunk = chunk.content
+            actual_chunk_tokens = chunk.tokens
+            is_final_chunk = index == len(chunks) - 1
+            context_hash = hashlib.sha256((previous_arcs_json or "").encode("utf-8")).hexdigest()
             
-            window_result = WindowProcessingResult(
-                window_number=window_number,
-                start_chapter=chunk_start_chapter,
-                end_chapter=chunk_end_chapter,
-                is_final_window=is_final_chunk
+            # Restore the window if it was checkpointed with the same inputs
+            restored = self._restore_window(
+                checkpoints.get(window_number), chunk_start_chapter, chunk_end_chapter, context_hash
             )
-            self._window_results.append(window_result)
+            if restored is not None:
+                self._window_results.append(restored)
+                parsed_result = cast(ArcAnalysisResult, restored.parsed_result)
+                previous_arcs_json = parsed_result.model_dump_json()
+                if parsed_result.arcs:
+                    last_processed_chapter = parsed_result.arcs[-1].end_chapter
+                logger.info(f"♻️ Window {window_number}: restored {len(parsed_result.arcs)} arcs from checkpoint (chapters {chunk_start_chapter}-{chunk_end_chapter})")
+                continue
             
             logger.info(f"🔄 Processing window {window_number}: chapters {chunk_start_chapter}-{chunk_end_chapter}")
             logger.info(f"   🧮 Chunk tokens: {actual_chunk_tokens}, Final: {is_final_chunk}")
 
             # Render prompts for the current chunk
             messages = self._load_and_render_prompts_for_chunk(
-                story_title=story_title,
+                **prompt_args,
                 story_content_chunk=story_content_chunk,
-                total_chapters=total_chapters,
-                is_short_story=is_short_story,
-                genre=genre,
                 chunk_start_chapter=chunk_start_chapter,
                 chunk_end_chapter=chunk_end_chapter,
                 is_final_chunk=is_final_chunk,
@@ -276,73 +463,405 @@ class ArcSplitterAgent(BaseAgent):
                 last_processed_chapter=last_processed_chapter
             )
 
-            # Make the LLM call for the window
-            logger.info(f"   🤖 Making LLM call for window {window_number}...")
+            window_result = WindowProcessingResult(
+                window_number=window_number,
+                start_chapter=chunk_start_chapter,
+                end_chapter=chunk_end_chapter,
+                is_final_window=is_final_chunk,
+                input_context_hash=context_hash
+            )
+            async for llm_chunk in self._run_window(window_result, messages, **llm_args):
+                yield llm_chunk
+            self._window_results.append(window_result)
+            
+            if window_result.parsed_result is None:
+                # Later windows depend on this one's arcs, so stop here; a rerun resumes at this window
+                logger.error(f"   ⛔ Stopping analysis at window {window_number} after {window_result.attempts} attempts")
+                break
+            
+            # Update context for next iteration
+            parsed_result = cast(ArcAnalysisResult, window_result.parsed_result)
+            previous_arcs_json = parsed_result.model_dump_json()
+            if parsed_result.arcs:
+                last_processed_chapter = parsed_result.arcs[-1].end_chapter
+            await self._save_checkpoint(window_result, previous_arcs_json, last_processed_chapter)
+        
+        logger.info(f"✅ Streaming completed: {len(self._window_results)} windows processed")
+        self._log_cascade_report()
+    
+    async def _run_window(
+        self,
+        window_result: WindowProcessingResult,
+        messages: List[LLMMessage],
+        user_id: UUID,
+        api_key: Optional[str],
+        provider: Optional[PROVIDER_ID],
+        model: Optional[MODEL_NAME]
+    ) -> AsyncIterator[LLMResponse]:
+        """
+        Run a window, retrying failed LLM calls or unparseable output up to max_window_retries times.
+        
+        Windows stream, so the cascade is driven here with BaseAgent's
+        CascadeItem rather than _run_cascade: with an escalation model, attempts
+        after a failed first attempt run on it (at least one escalated attempt
+        is made). A window whose output parsed but failed only the coverage
+        check keeps that output if the escalated attempts produce nothing
+        parseable.
+        """
+        if self._on_window is not None:
+            outcome = self._on_window(window_result)
+            if asyncio.iscoroutine(outcome):
+                await outcome
+        item = self._start_cascade("window", provider, model)
+        cheap_model = item.model
+        max_attempts = max(self.max_window_retries, 1 if item.can_escalate else 0) + 1
+        unconfirmed: Optional[ArcAnalysisResult] = None
+        for attempt in range(1, max_attempts + 1):
+            window_result.attempts = attempt
+            window_result.raw_content = WindowContentAccumulator()
+            window_result.parsed_result = None
+            window_result.error = None
+            async for llm_chunk in self._stream_window(window_result, messages, user_id, api_key, item.provider, item.model):
+                yield llm_chunk
+            issue = self._window_issue(window_result)
+            if issue is None:
+                item.passed()
+                return
+            if window_result.parsed_result is not None:
+                if not item.can_escalate:
+                    # Only the coverage check failed and there is no stronger model to ask
+                    return
+                unconfirmed = cast(ArcAnalysisResult, window_result.parsed_result)
+            if item.escalate(f"window {window_result.window_number}: {issue}"):
+                window_result.escalated = True
+            elif attempt < max_attempts:
+                logger.warning(f"   🔁 Retrying window {window_result.window_number} (attempt {attempt + 1})")
+        if unconfirmed is not None:
+            logger.warning(f"   ⚠️ Window {window_result.window_number}: keeping the unconfirmed {cheap_model} result")
+            window_result.parsed_result = unconfirmed
+            window_result.error = None
+    
+    def _window_issue(self, window_result: WindowProcessingResult) -> Optional[str]:
+        """
+        Why a window's output should not be trusted, or None if it passes.
+        
+        Besides failing to parse (which includes ArcAnalysisResult's gap and
+        overlap checks), output is suspect if its arcs stop short of the window's
+        last chapter.
+        """
+        parsed_result = cast(Optional[ArcAnalysisResult], window_result.parsed_result)
+        if parsed_result is None:
+            return window_result.error or "no parseable output"
+        last_chapter = max(arc.end_chapter for arc in parsed_result.arcs)
+        if last_chapter < window_result.end_chapter:
+            return f"arcs stop at chapter {last_chapter}, window ends at chapter {window_result.end_chapter}"
+        return None
+    
+    async def _analyze_windows_parallel(
+        self,
+        story: FullStoryBase,
+        chunk_token_limit: int,
+        start_chapter: int,
+        checkpoints: Dict[int, Dict[str, Any]],
+        prompt_args: StoryPromptArgs,
+        llm_args: LLMArgs,
+        tokenizer: Tokenizer
+    ) -> AsyncIterator[LLMResponse]:
+        """
+        Analyze all windows concurrently, yielding their chunks as they arrive.
+        
+        Each window owns the chapters of one chunk (computed with a token budget
+        reduced by PARALLEL_OVERLAP_TOKEN_SHARE) and also sees an overlap margin
+        of preceding chapters. No window gets previous-arc context.
+        """
+        overlap_budget = int(chunk_token_limit * PARALLEL_OVERLAP_TOKEN_SHARE) if self.parallel_overlap_chapters else 0
+        first_window_number = len(self._window_results) + 1
+        
+        windows: List[WindowProcessingResult] = []
+        pending: List[Tuple[WindowProcessingResult, List[LLMMessage]]] = []
+        chunks = story.pack_windows(
+            chunk_token_limit - overlap_budget, start_chapter=start_chapter, tokenizer=tokenizer,
+            overlap_chapters=self.parallel_overlap_chapters, overlap_token_limit=overlap_budget
+        )
+        for offset, chunk in enumerate(chunks):
+            window_number = first_window_number + offset
+            core_start = chunk.start_chapter
+            core_end = chunk.end_chapter
+            context_start = chunk.context_start_chapter
+            context_hash = hashlib.sha256(f"parallel:{context_start}".encode("utf-8")).hexdigest()
+            
+            restored = self._restore_window(checkpoints.get(window_number), core_start, core_end, context_hash)
+            if restored is not None:
+                windows.append(restored)
+                logger.info(f"♻️ Window {window_number}: restored from checkpoint (chapters {core_start}-{core_end})")
+                continue
+            
+            window_result = WindowProcessingResult(
+                window_number=window_number,
+                start_chapter=core_start,
+                end_chapter=core_end,
+                is_final_window=offset == len(chunks) - 1,
+                input_context_hash=context_hash,
+                context_start_chapter=context_start
+            )
+            messages = self._load_and_render_prompts_for_chunk(
+                **prompt_args,
+                story_content_chunk=chunk.content,
+                chunk_start_chapter=context_start,
+                chunk_end_chapter=core_end,
+                is_final_chunk=window_result.is_final_window,
+                previous_arcs_json=None,
+                last_processed_chapter=0
+            )
+            windows.append(window_result)
+            pending.append((window_result, messages))
+        
+        self._window_results.extend(windows)
+        logger.info(f"🔀 Parallel analysis: {len(pending)} windows to run ({len(windows) - len(pending)} restored), up to {self.max_parallel_windows} at once")
+        
+        queue: asyncio.Queue[Optional[LLMResponse]] = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_parallel_windows)
+        
+        async def run(window_result: WindowProcessingResult, messages: List[LLMMessage]) -> None:
+            async with semaphore:
+                async for llm_chunk in self._run_window(window_result, messages, **llm_args):
+                    await queue.put(llm_chunk)
+            parsed_result = cast(Optional[ArcAnalysisResult], window_result.parsed_result)
+            if parsed_result is not None:
+                await self._save_checkpoint(window_result, parsed_result.model_dump_json(), parsed_result.arcs[-1].end_chapter)
+        
+        async def run_all() -> None:
             try:
-                response_stream = await self._make_llm_call(
-                    messages=messages,
-                    user_id=user_id,
-                    api_key=api_key,
-                    provider=provider,
-                    model=model,
-                    stream=True,
-                    response_format=ArcAnalysisResult
-                )
+                await asyncio.gather(*(run(window_result, messages) for window_result, messages in pending))
+            finally:
+                await queue.put(None)
+        
+        runner = asyncio.create_task(run_all())
+        try:
+            while (llm_chunk := await queue.get()) is not None:
+                yield llm_chunk
+            await runner
+        finally:
+            if not runner.done():
+                runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
+    
+    def _finalized_prefix(self, previous_result: ArcAnalysisResult) -> Optional[ArcAnalysisResult]:
+        """
+        The previous analysis cut down to its leading finalized arcs.
+        
+        Everything from the first unfinalized arc on is re-opened, since the
+        trailing arc may grow into (or merge with) the new chapters.
+        
+        Returns:
+            ArcAnalysisResult with only the kept arcs, or None if no arc is kept
+        """
+        kept: List[Arc] = []
+        for arc in sorted(previous_result.arcs, key=lambda a: a.start_chapter):
+            if not arc.is_finalized:
+                break
+            kept.append(arc)
+        if not kept:
+            return None
+        return ArcAnalysisResult.model_validate({**previous_result.model_dump(exclude={"arcs"}), "arcs": kept})
+    
+    async def _stream_window(
+        self,
+        window_result: WindowProcessingResult,
+        messages: List[LLMMessage],
+        user_id: UUID,
+        api_key: Optional[str],
+        provider: Optional[PROVIDER_ID],
+        model: Optional[MODEL_NAME]
+    ) -> AsyncIterator[LLMResponse]:
+        """Make one streaming LLM call for a window, yielding chunks and filling in window_result."""
+        window_number = window_result.window_number
+        logger.info(f"   🤖 Making LLM call for window {window_number}...")
+        try:
+            response_stream = await self._make_llm_call(
+                messages=messages,
+                user_id=user_id,
+                api_key=api_key,
+                provider=provider,
+                model=model,
+                stream=True,
+                response_format=ArcAnalysisResult
+            )
+            
+            # Process the streaming response
+            stream = cast(AsyncIterator[LLMResponse], response_stream)
+            chunk_stream_count = 0
+            arc_stream = JSONArrayItemStream("arcs")
+            json_scanner = JSONScanner()
+            
+            async for llm_chunk in stream:
+                chunk_stream_count += 1
                 
-                # Process the streaming response
-                stream = cast(AsyncIterator[LLMResponse], response_stream)
-                chunk_stream_count = 0
+                # Add metadata to help with debugging
+                llm_chunk.metadata = llm_chunk.metadata or {}
+                llm_chunk.metadata.update({
+                    "analysis_id": self._current_analysis_id,
+                    "window_number": window_number,
+                    "chapters": window_result.chapters_range,
+                    "is_final_chunk": window_result.is_final_window,
+                    "attempt": window_result.attempts
+                })
                 
-                async for llm_chunk in stream:
-                    chunk_stream_count += 1
-                    
-                    # Add metadata to help with debugging
-                    llm_chunk.metadata = llm_chunk.metadata or {}
-                    llm_chunk.metadata.update({
-                        "analysis_id": self._current_analysis_id,
-                        "window_number": window_number,
-                        "chapters": f"{chunk_start_chapter}-{chunk_end_chapter}",
-                        "is_final_chunk": is_final_chunk
-                    })
-                    
-                    # Accumulate content in window result
-                    window_result.raw_content.add_chunk(llm_chunk)
-                    
-                    # Yield the raw LLM response
-                    yield llm_chunk
+                # Accumulate content in window result
+                window_result.raw_content.add_chunk(llm_chunk)
                 
-                logger.info(f"   📡 Window {window_number}: {chunk_stream_count} streaming responses")
+                # Surface arcs whose JSON object this chunk completed
+                if llm_chunk.chunk_type in (ChunkType.CONTENT, ChunkType.UNKNOWN):
+                    json_scanner.feed(llm_chunk.content)
+                    completed_arcs = await self._emit_streamed_arcs(arc_stream.feed(llm_chunk.content), window_result)
+                    if completed_arcs:
+                        llm_chunk.metadata["completed_arcs"] = [arc.model_dump() for arc in completed_arcs]
                 
-                # Parse the accumulated content for this window
-                content_to_parse = window_result.raw_content.content + window_result.raw_content.unknown
-                if content_to_parse.strip():
-                    try:
-                        # Clean the JSON from potential markdown formatting
-                        cleaned_json = clean_json_from_llm_response(content_to_parse)
-                        parsed_result = ArcAnalysisResult.model_validate_json(cleaned_json)
-                        window_result.parsed_result = parsed_result
-                        logger.info(f"   ✅ Window {window_number}: Parsed {len(parsed_result.arcs)} arcs")
-                        
-                        # Update context for next iteration
-                        previous_arcs_json = parsed_result.model_dump_json()
-                        if parsed_result.arcs:
-                            last_processed_chapter = parsed_result.arcs[-1].end_chapter
-                            
-                    except Exception as e:
-                        error_msg = f"Failed to parse window {window_number}: {e}"
-                        window_result.error = error_msg
-                        logger.error(f"   ❌ {error_msg}")
-                else:
-                    error_msg = f"Window {window_number} produced no parseable content"
+                # Yield the raw LLM response
+                yield llm_chunk
+            
+            raw = window_result.raw_content
+            ttft, rate, thinking = raw.time_to_first_token, raw.tokens_per_second, raw.thinking_ratio
+            logger.info(
+                f"   📡 Window {window_number}: {chunk_stream_count} streaming responses, {raw.output_tokens} tokens"
+                + (f", TTFT {ttft:.2f}s" if ttft is not None else "")
+                + (f", {rate:.0f} tokens/s" if rate is not None else "")
+                + (f", {thinking:.0%} thinking" if thinking is not None else "")
+            )
+            
+            # Parse the accumulated content for this window
+            content_to_parse = window_result.raw_content.content + window_result.raw_content.unknown
+            if content_to_parse.strip():
+                try:
+                    # The JSON was extracted from markdown formatting while it streamed
+                    cleaned_json = json_scanner.extract()
+                    parsed_result = ArcAnalysisResult.model_validate_json(cleaned_json)
+                    window_result.parsed_result = parsed_result
+                    logger.info(f"   ✅ Window {window_number}: Parsed {len(parsed_result.arcs)} arcs")
+                except Exception as e:
+                    error_msg = f"Failed to parse window {window_number}: {e}"
                     window_result.error = error_msg
                     logger.error(f"   ❌ {error_msg}")
-                    
-            except Exception as e:
-                error_msg = f"LLM call failed for window {window_number}: {e}"
+            else:
+                error_msg = f"Window {window_number} produced no parseable content"
                 window_result.error = error_msg
                 logger.error(f"   ❌ {error_msg}")
+                
+        except Exception as e:
+            error_msg = f"LLM call failed for window {window_number}: {e}"
+            window_result.error = error_msg
+            logger.error(f"   ❌ {error_msg}")
+    
+    async def _emit_streamed_arcs(self, items: List[Any], window_result: WindowProcessingResult) -> List[Arc]:
+        """Validate streamed arc objects and pass them to the on_arc callback."""
+        arcs: List[Arc] = []
+        for item in items:
+            try:
+                arc = Arc.model_validate(item)
+            except Exception as e:
+                logger.debug(f"   Skipping invalid streamed arc in window {window_result.window_number}: {e}")
+                continue
+            arcs.append(arc)
+            logger.info(f"   🧩 Window {window_result.window_number}: arc {arc.id} '{arc.title}' (chapters {arc.start_chapter}-{arc.end_chapter}) streamed in")
+            if self._on_arc is not None:
+                outcome = self._on_arc(arc, window_result)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+        return arcs
+    
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+    
+    def _checkpoint_run_key(
+        self,
+        story: FullStoryBase,
+        provider: Optional[PROVIDER_ID],
+        model: Optional[MODEL_NAME],
+        chunk_token_limit: int,
+        start_chapter: int = 1,
+        mode: str = "sequential"
+    ) -> str:
+        """
+        Key identifying an analysis whose windows can be reused.
         
-        logger.info(f"✅ Streaming completed: {len(self._window_results)} windows processed")
+        Covers everything that changes a window's output: story content, prompt
+        version and templates, model, chunk size, start chapter and mode.
+        """
+        final_provider, final_model = self._get_model_params(provider, model)
+        splitting_prompts = prompt_manager.get_group("wikigen.arc_splitting")
+        key_parts = {
+            "story": story.content_hash,
+            "prompt_version": splitting_prompts.get("version"),
+            "prompt_templates": splitting_prompts.get("messages"),
+            "provider": final_provider,
+            "model": final_model,
+            "chunk_token_limit": chunk_token_limit,
+            "tokenizer": get_tokenizer(final_provider, final_model).name,
+            "start_chapter": start_chapter,
+            "mode": mode,
+        }
+        return hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    
+    async def _load_checkpoints(self, run_key: str) -> Dict[int, Dict[str, Any]]:
+        """Checkpoint data by window number (empty if the store is unavailable)."""
+        assert self.checkpoint_repository is not None
+        try:
+            checkpoints = await self.checkpoint_repository.list_steps(CHECKPOINT_NAMESPACE, run_key)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load arc splitter checkpoints, starting fresh: {e}")
+            return {}
+        if checkpoints:
+            logger.info(f"♻️ Found {len(checkpoints)} checkpointed windows for this analysis")
+        return {checkpoint.step: checkpoint.data for checkpoint in checkpoints}
+    
+    def _restore_window(
+        self,
+        data: Optional[Dict[str, Any]],
+        start_chapter: int,
+        end_chapter: int,
+        context_hash: str
+    ) -> Optional[WindowProcessingResult]:
+        """Rebuild a checkpointed window if it was produced from the same chapters and context."""
+        if not data:
+            return None
+        if (
+            data.get("start_chapter") != start_chapter
+            or data.get("end_chapter") != end_chapter
+            or data.get("input_context_hash") != context_hash
+            or data.get("parsed_result") is None
+        ):
+            return None
+        try:
+            return WindowProcessingResult.from_checkpoint(data, ArcAnalysisResult)
+        except Exception as e:
+            logger.warning(f"⚠️  Ignoring invalid checkpoint for window {data.get('window_number')}: {e}")
+            return None
+    
+    async def _save_checkpoint(
+        self,
+        window_result: WindowProcessingResult,
+        previous_arcs_json: str,
+        last_processed_chapter: int
+    ) -> None:
+        """Persist a successful window; a failing store only costs resumability."""
+        if self.checkpoint_repository is None or self._current_run_key is None:
+            return
+        data = window_result.to_checkpoint()
+        data["previous_arcs_json"] = previous_arcs_json
+        data["last_processed_chapter"] = last_processed_chapter
+        try:
+            await self.checkpoint_repository.save(
+                CHECKPOINT_NAMESPACE, self._current_run_key, window_result.window_number, data
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Could not checkpoint window {window_result.window_number}: {e}")
+    
+    async def clear_checkpoints(self) -> int:
+        """Delete the checkpoints of the most recent analysis, returns the number deleted."""
+        if self.checkpoint_repository is None or self._current_run_key is None:
+            return 0
+        return await self.checkpoint_repository.delete_run(CHECKPOINT_NAMESPACE, self._current_run_key)
     
     def _load_and_render_prompts_for_chunk(
         self,
@@ -359,9 +878,8 @@ class ArcSplitterAgent(BaseAgent):
     ) -> List[LLMMessage]:
         """Loads and renders arc splitting prompts using chunk-specific context."""
         splitting_prompts = prompt_manager.get_group("wikigen.arc_splitting")
-        message_templates = splitting_prompts.get("messages")
         
-        render_kwargs = {
+        render_kwargs: Dict[str, Any] = {
             "story_title": story_title,
             "story_content_chunk": story_content_chunk,
             "total_chapters": total_chapters,
@@ -374,12 +892,7 @@ class ArcSplitterAgent(BaseAgent):
             "last_processed_chapter": last_processed_chapter
         }
         
-        final_messages = []
-        for template in message_templates:
-            rendered_content = splitting_prompts.render(template['content'], **render_kwargs)
-            final_messages.append(LLMMessage(role=template['role'], content=rendered_content))
-        
-        return final_messages
+        return splitting_prompts.render_messages(**render_kwargs)
 
     def _calculate_chunk_token_limit(
         self, 
@@ -426,7 +939,7 @@ class ArcSplitterAgent(BaseAgent):
         return chunk_token_limit
     
     # Implementation of BaseAgent's abstract method
-    async def execute(self, *args, **kwargs):
+    async def execute(self, *args: Any, **kwargs: Any) -> ArcAnalysisResult:
         """
         Execute the arc splitting analysis.
         
@@ -20,21 +20,76 @@ Key Features:
 - Consistent formatting and style
 - Quality validation and refinement
 - Spoiler-aware content generation
+- Bounded-concurrency pipeline: generation, reference identification, search
+  and formatting are separate stages connected by queues, with per-article
+  retries and each article surfaced as soon as it is done
+- Passage retrieval: for long arcs, each article prompt carries only the
+  passages relevant to it (BM25 index built once per arc)
 """
 
-from typing import List, Optional, Dict, Any
+import asyncio
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, TypeVar
 from uuid import UUID
 
-# TODO: Import proper types when schemas are defined
-# from src.database.models.story import Chapter
-# from src.database.models.workspace import Arc
-# from src.database.models.wiki import WikiArticle
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.core.exceptions import ProcessingError
 # NOTE: WikiPlan and ArticlePlan may need to be created in domain models
+from src.schemas.llm.models import LLMMessage
+from src.schemas.wikigen.wiki import ArticlePlan, WikiArticle, WikiPlan
 from src.services.llm.llm_service import LLMService
-# TODO: Import when web search service is implemented
-# from src.services.web_search.web_search_service import WebSearchService
+from src.services.web_search.web_search_service import SearchResult, WebSearchService
 from src.prompts import prompt_manager
 from src.agents.base_agent import BaseAgent
+from src.utils import parse_cleaned_json
+from src.utils.passage_index import Embedder, PassageIndex
+from src.utils.tokenizers import get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Base delay before retrying a failed stage; doubles with each attempt
+RETRY_BACKOFF_SECONDS = 0.5
+
+# Stages an article moves through, in order
+PIPELINE_STAGES = ("generate", "references", "search", "format")
+
+# Passage indexes kept per agent (one per recently written arc)
+MAX_CACHED_PASSAGE_INDEXES = 4
+
+# Most references looked up per article
+MAX_SEARCH_QUERIES = 5
+
+# Search hits cited per reference in an article's References section
+MAX_RESULTS_PER_REFERENCE = 2
+
+# Called with each finished article as soon as it is ready (may be a coroutine function)
+ArticleCallback = Callable[[WikiArticle], Any]
+
+T = TypeVar("T")
+
+_REFERENCES_HEADING_PATTERN = re.compile(r"^##\s+References\s*$", re.MULTILINE | re.IGNORECASE)
+_CODE_FENCE_PATTERN = re.compile(r"^```(?:markdown|md)?[ \t]*\n(.*?)\n```[ \t]*$", re.DOTALL)
+
+
+@dataclass
+class ArticleJob:
+    """An article moving through the writing pipeline"""
+    index: int                                   # Position in the wiki plan
+    plan: ArticlePlan
+    content: str = ""                            # Draft, then formatted content
+    search_queries: List[str] = field(default_factory=list)
+    search_results: Dict[str, Any] = field(default_factory=dict)
+    attempts: Dict[str, int] = field(default_factory=dict)  # Attempts per stage
+    article: Optional[WikiArticle] = None        # Set when the article is done
+    error: Optional[str] = None                  # Set when a required stage failed
+
+    @property
+    def succeeded(self) -> bool:
+        return self.article is not None
 
 
 class ArticleWriterAgent(BaseAgent):
@@ -43,55 +98,97 @@ class ArticleWriterAgent(BaseAgent):
     
     Creates high-quality wiki articles with web search integration for 
     cultural references and proper wiki-style formatting.
+    
+    Articles go through a staged pipeline (generate, identify references,
+    search, format) connected by bounded queues, so one article can be
+    searched while others are still being generated. Each stage has its own
+    concurrency limit, shared by every write_articles call on the agent, and
+    each stage is retried per article. A run over many articles takes about
+    as long as its slowest few.
     """
     
     def __init__(
         self, 
         llm_service: LLMService, 
-        web_search_service: Any = None,  # TODO: WebSearchService when available
-        default_provider: str = "google",
-        default_model: str = "gemini-2.0-flash-001"
+        web_search_service: Optional[WebSearchService] = None,
+        default_provider: PROVIDER_ID = "google",
+        default_model: MODEL_NAME = "gemini-2.0-flash-001",
+        max_concurrent_articles: int = 8,
+        max_concurrent_searches: int = 4,
+        max_article_retries: int = 1,
+        passage_token_budget: Optional[int] = 8000,
+        passage_tokens: int = 300,
+        embedder: Optional[Embedder] = None,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None
     ):
         """
         Initializes agent with required services and default model.
         
         Args:
             llm_service: LLM service for content generation
-            web_search_service: Web search service for reference lookup
+            web_search_service: Web search service for reference lookup (share one
+                                across agents so repeated references are searched once)
             default_provider: Default LLM provider for article writing
             default_model: Default model optimized for content generation
+            max_concurrent_articles: Maximum concurrent article generation (LLM) calls
+            max_concurrent_searches: Maximum articles in the reference and search stages at once
+            max_article_retries: Extra attempts for an article stage that fails
+            passage_token_budget: Arcs longer than this are not sent whole; each article
+                                  gets its most relevant passages up to this many tokens
+                                  (None always sends the whole arc)
+            passage_tokens: Target size of an indexed passage
+            embedder: Optional local embedding function mixed into passage ranking
+            escalation_model: Stronger model an article draft is re-run on when the default
+                              model fails or returns no content (None disables escalation)
+            escalation_provider: Provider of the escalation model (default: default_provider)
         """
         super().__init__(
             llm_service=llm_service,
             default_provider=default_provider,
-            default_model=default_model
+            default_model=default_model,
+            escalation_model=escalation_model,
+            escalation_provider=escalation_provider
         )
         self.web_search_service = web_search_service
+        self.max_article_retries = max(0, max_article_retries)
+        self.stage_concurrency: Dict[str, int] = {
+            "generate": max(1, max_concurrent_articles),
+            "references": max(1, max_concurrent_searches),
+            "search": max(1, max_concurrent_searches),
+            "format": max(1, max_concurrent_articles),
+        }
+        self.passage_token_budget = passage_token_budget
+        self.passage_tokens = passage_tokens
+        self.embedder = embedder
+        # Created lazily so they bind to the running event loop
+        self._stage_slots: Dict[str, asyncio.Semaphore] = {}
+        self._passage_indexes: "OrderedDict[str, PassageIndex]" = OrderedDict()
     
     async def write_articles(
         self,
-        wiki_plan: Any,  # TODO: WikiPlan
+        wiki_plan: WikiPlan,
         arc_content: str,
         story_metadata: Dict[str, Any],
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None,
-        include_web_search: bool = True
-    ) -> List[Any]:  # TODO: List[WikiArticle]
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        include_web_search: bool = True,
+        context_plan: Optional[WikiPlan] = None,
+        on_article: Optional[ArticleCallback] = None,
+        allow_partial: bool = False,
+        project_id: Optional[str] = None
+    ) -> List[WikiArticle]:
         """
         Main generation method that creates all articles from plan.
         
-        Processes each article in the plan and generates complete content:
-        1. For each planned article:
-           - Generate base content from arc text
-           - Identify cultural references needing search
-           - Perform web searches for references
-           - Integrate search results into content
-           - Format as proper wiki article
-           - Add cross-reference links
-        2. Validate article quality and consistency
-        3. Return complete article set
+        Articles run through the pipeline concurrently (see stream_articles):
+        1. Generate base content from arc text
+        2. Identify cultural references needing search
+        3. Perform web searches for references
+        4. Format as a wiki article, cite search results in a References
+           section and validate
         
         Args:
             wiki_plan: Planning output with article specifications
@@ -102,9 +199,19 @@ class ArticleWriterAgent(BaseAgent):
             provider: Optional LLM provider override (uses default if not provided)
             model: Optional LLM model override (uses default if not provided)
             include_web_search: Whether to perform web searches for references
+            context_plan: Full plan shown to the model for linking when wiki_plan is a
+                          subset of it (defaults to wiki_plan)
+            on_article: Called with each article as soon as it is finished, before the
+                        rest of the plan completes
+            allow_partial: Return the articles that succeeded instead of raising when
+                           some fail
+            project_id: Optional project the calls are made for (usage attribution)
             
         Returns:
-            List of WikiArticle objects with complete content
+            List of WikiArticle objects with complete content, in plan order
+            
+        Raises:
+            ProcessingError: If any article failed after retries (unless allow_partial)
             
         Output Format: Each article has:
             - title: Article title
@@ -113,49 +220,283 @@ class ArticleWriterAgent(BaseAgent):
             - metadata: Article type, references, links
             - arc_id: Arc this content is safe for
         """
-        # TODO: Implement article generation logic
-        raise NotImplementedError("Article writing not yet implemented")
+        jobs: List[ArticleJob] = []
+        async for job in self.stream_articles(
+            wiki_plan, arc_content, story_metadata, user_id,
+            api_key=api_key, provider=provider, model=model,
+            include_web_search=include_web_search, context_plan=context_plan, project_id=project_id,
+        ):
+            jobs.append(job)
+            if job.article is not None and on_article is not None:
+                outcome = on_article(job.article)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+
+        jobs.sort(key=lambda j: j.index)
+        failed = [job for job in jobs if not job.succeeded]
+        if failed and not allow_partial:
+            raise ProcessingError(
+                f"Failed to write {len(failed)} of {len(jobs)} articles",
+                details={"failed": {job.plan.title: job.error for job in failed}},
+            )
+        for job in failed:
+            logger.warning(f"⚠️ Skipping article '{job.plan.title}': {job.error}")
+        return [job.article for job in jobs if job.article is not None]
+
+    async def stream_articles(
+        self,
+        wiki_plan: WikiPlan,
+        arc_content: str,
+        story_metadata: Dict[str, Any],
+        user_id: UUID,
+        api_key: Optional[str] = None,
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        include_web_search: bool = True,
+        context_plan: Optional[WikiPlan] = None,
+        project_id: Optional[str] = None
+    ) -> AsyncIterator[ArticleJob]:
+        """
+        Run the article pipeline and yield each article as soon as it finishes.
+        
+        Every stage has a pool of workers reading from a bounded queue and
+        writing to the next stage's queue. Generation and formatting failures
+        fail the article after retries; reference and search failures only
+        drop the references. Failed articles are yielded too (article is None,
+        error is set), so one bad article never holds up the rest.
+        
+        Args:
+            Same as write_articles
+            
+        Yields:
+            Finished ArticleJob objects, in completion order
+        """
+        articles = list(wiki_plan.articles)
+        if not articles:
+            return
+        search = include_web_search and self.web_search_service is not None
+        overall_plan = self._format_wiki_plan(context_plan or wiki_plan)
+        context = {
+            "story_metadata": story_metadata,
+            "overall_wiki_plan": overall_plan,
+            "project_id": project_id,
+            "passage_index": self._get_passage_index(arc_content, provider, model),
+        }
+
+        async def generate(job: ArticleJob) -> None:
+            job.content = await self._generate_single_article(
+                job.plan, arc_content, context, user_id, api_key, provider, model
+            )
+
+        async def identify_references(job: ArticleJob) -> None:
+            if search:
+                job.search_queries = await self._identify_search_queries(
+                    job.content, job.plan.article_type, user_id, api_key, provider, model, project_id
+                )
+
+        async def perform_searches(job: ArticleJob) -> None:
+            if job.search_queries:
+                job.search_results = await self._perform_web_searches(job.search_queries)
+
+        async def format_article(job: ArticleJob) -> None:
+            content = self._format_as_wiki_article(job.content, job.plan)
+            content = self._integrate_search_results(content, job.search_results)
+            article = WikiArticle(
+                title=job.plan.title,
+                filename=job.plan.filename,
+                content=content,
+                article_type=job.plan.article_type,
+                arc_id=wiki_plan.arc_id,
+                aliases=job.plan.aliases,
+                metadata={"search_queries": job.search_queries, "attempts": dict(job.attempts)},
+            )
+            if not self._validate_article_quality(article):
+                raise ValueError("article failed quality validation")
+            job.content, job.article = content, article
+
+        handlers: Dict[str, Callable[[ArticleJob], Awaitable[None]]] = {
+            "generate": generate, "references": identify_references,
+            "search": perform_searches, "format": format_article,
+        }
+        required = {"generate", "format"}
+
+        # Queue i feeds stage i; the last queue collects finished (or failed) articles
+        queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=2 * self.stage_concurrency[stage]) for stage in PIPELINE_STAGES
+        ]
+        done: asyncio.Queue = asyncio.Queue()
+
+        async def worker(position: int) -> None:
+            stage = PIPELINE_STAGES[position]
+            inbox = queues[position]
+            outbox = queues[position + 1] if position + 1 < len(queues) else done
+            while True:
+                job: ArticleJob = await inbox.get()
+                try:
+                    await self._run_stage(stage, job, handlers[stage])
+                except Exception as e:
+                    if stage in required:
+                        job.error = f"{stage} failed: {e}"
+                        logger.error(f"❌ Article '{job.plan.title}' failed at {stage}: {e}")
+                        await done.put(job)
+                        continue
+                    logger.warning(f"⚠️ {stage} failed for '{job.plan.title}', continuing without references: {e}")
+                    job.search_queries, job.search_results = [], {}
+                await outbox.put(job)
+
+        async def feed() -> None:
+            for index, article_plan in enumerate(articles):
+                await queues[0].put(ArticleJob(index=index, plan=article_plan))
+
+        tasks = [asyncio.create_task(feed())]
+        for position, stage in enumerate(PIPELINE_STAGES):
+            tasks.extend(
+                asyncio.create_task(worker(position))
+                for _ in range(min(self.stage_concurrency[stage], len(articles)))
+            )
+        logger.info(f"✍️ Writing {len(articles)} articles for arc {wiki_plan.arc_id}")
+        try:
+            for _ in articles:
+                yield await done.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_stage(self, stage: str, job: ArticleJob, handler: Callable[[ArticleJob], Awaitable[T]]) -> T:
+        """Run one stage for an article within the stage's shared limit, retrying up to max_article_retries times."""
+        slots = self._stage_slots.get(stage)
+        if slots is None:
+            slots = self._stage_slots[stage] = asyncio.Semaphore(self.stage_concurrency[stage])
+        for attempt in range(1, self.max_article_retries + 2):
+            job.attempts[stage] = attempt
+            try:
+                async with slots:
+                    return await handler(job)
+            except Exception as e:
+                if attempt > self.max_article_retries:
+                    raise
+                delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"🔁 {stage} failed for '{job.plan.title}' (attempt {attempt}), retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def _get_passage_index(self, arc_content: str, provider: Optional[PROVIDER_ID], model: Optional[MODEL_NAME]) -> Optional[PassageIndex]:
+        """
+        Passage index of an arc, or None when the arc fits the passage budget.
+        
+        Built once per arc and kept for later calls with the same content (the
+        orchestrator writes each article of an arc in its own call).
+        """
+        if self.passage_token_budget is None:
+            return None
+        tokenizer = get_tokenizer(*self._get_model_params(provider, model))
+        key = hashlib.sha256(f"{tokenizer.name}\x00{arc_content}".encode("utf-8")).hexdigest()
+        if key in self._passage_indexes:
+            self._passage_indexes.move_to_end(key)
+            return self._passage_indexes[key]
+        if tokenizer.count(arc_content) <= self.passage_token_budget:
+            return None
+
+        index = PassageIndex.from_story_text(
+            arc_content, passage_tokens=self.passage_tokens, count=tokenizer.count, embedder=self.embedder,
+        )
+        logger.info(f"🔎 Indexed {len(index)} passages for article retrieval")
+        self._passage_indexes[key] = index
+        while len(self._passage_indexes) > MAX_CACHED_PASSAGE_INDEXES:
+            self._passage_indexes.popitem(last=False)
+        return index
+
+    def _select_passages(self, article_plan: ArticlePlan, index: PassageIndex) -> List[str]:
+        """Prompt text of the passages most relevant to an article, in story order."""
+        # The subject's names matter most, so they count double against the outline
+        names = " ".join([article_plan.title, *article_plan.aliases])
+        query = f"{names} {names} {article_plan.preview} {article_plan.structure}"
+        assert self.passage_token_budget is not None
+        return [passage.to_prompt_text() for passage in index.select(query, self.passage_token_budget)]
+
+    def _format_wiki_plan(self, wiki_plan: WikiPlan) -> str:
+        """Render the plan as a markdown list of articles for linking context."""
+        return "\n".join(
+            f"- {article.title} ({article.article_type}, {article.filename})"
+            + (f": {article.preview}" if article.preview else "")
+            for article in wiki_plan.articles
+        )
     
     async def _generate_single_article(
         self,
-        article_plan: Any,  # TODO: ArticlePlan
+        article_plan: ArticlePlan,
         arc_content: str,
         context: Dict[str, Any],
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None
-    ) -> Any:  # TODO: WikiArticle
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None
+    ) -> str:
         """
-        Generates content for a single article from its plan.
+        Generates the draft content for a single article from its plan.
         
-        Process:
-        1. Extract relevant content from arc text
-        2. Generate base article structure and content
-        3. Identify references and allusions needing web search
-        4. Perform searches and integrate results
-        5. Format as markdown with proper wiki structure
-        6. Add cross-reference links
+        This is the pipeline's generate stage; references, searches and
+        formatting are later stages. The story text and overall plan are the
+        same for every article, so they form the cacheable prompt prefix.
+        Arcs over the passage budget are replaced by the passages relevant to
+        the article (except for the main article, which covers everything);
+        that text is specific to the article, so it is not marked cacheable.
         
         Args:
             article_plan: Plan for this specific article
             arc_content: Source content from arc
-            context: Additional context (story metadata, etc.)
+            context: Additional context (overall_wiki_plan, story metadata, project_id)
             user_id: User making the request
             api_key: Optional API key for direct usage
             provider: Optional LLM provider override
             model: Optional LLM model override
             
         Returns:
-            WikiArticle object with complete content
+            Draft markdown content of the article
         """
-        # TODO: Implement single article generation
-        pass
+        story_content = arc_content
+        index: Optional[PassageIndex] = context.get("passage_index")
+        passages = self._select_passages(article_plan, index) if index is not None and article_plan.article_type != "main" else []
+        if passages:
+            story_content = "\n\n".join(passages)
+        messages = self._load_writing_prompts(article_plan.article_type, {
+            "story_content": story_content,
+            "overall_wiki_plan": context.get("overall_wiki_plan", ""),
+            "article_title": article_plan.title,
+            "article_type": article_plan.article_type,
+            "article_file": article_plan.filename,
+            "article_content_structure": article_plan.structure,
+        })
+        if passages:
+            messages = [m if m.role == "system" else m.model_copy(update={"cacheable": False}) for m in messages]
+        async def draft(attempt_provider: PROVIDER_ID, attempt_model: MODEL_NAME) -> str:
+            response = await self._make_llm_call(
+                messages=messages,
+                user_id=user_id,
+                api_key=api_key,
+                provider=attempt_provider,
+                model=attempt_model,
+                project_id=context.get("project_id"),
+            )
+            return getattr(response, "content", "") or ""
+        
+        content = await self._run_cascade(
+            "article", draft, lambda text: None if text.strip() else "no article content", provider, model
+        )
+        if not content.strip():
+            raise ValueError("model returned no article content")
+        return content
     
     async def _identify_search_queries(
         self,
         article_content: str,
-        article_type: str
+        article_type: str,
+        user_id: UUID,
+        api_key: Optional[str] = None,
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        project_id: Optional[str] = None
     ) -> List[str]:
         """
         Identifies cultural references and allusions that need web search.
@@ -167,15 +508,43 @@ class ArticleWriterAgent(BaseAgent):
         - Mythological elements
         - Real-world connections
         
+        Only references to things outside the story are returned; the story's
+        own characters and places are covered by the wiki itself.
+        
         Args:
             article_content: Draft article content to analyze
             article_type: Type of article (character, location, etc.)
+            user_id: User making the request
+            api_key: Optional API key for direct usage
+            provider: Optional LLM provider override
+            model: Optional LLM model override
+            project_id: Optional project for usage tracking
             
         Returns:
-            List of search query strings for web search
+            List of search query strings for web search (at most MAX_SEARCH_QUERIES)
+            
+        Raises:
+            ValueError: If the model's answer is not a query list
         """
-        # TODO: Implement reference identification
-        return []
+        if not article_content.strip():
+            return []
+        messages = prompt_manager.get_group("wikigen.identify_references").render_messages(
+            article_content=article_content, article_type=article_type, max_queries=MAX_SEARCH_QUERIES
+        )
+        response = await self._make_llm_call(
+            messages=messages,
+            user_id=user_id,
+            api_key=api_key,
+            provider=provider,
+            model=model,
+            project_id=project_id,
+        )
+        answer = parse_cleaned_json(getattr(response, "content", "") or "")
+        queries = answer.get("queries") if isinstance(answer, dict) else answer
+        if not isinstance(queries, list):
+            raise ValueError("model returned no query list")
+        cleaned = (query.strip() for query in queries if isinstance(query, str))
+        return list(dict.fromkeys(query for query in cleaned if query))[:MAX_SEARCH_QUERIES]
     
     async def _perform_web_searches(self, queries: List[str]) -> Dict[str, Any]:
         """
@@ -183,25 +552,19 @@ class ArticleWriterAgent(BaseAgent):
         
         Uses web search service to find relevant information about
         cultural references and allusions mentioned in the content.
+        The service runs the queries concurrently, deduplicates and caches
+        them across articles and bounds the request rate.
         
         Args:
             queries: List of search queries to execute
             
         Returns:
-            Dictionary mapping queries to search results
+            Dictionary mapping queries to search results; a failed query maps
+            to {"error": message}
         """
-        # TODO: Implement web searching
-        search_results = {}
-        for query in queries:
-            try:
-                # results = await self.web_search_service.search(query)
-                # search_results[query] = results
-                pass
-            except Exception as e:
-                # Log error but continue with other searches
-                search_results[query] = {"error": str(e)}
-        
-        return search_results
+        if self.web_search_service is None or not queries:
+            return {}
+        return await self.web_search_service.search_many(queries)
     
     def _integrate_search_results(
         self,
@@ -211,46 +574,67 @@ class ArticleWriterAgent(BaseAgent):
         """
         Integrates web search results into article content.
         
-        Adds reference sections, footnotes, or inline citations based
-        on search results while maintaining article flow and readability.
+        Cites the top MAX_RESULTS_PER_REFERENCE hits of each reference, in the
+        order the references were identified, in a References section at the
+        end of the article (added to the article's own section if it has one).
+        Failed searches and hits without a URL are left out, and a page found
+        for several references is cited once.
         
         Args:
-            article_content: Original article content
-            search_results: Results from web searches
+            article_content: Formatted article content
+            search_results: Results from web searches, by query
             
         Returns:
-            Enhanced article content with integrated references
+            Article content with the references appended (unchanged if there are none)
         """
-        # TODO: Implement search result integration
-        return article_content
+        citations: List[str] = []
+        seen: Set[str] = set()
+        for query, results in search_results.items():
+            if not isinstance(results, list):  # {"error": ...} for a failed search
+                continue
+            cited = 0
+            for result in results:
+                hit = result if isinstance(result, SearchResult) else SearchResult.from_dict(result)
+                if cited >= MAX_RESULTS_PER_REFERENCE or not hit.url or hit.url in seen:
+                    continue
+                seen.add(hit.url)
+                cited += 1
+                citation = f"- [{hit.title or hit.url}]({hit.url}) ({query})"
+                snippet = " ".join(hit.snippet.split())
+                citations.append(f"{citation}: {snippet}" if snippet else citation)
+        if not citations:
+            return article_content
+        content = article_content.rstrip("\n")
+        if not _REFERENCES_HEADING_PATTERN.search(content):
+            content += "\n\n## References\n"
+        return content + "\n" + "\n".join(citations) + "\n"
     
     def _format_as_wiki_article(
         self,
         content: str,
-        article_plan: Any,  # TODO: ArticlePlan
-        cross_references: List[Any]  # TODO: List[CrossReference]
+        article_plan: ArticlePlan
     ) -> str:
         """
         Formats content as proper wiki article with markdown structure.
         
-        Applies consistent formatting:
-        - Proper heading hierarchy
-        - Wiki-style cross-reference links
-        - Consistent styling and tone
-        - Navigation elements where appropriate
+        Unwraps a response the model fenced as a Markdown code block and
+        normalizes surrounding whitespace. Cross-reference links are written
+        by the model itself as [[wikilinks]] to the articles in the plan.
         
         Args:
             content: Raw article content
             article_plan: Plan with structure information
-            cross_references: Links to other articles
             
         Returns:
             Formatted markdown content ready for wiki
         """
-        # TODO: Implement wiki formatting
-        return content
+        content = content.strip()
+        fenced = _CODE_FENCE_PATTERN.match(content)
+        if fenced:
+            content = fenced.group(1).strip()
+        return content + "\n"
     
-    def _validate_article_quality(self, article: Any) -> bool:  # TODO: WikiArticle -> bool
+    def _validate_article_quality(self, article: WikiArticle) -> bool:
         """
         Validates article quality and completeness.
         
@@ -274,11 +658,12 @@ class ArticleWriterAgent(BaseAgent):
         self,
         article_type: str,
         context: Dict[str, Any]
-    ) -> List[Any]:  # TODO: List[LLMMessage]
+    ) -> List[LLMMessage]:
         """
         Loads article writing prompts based on type and context.
         
-        Uses wikigen.writing prompt group with article-type-specific templates.
+        Uses the wikigen.generate_article prompt group; the story text and plan
+        come first and are marked cacheable, so every article call shares them.
         
         Args:
             article_type: Type of article being written
@@ -287,10 +672,7 @@ class ArticleWriterAgent(BaseAgent):
         Returns:
             List of rendered LLMMessage objects
         """
-        # TODO: Implement prompt loading
-        # writing_prompts = prompt_manager.get_group(f"wikigen.writing.{article_type}")
-        # Render with context
-        return []
+        return prompt_manager.get_group("wikigen.generate_article").render_messages(**context)
     
     # Implementation of BaseAgent's abstract method
     async def execute(self, *args, **kwargs):
@@ -18,19 +18,41 @@ Key Features:
 - Non-intrusive formatting
 - Link validation and consistency
 - Enhanced reading experience
+- Deterministic linking: titles and aliases are found with one Aho-Corasick
+  pass per chapter; only ambiguous mentions go to the LLM
+- Mentions come from the shared story entity index when one is set, so
+  chapters already scanned are not scanned again
 """
 
+import asyncio
+import dataclasses
+import logging
+import re
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
-# TODO: Import proper types when schemas are defined
-# from src.database.models.story import Chapter
-# NOTE: EnhancedChapter may need to be added to domain models
-# from src.database.models.wiki import WikiArticle
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.schemas.db.story import Chapter
+from src.schemas.llm.models import LLMMessage
+from src.schemas.wikigen.wiki import EnhancedChapter, WikiArticle
 # NOTE: LinkMapping may need to be created in domain models
 from src.services.llm.llm_service import LLMService
 from src.prompts import prompt_manager
 from src.agents.base_agent import BaseAgent
+from src.agents.wikigen.entity_index import EntityIndex
+from src.utils import parse_cleaned_json
+from src.utils.entity_matcher import EntityMatcher, EntityMention
+
+logger = logging.getLogger(__name__)
+
+# Characters of chapter text on each side of an ambiguous mention sent to the LLM
+MENTION_CONTEXT_CHARS = 150
+
+# [[Title]] or [[Title|Display Text]]; group 1 is the display text of aliased links
+_WIKI_LINK_PATTERN = re.compile(r"\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]")
+
+# Two links separated by nothing but whitespace read as one run-on link
+_ADJACENT_LINKS_PATTERN = re.compile(r"\]\]\s*\[\[")
 
 
 class ChapterBacklinkerAgent(BaseAgent):
@@ -39,13 +61,23 @@ class ChapterBacklinkerAgent(BaseAgent):
     
     Enhances the reading experience by connecting narrative content
     with corresponding wiki articles in a contextual, spoiler-aware manner.
+    
+    Linking is deterministic for most mentions: one Aho-Corasick pass per
+    chapter finds every article title and alias. Only ambiguous mentions (a
+    name shared by several articles, or one that matches only when ignoring
+    case) are sent to the LLM, as short snippets rather than whole chapters.
     """
     
     def __init__(
         self, 
         llm_service: LLMService,
-        default_provider: str = "google",
-        default_model: str = "gemini-2.0-flash-001"
+        default_provider: PROVIDER_ID = "google",
+        default_model: MODEL_NAME = "gemini-2.0-flash-001",
+        resolve_ambiguous: bool = True,
+        max_concurrent_resolutions: int = 4,
+        entity_index: Optional[EntityIndex] = None,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None
     ):
         """
         Initializes agent with LLM service and default model.
@@ -54,36 +86,50 @@ class ChapterBacklinkerAgent(BaseAgent):
             llm_service: LLM service for link analysis and placement
             default_provider: Default LLM provider for backlinking
             default_model: Default model optimized for link analysis and insertion
+            resolve_ambiguous: Ask the LLM about ambiguous mentions (otherwise they are not linked)
+            max_concurrent_resolutions: Maximum concurrent LLM calls for ambiguous mentions
+            entity_index: Shared story entity index to take chapter mentions from
+            escalation_model: Stronger model a resolution call is re-run on when the default
+                              model returns no usable answer (None disables escalation)
+            escalation_provider: Provider of the escalation model (default: default_provider)
         """
         super().__init__(
             llm_service=llm_service,
             default_provider=default_provider,
-            default_model=default_model
+            default_model=default_model,
+            escalation_model=escalation_model,
+            escalation_provider=escalation_provider
         )
+        self.resolve_ambiguous = resolve_ambiguous
+        self.max_concurrent_resolutions = max(1, max_concurrent_resolutions)
+        self.entity_index = entity_index
+        # Created lazily so it binds to the running event loop
+        self._resolution_slots: Optional[asyncio.Semaphore] = None
     
     async def create_chapter_links(
         self,
-        chapters: List[Any],  # TODO: List[Chapter]
-        wiki_articles: List[Any],  # TODO: List[WikiArticle]
+        chapters: List[Chapter],
+        wiki_articles: List[WikiArticle],
         current_arc_id: int,
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None,
-        max_links_per_chapter: int = 15
-    ) -> List[Any]:  # TODO: List[EnhancedChapter]
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        max_links_per_chapter: int = 15,
+        project_id: Optional[str] = None
+    ) -> List[EnhancedChapter]:
         """
         Main linking method that creates enhanced chapters with wiki links.
         
         Process:
-        1. For each chapter:
-           - Identify linkable entities mentioned
-           - Filter to spoiler-safe articles (current arc or earlier)
-           - Determine optimal link placement
-           - Create contextual, non-intrusive links
-           - Validate link quality and necessity
-        2. Ensure link consistency across chapters
-        3. Return enhanced chapters with embedded links
+        1. Filter to spoiler-safe articles (current arc or earlier)
+        2. Build one matcher over their titles and aliases
+        3. For each chapter:
+           - Find mentions of titles and aliases
+           - Resolve ambiguous mentions with the LLM (snippets only)
+           - Link the first mention of each article, up to max_links_per_chapter
+           - Validate that only links were added
+        4. Ensure link consistency across chapters
         
         Args:
             chapters: List of chapter objects to enhance
@@ -94,35 +140,83 @@ class ChapterBacklinkerAgent(BaseAgent):
             provider: Optional LLM provider override (uses default if not provided)
             model: Optional LLM model override (uses default if not provided)
             max_links_per_chapter: Maximum links to add per chapter
+            project_id: Optional project the calls are made for (usage attribution)
             
         Returns:
-            List of EnhancedChapter objects with wiki links
+            List of EnhancedChapter objects with wiki links, in chapter order
             
         Link Format Examples:
             - Character: "[[Sarah Chen|Sarah]] walked into the room"
             - Location: "The [[Celestial Observatory]] gleamed in moonlight"
             - Concept: "The ancient [[Binding Ritual]] required three components"
         """
-        # TODO: Implement chapter linking logic
-        raise NotImplementedError("Chapter backlinking not yet implemented")
+        articles = self._filter_spoiler_safe_articles(wiki_articles, current_arc_id)
+        # With a shared entity index, mentions come from the index instead
+        matcher = self._build_matcher(articles) if self.entity_index is None else None
+        article_mapping = {article.title: article for article in articles}
+        logger.info(f"🔗 Linking {len(chapters)} chapters against {len(articles)} articles")
+
+        async def link(chapter: Chapter) -> EnhancedChapter:
+            indexed = self._indexed_mentions(chapter, article_mapping) if self.entity_index is not None else None
+            mentions = await self._analyze_chapter_entities(
+                chapter.content, articles, user_id, api_key, provider, model,
+                matcher=matcher, project_id=project_id, mentions=indexed,
+            )
+            selected = self._determine_optimal_link_placement(chapter.content, mentions, max_links_per_chapter)
+            content = self._create_wiki_links(chapter.content, selected, article_mapping)
+            if not self._validate_link_quality(chapter.content, content, len(selected)):
+                logger.warning(f"⚠️ Links failed validation in chapter {chapter.chapter_number}, leaving it unlinked")
+                content, selected = chapter.content, []
+            return EnhancedChapter(
+                chapter_number=chapter.chapter_number,
+                content=content,
+                links=[title for title, _, _ in selected],
+            )
+
+        enhanced = await asyncio.gather(*(link(chapter) for chapter in chapters))
+        return self._ensure_link_consistency(list(enhanced))
+
+    def _build_matcher(self, articles: List[WikiArticle]) -> EntityMatcher:
+        """Matcher over every article's title and aliases."""
+        return EntityMatcher(
+            (name, article.title)
+            for article in articles
+            for name in [article.title, *article.aliases]
+        )
     
+    def _indexed_mentions(self, chapter: Chapter, articles: Dict[str, WikiArticle]) -> List[EntityMention]:
+        """
+        Chapter mentions from the entity index, limited to the given articles.
+
+        The index knows every article registered so far, including ones from
+        later arcs; mentions of those are dropped here (spoiler safety).
+        """
+        assert self.entity_index is not None
+        mentions = []
+        for mention in self.entity_index.find(chapter.chapter_number, chapter.content):
+            targets = tuple(title for title in mention.targets if title in articles)
+            if targets:
+                mentions.append(dataclasses.replace(mention, targets=targets) if targets != mention.targets else mention)
+        return mentions
+
     async def _analyze_chapter_entities(
         self,
         chapter_content: str,
-        available_articles: List[Any],  # TODO: List[WikiArticle]
+        available_articles: List[WikiArticle],
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None
-    ) -> List[Tuple[str, Any, List[int]]]:  # TODO: List[Tuple[str, WikiArticle, List[int]]]
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        matcher: Optional[EntityMatcher] = None,
+        project_id: Optional[str] = None,
+        mentions: Optional[List[EntityMention]] = None
+    ) -> List[Tuple[str, int, int]]:
         """
         Identifies entities in chapter content that have corresponding wiki articles.
         
-        Uses LLM to identify mentions and find optimal linking positions:
-        1. Extract entity mentions from chapter text
-        2. Match mentions to available wiki articles
-        3. Identify character positions for link placement
-        4. Score linking opportunities by contextual relevance
+        1. Find title and alias mentions with the matcher (skipping existing links)
+        2. Link unambiguous mentions directly
+        3. Ask the LLM which article, if any, each ambiguous mention refers to
         
         Args:
             chapter_content: Text content of the chapter
@@ -131,18 +225,115 @@ class ChapterBacklinkerAgent(BaseAgent):
             api_key: Optional API key for direct usage
             provider: Optional LLM provider override
             model: Optional LLM model override
+            matcher: Prebuilt matcher for available_articles (built if not given)
+            project_id: Optional project the calls are made for
+            mentions: Mentions already found (e.g. by the entity index); skips matching
             
         Returns:
-            List of tuples (entity_name, article, character_positions)
+            List of (article_title, start, end) mentions in text order
         """
-        # TODO: Implement entity analysis
-        return []
+        if mentions is None:
+            matcher = matcher or self._build_matcher(available_articles)
+            mentions = matcher.find(chapter_content)
+        existing = [(m.start(), m.end()) for m in _WIKI_LINK_PATTERN.finditer(chapter_content)]
+        mentions = [
+            mention for mention in mentions
+            if not any(start < mention.end and mention.start < end for start, end in existing)
+        ]
+
+        resolved: List[Tuple[str, int, int]] = [
+            (mention.targets[0], mention.start, mention.end) for mention in mentions if not mention.is_ambiguous
+        ]
+        ambiguous = [mention for mention in mentions if mention.is_ambiguous]
+        if ambiguous and self.resolve_ambiguous:
+            articles = {article.title: article for article in available_articles}
+            choices = await self._resolve_ambiguous_mentions(
+                chapter_content, ambiguous, articles, user_id, api_key, provider, model, project_id
+            )
+            resolved.extend((choices[index], mention.start, mention.end)
+                            for index, mention in enumerate(ambiguous) if index in choices)
+        return sorted(resolved, key=lambda mention: mention[1])
+
+    async def _resolve_ambiguous_mentions(
+        self,
+        chapter_content: str,
+        mentions: List[EntityMention],
+        articles: Dict[str, WikiArticle],
+        user_id: UUID,
+        api_key: Optional[str] = None,
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        project_id: Optional[str] = None
+    ) -> Dict[int, str]:
+        """
+        Ask the LLM which article each ambiguous mention refers to.
+        
+        Mentions written the same way with the same candidates are asked about
+        once (by their first occurrence). A failed call or unusable answer
+        leaves the mentions unlinked.
+        
+        Returns:
+            Maps the index of each mention to link to its article title
+        """
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[int]] = {}
+        for index, mention in enumerate(mentions):
+            groups.setdefault((mention.text.lower(), mention.targets), []).append(index)
+        questions = list(groups.values())
+
+        lines = []
+        for number, indexes in enumerate(questions, 1):
+            mention = mentions[indexes[0]]
+            before = chapter_content[max(0, mention.start - MENTION_CONTEXT_CHARS):mention.start]
+            after = chapter_content[mention.end:mention.end + MENTION_CONTEXT_CHARS]
+            snippet = " ".join(f"{before}>>{mention.text}<<{after}".split())
+            lines.append(f'{number}. "{mention.text}" (candidates: {", ".join(mention.targets)}): ...{snippet}...')
+        candidates = sorted({target for mention in mentions for target in mention.targets})
+        article_lines = [
+            f"- {title} ({articles[title].article_type}"
+            + (f"; also called {', '.join(articles[title].aliases)}" if articles[title].aliases else "") + ")"
+            for title in candidates if title in articles
+        ]
+
+        messages = self._load_linking_prompts({"articles": "\n".join(article_lines), "mentions": "\n".join(lines)})
+        if self._resolution_slots is None:
+            self._resolution_slots = asyncio.Semaphore(self.max_concurrent_resolutions)
+        slots = self._resolution_slots
+
+        async def resolve(attempt_provider: PROVIDER_ID, attempt_model: MODEL_NAME) -> List[Any]:
+            async with slots:
+                response = await self._make_llm_call(
+                    messages=messages, user_id=user_id, api_key=api_key,
+                    provider=attempt_provider, model=attempt_model, project_id=project_id,
+                )
+            answer = parse_cleaned_json(getattr(response, "content", "") or "")
+            links = answer.get("links", []) if isinstance(answer, dict) else answer
+            if not isinstance(links, list):
+                raise ValueError("Linking response has no link list")
+            return links
+
+        try:
+            links = await self._run_cascade("links", resolve, lambda answers: None, provider, model)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not resolve {len(questions)} ambiguous mentions, leaving them unlinked: {e}")
+            return {}
+
+        choices: Dict[int, str] = {}
+        for link in links:
+            if not isinstance(link, dict) or not isinstance(link.get("id"), int):
+                continue
+            number, title = link["id"], link.get("article")
+            if not 1 <= number <= len(questions) or title is None:
+                continue
+            indexes = questions[number - 1]
+            if title in mentions[indexes[0]].targets:
+                choices.update((index, title) for index in indexes)
+        return choices
     
     def _filter_spoiler_safe_articles(
         self,
-        articles: List[Any],  # TODO: List[WikiArticle]
+        articles: List[WikiArticle],
         current_arc_id: int
-    ) -> List[Any]:  # TODO: List[WikiArticle]
+    ) -> List[WikiArticle]:
         """
         Filters articles to only include those safe for current reading position.
         
@@ -156,9 +347,7 @@ class ChapterBacklinkerAgent(BaseAgent):
         Returns:
             Filtered list of spoiler-safe articles
         """
-        # TODO: Implement spoiler filtering
-        # return [article for article in articles if article.arc_id <= current_arc_id]
-        return articles
+        return [article for article in articles if article.arc_id <= current_arc_id]
     
     def _determine_optimal_link_placement(
         self,
@@ -167,31 +356,38 @@ class ChapterBacklinkerAgent(BaseAgent):
         max_links: int
     ) -> List[Tuple[str, int, int]]:
         """
-        Determines optimal positions for link placement within chapter.
+        Determines positions for link placement within chapter.
         
-        Considers:
-        - Contextual relevance of each mention
-        - Spacing between links (avoid clustering)
-        - Narrative importance of the moment
-        - Reading flow and user experience
+        Follows the wiki convention of linking an article only at its first
+        mention in the chapter, which also keeps links from clustering. A
+        mention separated from the previous link by whitespace alone is
+        skipped, so two links never run together.
         
         Args:
             chapter_text: Full chapter text
-            entity_mentions: All possible entity mentions with positions
+            entity_mentions: All possible entity mentions with positions, in text order
             max_links: Maximum number of links to place
             
         Returns:
             List of selected mentions for linking (entity_name, start, end)
         """
-        # TODO: Implement optimal placement logic
-        # This should use contextual analysis to select best linking opportunities
-        return entity_mentions[:max_links]
+        selected: List[Tuple[str, int, int]] = []
+        linked = set()
+        for mention in entity_mentions:
+            if len(selected) >= max_links:
+                break
+            if selected and not chapter_text[selected[-1][2]:mention[1]].strip():
+                continue
+            if mention[0] not in linked:
+                linked.add(mention[0])
+                selected.append(mention)
+        return selected
     
     def _create_wiki_links(
         self,
         chapter_text: str,
         selected_mentions: List[Tuple[str, int, int]],
-        article_mapping: Dict[str, Any]  # TODO: Dict[str, WikiArticle]
+        article_mapping: Dict[str, WikiArticle]
     ) -> str:
         """
         Creates wiki-style links in chapter text.
@@ -202,7 +398,6 @@ class ChapterBacklinkerAgent(BaseAgent):
         Link Formats:
         - Simple: [[Article Name]]
         - Aliased: [[Article Name|Display Text]]
-        - Contextual: Links that feel natural in narrative flow
         
         Args:
             chapter_text: Original chapter text
@@ -212,9 +407,14 @@ class ChapterBacklinkerAgent(BaseAgent):
         Returns:
             Enhanced chapter text with wiki links
         """
-        # TODO: Implement link creation
         # Work backwards through positions to avoid offset issues
         enhanced_text = chapter_text
+        for title, start, end in sorted(selected_mentions, key=lambda mention: mention[1], reverse=True):
+            if title not in article_mapping:
+                continue
+            display = chapter_text[start:end]
+            link = f"[[{title}]]" if display == title else f"[[{title}|{display}]]"
+            enhanced_text = enhanced_text[:start] + link + enhanced_text[end:]
         return enhanced_text
     
     def _validate_link_quality(
@@ -241,13 +441,28 @@ class ChapterBacklinkerAgent(BaseAgent):
         Returns:
             True if link quality meets standards
         """
-        # TODO: Implement quality validation
-        return True
+        def unlinked(text: str) -> str:
+            return _WIKI_LINK_PATTERN.sub(r"\1", text)
+
+        def misplaced(text: str) -> int:
+            # Links that split a word or run into another link
+            split = sum(
+                text[link.start() - 1:link.start()].isalnum() or text[link.end():link.end() + 1].isalnum()
+                for link in _WIKI_LINK_PATTERN.finditer(text)
+            )
+            return split + len(_ADJACENT_LINKS_PATTERN.findall(text))
+
+        added = len(_WIKI_LINK_PATTERN.findall(enhanced_text)) - len(_WIKI_LINK_PATTERN.findall(original_text))
+        return (
+            added == links_added
+            and unlinked(enhanced_text) == unlinked(original_text)
+            and misplaced(enhanced_text) <= misplaced(original_text)
+        )
     
     def _ensure_link_consistency(
         self,
-        enhanced_chapters: List[Any]  # TODO: List[EnhancedChapter]
-    ) -> List[Any]:  # TODO: List[EnhancedChapter]
+        enhanced_chapters: List[EnhancedChapter]
+    ) -> List[EnhancedChapter]:
         """
         Ensures consistent linking patterns across all chapters.
         
@@ -269,11 +484,11 @@ class ChapterBacklinkerAgent(BaseAgent):
     def _load_linking_prompts(
         self,
         context: Dict[str, Any]
-    ) -> List[Any]:  # TODO: List[LLMMessage]
+    ) -> List[LLMMessage]:
         """
-        Loads prompts for entity identification and link analysis.
+        Loads prompts for resolving ambiguous mentions.
         
-        Uses wikigen.linking prompt group for contextual analysis.
+        Uses the wikigen.link_entities prompt group.
         
         Args:
             context: Variables for prompt rendering
@@ -281,13 +496,10 @@ class ChapterBacklinkerAgent(BaseAgent):
         Returns:
             List of rendered LLMMessage objects
         """
-        # TODO: Implement prompt loading
-        # linking_prompts = prompt_manager.get_group("wikigen.linking")
-        # Render with chapter and article context
-        return []
+        return prompt_manager.get_group("wikigen.link_entities").render_messages(**context)
     
     # Implementation of BaseAgent's abstract method
-    async def execute(self, *args, **kwargs):
+    async def execute(self, *args: Any, **kwargs: Any) -> List[EnhancedChapter]:
         """
         Execute the chapter backlinking process.
         
@@ -0,0 +1,377 @@
+# backend/src/agents/wikigen/entity_index.py
+
+"""
+Story Entity Index
+
+One index of the story's known entities (wiki article subjects) shared by the
+planner, summarizer and backlinker, so each of them queries it instead of
+rediscovering entities with its own prompts.
+
+Key Features:
+- Mention spans per chapter, found with one Aho-Corasick pass (EntityMatcher)
+- Aliases and entity types from the wiki articles
+- First-appearance chapter of every entity, for spoiler gating
+- Co-occurrence counts (entities mentioned in the same paragraph)
+- Incremental: a chapter is only re-scanned when its text changed, or when a
+  name added since it was indexed occurs in it (checked with a matcher of the
+  new names only)
+- Persisted per chapter in a CheckpointRepository (one step per chapter), so
+  saving after a new chapter writes only that chapter
+"""
+
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.core.text_processing import PARAGRAPH_BREAK_PATTERN
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
+from src.schemas.db.story import Chapter
+from src.schemas.wikigen.wiki import WikiArticle
+from src.utils.entity_matcher import EntityMatcher, EntityMention
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAMESPACE = "entity_index"
+ENCODING_VERSION = 2
+
+# Checkpoint step holding the entity registry; chapters use their own number
+_REGISTRY_STEP = 0
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class IndexedEntity:
+    """An entity the index looks for (the subject of a wiki article)"""
+    name: str                                   # Canonical name (the article title)
+    entity_type: str = "unknown"                # character, location, concept, event, ...
+    aliases: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ChapterEntities:
+    """Everything the index found in one chapter"""
+    chapter_number: int
+    content_hash: str
+    names_version: int                          # Registry version the chapter was scanned with
+    mentions: List[EntityMention] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)                # Entity -> unambiguous mentions
+    pairs: Dict[Tuple[str, str], int] = field(default_factory=dict)     # Sorted pair -> shared paragraphs
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "chapter_number": self.chapter_number,
+            "content_hash": self.content_hash,
+            "names_version": self.names_version,
+            "mentions": [[m.start, m.end, m.text, list(m.targets), m.exact_case] for m in self.mentions],
+            "counts": self.counts,
+            "pairs": [[a, b, n] for (a, b), n in self.pairs.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChapterEntities":
+        return cls(
+            chapter_number=data["chapter_number"],
+            content_hash=data["content_hash"],
+            names_version=data["names_version"],
+            mentions=[
+                EntityMention(start=start, end=end, text=text, targets=tuple(targets), exact_case=exact_case)
+                for start, end, text, targets, exact_case in data["mentions"]
+            ],
+            counts=dict(data["counts"]),
+            pairs={(a, b): n for a, b, n in data["pairs"]},
+        )
+
+
+class EntityIndex:
+    """
+    Story-level index of entity mentions, built chapter by chapter.
+
+    Statistics (counts, first appearances, co-occurrences) only use
+    unambiguous mentions; ambiguous ones (a name shared by several entities,
+    or matching only when ignoring case) are kept as spans for the backlinker
+    to resolve.
+
+    Examples:
+        >>> index = EntityIndex()
+        >>> index.register("Sarah Chen", aliases=["Sarah"], entity_type="character")
+        True
+        >>> index.update([Chapter(chapter_number=1, title="", content="Sarah smiled.")])
+        [1]
+        >>> index.first_appearance("Sarah Chen")
+        1
+    """
+
+    def __init__(self) -> None:
+        self._entities: Dict[str, IndexedEntity] = {}
+        self._chapters: Dict[int, ChapterEntities] = {}
+        self._names_version = 0
+        self._name_versions: Dict[Tuple[str, str], int] = {}   # (name, entity) -> names version it was added in
+        self._matcher: Optional[EntityMatcher] = None
+        self._new_name_matchers: Dict[int, EntityMatcher] = {}  # Names version -> matcher of the names added after it
+        self._dirty: Set[int] = set()               # Chapters changed since the last save
+        self._registry_dirty = False
+
+    def __len__(self) -> int:
+        """Number of known entities."""
+        return len(self._entities)
+
+    @property
+    def chapters(self) -> List[int]:
+        """Numbers of the indexed chapters."""
+        return sorted(self._chapters)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def register(self, name: str, aliases: Iterable[str] = (), entity_type: Optional[str] = None) -> bool:
+        """
+        Add an entity, or new aliases / a type for a known one.
+
+        Returns:
+            True if the set of names changed (indexed chapters that mention a new name
+            are then re-scanned)
+        """
+        added: List[str] = []
+        entity = self._entities.get(name)
+        if entity is None:
+            entity = self._entities[name] = IndexedEntity(name=name, entity_type=entity_type or "unknown")
+            added.append(name)
+        elif entity_type and entity.entity_type != entity_type:
+            entity.entity_type = entity_type
+            self._registry_dirty = True
+        for alias in aliases:
+            if alias and alias != name and alias not in entity.aliases:
+                entity.aliases.append(alias)
+                added.append(alias)
+        if added:
+            self._names_version += 1
+            for surface in added:
+                self._name_versions[(surface, name)] = self._names_version
+            self._matcher = None
+            self._new_name_matchers.clear()
+            self._registry_dirty = True
+        return bool(added)
+
+    def register_articles(self, articles: Iterable[WikiArticle]) -> bool:
+        """Register the subjects of wiki articles (title, aliases and article type)."""
+        changed = False
+        for article in articles:
+            changed = self.register(article.title, article.aliases, article.article_type) or changed
+        return changed
+
+    def update(self, chapters: Iterable[Chapter]) -> List[int]:
+        """
+        Index chapters whose text changed, or that mention names added, since they were indexed.
+
+        Returns:
+            Numbers of the chapters that were (re-)scanned
+        """
+        return [chapter.chapter_number for chapter in chapters if self._refresh(chapter.chapter_number, chapter.content)]
+
+    def find(self, chapter_number: int, content: str) -> List[EntityMention]:
+        """Mentions in a chapter, from the index when it is current (indexing it otherwise)."""
+        self._refresh(chapter_number, content)
+        return list(self._chapters[chapter_number].mentions)
+
+    def remove_chapter(self, chapter_number: int) -> bool:
+        """Forget a chapter (e.g. one deleted from the story)."""
+        if self._chapters.pop(chapter_number, None) is None:
+            return False
+        self._dirty.add(chapter_number)
+        return True
+
+    def _refresh(self, chapter_number: int, content: str) -> bool:
+        """
+        Bring a chapter's entry up to date, returns True if the chapter was (re-)scanned.
+
+        An entry of unchanged text is only re-scanned if a name added after it was
+        indexed occurs in the chapter; otherwise the new names cannot change its
+        mentions and the entry just moves to the current names version.
+        """
+        entry = self._chapters.get(chapter_number)
+        if entry is None or entry.content_hash != _content_hash(content):
+            self._index_chapter(chapter_number, content)
+            return True
+        if entry.names_version == self._names_version:
+            return False
+        if self._get_new_name_matcher(entry.names_version).find(content):
+            self._index_chapter(chapter_number, content)
+            return True
+        # Saved with the chapter's next change; until then a loaded index repeats this cheap check
+        entry.names_version = self._names_version
+        return False
+
+    def _get_matcher(self) -> EntityMatcher:
+        if self._matcher is None:
+            self._matcher = EntityMatcher(
+                (name, entity.name)
+                for entity in self._entities.values()
+                for name in [entity.name, *entity.aliases]
+            )
+        return self._matcher
+
+    def _get_new_name_matcher(self, names_version: int) -> EntityMatcher:
+        """Matcher of the names added after a names version."""
+        matcher = self._new_name_matchers.get(names_version)
+        if matcher is None:
+            matcher = self._new_name_matchers[names_version] = EntityMatcher(
+                pair for pair, version in self._name_versions.items() if version > names_version
+            )
+        return matcher
+
+    def _index_chapter(self, chapter_number: int, content: str) -> ChapterEntities:
+        mentions = self._get_matcher().find(content)
+        counts: Counter = Counter()
+        pairs: Counter = Counter()
+
+        # Paragraph boundaries in character offsets, walked alongside the sorted mentions
+        boundaries = [match.end() for match in PARAGRAPH_BREAK_PATTERN.finditer(content)]
+        paragraph = 0
+        in_paragraph: Set[str] = set()
+        for mention in mentions:
+            if mention.is_ambiguous:
+                continue
+            while paragraph < len(boundaries) and mention.start >= boundaries[paragraph]:
+                pairs.update(combinations(sorted(in_paragraph), 2))
+                paragraph, in_paragraph = paragraph + 1, set()
+            counts[mention.targets[0]] += 1
+            in_paragraph.add(mention.targets[0])
+        pairs.update(combinations(sorted(in_paragraph), 2))
+
+        entry = ChapterEntities(
+            chapter_number=chapter_number,
+            content_hash=_content_hash(content),
+            names_version=self._names_version,
+            mentions=mentions,
+            counts=dict(counts),
+            pairs=dict(pairs),
+        )
+        self._chapters[chapter_number] = entry
+        self._dirty.add(chapter_number)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[IndexedEntity]:
+        return self._entities.get(name)
+
+    def first_appearance(self, name: str) -> Optional[int]:
+        """First indexed chapter that mentions the entity (None if none does)."""
+        return next((number for number in self.chapters if self._chapters[number].counts.get(name)), None)
+
+    def first_appearances(self) -> Dict[str, int]:
+        """First-appearance chapter of every mentioned entity."""
+        first: Dict[str, int] = {}
+        for number in self.chapters:
+            for name in self._chapters[number].counts:
+                first.setdefault(name, number)
+        return first
+
+    def entities(self, as_of_chapter: Optional[int] = None) -> List[IndexedEntity]:
+        """
+        Entities readers have met by a chapter, in order of first appearance.
+
+        Args:
+            as_of_chapter: Reading position (None: the whole indexed story)
+        """
+        first = self.first_appearances()
+        seen = [
+            (chapter, name) for name, chapter in first.items()
+            if as_of_chapter is None or chapter <= as_of_chapter
+        ]
+        return [self._entities[name] for _, name in sorted(seen) if name in self._entities]
+
+    def mention_counts(self, start_chapter: Optional[int] = None, end_chapter: Optional[int] = None) -> Counter:
+        """Unambiguous mentions per entity over a chapter range (inclusive)."""
+        counts: Counter = Counter()
+        for entry in self._entries(start_chapter, end_chapter):
+            counts.update(entry.counts)
+        return counts
+
+    def co_occurrences(
+        self,
+        start_chapter: Optional[int] = None,
+        end_chapter: Optional[int] = None
+    ) -> Counter:
+        """Paragraphs shared by each pair of entities over a chapter range, keyed by sorted pair."""
+        pairs: Counter = Counter()
+        for entry in self._entries(start_chapter, end_chapter):
+            pairs.update(entry.pairs)
+        return pairs
+
+    def related(self, name: str, as_of_chapter: Optional[int] = None, limit: int = 10) -> List[Tuple[str, int]]:
+        """Entities most often mentioned alongside one, up to a reading position."""
+        related: Counter = Counter()
+        for (a, b), count in self.co_occurrences(end_chapter=as_of_chapter).items():
+            if name in (a, b):
+                related[b if a == name else a] += count
+        return related.most_common(limit)
+
+    def entities_in(self, text: str) -> Counter:
+        """Unambiguous mentions per entity in any text (an arc, a summary, ...)."""
+        return Counter(
+            mention.targets[0] for mention in self._get_matcher().find(text) if not mention.is_ambiguous
+        )
+
+    def _entries(self, start_chapter: Optional[int], end_chapter: Optional[int]) -> Iterable[ChapterEntities]:
+        for number, entry in self._chapters.items():
+            if (start_chapter is None or number >= start_chapter) and (end_chapter is None or number <= end_chapter):
+                yield entry
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    async def save(self, repository: CheckpointRepository, story_key: str) -> int:
+        """
+        Write the registry and the chapters changed since the last save.
+
+        Returns:
+            Number of checkpoints written
+        """
+        written = 0
+        if self._registry_dirty or self._dirty:
+            await repository.save(INDEX_NAMESPACE, story_key, _REGISTRY_STEP, {
+                "version": ENCODING_VERSION,
+                "names_version": self._names_version,
+                "entities": [[e.name, e.entity_type, e.aliases] for e in self._entities.values()],
+                "name_versions": [[surface, name, version] for (surface, name), version in self._name_versions.items()],
+                "chapters": self.chapters,
+            })
+            written += 1
+        for number in sorted(self._dirty):
+            entry = self._chapters.get(number)
+            if entry is not None:
+                await repository.save(INDEX_NAMESPACE, story_key, number, entry.to_dict())
+                written += 1
+        self._dirty.clear()
+        self._registry_dirty = False
+        return written
+
+    @classmethod
+    async def load(cls, repository: CheckpointRepository, story_key: str) -> "EntityIndex":
+        """Load a saved index (an empty one if none was saved or its encoding is outdated)."""
+        index = cls()
+        steps = {checkpoint.step: checkpoint.data for checkpoint in await repository.list_steps(INDEX_NAMESPACE, story_key)}
+        registry = steps.get(_REGISTRY_STEP)
+        if registry is None or registry.get("version") != ENCODING_VERSION:
+            return index
+        for name, entity_type, aliases in registry["entities"]:
+            index._entities[name] = IndexedEntity(name=name, entity_type=entity_type, aliases=list(aliases))
+        index._names_version = registry["names_version"]
+        index._name_versions = {(surface, name): version for surface, name, version in registry["name_versions"]}
+        for number in registry["chapters"]:
+            # Chapters removed after their last save are listed in the registry no longer
+            if number in steps:
+                index._chapters[number] = ChapterEntities.from_dict(steps[number])
+        logger.info(f"📇 Loaded entity index: {len(index)} entities, {len(index._chapters)} chapters")
+        return index
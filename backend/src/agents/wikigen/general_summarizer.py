@@ -17,18 +17,60 @@ Key Features:
 - Consistent style and tone
 - Template-based approach
 - Quality validation
+- Map-reduce tree: chapters are summarized in parallel and combined level by
+  level, so arcs longer than the model context can be summarized
+- Summaries cached by content hash: an update only re-summarizes changed
+  chapters and their ancestors in the tree
+- Arc summaries are told the arc's known characters, locations and events
+  (from the shared entity index), so they cover them by their wiki names
 """
 
-from typing import List, Optional, Dict, Any
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Dict, Any
 from uuid import UUID
 
-# TODO: Import proper types when schemas are defined
-# from src.database.models.story import Chapter
-# from src.database.models.workspace import Arc
-# NOTE: Summary and SummaryType may need to be created in domain models
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
+from src.schemas.db.story import Chapter
+from src.schemas.llm.models import LLMMessage
+from src.schemas.wikigen.wiki import ArcSummary, ChapterSummary, CharacterDevelopmentSummary
 from src.services.llm.llm_service import LLMService
 from src.prompts import prompt_manager
 from src.agents.base_agent import BaseAgent
+from src.agents.wikigen.entity_index import EntityIndex
+from src.utils.tokenizers import get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint namespace of cached summaries (run_key is the summary's hash, step 0)
+CACHE_NAMESPACE = "summarizer"
+
+# Length instructions for each summary type
+SUMMARY_LENGTHS: Dict[str, str] = {
+    "brief": "A short overview of 200-500 words",
+    "standard": "About 150-300 words",
+    "detailed": "A comprehensive summary of 800-1200 words covering every key event",
+    "progressive": "As long as needed to cover the whole story so far (typically 500-1500 words)",
+}
+
+# Length of the chapter summaries and inner nodes an arc summary is reduced from
+TREE_SUMMARY_LENGTH = "standard"
+
+# Most known names per category listed in an arc summary prompt
+MAX_KEY_ELEMENTS = 15
+
+
+@dataclass
+class SummaryNode:
+    """A node of the map-reduce summary tree"""
+    key: str                            # Hash of everything the summary depends on
+    content: str
+    children: List["SummaryNode"] = field(default_factory=list)
+    cached: bool = False                # Taken from the cache instead of an LLM call
 
 
 class GeneralSummarizerAgent(BaseAgent):
@@ -37,13 +79,27 @@ class GeneralSummarizerAgent(BaseAgent):
     
     Creates high-quality summaries of different lengths and styles
     based on the specific needs of the workflow step.
+    
+    Long content is summarized as a map-reduce tree: chapters are summarized
+    in parallel (oversized chapters as parts), then consecutive summaries are
+    combined reduce_fanout at a time until one remains. Every node is cached
+    by a hash of its inputs (a chapter's content hash, or its children's
+    hashes), so after an edit only the changed chapters and their ancestors
+    are summarized again.
     """
     
     def __init__(
         self, 
         llm_service: LLMService,
-        default_provider: str = "google",
-        default_model: str = "gemini-2.0-flash-001"
+        default_provider: PROVIDER_ID = "google",
+        default_model: MODEL_NAME = "gemini-2.0-flash-001",
+        summary_cache: Optional[CheckpointRepository] = None,
+        reduce_fanout: int = 8,
+        chapter_token_limit: int = 100_000,
+        max_concurrent_summaries: int = 8,
+        entity_index: Optional[EntityIndex] = None,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None
     ):
         """
         Initializes agent with LLM service and default model.
@@ -52,12 +108,30 @@ class GeneralSummarizerAgent(BaseAgent):
             llm_service: LLM service for making summarization calls
             default_provider: Default LLM provider for summarization
             default_model: Default model optimized for summarization tasks
+            summary_cache: Store that keeps summaries across runs (None: this agent instance only)
+            reduce_fanout: Summaries combined per reduce step
+            chapter_token_limit: Chapters larger than this are summarized in parts
+            max_concurrent_summaries: Maximum concurrent summarization LLM calls
+            entity_index: Shared story entity index used to find key elements
+            escalation_model: Stronger model a summary call is re-run on when the default
+                              model fails or returns an empty summary (None disables escalation)
+            escalation_provider: Provider of the escalation model (default: default_provider)
         """
         super().__init__(
             llm_service=llm_service,
             default_provider=default_provider,
-            default_model=default_model
+            default_model=default_model,
+            escalation_model=escalation_model,
+            escalation_provider=escalation_provider
         )
+        self.summary_cache = summary_cache
+        self.reduce_fanout = max(2, reduce_fanout)
+        self.chapter_token_limit = chapter_token_limit
+        self.max_concurrent_summaries = max(1, max_concurrent_summaries)
+        self.entity_index = entity_index
+        self._cache: Dict[str, str] = {}
+        # Created lazily so it binds to the running event loop
+        self._llm_slots: Optional[asyncio.Semaphore] = None
     
     async def summarize_arc(
         self,
@@ -66,27 +140,29 @@ class GeneralSummarizerAgent(BaseAgent):
         summary_type: str,  # "brief", "detailed", "progressive"
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None,
-        previous_arcs: Optional[List[Any]] = None  # TODO: List[ArcSummary]
-    ) -> Any:  # TODO: Replace with ArcSummary type
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        previous_arcs: Optional[List[ArcSummary]] = None,
+        chapters: Optional[List[Chapter]] = None,
+        project_id: Optional[str] = None
+    ) -> ArcSummary:
         """
         Creates summary of arc content for various workflow needs.
         
         Summary Types:
         - brief: Short overview for quick reference (200-500 words)
         - detailed: Comprehensive summary with key events (800-1200 words)
-        - progressive: Summary that builds on previous arcs (varies)
+        - progressive: Summary of the story so far, building on previous arcs
         
         Process:
-        1. Analyze arc content and structure
-        2. Identify key events, characters, and developments
-        3. Create appropriate summary based on type
-        4. Validate summary quality and completeness
-        5. Return structured summary object
+        1. Summarize each chapter in parallel (map), reusing cached summaries
+        2. Combine consecutive summaries reduce_fanout at a time (reduce)
+        3. Combine the top level into the arc summary of the requested type
+           (with the previous arcs' summaries for progressive)
         
         Args:
-            arc_content: Full text content of the arc
+            arc_content: Full text content of the arc (summarized as one chapter
+                         when chapters is not given)
             arc_metadata: Arc title, boundaries, etc.
             summary_type: Type of summary to create
             user_id: UUID of the user making the request
@@ -94,27 +170,52 @@ class GeneralSummarizerAgent(BaseAgent):
             provider: Optional LLM provider override (uses default if not provided)
             model: Optional LLM model override (uses default if not provided)
             previous_arcs: Previous arc summaries for progressive mode
+            chapters: The arc's chapters (lets unchanged chapters be reused after edits)
+            project_id: Optional project the calls are made for (usage attribution)
             
         Returns:
             ArcSummary object with content and metadata
         """
-        # TODO: Implement arc summarization
-        raise NotImplementedError("Arc summarization not yet implemented")
+        if chapters is None:
+            chapters = [Chapter(
+                chapter_number=arc_metadata.get("start_chapter", 1),
+                title=arc_metadata.get("title", "Arc"),
+                content=arc_content,
+            )]
+        llm_args = self._llm_args(user_id, api_key, provider, model, project_id)
+        leaves = await asyncio.gather(*(
+            self._summarize_chapter(chapter, TREE_SUMMARY_LENGTH, llm_args) for chapter in chapters
+        ))
+
+        previous_summaries = "\n\n".join(
+            f"Arc {summary.arc_id}: {summary.content}" for summary in previous_arcs or [] if summary is not None
+        ) if summary_type == "progressive" else ""
+        key_elements = self._format_key_elements(self._extract_key_elements(arc_content, "arc"))
+        root = await self._reduce(
+            list(leaves), summary_type, llm_args, previous_summaries=previous_summaries, key_elements=key_elements
+        )
+        self._validate_summary_quality(root.content, arc_content, summary_type)
+
+        reused = sum(1 for leaf in leaves if leaf.cached)
+        logger.info(f"📝 Summarized arc {arc_metadata.get('id')} from {len(chapters)} chapters ({reused} reused)")
+        return ArcSummary(arc_id=arc_metadata.get("id", 1), summary_type=summary_type, content=root.content)
     
     async def summarize_chapters(
         self,
-        chapters: List[Any],  # TODO: List[Chapter]
+        chapters: List[Chapter],
         summary_length: str,  # "brief", "standard", "detailed"
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None
-    ) -> List[Any]:  # TODO: List[ChapterSummary]
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        project_id: Optional[str] = None
+    ) -> List[ChapterSummary]:
         """
         Creates summaries for individual chapters.
         
         Used for creating chapter-level summaries that can be referenced
-        in wiki articles or used for navigation purposes.
+        in wiki articles or used for navigation purposes. Chapters are
+        summarized in parallel and cached by content hash.
         
         Args:
             chapters: List of chapter objects to summarize
@@ -123,12 +224,25 @@ class GeneralSummarizerAgent(BaseAgent):
             api_key: Optional API key for direct usage
             provider: Optional LLM provider override
             model: Optional LLM model override
+            project_id: Optional project the calls are made for
             
         Returns:
-            List of ChapterSummary objects
+            List of ChapterSummary objects, in chapter order
         """
-        # TODO: Implement chapter summarization
-        raise NotImplementedError("Chapter summarization not yet implemented")
+        llm_args = self._llm_args(user_id, api_key, provider, model, project_id)
+        nodes = await asyncio.gather(*(
+            self._summarize_chapter(chapter, summary_length, llm_args) for chapter in chapters
+        ))
+        return [
+            ChapterSummary(
+                chapter_number=chapter.chapter_number,
+                title=chapter.title,
+                summary_length=summary_length,
+                content=node.content,
+                content_hash=chapter.content_hash,
+            )
+            for chapter, node in zip(chapters, nodes)
+        ]
     
     async def summarize_character_development(
         self,
@@ -137,14 +251,17 @@ class GeneralSummarizerAgent(BaseAgent):
         character_name: str,
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None
-    ) -> Any:  # TODO: CharacterDevelopmentSummary
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        project_id: Optional[str] = None
+    ) -> CharacterDevelopmentSummary:
         """
         Creates focused summary of character development within an arc.
         
         Identifies and summarizes how a specific character changes,
-        grows, or is revealed throughout the arc content.
+        grows, or is revealed throughout the arc content. The excerpts (or
+        the arc content when there are none) go through the same map-reduce
+        tree as arcs, with every step focused on the character.
         
         Args:
             character_mentions: Excerpts mentioning the character
@@ -154,12 +271,175 @@ class GeneralSummarizerAgent(BaseAgent):
             api_key: Optional API key for direct usage
             provider: Optional LLM provider override
             model: Optional LLM model override
+            project_id: Optional project the calls are made for
             
         Returns:
             CharacterDevelopmentSummary object
         """
-        # TODO: Implement character development summarization
-        raise NotImplementedError("Character development summarization not yet implemented")
+        text = "\n\n".join(character_mentions) if character_mentions else arc_content
+        focus = f"how {character_name} changes, grows or is revealed"
+        llm_args = self._llm_args(user_id, api_key, provider, model, project_id)
+        excerpt = Chapter(chapter_number=1, title=f"Excerpts about {character_name}", content=text)
+        root = await self._summarize_chapter(excerpt, "detailed", llm_args, focus=focus)
+        return CharacterDevelopmentSummary(character_name=character_name, content=root.content)
+
+    # ------------------------------------------------------------------
+    # Map-reduce tree
+    # ------------------------------------------------------------------
+
+    async def _summarize_chapter(
+        self,
+        chapter: Chapter,
+        summary_length: str,
+        llm_args: Dict[str, Any],
+        focus: str = ""
+    ) -> SummaryNode:
+        """Map step: summarize a chapter, or its parts and then combine them when it is too large."""
+        tokenizer = get_tokenizer(*self._get_model_params(llm_args.get("provider"), llm_args.get("model")))
+        parts = chapter.split_at_scene_breaks(self.chapter_token_limit, tokenizer)
+        if len(parts) > 1:
+            leaves = await asyncio.gather(*(
+                self._summarize_chapter(part, TREE_SUMMARY_LENGTH, llm_args, focus) for part in parts
+            ))
+            return await self._reduce(list(leaves), summary_length, llm_args, focus=focus)
+
+        key = self._node_key("summarize_text", llm_args, {
+            "chapter": chapter.content_hash, "length": summary_length, "focus": focus,
+        })
+        return await self._cached_node(key, [], lambda: self._load_summarization_prompts(summary_length, "text", {
+            "title": chapter.title, "content": chapter.content, "focus": focus,
+        }), llm_args)
+
+    async def _reduce(
+        self,
+        nodes: List[SummaryNode],
+        summary_type: str,
+        llm_args: Dict[str, Any],
+        focus: str = "",
+        previous_summaries: str = "",
+        key_elements: str = ""
+    ) -> SummaryNode:
+        """
+        Reduce step: combine nodes reduce_fanout at a time until one root is left.
+        
+        Groups are aligned to fixed positions, so changing one chapter only
+        changes the groups on its path to the root, and appending chapters only
+        the last group of each level. Only the root gets the requested type,
+        the previous arcs' summaries and the key elements; inner nodes stay
+        reusable across all three.
+        """
+        level = nodes
+        while len(level) > self.reduce_fanout:
+            level = list(await asyncio.gather(*(
+                self._combine(level[start:start + self.reduce_fanout], TREE_SUMMARY_LENGTH, llm_args, focus)
+                for start in range(0, len(level), self.reduce_fanout)
+            )))
+        return await self._combine(level, summary_type, llm_args, focus, previous_summaries, key_elements)
+
+    async def _combine(
+        self,
+        children: List[SummaryNode],
+        summary_length: str,
+        llm_args: Dict[str, Any],
+        focus: str = "",
+        previous_summaries: str = "",
+        key_elements: str = ""
+    ) -> SummaryNode:
+        """Combine consecutive summaries into one node."""
+        key = self._node_key("combine_summaries", llm_args, {
+            "children": [child.key for child in children],
+            "length": summary_length,
+            "focus": focus,
+            "previous": hashlib.sha256(previous_summaries.encode("utf-8")).hexdigest(),
+            "key_elements": key_elements,
+        })
+        summaries = "\n\n".join(f"[{number}] {child.content}" for number, child in enumerate(children, 1))
+        return await self._cached_node(key, children, lambda: self._load_summarization_prompts(summary_length, "summaries", {
+            "summaries": summaries, "focus": focus, "previous_summaries": previous_summaries,
+            "key_elements": key_elements,
+        }), llm_args)
+
+    async def _cached_node(
+        self,
+        key: str,
+        children: List[SummaryNode],
+        render_prompts: Callable[[], List[LLMMessage]],
+        llm_args: Dict[str, Any]
+    ) -> SummaryNode:
+        """Return the cached summary for key, or make the LLM call and cache the result."""
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return SummaryNode(key=key, content=cached, children=children, cached=True)
+
+        if self._llm_slots is None:
+            self._llm_slots = asyncio.Semaphore(self.max_concurrent_summaries)
+        slots = self._llm_slots
+
+        async def summarize(attempt_provider: PROVIDER_ID, attempt_model: MODEL_NAME) -> str:
+            async with slots:
+                response = await self._make_llm_call(
+                    messages=render_prompts(), **{**llm_args, "provider": attempt_provider, "model": attempt_model}
+                )
+            return (getattr(response, "content", "") or "").strip()
+
+        content = await self._run_cascade(
+            "summary", summarize, lambda text: None if text else "empty summary",
+            llm_args.get("provider"), llm_args.get("model"),
+        )
+        if not content:
+            raise ValueError("model returned an empty summary")
+        await self._cache_put(key, content)
+        return SummaryNode(key=key, content=content, children=children)
+
+    def _node_key(self, prompt_group: str, llm_args: Dict[str, Any], inputs: Dict[str, Any]) -> str:
+        """Hash of a node's inputs, prompt templates and model: equal keys mean an equal summary."""
+        provider, model = self._get_model_params(llm_args.get("provider"), llm_args.get("model"))
+        prompts = prompt_manager.get_group(f"wikigen.{prompt_group}")
+        key_parts = {
+            "prompt": prompt_group,
+            "prompt_version": prompts.get("version"),
+            "prompt_templates": prompts.get("messages"),
+            "provider": provider,
+            "model": model,
+            **inputs,
+        }
+        return hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        """Cached summary for key (in memory, then the store); a failing store is a cache miss."""
+        if key in self._cache:
+            return self._cache[key]
+        if self.summary_cache is None:
+            return None
+        try:
+            steps = await self.summary_cache.list_steps(CACHE_NAMESPACE, key)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not read the summary cache: {e}")
+            return None
+        if not steps or not steps[0].data.get("content"):
+            return None
+        self._cache[key] = steps[0].data["content"]
+        return self._cache[key]
+
+    async def _cache_put(self, key: str, content: str) -> None:
+        """Cache a summary; a failing store only costs reuse in later runs."""
+        self._cache[key] = content
+        if self.summary_cache is None:
+            return
+        try:
+            await self.summary_cache.save(CACHE_NAMESPACE, key, 0, {"content": content})
+        except Exception as e:
+            logger.warning(f"⚠️  Could not write the summary cache: {e}")
+
+    @staticmethod
+    def _llm_args(
+        user_id: UUID,
+        api_key: Optional[str],
+        provider: Optional[PROVIDER_ID],
+        model: Optional[MODEL_NAME],
+        project_id: Optional[str]
+    ) -> Dict[str, Any]:
+        return {"user_id": user_id, "api_key": api_key, "provider": provider, "model": model, "project_id": project_id}
     
     def _extract_key_elements(self, content: str, content_type: str) -> Dict[str, List[str]]:
         """
@@ -172,6 +452,9 @@ class GeneralSummarizerAgent(BaseAgent):
         - Conflicts and resolutions
         - Themes and motifs
         
+        Known entities come from the shared entity index (most mentioned
+        first) rather than another prompt; themes are not tracked there.
+        
         Args:
             content: Content to analyze
             content_type: Type of content (arc, chapter, etc.)
@@ -179,13 +462,24 @@ class GeneralSummarizerAgent(BaseAgent):
         Returns:
             Dictionary of categorized key elements
         """
-        # TODO: Implement key element extraction
-        return {
-            "events": [],
-            "characters": [],
-            "locations": [],
-            "themes": []
-        }
+        elements: Dict[str, List[str]] = {"events": [], "characters": [], "locations": [], "themes": []}
+        if self.entity_index is None:
+            return elements
+        categories = {"event": "events", "character": "characters", "location": "locations"}
+        for name, _ in self.entity_index.entities_in(content).most_common():
+            entity = self.entity_index.get(name)
+            category = categories.get(entity.entity_type) if entity is not None else None
+            if category is not None:
+                elements[category].append(name)
+        return elements
+
+    @staticmethod
+    def _format_key_elements(elements: Dict[str, List[str]]) -> str:
+        """Render key elements as one line per non-empty category (most mentioned first)."""
+        return "\n".join(
+            f"- {category.capitalize()}: {', '.join(names[:MAX_KEY_ELEMENTS])}"
+            for category, names in elements.items() if names
+        )
     
     def _validate_summary_quality(
         self,
@@ -219,24 +513,24 @@ class GeneralSummarizerAgent(BaseAgent):
         summary_type: str,
         content_type: str,
         context: Dict[str, Any]
-    ) -> List[Any]:  # TODO: List[LLMMessage]
+    ) -> List[LLMMessage]:
         """
         Loads appropriate summarization prompts based on type and context.
         
-        Uses wikigen.summarization prompt group with type-specific templates.
+        Story text uses the wikigen.summarize_text prompt group, summaries of
+        consecutive parts wikigen.combine_summaries.
         
         Args:
             summary_type: Type of summary (brief, detailed, etc.)
-            content_type: Type of content being summarized
+            content_type: "text" for story text, "summaries" for summaries to combine
             context: Variables for prompt rendering
             
         Returns:
             List of rendered LLMMessage objects
         """
-        # TODO: Implement prompt loading
-        # prompts = prompt_manager.get_group(f"wikigen.summarization.{summary_type}")
-        # Render with context including content_type
-        return []
+        group = "summarize_text" if content_type == "text" else "combine_summaries"
+        length_guidance = SUMMARY_LENGTHS.get(summary_type, SUMMARY_LENGTHS[TREE_SUMMARY_LENGTH])
+        return prompt_manager.get_group(f"wikigen.{group}").render_messages(length_guidance=length_guidance, **context)
     
     # Implementation of BaseAgent's abstract method
     async def execute(self, *args, **kwargs):
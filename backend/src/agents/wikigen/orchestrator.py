@@ -3,27 +3,74 @@
 """
 WikiGen Workflow Orchestrator
 
-Coordinates the complete WikiGen workflow by managing all agents and handling 
+Coordinates the complete WikiGen workflow by managing all agents and handling
 the overall processing sequence. This is NOT an agent itself - it's a coordination layer.
 
 Key Responsibilities:
 - Manages agent initialization and lifecycle
-- Coordinates data flow between agents  
+- Coordinates data flow between agents
 - Handles error management and retry logic
 - Tracks overall workflow progress
 - Manages arc-by-arc processing loop
 - Handles state and resource management
+
+The workflow runs as a task graph on DAGExecutor:
+
+    split ──┬─> summarize:1 ──> summarize:2 ──> ...
+            └─> plan:1 ──> write:1:* ──> articles:1 ──┬─> backlink:1
+                                                      └─> plan:2 ──> write:2:* ──> ...
+
+Articles of an arc are written concurrently, and backlinking of arc N overlaps
+with planning and writing of arc N+1, so wall time follows the critical path
+(split, then plan + slowest article per arc).
+
+Every arc's articles are registered in one EntityIndex shared by the planner,
+summarizer and backlinker, so entities are found once per chapter. Before each
+arc is planned, the chapters up to its end are indexed with the names known so
+far (only chapters whose text or names changed are re-scanned).
 """
 
-from typing import List, Optional, Dict, Any
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
 from uuid import UUID
 
-# TODO: Import proper types when schemas are defined
-# from src.database.models.story import FullStoryBase as Story, Chapter
-# from src.database.models.wiki import WikiArchive
-# from src.database.models.workspace import Arc
-# NOTE: WikiResult may need to be created in domain models
+from src.agents.base_agent import LLMArgs
+from src.agents.wikigen.arc_splitter import ArcSplitterAgent
+from src.agents.wikigen.article_writer import ArticleWriterAgent
+from src.agents.wikigen.chapter_backlinker import ChapterBacklinkerAgent
+from src.agents.wikigen.entity_index import EntityIndex
+from src.agents.wikigen.general_summarizer import GeneralSummarizerAgent
+from src.agents.wikigen.pipeline import DAGExecutor, EventCallback, TaskContext, TaskFunc
+from src.agents.wikigen.planner import WikiPlannerAgent
+from src.agents.wikigen.wiki_store import WikiStore
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.core.exceptions import ProcessingError
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
+from src.schemas.db.story import Chapter, FullStoryBase
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+from src.schemas.wikigen.wiki import (
+    ArcArchive,
+    ArcSummary,
+    EnhancedChapter,
+    PipelineEvent,
+    WikiArticle,
+    WikiPlan,
+    WikiResult,
+)
 from src.services.llm.llm_service import LLMService
+from src.services.web_search.web_search_service import WebSearchService
+
+logger = logging.getLogger(__name__)
+
+# Maximum concurrent agent calls per pipeline stage
+DEFAULT_STAGE_CONCURRENCY: Dict[str, int] = {
+    "split": 1,
+    "summarize": 2,
+    "plan": 2,
+    "write": 8,
+    "backlink": 4,
+    "join": 16,
+}
 
 
 class WikiGenOrchestrator:
@@ -31,33 +78,69 @@ class WikiGenOrchestrator:
     Orchestrates the complete WikiGen workflow.
     Manages all agents and coordinates the workflow execution.
     """
-    
-    def __init__(self, llm_service: LLMService):
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        arc_splitter: Optional[ArcSplitterAgent] = None,
+        summarizer: Optional[GeneralSummarizerAgent] = None,
+        wiki_planner: Optional[WikiPlannerAgent] = None,
+        article_writer: Optional[ArticleWriterAgent] = None,
+        chapter_backlinker: Optional[ChapterBacklinkerAgent] = None,
+        web_search_service: Optional[WebSearchService] = None,
+        stage_concurrency: Optional[Dict[str, int]] = None,
+        entity_index: Optional[EntityIndex] = None,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None,
+        checkpoint_repository: Optional[CheckpointRepository] = None,
+    ):
         """
         Initializes orchestrator with all required agents.
-        
+
         Args:
             llm_service: LLM service for making API calls
+            arc_splitter, summarizer, wiki_planner, article_writer, chapter_backlinker:
+                Agent instances to use (created with their defaults if not provided)
+            web_search_service: Web search service for the default article writer
+            stage_concurrency: Per-stage concurrency overrides (see DEFAULT_STAGE_CONCURRENCY)
+            entity_index: Story entity index to build on (e.g. EntityIndex.load() of an
+                earlier run); given to every agent that has none of its own
+            escalation_model: Stronger model the default agents escalate failing items to
+                (windows, plans, articles, summaries, link resolutions); None disables it
+            escalation_provider: Provider of the escalation model (default: each agent's provider)
+            checkpoint_repository: Store the default arc splitter checkpoints windows in and
+                the default summarizer caches summaries in (None: nothing kept across runs)
         """
         self.llm_service = llm_service
-        
-        # TODO: Initialize agents when full implementation is ready
-        # self.arc_splitter = ArcSplitterAgent(llm_service)
-        # self.summarizer = GeneralSummarizerAgent(llm_service)  
-        # self.wiki_planner = WikiPlannerAgent(llm_service)
-        # self.article_writer = ArticleWriterAgent(llm_service, web_search_service)
-        # self.chapter_backlinker = ChapterBacklinkerAgent(llm_service)
-    
+
+        escalation: Dict[str, Any] = {"escalation_model": escalation_model, "escalation_provider": escalation_provider}
+        self.arc_splitter = arc_splitter or ArcSplitterAgent(llm_service, checkpoint_repository=checkpoint_repository, **escalation)
+        self.summarizer = summarizer or GeneralSummarizerAgent(llm_service, summary_cache=checkpoint_repository, **escalation)
+        self.wiki_planner = wiki_planner or WikiPlannerAgent(llm_service, **escalation)
+        self.article_writer = article_writer or ArticleWriterAgent(llm_service, web_search_service, **escalation)
+        self.chapter_backlinker = chapter_backlinker or ChapterBacklinkerAgent(llm_service, **escalation)
+
+        self.entity_index = entity_index if entity_index is not None else EntityIndex()
+        for agent in (self.wiki_planner, self.summarizer, self.chapter_backlinker):
+            if getattr(agent, "entity_index", False) is None:
+                agent.entity_index = self.entity_index
+
+        self.stage_concurrency = {**DEFAULT_STAGE_CONCURRENCY, **(stage_concurrency or {})}
+        self._last_executor: Optional[DAGExecutor] = None
+        self._last_result: Optional[WikiResult] = None
+
     async def generate_wiki(
-        self, 
-        story: Any,  # TODO: Replace with Story type
+        self,
+        story: FullStoryBase,
         user_id: UUID,
-        provider: str,
-        model: str
-    ) -> Any:  # TODO: Replace with WikiResult type
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        api_key: Optional[str] = None,
+        on_event: Optional[EventCallback] = None,
+    ) -> WikiResult:
         """
         Main orchestration method that runs the complete workflow.
-        
+
         Coordinates all agents in proper sequence:
         1. Split story into arcs
         2. For each arc:
@@ -66,83 +149,416 @@ class WikiGenOrchestrator:
            - Create chapter backlinks
            - Save arc archive
         3. Return complete wiki result
-        
+
+        Independent steps run concurrently (see module docstring).
+
         Args:
             story: Story object with content and metadata
             user_id: UUID of the user making the request
-            provider: LLM provider ID (e.g., 'openai')
-            model: LLM model name (e.g., 'gpt-4')
-            
+            provider: Optional LLM provider override for every agent (agent defaults if None)
+            model: Optional LLM model override for every agent (agent defaults if None)
+            api_key: Optional API key for direct usage
+            on_event: Optional callback receiving structured progress events
+
         Returns:
             WikiResult with complete wiki archives and metadata
-            
+
         Raises:
-            WikiGenError: If workflow execution fails
+            ProcessingError: If workflow execution fails
         """
-        # TODO: Implement orchestration logic
-        raise NotImplementedError("WikiGen orchestration not yet implemented")
-    
+        executor = self._build_pipeline(story, user_id, provider, model, api_key, on_event=on_event)
+        await executor.run()
+        return self._collect_result(story, executor)
+
+    async def generate_wiki_streaming(
+        self,
+        story: FullStoryBase,
+        user_id: UUID,
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        api_key: Optional[str] = None,
+        event_queue_size: int = 100,
+    ) -> AsyncIterator[PipelineEvent]:
+        """
+        Streaming version of generate_wiki that yields progress events.
+
+        The pipeline pauses when the consumer falls event_queue_size events behind.
+        The WikiResult is available from get_final_result() once the stream ends.
+        """
+        executor = self._build_pipeline(story, user_id, provider, model, api_key)
+        async for event in executor.run_streaming(event_queue_size=event_queue_size):
+            yield event
+        self._collect_result(story, executor)
+
+    def get_final_result(self) -> WikiResult:
+        """Get the result of the last completed run."""
+        if self._last_result is None:
+            raise ValueError("No wiki has been generated. Run generate_wiki_streaming() first.")
+        return self._last_result
+
+    def get_wiki_store(self, result: Optional[WikiResult] = None) -> WikiStore:
+        """
+        Versioned view of a result's articles (default: the last run's).
+
+        Each arc's articles become visible at the arc's end chapter, so
+        store.as_of(chapter) is the spoiler-safe wiki for a reader at that
+        chapter, without a wiki copy per arc.
+        """
+        return WikiStore.from_archives((result or self.get_final_result()).archives)
+
     async def update_wiki(
         self,
-        story: Any,  # TODO: Replace with Story type
-        new_chapters: List[Any],  # TODO: Replace with List[Chapter]
-        existing_wiki: Any,  # TODO: Replace with WikiArchive
+        story: FullStoryBase,
+        new_chapters: List[Chapter],
+        existing_wiki: WikiResult,
         user_id: UUID,
-        provider: str,
-        model: str
-    ) -> Any:  # TODO: Replace with WikiResult
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        api_key: Optional[str] = None,
+        on_event: Optional[EventCallback] = None,
+        previous_analysis: Optional[ArcAnalysisResult] = None,
+    ) -> WikiResult:
         """
         Handles workflow for updating existing wikis with new chapters.
-        
+
         Process:
         1. Reassess arc boundaries with new content
         2. Update existing articles with new information
         3. Create new articles if needed
         4. Maintain consistency with previous versions
-        
+
+        Arcs that end before the first new chapter and whose boundaries are
+        unchanged reuse their existing archives without any LLM calls. The arc
+        split itself is incremental when the previous analysis is known (passed
+        in, or stored in existing_wiki.metadata by an earlier run): only the
+        trailing unfinalized arcs and the new chapters are re-analyzed.
+
         Args:
             story: Updated story object
             new_chapters: List of newly added chapters
-            existing_wiki: Previous wiki archive to update
+            existing_wiki: Previous wiki result to update
             user_id: UUID of the user making the request
-            provider: LLM provider ID
-            model: LLM model name
-            
+            provider: Optional LLM provider override
+            model: Optional LLM model override
+            api_key: Optional API key for direct usage
+            on_event: Optional callback receiving structured progress events
+            previous_analysis: Arc analysis the existing wiki was built from
+
         Returns:
             WikiResult with updated wiki archives
         """
-        # TODO: Implement update logic
-        raise NotImplementedError("Wiki update workflow not yet implemented")
-    
-    def _create_arc_archive(self, arc: Any, articles: List[Any], enhanced_chapters: List[Any]) -> Any:
+        first_new_chapter = min((c.chapter_number for c in new_chapters), default=story.total_chapters + 1)
+        reusable = {
+            archive.arc.id: archive
+            for archive in existing_wiki.archives
+            if archive.arc.is_finalized and archive.arc.end_chapter < first_new_chapter
+        }
+
+        if previous_analysis is None and existing_wiki.metadata.get("arc_analysis"):
+            previous_analysis = ArcAnalysisResult.model_validate(existing_wiki.metadata["arc_analysis"])
+
+        executor = self._build_pipeline(
+            story, user_id, provider, model, api_key, on_event=on_event, reusable=reusable,
+            previous_analysis=previous_analysis,
+        )
+        await executor.run()
+        return self._collect_result(story, executor)
+
+    # ------------------------------------------------------------------
+    # Pipeline construction
+    # ------------------------------------------------------------------
+
+    def _build_pipeline(
+        self,
+        story: FullStoryBase,
+        user_id: UUID,
+        provider: Optional[PROVIDER_ID],
+        model: Optional[MODEL_NAME],
+        api_key: Optional[str],
+        on_event: Optional[EventCallback] = None,
+        reusable: Optional[Dict[int, ArcArchive]] = None,
+        previous_analysis: Optional[ArcAnalysisResult] = None,
+    ) -> DAGExecutor:
+        """Create the executor with the split task; later tasks are added as results arrive."""
+        executor = DAGExecutor(stage_concurrency=self.stage_concurrency, on_event=on_event)
+        self._last_executor = executor
+        self._last_result = None
+
+        reusable = reusable or {}
+        llm_args = LLMArgs(user_id=user_id, api_key=api_key, provider=provider, model=model)
+        story_metadata = {
+            "title": story.metadata.title,
+            "author": story.metadata.author,
+            "genres": story.metadata.genres,
+            "synopsis": story.metadata.synopsis,
+        }
+
+        def is_reused(arc: Arc) -> bool:
+            archive = reusable.get(arc.id)
+            return archive is not None and (archive.arc.start_chapter, archive.arc.end_chapter) == (arc.start_chapter, arc.end_chapter)
+
+        def add_arc_tasks(ctx: TaskContext, arcs: List[Arc], index: int) -> None:
+            """Add the planning task of arcs[index] (which adds the arc's remaining tasks)."""
+            arc = arcs[index]
+            plan_deps = ["split"]
+            if index > 0:
+                plan_deps += [f"summarize:{arcs[index - 1].id}", f"articles:{arcs[index - 1].id}"]
+
+            async def plan(plan_ctx: TaskContext) -> Optional[WikiPlan]:
+                previous_summaries = [
+                    plan_ctx.executor.results[f"summarize:{a.id}"] for a in arcs[:index]
+                ]
+                existing_articles = self._articles_before(plan_ctx.executor, arcs, index)
+                if is_reused(arc):
+                    wiki_plan = reusable[arc.id].plan
+                else:
+                    self.entity_index.update(story.get_chapters(1, arc.end_chapter))
+                    wiki_plan = await self.wiki_planner.create_plan(
+                        arc_content=story.get_content(arc.start_chapter, arc.end_chapter),
+                        story_metadata=story_metadata,
+                        mode="update" if (index > 0 or existing_articles) else "fresh",
+                        previous_summaries=previous_summaries,
+                        existing_wiki=existing_articles or None,
+                        arc_id=arc.id,
+                        as_of_chapter=arc.end_chapter,
+                        **llm_args,
+                    )
+                    self._validate_agent_output("WikiPlannerAgent", wiki_plan)
+                self._add_write_tasks(plan_ctx, arc, wiki_plan, story, story_metadata, llm_args, reusable if is_reused(arc) else {})
+
+                # Backlinking arc N overlaps with planning arc N+1
+                plan_ctx.add_task(
+                    f"backlink:{arc.id}", "backlink",
+                    self._backlink_task(arcs, index, story, llm_args, reusable if is_reused(arc) else {}),
+                    deps=[f"articles:{arc.id}"], arc_id=arc.id,
+                )
+                if index + 1 < len(arcs):
+                    add_arc_tasks(plan_ctx, arcs, index + 1)
+                return wiki_plan
+
+            ctx.add_task(f"plan:{arc.id}", "plan", plan, deps=plan_deps, arc_id=arc.id)
+
+        async def split(ctx: TaskContext) -> ArcAnalysisResult:
+            async def window_started(window: Any) -> None:
+                await ctx.emit(
+                    "window_started", window_number=window.window_number,
+                    start_chapter=window.start_chapter, end_chapter=window.end_chapter,
+                )
+
+            async def arc_detected(arc: Arc, window: Any) -> None:
+                await ctx.emit(
+                    "arc_detected", arc_id=arc.id, title=arc.title,
+                    start_chapter=arc.start_chapter, end_chapter=arc.end_chapter, is_finalized=arc.is_finalized,
+                )
+
+            analysis = await self.arc_splitter.analyze_story(
+                story=story, on_arc=arc_detected, on_window=window_started,
+                previous_result=previous_analysis, **llm_args,
+            )
+            self._validate_agent_output("ArcSplitterAgent", analysis)
+            arcs = sorted(analysis.arcs, key=lambda a: a.start_chapter)
+            await ctx.emit("arcs_split", arcs=len(arcs))
+
+            for index, arc in enumerate(arcs):
+                ctx.add_task(
+                    f"summarize:{arc.id}", "summarize",
+                    self._summarize_task(arcs, index, story, llm_args, reusable if is_reused(arc) else {}),
+                    deps=[f"summarize:{arcs[index - 1].id}"] if index > 0 else [], arc_id=arc.id,
+                )
+            if arcs:
+                add_arc_tasks(ctx, arcs, 0)
+            return analysis
+
+        executor.add_task("split", "split", split)
+        return executor
+
+    def _add_write_tasks(
+        self,
+        ctx: TaskContext,
+        arc: Arc,
+        wiki_plan: Optional[WikiPlan],
+        story: FullStoryBase,
+        story_metadata: Dict[str, Any],
+        llm_args: LLMArgs,
+        reusable: Dict[int, ArcArchive],
+    ) -> None:
+        """Add one write task per planned article plus the arc's articles join task."""
+        write_ids: List[str] = []
+        if arc.id not in reusable and wiki_plan is not None:
+            arc_content = story.get_content(arc.start_chapter, arc.end_chapter)
+            for number, article_plan in enumerate(wiki_plan.articles, 1):
+                single_article_plan = wiki_plan.model_copy(update={"articles": [article_plan]})
+
+                async def write(write_ctx: TaskContext, plan: WikiPlan = single_article_plan) -> List[WikiArticle]:
+                    articles = await self.article_writer.write_articles(
+                        wiki_plan=plan,
+                        arc_content=arc_content,
+                        story_metadata=story_metadata,
+                        context_plan=wiki_plan,  # Same plan text for every article keeps the prompt prefix cacheable
+                        **llm_args,
+                    )
+                    for article in articles:
+                        await write_ctx.emit("article_done", arc_id=arc.id, title=article.title, filename=article.filename)
+                    return articles
+
+                task_id = f"write:{arc.id}:{number}"
+                ctx.add_task(task_id, "write", write, arc_id=arc.id, article=article_plan.title)
+                write_ids.append(task_id)
+
+        async def join_articles(join_ctx: TaskContext) -> List[WikiArticle]:
+            if arc.id in reusable:
+                self.entity_index.register_articles(reusable[arc.id].articles)
+                return reusable[arc.id].articles
+            articles = [article for task_id in write_ids for article in (join_ctx.results[task_id] or [])]
+            self.entity_index.register_articles(articles)
+            await join_ctx.emit("arc_articles_written", arc_id=arc.id, articles=len(articles))
+            return articles
+
+        ctx.add_task(f"articles:{arc.id}", "join", join_articles, deps=write_ids, arc_id=arc.id)
+
+    def _summarize_task(
+        self,
+        arcs: List[Arc],
+        index: int,
+        story: FullStoryBase,
+        llm_args: LLMArgs,
+        reusable: Dict[int, ArcArchive],
+    ) -> TaskFunc:
+        arc = arcs[index]
+
+        async def summarize(ctx: TaskContext) -> Optional[ArcSummary]:
+            if arc.id in reusable:
+                return reusable[arc.id].summary
+            previous_arcs = [ctx.executor.results[f"summarize:{a.id}"] for a in arcs[:index]]
+            return await self.summarizer.summarize_arc(
+                arc_content=story.get_content(arc.start_chapter, arc.end_chapter),
+                arc_metadata=arc.model_dump(),
+                summary_type="progressive",
+                previous_arcs=previous_arcs,
+                chapters=story.get_chapters(arc.start_chapter, arc.end_chapter),
+                **llm_args,
+            )
+
+        return summarize
+
+    def _backlink_task(
+        self,
+        arcs: List[Arc],
+        index: int,
+        story: FullStoryBase,
+        llm_args: LLMArgs,
+        reusable: Dict[int, ArcArchive],
+    ) -> TaskFunc:
+        arc = arcs[index]
+
+        async def backlink(ctx: TaskContext) -> List[EnhancedChapter]:
+            if arc.id in reusable:
+                return reusable[arc.id].enhanced_chapters
+            # Spoiler-safe: only articles from this arc and earlier ones
+            articles = self._articles_before(ctx.executor, arcs, index + 1)
+            return await self.chapter_backlinker.create_chapter_links(
+                chapters=story.get_chapters(arc.start_chapter, arc.end_chapter),
+                wiki_articles=articles,
+                current_arc_id=arc.id,
+                **llm_args,
+            )
+
+        return backlink
+
+    @staticmethod
+    def _articles_before(executor: DAGExecutor, arcs: List[Arc], index: int) -> List[WikiArticle]:
+        """Articles written for arcs[:index]."""
+        return [
+            article
+            for arc in arcs[:index]
+            for article in executor.results.get(f"articles:{arc.id}", [])
+        ]
+
+    def _collect_result(self, story: FullStoryBase, executor: DAGExecutor) -> WikiResult:
+        """Package the executor's results into per-arc archives."""
+        analysis: ArcAnalysisResult = executor.results["split"]
+        archives = []
+        for arc in sorted(analysis.arcs, key=lambda a: a.start_chapter):
+            archives.append(self._create_arc_archive(
+                arc,
+                executor.results.get(f"articles:{arc.id}", []),
+                executor.results.get(f"backlink:{arc.id}") or [],
+                summary=executor.results.get(f"summarize:{arc.id}"),
+                plan=executor.results.get(f"plan:{arc.id}"),
+            ))
+
+        result = WikiResult(
+            story_title=story.metadata.title,
+            archives=archives,
+            metadata={
+                "total_chapters": story.total_chapters,
+                "arc_analysis": analysis.model_dump(mode="json"),
+                "stage_stats": executor.stage_stats(),
+                "cascade": self.cascade_report(),
+            },
+        )
+        self._last_result = result
+        return result
+
+    def cascade_report(self) -> Dict[str, Dict[str, Any]]:
+        """Escalation counts of the cascade stages of each agent that has an escalation model."""
+        agents = (self.arc_splitter, self.summarizer, self.wiki_planner, self.article_writer, self.chapter_backlinker)
+        return {
+            type(agent).__name__: agent.cascade_report()
+            for agent in agents if getattr(agent, "escalation_model", None) is not None
+        }
+
+    def _create_arc_archive(
+        self,
+        arc: Arc,
+        articles: List[WikiArticle],
+        enhanced_chapters: List[EnhancedChapter],
+        summary: Optional[ArcSummary] = None,
+        plan: Optional[WikiPlan] = None,
+    ) -> ArcArchive:
         """
         Helper method to package arc results into archive format.
-        
+
         Creates proper file structure and metadata for spoiler prevention.
-        
+        An archive holds only the articles written for its arc; the wiki as
+        of any point is assembled by WikiStore (see get_wiki_store).
+
         Args:
             arc: Arc object with boundaries and metadata
             articles: List of generated wiki articles
             enhanced_chapters: Chapters with added wiki links
-            
+            summary: Arc summary
+            plan: Wiki plan the articles were written from
+
         Returns:
             ArcArchive object ready for storage
         """
-        # TODO: Implement archive creation
-        pass
-    
+        return ArcArchive(
+            arc=arc,
+            summary=summary,
+            plan=plan,
+            articles=list(articles),
+            enhanced_chapters=list(enhanced_chapters),
+        )
+
     def _validate_agent_output(self, agent_name: str, output: Any) -> bool:
         """
         Validates outputs from each agent before proceeding.
-        
+
         Ensures data consistency and completeness across the workflow.
-        
+
         Args:
             agent_name: Name of the agent that produced the output
             output: Output data to validate
-            
+
         Returns:
-            True if output is valid, False otherwise
+            True if output is valid
+
+        Raises:
+            ProcessingError: If the output is missing
         """
-        # TODO: Implement validation logic
-        return True
\ No newline at end of file
+        if output is None:
+            raise ProcessingError(f"{agent_name} returned no output")
+        if isinstance(output, ArcAnalysisResult) and not output.arcs:
+            raise ProcessingError(f"{agent_name} returned no arcs")
+        return True
@@ -0,0 +1,287 @@
+# backend/src/agents/wikigen/pipeline.py
+
+"""
+WikiGen Pipeline Executor
+
+Runs a dependency graph of async tasks with bounded concurrency per stage. This
+is the engine under WikiGenOrchestrator; it knows nothing about agents.
+
+Key Features:
+- Tasks start as soon as all of their dependencies are done, so total wall time
+  follows the critical path of the graph rather than the number of tasks
+- Per-stage semaphores cap concurrent work (e.g. at most 8 article writes at once)
+- Running tasks can add new tasks (fan-out once a plan is known)
+- Structured PipelineEvents, delivered to a callback and/or a bounded queue; a
+  slow event consumer applies backpressure to the pipeline instead of letting
+  events pile up in memory
+- Fail-fast: the first failing task cancels the rest of the graph
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from src.core.exceptions import ProcessingError
+from src.schemas.wikigen.wiki import PipelineEvent
+
+logger = logging.getLogger(__name__)
+
+TaskFunc = Callable[["TaskContext"], Awaitable[Any]]
+EventCallback = Callable[[PipelineEvent], Any]
+
+
+@dataclass
+class TaskContext:
+    """What a running task gets: its dependencies' results and a handle on the executor."""
+    task_id: str
+    stage: str
+    results: Dict[str, Any]
+    executor: "DAGExecutor"
+
+    def add_task(
+        self,
+        task_id: str,
+        stage: str,
+        func: TaskFunc,
+        deps: Iterable[str] = (),
+        **metadata: Any
+    ) -> None:
+        """Add a task to the running graph (see DAGExecutor.add_task)."""
+        self.executor.add_task(task_id, stage, func, deps, **metadata)
+
+    async def emit(self, event_type: str, **data: Any) -> None:
+        """Emit a custom progress event attributed to this task."""
+        await self.executor.emit(event_type, stage=self.stage, task_id=self.task_id, **data)
+
+
+@dataclass
+class _TaskSpec:
+    task_id: str
+    stage: str
+    func: TaskFunc
+    deps: Tuple[str, ...]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class DAGExecutor:
+    """
+    Executes a graph of async tasks with per-stage concurrency limits.
+
+    Dependencies must be added before (or together with) the tasks that depend
+    on them, either up front or by a task that is still running.
+    """
+
+    def __init__(
+        self,
+        stage_concurrency: Optional[Dict[str, int]] = None,
+        default_concurrency: int = 4,
+        on_event: Optional[EventCallback] = None,
+    ):
+        """
+        Args:
+            stage_concurrency: Maximum concurrently running tasks per stage name
+            default_concurrency: Limit for stages not listed in stage_concurrency
+            on_event: Called with every PipelineEvent (may be a coroutine function)
+        """
+        self.stage_concurrency = dict(stage_concurrency or {})
+        self.default_concurrency = default_concurrency
+        self.on_event = on_event
+
+        self._specs: Dict[str, _TaskSpec] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._started = False
+
+        self.results: Dict[str, Any] = {}
+        self.task_timings: Dict[str, Tuple[float, float]] = {}  # task_id -> (start, end), perf_counter seconds
+
+    # ------------------------------------------------------------------
+    # Graph construction
+    # ------------------------------------------------------------------
+
+    def add_task(
+        self,
+        task_id: str,
+        stage: str,
+        func: TaskFunc,
+        deps: Iterable[str] = (),
+        **metadata: Any
+    ) -> None:
+        """
+        Add a task to the graph.
+
+        Args:
+            task_id: Unique task ID
+            stage: Stage name (selects the concurrency limit)
+            func: Coroutine function called with a TaskContext
+            deps: IDs of tasks that must finish first (must already exist)
+            **metadata: Extra fields included in this task's events
+
+        Raises:
+            ValueError: If the task ID is taken or a dependency is unknown
+        """
+        if task_id in self._specs:
+            raise ValueError(f"Duplicate pipeline task '{task_id}'")
+        deps = tuple(deps)
+        missing = [dep for dep in deps if dep not in self._specs]
+        if missing:
+            raise ValueError(f"Pipeline task '{task_id}' depends on unknown tasks: {missing}")
+
+        spec = _TaskSpec(task_id=task_id, stage=stage, func=func, deps=deps, metadata=metadata)
+        self._specs[task_id] = spec
+        if self._started:
+            self._tasks[task_id] = asyncio.create_task(self._run_task(spec), name=f"pipeline:{task_id}")
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        if stage not in self._semaphores:
+            limit = self.stage_concurrency.get(stage, self.default_concurrency)
+            self._semaphores[stage] = asyncio.Semaphore(max(1, limit))
+        return self._semaphores[stage]
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    async def emit(
+        self,
+        event_type: str,
+        stage: Optional[str] = None,
+        task_id: Optional[str] = None,
+        **data: Any
+    ) -> None:
+        """Deliver an event to the callback and, when streaming, the event queue."""
+        event = PipelineEvent(type=event_type, stage=stage, task_id=task_id, data=data)
+        if self.on_event is not None:
+            outcome = self.on_event(event)
+            if asyncio.iscoroutine(outcome):
+                await outcome
+        if self._event_queue is not None:
+            await self._event_queue.put(event)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    async def _run_task(self, spec: _TaskSpec) -> Any:
+        # Dependency failures propagate; the run loop reports the original one
+        results = {dep: await self._tasks[dep] for dep in spec.deps}
+
+        async with self._semaphore(spec.stage):
+            await self.emit("task_started", spec.stage, spec.task_id, **spec.metadata)
+            started = time.perf_counter()
+            try:
+                result = await spec.func(TaskContext(spec.task_id, spec.stage, results, self))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.task_timings[spec.task_id] = (started, time.perf_counter())
+                await self.emit("task_failed", spec.stage, spec.task_id, error=str(e), **spec.metadata)
+                raise
+
+        finished = time.perf_counter()
+        self.task_timings[spec.task_id] = (started, finished)
+        self.results[spec.task_id] = result
+        await self.emit(
+            "task_completed", spec.stage, spec.task_id,
+            duration_seconds=round(finished - started, 3), **spec.metadata
+        )
+        return result
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run the graph until every task (including ones added while running) is done.
+
+        Returns:
+            Results by task ID
+
+        Raises:
+            ProcessingError: If a task fails (remaining tasks are cancelled)
+        """
+        if self._started:
+            raise RuntimeError("DAGExecutor.run() can only be called once")
+        self._started = True
+        started = time.perf_counter()
+        await self.emit("pipeline_started", tasks=len(self._specs))
+
+        for spec in self._specs.values():
+            self._tasks[spec.task_id] = asyncio.create_task(self._run_task(spec), name=f"pipeline:{spec.task_id}")
+
+        try:
+            while True:
+                active = [task for task in self._tasks.values() if not task.done()]
+                if not active:
+                    break
+                done, _ = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        raise task.exception()  # type: ignore[misc]
+        except BaseException as e:
+            await self._cancel_all()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            failed = next(
+                (task_id for task_id, task in self._tasks.items()
+                 if task.done() and not task.cancelled() and task.exception() is e),
+                None,
+            )
+            await self.emit("pipeline_failed", task_id=failed, error=str(e))
+            raise ProcessingError(
+                f"WikiGen pipeline task '{failed}' failed: {e}",
+                details={"task_id": failed, "completed_tasks": len(self.results)},
+            ) from e
+
+        await self.emit(
+            "pipeline_completed",
+            tasks=len(self._tasks),
+            duration_seconds=round(time.perf_counter() - started, 3),
+        )
+        return self.results
+
+    async def run_streaming(self, event_queue_size: int = 100) -> AsyncIterator[PipelineEvent]:
+        """
+        Run the graph, yielding progress events as they happen.
+
+        The event queue is bounded, so tasks wait for the consumer when it falls
+        behind by event_queue_size events. Results are available in self.results.
+
+        Raises:
+            ProcessingError: If a task fails (after the failure events are yielded)
+        """
+        queue: asyncio.Queue[PipelineEvent] = asyncio.Queue(maxsize=event_queue_size)
+        self._event_queue = queue
+        runner = asyncio.create_task(self.run())
+        try:
+            while True:
+                next_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({next_event, runner}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event in done:
+                    yield next_event.result()
+                    continue
+                next_event.cancel()
+                break
+            while not queue.empty():
+                yield queue.get_nowait()
+            runner.result()
+        finally:
+            if not runner.done():
+                runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
+
+    async def _cancel_all(self) -> None:
+        pending = [task for task in self._tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        # Also collects the exceptions of tasks that failed with (or because of) the first failure
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage task count and busy time (sum of task durations) in seconds."""
+        stats: Dict[str, Dict[str, float]] = {}
+        for task_id, (start, end) in self.task_timings.items():
+            stage = stats.setdefault(self._specs[task_id].stage, {"tasks": 0, "busy_seconds": 0.0})
+            stage["tasks"] += 1
+            stage["busy_seconds"] += end - start
+        return stats
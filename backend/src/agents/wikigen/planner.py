@@ -20,18 +20,49 @@ Key Features:
 - Cross-reference planning
 - Structured article planning
 - Consistent organization schemes
+- One planning call per arc; the subjects the wiki already covers and how
+  they co-occur come from the shared entity index instead of the prompt
 """
 
-from typing import List, Optional, Dict, Any
+import logging
+import re
+from html import escape
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
-# TODO: Import proper types when schemas are defined
-# from src.database.models.story import FullStoryBase as Story, Chapter
-# from src.database.models.workspace import Arc
-# NOTE: WikiPlan, ArticlePlan, and EntityAnalysis may need to be created in domain models
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.schemas.llm.models import LLMMessage
+from src.schemas.wikigen.wiki import ArcSummary, ArticlePlan, WikiArticle, WikiPlan
 from src.services.llm.llm_service import LLMService
 from src.prompts import prompt_manager
 from src.agents.base_agent import BaseAgent
+from src.agents.wikigen.entity_index import EntityIndex, IndexedEntity
+from src.utils import parse_cleaned_json
+
+logger = logging.getLogger(__name__)
+
+# Wiki directory of each article type; the main article and unknown types sit at the root
+ARTICLE_DIRECTORIES: Dict[str, str] = {
+    "character": "characters",
+    "location": "locations",
+    "concept": "concepts",
+    "event": "events",
+}
+
+# Section outline of an article whose plan has none
+DEFAULT_STRUCTURES: Dict[str, str] = {
+    "main": "# Synopsis\n# Plot Summary\n# Characters\n# World",
+    "character": "# Overview\n# History\n# Relationships\n# Development",
+    "location": "# Description\n# Geography\n# History\n# Significance",
+    "concept": "# Definition\n# Origins\n# Usage\n# Examples",
+    "event": "# Overview\n# Participants\n# Consequences\n# Timeline",
+}
+
+# Known entities and entity pairs listed in the planning prompt
+MAX_PROMPT_ENTITIES = 50
+MAX_PROMPT_CROSS_REFERENCES = 30
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|]+')
 
 
 class WikiPlannerAgent(BaseAgent):
@@ -45,8 +76,11 @@ class WikiPlannerAgent(BaseAgent):
     def __init__(
         self, 
         llm_service: LLMService,
-        default_provider: str = "google",
-        default_model: str = "gemini-2.0-flash-001"
+        default_provider: PROVIDER_ID = "google",
+        default_model: MODEL_NAME = "gemini-2.0-flash-001",
+        entity_index: Optional[EntityIndex] = None,
+        escalation_model: Optional[MODEL_NAME] = None,
+        escalation_provider: Optional[PROVIDER_ID] = None
     ):
         """
         Initializes agent with LLM service and default model.
@@ -55,12 +89,19 @@ class WikiPlannerAgent(BaseAgent):
             llm_service: LLM service for making planning calls
             default_provider: Default LLM provider for wiki planning
             default_model: Default model optimized for planning and organization
+            entity_index: Shared story entity index of the subjects already in the wiki
+            escalation_model: Stronger model the planning call is re-run on when the default
+                              model returns no usable article list (None disables escalation)
+            escalation_provider: Provider of the escalation model (default: default_provider)
         """
         super().__init__(
             llm_service=llm_service,
             default_provider=default_provider,
-            default_model=default_model
+            default_model=default_model,
+            escalation_model=escalation_model,
+            escalation_provider=escalation_provider
         )
+        self.entity_index = entity_index
     
     async def create_plan(
         self,
@@ -69,11 +110,14 @@ class WikiPlannerAgent(BaseAgent):
         mode: str,  # "fresh" or "update"
         user_id: UUID,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None,
-        model: Optional[str] = None,
-        previous_summaries: Optional[List[Any]] = None,  # TODO: List[ArcSummary]
-        existing_wiki: Optional[Any] = None  # TODO: WikiArchive
-    ) -> Any:  # TODO: Replace with WikiPlan type
+        provider: Optional[PROVIDER_ID] = None,
+        model: Optional[MODEL_NAME] = None,
+        previous_summaries: Optional[List[ArcSummary]] = None,
+        existing_wiki: Optional[List[WikiArticle]] = None,
+        arc_id: int = 1,
+        as_of_chapter: Optional[int] = None,
+        project_id: Optional[str] = None
+    ) -> WikiPlan:
         """
         Main planning method that creates comprehensive wiki structure.
         
@@ -93,6 +137,12 @@ class WikiPlannerAgent(BaseAgent):
         4. Identify new articles needed
         5. Maintain consistency with previous arcs
         
+        Entities the wiki already covers and how they relate come from the
+        entity index and are listed in the prompt; the model picks the articles
+        and their outlines in one call. Articles it plans without an outline
+        get their type's default one, every article gets its file path from
+        the file organization scheme, and a main article is always included.
+        
         Args:
             arc_content: Text content of the current arc
             story_metadata: Story title, genre, etc.
@@ -102,31 +152,89 @@ class WikiPlannerAgent(BaseAgent):
             provider: Optional LLM provider override (uses default if not provided)
             model: Optional LLM model override (uses default if not provided)
             previous_summaries: Summaries from previous arcs (update mode)
-            existing_wiki: Previous wiki archive (update mode)
+            existing_wiki: Articles written for previous arcs (update mode)
+            arc_id: Arc the plan is for
+            as_of_chapter: Last chapter of the arc (cross-references stop there)
+            project_id: Optional project the call is made for (usage attribution)
             
         Returns:
-            WikiPlan object with detailed article plans and organization
+            WikiPlan with the articles to write for the arc, main article first
             
-        Output Format:
-            <WikiPlan>
-              <Articles>
-                <Article title="Story Wiki" type="main" file="Story_Wiki.md">
-                  <Preview>Main wiki page summarizing the story</Preview>
-                  <Structure>
-                    # Synopsis
-                    # Characters  
-                    # Plot Summary
-                    ## Arc 1: The Awakening
-                  </Structure>
-                </Article>
-                <!-- Additional articles -->
-              </Articles>
-            </WikiPlan>
-        """
-        # TODO: Implement planning logic
-        raise NotImplementedError("Wiki planning not yet implemented")
+        Raises:
+            ValueError: If the model's answer is not a valid plan
+        """
+        story_title = story_metadata.get("title") or "Story"
+        existing = {article.title: article for article in existing_wiki or []}
+        entities = self._analyze_entities(arc_content)
+        cross_references = self._identify_cross_references(
+            [entity for entity, _ in entities], list(existing.values()), as_of_chapter=as_of_chapter
+        )
+        messages = self._load_planning_prompts(mode, {
+            "story_metadata": story_metadata,
+            "arc_content": arc_content,
+            "entities": entities,
+            "cross_references": cross_references,
+            "existing_articles": list(existing.values()),
+            "previous_summaries": previous_summaries or [],
+        })
+        
+        async def plan_articles(attempt_provider: PROVIDER_ID, attempt_model: MODEL_NAME) -> List[Any]:
+            response = await self._make_llm_call(
+                messages=messages,
+                user_id=user_id,
+                api_key=api_key,
+                provider=attempt_provider,
+                model=attempt_model,
+                project_id=project_id,
+            )
+            answer = parse_cleaned_json(getattr(response, "content", "") or "")
+            planned = answer.get("articles") if isinstance(answer, dict) else None
+            if not isinstance(planned, list):
+                raise ValueError("Planning response has no article list")
+            return planned
+        
+        # An unusable answer is re-asked of the escalation model, if there is one
+        planned = await self._run_cascade(
+            "plan", plan_articles, lambda articles: None if articles else "no articles planned", provider, model
+        )
+        
+        # Planned articles by title (the first of duplicate titles wins), main article first
+        planned_articles: Dict[str, Dict[str, Any]] = {}
+        for item in planned:
+            title = str(item.get("title") or "").strip() if isinstance(item, dict) else ""
+            if not title or title in planned_articles:
+                continue
+            known = existing.get(title)
+            article_type = (
+                str(item.get("article_type") or "").strip().lower()
+                or (known.article_type if known is not None else "main")
+            )
+            planned_articles[title] = {
+                "title": title,
+                "article_type": article_type,
+                "preview": str(item.get("preview") or ""),
+                "structure": str(item.get("structure") or "").strip() or self._plan_article_structure(title, article_type),
+                "aliases": [str(alias) for alias in item.get("aliases") or [] if alias and alias != title],
+            }
+        if not any(article["article_type"] == "main" for article in planned_articles.values()):
+            main_title = f"{story_title} Wiki"
+            planned_articles = {main_title: {
+                "title": main_title, "article_type": "main", "preview": f"Overview of {story_title}",
+                "structure": self._plan_article_structure(main_title, "main"), "aliases": [],
+            }, **planned_articles}
+        ordered = sorted(planned_articles.values(), key=lambda article: article["article_type"] != "main")
+        
+        # Existing articles keep their files; new ones are placed by type
+        filenames = {title: article.filename for title, article in existing.items()}
+        filenames.update(self._create_file_organization(
+            [ArticlePlan(**article, filename="-") for article in ordered if article["title"] not in existing],
+            taken=list(filenames.values()),
+        ))
+        articles = [ArticlePlan(**article, filename=filenames[article["title"]]) for article in ordered]
+        logger.info(f"🗺️ Planned {len(articles)} articles for arc {arc_id} ({mode}, {len(entities)} known entities in the arc)")
+        return WikiPlan(arc_id=arc_id, mode=mode, articles=articles)
     
-    def _analyze_entities(self, arc_content: str) -> Any:  # TODO: EntityAnalysis
+    def _analyze_entities(self, arc_content: str) -> List[Tuple[IndexedEntity, int]]:
         """
         Identifies characters, locations, concepts, and events in arc content.
         
@@ -135,17 +243,26 @@ class WikiPlannerAgent(BaseAgent):
         - Importance (major, minor, mentioned)
         - Complexity (needs dedicated article vs. brief mention)
         
+        Entities the wiki already covers come from the shared entity index
+        with their mention counts (importance); only new subjects are left
+        for the planning prompt to discover.
+        
         Args:
             arc_content: Text content to analyze
             
         Returns:
-            EntityAnalysis object with categorized entities
+            (entity, mentions in the arc) pairs, most mentioned first
         """
-        # TODO: Implement entity analysis
-        # This could use NLP techniques or LLM analysis to identify entities
-        pass
+        if self.entity_index is None:
+            return []
+        analysis = []
+        for name, mentions in self.entity_index.entities_in(arc_content).most_common():
+            entity = self.entity_index.get(name)
+            if entity is not None:
+                analysis.append((entity, mentions))
+        return analysis
     
-    def _plan_article_structure(self, entity: Any, article_type: str) -> Any:  # TODO: ArticleStructure
+    def _plan_article_structure(self, entity: Any, article_type: str) -> str:
         """
         Creates detailed structure plan for individual articles.
         
@@ -156,20 +273,20 @@ class WikiPlannerAgent(BaseAgent):
         - Events: Overview, Participants, Consequences, Timeline
         
         Args:
-            entity: Entity object to plan structure for
+            entity: Entity (or title) to plan structure for
             article_type: Type of article (character, location, etc.)
             
         Returns:
-            ArticleStructure object with sections and content plan
+            Section outline as markdown headers
         """
-        # TODO: Implement structure planning
-        pass
+        return DEFAULT_STRUCTURES.get(article_type, "# Overview\n# Details\n# Appearances")
     
     def _identify_cross_references(
         self, 
         entities: List[Any], 
-        existing_articles: Optional[List[Any]] = None
-    ) -> List[Any]:  # TODO: List[CrossReference]
+        existing_articles: Optional[List[Any]] = None,
+        as_of_chapter: Optional[int] = None
+    ) -> List[Tuple[str, str, int]]:
         """
         Identifies opportunities for wiki-style linking between articles.
         
@@ -179,17 +296,26 @@ class WikiPlannerAgent(BaseAgent):
         - Concept dependencies and usage
         - Event participants and consequences
         
+        Relationships are taken from the entity index's co-occurrence counts
+        (entities mentioned in the same paragraphs), up to the arc's end so
+        later chapters cannot leak into the plan.
+        
         Args:
-            entities: List of entities from current arc
+            entities: List of entities from current arc (names or IndexedEntity)
             existing_articles: Articles from previous arcs (update mode)
+            as_of_chapter: Last chapter the plan may draw on (None: all indexed chapters)
             
         Returns:
-            List of CrossReference objects for linking strategy
+            (entity, entity, shared paragraphs) pairs, strongest first
         """
-        # TODO: Implement cross-reference identification
-        return []
+        if self.entity_index is None:
+            return []
+        names = {getattr(entity, "name", entity) for entity in entities}
+        names.update(getattr(article, "title", article) for article in existing_articles or [])
+        pairs = self.entity_index.co_occurrences(end_chapter=as_of_chapter)
+        return [(a, b, count) for (a, b), count in pairs.most_common() if a in names and b in names]
     
-    def _create_file_organization(self, entities: List[Any]) -> Dict[str, Any]:
+    def _create_file_organization(self, entities: List[Any], taken: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Plans file structure and naming conventions for wiki articles.
         
@@ -200,36 +326,77 @@ class WikiPlannerAgent(BaseAgent):
         - events/ for event articles
         - Main wiki page at root
         
+        Files are named after the article title; a path already taken gets
+        a numbered suffix.
+        
         Args:
-            entities: List of entities to organize
+            entities: Entities (or article plans) to organize
+            taken: File paths already used in the wiki
             
         Returns:
-            Dictionary mapping entities to file paths
+            Dictionary mapping entity names to file paths
         """
-        # TODO: Implement file organization planning
-        return {}
+        used = {path.lower() for path in taken or []}
+        paths: Dict[str, str] = {}
+        for entity in entities:
+            name = getattr(entity, "title", None) or getattr(entity, "name", entity)
+            article_type = getattr(entity, "article_type", None) or getattr(entity, "entity_type", "")
+            stem = _UNSAFE_FILENAME_CHARS.sub(" ", str(name)).strip() or "Untitled"
+            directory = ARTICLE_DIRECTORIES.get(article_type)
+            base = f"{directory}/{stem}" if directory else stem
+            path, number = f"{base}.md", 2
+            while path.lower() in used:
+                path, number = f"{base} ({number}).md", number + 1
+            used.add(path.lower())
+            paths[name] = path
+        return paths
     
     def _load_planning_prompts(
         self, 
         mode: str, 
         context: Dict[str, Any]
-    ) -> List[Any]:  # TODO: List[LLMMessage]
+    ) -> List[LLMMessage]:
         """
         Loads and renders planning prompts based on mode and context.
         
-        Uses wikigen.planning prompt group with appropriate variables.
+        Uses wikigen.planning prompt group with appropriate variables. The
+        story text comes first and is cacheable; the wiki's state (summaries,
+        existing articles, known entities) follows it.
         
         Args:
             mode: "fresh" or "update" for different prompt variants
-            context: Variables for prompt rendering
+            context: story_metadata, arc_content, entities, cross_references,
+                     existing_articles and previous_summaries
             
         Returns:
             List of rendered LLMMessage objects
         """
-        # TODO: Implement prompt loading
-        # planning_prompts = prompt_manager.get_group("wikigen.planning")
-        # Render with mode-specific context
-        return []
+        metadata = context.get("story_metadata") or {}
+        story_title = metadata.get("title") or "Story"
+        genres = ", ".join(metadata.get("genres") or [])
+        story_xml = (
+            f'<Story title="{escape(story_title)}" genres="{escape(genres)}">\n'
+            + (f"<Synopsis>{metadata['synopsis']}</Synopsis>\n" if metadata.get("synopsis") else "")
+            + f"{context.get('arc_content', '')}\n</Story>"
+        )
+        summaries: List[ArcSummary] = context.get("previous_summaries") or []
+        return prompt_manager.get_group("wikigen.planning").render_messages(
+            mode=mode,
+            story_title=story_title,
+            story_xml=story_xml,
+            previous_summary=summaries[-1].content if summaries else "",
+            existing_articles="\n".join(
+                f"- {article.title} ({article.article_type})" for article in context.get("existing_articles") or []
+            ),
+            known_entities="\n".join(
+                f"- {entity.name} ({entity.entity_type}, {mentions} mentions)"
+                for entity, mentions in (context.get("entities") or [])[:MAX_PROMPT_ENTITIES]
+            ),
+            cross_references="\n".join(
+                f"- {a} & {b} ({count})"
+                for a, b, count in (context.get("cross_references") or [])[:MAX_PROMPT_CROSS_REFERENCES]
+            ),
+        )
     
     # Implementation of BaseAgent's abstract method
     async def execute(self, *args, **kwargs):
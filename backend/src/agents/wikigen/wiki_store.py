@@ -0,0 +1,291 @@
+# backend/src/agents/wikigen/wiki_store.py
+
+"""
+Versioned Wiki Store
+
+Keeps every revision of every wiki article once, tagged with the chapter it
+becomes visible at, instead of a full wiki copy per arc.
+
+Key Features:
+- Point-in-time views ("the wiki as of chapter 57") for spoiler-safe reading
+- Each article's revisions form consecutive validity intervals, so looking an
+  article up as of a chapter is a binary search (O(log revisions))
+- Diffs between two chapters or arcs only visit articles that changed between
+  them (a sorted change log, also searched by bisection)
+- Compact encoding: revision content is stored once per distinct content, so
+  articles carried over unchanged share their revision
+"""
+
+import hashlib
+import json
+import zlib
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.schemas.wikigen.arc import Arc
+from src.schemas.wikigen.wiki import ArcArchive, WikiArticle
+
+ENCODING_VERSION = 1
+
+
+def _article_hash(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class ArticleRevision:
+    """One version of an article, visible from valid_from_chapter until the next revision"""
+    key: str                        # Article identity (its filename)
+    valid_from_chapter: int         # First chapter whose readers may see this revision
+    arc_id: int                     # Arc the revision was written for
+    content_hash: Optional[str]     # Hash of the stored content; None marks a deletion
+
+
+@dataclass
+class WikiDiff:
+    """Articles that differ between two points of the story"""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+class WikiStore:
+    """
+    Revisions of wiki articles indexed by the chapter they become visible at.
+
+    Revisions of an article must be added in story order. Adding content equal
+    to the article's current revision is a no-op, so re-archiving an unchanged
+    article costs nothing.
+
+    Examples:
+        >>> store = WikiStore()
+        >>> store.add(WikiArticle(title="Sarah", filename="sarah.md", content="v1", arc_id=1), valid_from_chapter=10)
+        True
+        >>> store.add(WikiArticle(title="Sarah", filename="sarah.md", content="v2", arc_id=2), valid_from_chapter=20)
+        True
+        >>> store.get("sarah.md", as_of_chapter=15).content
+        'v1'
+    """
+
+    def __init__(self):
+        self._blobs: Dict[str, Dict[str, Any]] = {}                 # content hash -> article fields (no arc_id)
+        self._revisions: Dict[str, List[ArticleRevision]] = {}      # key -> revisions in chapter order
+        self._starts: Dict[str, List[int]] = {}                     # key -> valid_from_chapter of each revision
+        self._changes: List[Tuple[int, str]] = []                   # (valid_from_chapter, key), sorted
+        self._arc_ends: Dict[int, int] = {}                         # arc id -> chapter its revisions become visible
+
+    @classmethod
+    def from_archives(cls, archives: Iterable[ArcArchive]) -> "WikiStore":
+        """Build a store from per-arc archives (each arc's articles become visible at its end chapter)."""
+        store = cls()
+        for archive in sorted(archives, key=lambda a: a.arc.end_chapter):
+            store.add_arc(archive.arc, archive.articles)
+        return store
+
+    def __len__(self) -> int:
+        """Number of articles that ever existed."""
+        return len(self._revisions)
+
+    @property
+    def revision_count(self) -> int:
+        return sum(len(revisions) for revisions in self._revisions.values())
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def add_arc(self, arc: Arc, articles: Iterable[WikiArticle], removed: Iterable[str] = ()) -> int:
+        """
+        Record the articles written for an arc, visible from the arc's end chapter.
+
+        Args:
+            arc: Arc the articles are spoiler-safe for
+            articles: Articles written or updated for the arc
+            removed: Keys of articles that no longer exist after the arc
+
+        Returns:
+            Number of new revisions (unchanged articles add none)
+        """
+        self._arc_ends[arc.id] = arc.end_chapter
+        added = sum(self.add(article, arc.end_chapter, arc.id) for article in articles)
+        added += sum(self.remove(key, arc.end_chapter, arc.id) for key in removed)
+        return added
+
+    def add(self, article: WikiArticle, valid_from_chapter: int, arc_id: Optional[int] = None) -> bool:
+        """
+        Add a revision of an article.
+
+        Args:
+            article: The article's new content (keyed by filename)
+            valid_from_chapter: First chapter whose readers may see it
+            arc_id: Arc the revision was written for (default: article.arc_id)
+
+        Returns:
+            False if the content equals the article's current revision
+
+        Raises:
+            ValueError: If the article already has a revision from a later chapter
+        """
+        payload = article.model_dump(mode="json", exclude={"arc_id"})
+        content_hash = _article_hash(payload)
+        self._blobs.setdefault(content_hash, payload)
+        return self._append(ArticleRevision(
+            key=article.filename,
+            valid_from_chapter=valid_from_chapter,
+            arc_id=arc_id if arc_id is not None else article.arc_id,
+            content_hash=content_hash,
+        ))
+
+    def remove(self, key: str, valid_from_chapter: int, arc_id: int) -> bool:
+        """Mark an article deleted from valid_from_chapter on; False if it doesn't exist then."""
+        if key not in self._revisions:
+            return False
+        return self._append(ArticleRevision(key=key, valid_from_chapter=valid_from_chapter, arc_id=arc_id, content_hash=None))
+
+    def _append(self, revision: ArticleRevision) -> bool:
+        revisions = self._revisions.setdefault(revision.key, [])
+        starts = self._starts.setdefault(revision.key, [])
+        if revisions:
+            current = revisions[-1]
+            if revision.valid_from_chapter < current.valid_from_chapter:
+                raise ValueError(
+                    f"Revision of {revision.key} from chapter {revision.valid_from_chapter} "
+                    f"is older than its current revision (chapter {current.valid_from_chapter})"
+                )
+            if revision.content_hash == current.content_hash:
+                return False
+            if revision.valid_from_chapter == current.valid_from_chapter:
+                # Replaces the revision of the same chapter (its change log entry stays)
+                revisions[-1] = revision
+                return True
+        elif revision.content_hash is None:
+            return False
+        revisions.append(revision)
+        starts.append(revision.valid_from_chapter)
+        entry = (revision.valid_from_chapter, revision.key)
+        self._changes.insert(bisect_right(self._changes, entry), entry)
+        return True
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def chapter_of_arc(self, arc_id: int) -> int:
+        """Chapter from which an arc's revisions are visible."""
+        if arc_id not in self._arc_ends:
+            raise KeyError(f"Arc {arc_id} is not in the store")
+        return self._arc_ends[arc_id]
+
+    def revision(self, key: str, as_of_chapter: int) -> Optional[ArticleRevision]:
+        """The revision of an article visible at a chapter (None before it exists or after deletion)."""
+        starts = self._starts.get(key)
+        if not starts:
+            return None
+        index = bisect_right(starts, as_of_chapter) - 1
+        if index < 0:
+            return None
+        revision = self._revisions[key][index]
+        return revision if revision.content_hash is not None else None
+
+    def get(self, key: str, as_of_chapter: int) -> Optional[WikiArticle]:
+        """The article as readers of a chapter may see it."""
+        revision = self.revision(key, as_of_chapter)
+        return self._materialize(revision) if revision is not None else None
+
+    def history(self, key: str) -> List[ArticleRevision]:
+        """All revisions of an article in chapter order."""
+        return list(self._revisions.get(key, []))
+
+    def as_of(self, chapter: int) -> Dict[str, WikiArticle]:
+        """The whole wiki as readers of a chapter may see it, by key."""
+        snapshot: Dict[str, WikiArticle] = {}
+        for key in self._revisions:
+            revision = self.revision(key, chapter)
+            if revision is not None:
+                snapshot[key] = self._materialize(revision)
+        return snapshot
+
+    def as_of_arc(self, arc_id: int) -> Dict[str, WikiArticle]:
+        """The wiki as of the end of an arc."""
+        return self.as_of(self.chapter_of_arc(arc_id))
+
+    def diff(self, from_chapter: int, to_chapter: int) -> WikiDiff:
+        """
+        Articles that differ between the views at two chapters (from_chapter <= to_chapter).
+
+        Only articles with a revision in (from_chapter, to_chapter] are compared.
+        """
+        low = bisect_right(self._changes, (from_chapter, "\U0010ffff"))
+        high = bisect_left(self._changes, (to_chapter + 1, ""))
+        result = WikiDiff()
+        for key in sorted({key for _, key in self._changes[low:high]}):
+            before, after = self.revision(key, from_chapter), self.revision(key, to_chapter)
+            if before is None and after is not None:
+                result.added.append(key)
+            elif before is not None and after is None:
+                result.removed.append(key)
+            elif before is not None and after is not None and before.content_hash != after.content_hash:
+                result.changed.append(key)
+        return result
+
+    def diff_arcs(self, from_arc_id: int, to_arc_id: int) -> WikiDiff:
+        """Articles that differ between the end of two arcs."""
+        return self.diff(self.chapter_of_arc(from_arc_id), self.chapter_of_arc(to_arc_id))
+
+    def _materialize(self, revision: ArticleRevision) -> WikiArticle:
+        assert revision.content_hash is not None
+        return WikiArticle(**self._blobs[revision.content_hash], arc_id=revision.arc_id)
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact encoding: each distinct content once, revisions as references to it.
+
+        Revisions are stored as [key index, valid_from_chapter, arc_id, content
+        index or -1], and the whole document is zlib-compressed.
+        """
+        blob_ids = {content_hash: index for index, content_hash in enumerate(self._blobs)}
+        keys = list(self._revisions)
+        document = {
+            "version": ENCODING_VERSION,
+            "keys": keys,
+            "blobs": list(self._blobs.values()),
+            "arcs": [[arc_id, chapter] for arc_id, chapter in self._arc_ends.items()],
+            "revisions": [
+                [key_index, r.valid_from_chapter, r.arc_id, blob_ids[r.content_hash] if r.content_hash else -1]
+                for key_index, key in enumerate(keys)
+                for r in self._revisions[key]
+            ],
+        }
+        return zlib.compress(json.dumps(document, separators=(",", ":")).encode("utf-8"), 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WikiStore":
+        """Decode a store written by to_bytes()."""
+        document = json.loads(zlib.decompress(data).decode("utf-8"))
+        if document.get("version") != ENCODING_VERSION:
+            raise ValueError(f"Unsupported wiki store encoding version: {document.get('version')}")
+        store = cls()
+        hashes = []
+        for payload in document["blobs"]:
+            content_hash = _article_hash(payload)
+            store._blobs[content_hash] = payload
+            hashes.append(content_hash)
+        store._arc_ends = {arc_id: chapter for arc_id, chapter in document["arcs"]}
+        keys = document["keys"]
+        for key_index, valid_from, arc_id, blob_index in document["revisions"]:
+            store._append(ArticleRevision(
+                key=keys[key_index],
+                valid_from_chapter=valid_from,
+                arc_id=arc_id,
+                content_hash=hashes[blob_index] if blob_index >= 0 else None,
+            ))
+        return store
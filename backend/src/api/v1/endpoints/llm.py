@@ -2,11 +2,11 @@
 LLM API endpoints for chat completions, provider management, and API key handling
 """
 import logging
-from typing import Dict, Any, AsyncIterator, Optional, cast
+from typing import Dict, Any, AsyncIterator, List, Optional, cast
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta, UTC
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Query, status, Depends
 from fastapi.responses import StreamingResponse
 
 from src.api.dependencies import require_auth, get_current_user_id
@@ -14,6 +14,8 @@ from src.core.constants import PROVIDER_ID
 from src.database.factory import get_repositories
 from src.schemas.llm.models import ChunkType, LLMResponse, LLMMessage
 from src.services.llm.llm_service import LLMService
+from src.services.llm.usage_tracker import BudgetStatus, UsageTracker, get_usage_tracker
+from src.database.interfaces.usage_repository import UsageGroupBy
 from src.core.encryption import encrypt_api_key, decrypt_api_key
 from src.schemas.base import ApiResponse
 from src.schemas.requests.llm import (
@@ -22,7 +24,8 @@ from src.schemas.requests.llm import (
     StoreAPIKeyRequest,
     DeleteAPIKeyRequest,
     ListProvidersRequest,
-    ListModelsRequest
+    ListModelsRequest,
+    SetLLMBudgetRequest
 )
 from src.schemas.responses.llm import (
     ChatCompletionResponse,
@@ -34,7 +37,11 @@ from src.schemas.responses.llm import (
     ListProvidersResponse,
     ListModelsResponse,
     DeleteAPIKeyResponse,
-    ListUserAPIKeysResponse
+    ListUserAPIKeysResponse,
+    LLMBudgetStatusResponse,
+    LLMUsageStatsResponse,
+    LLMUsageRollupEntry,
+    LLMUsageRollupResponse
 )
 
 logger = logging.getLogger(__name__)
@@ -99,7 +106,7 @@ async def _stream_chat_completion(
             max_tokens=request.max_tokens,
             thinking=request.thinking,
             trace_id=request.trace_id,
-            metadata=request.metadata,
+            metadata={**(request.metadata or {}), "user_id": user_id},  # Attribute usage even with temporary API keys
             stream=True
         )
 
@@ -182,7 +189,7 @@ async def chat_completion(
             max_tokens=request.max_tokens,
             thinking=request.thinking,
             trace_id=request.trace_id,
-            metadata=request.metadata,
+            metadata={**(request.metadata or {}), "user_id": user_id},  # Attribute usage even with temporary API keys
             stream=False
         )
         
@@ -498,4 +505,166 @@ async def list_models(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error while listing models"
-        )
\ No newline at end of file
+        )
+
+
+# ============================================================================
+# Usage and Cost Endpoints
+# ============================================================================
+
+def _require_usage_tracker() -> UsageTracker:
+    """Get the usage tracker or fail if accounting is not initialized"""
+    usage_tracker = get_usage_tracker()
+    if usage_tracker is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="LLM usage tracking is not initialized"
+        )
+    return usage_tracker
+
+
+def _budget_response(budget: BudgetStatus) -> LLMBudgetStatusResponse:
+    return LLMBudgetStatusResponse(
+        scope=budget.scope,
+        scope_id=budget.scope_id,
+        limit_usd=budget.limit_usd,
+        spent_usd=budget.spent_usd,
+        remaining_usd=budget.remaining_usd,
+        exceeded=budget.exceeded
+    )
+
+
+@router.get("/usage", response_model=LLMUsageStatsResponse)
+async def get_usage_stats(
+    days: int = Query(default=30, ge=1, le=365),
+    project_id: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+) -> LLMUsageStatsResponse:
+    """
+    Get the current user's LLM usage, cost and budget status over the last `days` days
+    """
+    try:
+        usage_tracker = _require_usage_tracker()
+        period_end = datetime.now(UTC).replace(tzinfo=None)
+        period_start = period_end - timedelta(days=days)
+        
+        totals = await usage_tracker.get_totals(user_id=user_id, project_id=project_id, since=period_start)
+        by_provider = await usage_tracker.get_rollup("provider", user_id=user_id, project_id=project_id, since=period_start)
+        by_model = await usage_tracker.get_rollup("model", user_id=user_id, project_id=project_id, since=period_start)
+        budgets = await usage_tracker.get_budget_status(user_id=user_id, project_id=project_id)
+        
+        return LLMUsageStatsResponse(
+            total_requests=totals["requests"],
+            total_tokens_used=totals["total_tokens"],
+            cached_prompt_tokens=totals["cached_prompt_tokens"],
+            tokens_by_provider={row["provider"]: row["total_tokens"] for row in by_provider},
+            requests_by_model={row["model"]: row["requests"] for row in by_model},
+            cost_estimate=totals["cost_usd"],
+            period_start=period_start,
+            period_end=period_end,
+            budgets=[_budget_response(budget) for budget in budgets]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting LLM usage for user {user_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while getting usage"
+        )
+
+
+@router.put("/usage/budget", response_model=List[LLMBudgetStatusResponse])
+async def set_usage_budget(
+    request: SetLLMBudgetRequest,
+    user_id: str = Depends(get_current_user_id)
+) -> List[LLMBudgetStatusResponse]:
+    """
+    Set (or clear with a null limit) the current user's budget or one of their projects'
+
+    A limit may not exceed the configured default budget for the scope, so users
+    can lower their spend cap but not lift it. Returns the budget now in effect,
+    or an empty list when the scope has no limit.
+    """
+    try:
+        usage_tracker = _require_usage_tracker()
+        scope_id = user_id
+        if request.scope == "project":
+            project = None
+            if request.project_id:
+                project = await get_repositories().project.get_by_user_and_id(user_id, request.project_id)
+            if project is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Project {request.project_id} not found"
+                )
+            scope_id = project.id
+
+        default = usage_tracker.default_budget(request.scope)
+        if default is not None and (request.limit_usd is None or request.limit_usd > default):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Budget limit must not exceed the default of ${default:.2f}"
+            )
+
+        await usage_tracker.set_budget(request.scope, scope_id, request.limit_usd)
+        if request.scope == "project":
+            budgets = await usage_tracker.get_budget_status(project_id=scope_id)
+        else:
+            budgets = await usage_tracker.get_budget_status(user_id=scope_id)
+        return [_budget_response(budget) for budget in budgets]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error setting LLM budget for user {user_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while setting budget"
+        )
+
+
+@router.get("/usage/rollup", response_model=LLMUsageRollupResponse)
+async def get_usage_rollup(
+    group_by: UsageGroupBy = "agent_name",
+    days: int = Query(default=30, ge=1, le=365),
+    project_id: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+) -> LLMUsageRollupResponse:
+    """
+    Get the current user's LLM usage grouped by project, agent, provider or model
+    """
+    try:
+        usage_tracker = _require_usage_tracker()
+        period_end = datetime.now(UTC).replace(tzinfo=None)
+        period_start = period_end - timedelta(days=days)
+        
+        rows = await usage_tracker.get_rollup(group_by, user_id=user_id, project_id=project_id, since=period_start)
+        
+        return LLMUsageRollupResponse(
+            group_by=group_by,
+            entries=[
+                LLMUsageRollupEntry(
+                    key=row[group_by],
+                    requests=row["requests"],
+                    prompt_tokens=row["prompt_tokens"],
+                    completion_tokens=row["completion_tokens"],
+                    total_tokens=row["total_tokens"],
+                    cached_prompt_tokens=row["cached_prompt_tokens"],
+                    cost_usd=row["cost_usd"]
+                )
+                for row in rows
+            ],
+            period_start=period_start,
+            period_end=period_end
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting LLM usage rollup for user {user_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while getting usage rollup"
+        )
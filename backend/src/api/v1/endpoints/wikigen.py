@@ -0,0 +1,142 @@
+# backend/src/api/v1/endpoints/wikigen.py
+"""
+WikiGen API endpoints: background wiki generation with progress over SSE
+"""
+import logging
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Header, Query, status, Depends
+from fastapi.responses import StreamingResponse
+
+from src.api.dependencies import get_current_user_id
+from src.background.queue import Job, get_job_queue
+from src.background.tasks import generate_project_wiki
+from src.core.events import EventLog, get_event_logs
+from src.database.factory import get_repositories
+from src.schemas.requests.wikigen import WikiGenJobRequest
+from src.schemas.responses.wikigen import WikiGenJobResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _job_response(job: Job, log: EventLog) -> WikiGenJobResponse:
+    return WikiGenJobResponse(
+        job_id=job.id,
+        project_id=log.metadata.get("project_id", ""),
+        status=job.status.value,
+        events_url=f"/api/v1/wikigen/jobs/{job.id}/events",
+        last_event_id=log.last_id,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
+def _get_user_log(job_id: str, user_id: str) -> EventLog:
+    """The job's event log, if it belongs to the user (404 otherwise, so job IDs don't leak)."""
+    log = get_event_logs().get(job_id)
+    if log is None or log.metadata.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"WikiGen job {job_id} not found"
+        )
+    return log
+
+
+async def _stream_events(log: EventLog, last_event_id: int) -> AsyncIterator[str]:
+    """SSE frames of the log after last_event_id, until the job ends."""
+    async for event in log.subscribe(last_event_id):
+        yield event.frame
+
+
+# ============================================================================
+# Job Endpoints
+# ============================================================================
+
+@router.post(
+    "/projects/{project_id}/wikigen",
+    response_model=WikiGenJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def start_wikigen_job(
+    project_id: str,
+    request: Optional[WikiGenJobRequest] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Queue wiki generation for a project
+
+    Progress events are streamed from the returned events_url.
+    """
+    request = request or WikiGenJobRequest()
+    repos = get_repositories()
+    project = await repos.project.get_by_user_and_id(user_id, project_id)
+    if project is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {project_id} not found"
+        )
+
+    log = EventLog(metadata={"user_id": user_id, "project_id": project_id})
+    job = await get_job_queue().enqueue(
+        "wikigen", generate_project_wiki, project_id, user_id, log,
+        provider=request.provider, model=request.model
+    )
+    get_event_logs().register(job.id, log)
+    logger.info(f"📚 Queued WikiGen job {job.id} for project {project_id}")
+    return _job_response(job, log)
+
+
+@router.get("/wikigen/jobs/{job_id}", response_model=WikiGenJobResponse)
+async def get_wikigen_job(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get the status of a WikiGen job"""
+    log = _get_user_log(job_id, user_id)
+    job = get_job_queue().get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"WikiGen job {job_id} not found"
+        )
+    return _job_response(job, log)
+
+
+@router.get("/wikigen/jobs/{job_id}/events")
+async def stream_wikigen_events(
+    job_id: str,
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    last_event_id: Optional[int] = Query(default=None, ge=0),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Stream a WikiGen job's events (Server-Sent Events)
+
+    Every event carries its ID; a client that reconnects with Last-Event-ID
+    (the header EventSource sends, or the last_event_id query parameter)
+    receives only the events it missed. The stream ends after the job's
+    terminal event (job_completed, job_failed or job_cancelled).
+    """
+    log = _get_user_log(job_id, user_id)
+    resume_from = last_event_id or 0
+    if last_event_id_header is not None:
+        try:
+            resume_from = max(0, int(last_event_id_header))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Last-Event-ID must be an event ID"
+            )
+
+    return StreamingResponse(
+        _stream_events(log, resume_from),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,153 @@
+# backend/src/background/queue.py
+"""
+In-process background job queue
+
+Features:
+- Jobs are named coroutine functions with their arguments, tracked by ID
+- Bounded queue so producers get backpressure instead of unbounded memory growth
+- Callers can await a job's result or look up its status later
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[..., Awaitable[Any]]
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a background job."""
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    """A queued unit of background work."""
+    name: str
+    func: JobFunc
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: str(uuid4()))
+    status: JobStatus = JobStatus.PENDING
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    async def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the job to finish and return its result.
+
+        Raises:
+            asyncio.TimeoutError: If the job does not finish within timeout
+            RuntimeError: If the job failed or was cancelled
+        """
+        await asyncio.wait_for(self._done.wait(), timeout)
+        if self.status != JobStatus.SUCCEEDED:
+            raise RuntimeError(f"Job {self.name} ({self.id}) {self.status.value}: {self.error}")
+        return self.result
+
+    def _finish(self, status: JobStatus, result: Any = None, error: Optional[str] = None) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = datetime.now(UTC)
+        self._done.set()
+
+
+class JobQueue:
+    """
+    Bounded FIFO of background jobs consumed by a Worker.
+
+    Finished jobs stay queryable by ID until max_history newer jobs have finished.
+    """
+
+    def __init__(self, maxsize: int = 0, max_history: int = 1000):
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=maxsize)
+        self._jobs: Dict[str, Job] = {}
+        self.max_history = max_history
+
+    async def enqueue(self, name: str, func: JobFunc, *args: Any, **kwargs: Any) -> Job:
+        """
+        Queue a coroutine function to run in the background.
+
+        Waits for a free slot when the queue is full.
+
+        Args:
+            name: Job name (for logging and status lookups)
+            func: Coroutine function to run
+            *args, **kwargs: Arguments for func
+
+        Returns:
+            The queued Job
+        """
+        job = Job(name=name, func=func, args=args, kwargs=kwargs)
+        self._jobs[job.id] = job
+        await self._queue.put(job)
+        logger.debug(f"Queued job {name} ({job.id})")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID, or None if unknown or already evicted."""
+        return self._jobs.get(job_id)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    async def get(self) -> Job:
+        """Take the next job off the queue (used by workers)."""
+        return await self._queue.get()
+
+    def task_done(self, job: Job) -> None:
+        """Mark a job taken with get() as processed and evict old finished jobs."""
+        self._queue.task_done()
+        if len(self._jobs) > self.max_history:
+            for job_id in [jid for jid, j in self._jobs.items() if j.finished][:len(self._jobs) - self.max_history]:
+                del self._jobs[job_id]
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed."""
+        await self._queue.join()
+
+
+# Global job queue instance
+_job_queue: Optional[JobQueue] = None
+
+
+def init_job_queue(maxsize: int = 0) -> JobQueue:
+    """Initialize the global job queue."""
+    global _job_queue
+    _job_queue = JobQueue(maxsize=maxsize)
+    return _job_queue
+
+
+def get_job_queue() -> JobQueue:
+    """Get the global job queue, creating it on first use."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+def reset_job_queue() -> None:
+    """Reset the global job queue (useful for testing)."""
+    global _job_queue
+    _job_queue = None
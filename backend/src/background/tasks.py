@@ -0,0 +1,40 @@
+# backend/src/background/tasks.py
+"""
+Background job functions
+
+Each function is a coroutine queued on the JobQueue and run by a Worker.
+"""
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from src.core.events import EventLog
+    from src.schemas.wikigen.wiki import WikiResult
+    from src.services.llm.batch import BatchDispatcher, SubmittedBatch
+
+
+async def poll_llm_batch(dispatcher: "BatchDispatcher", batch: "SubmittedBatch") -> str:
+    """
+    Check an LLM provider batch once, resolving its callers' futures when it is done.
+
+    Unfinished batches are re-queued by the dispatcher after its poll interval, so
+    a long-running batch never holds a worker slot between checks.
+    """
+    return await dispatcher.poll_batch(batch)
+
+
+async def generate_project_wiki(
+    project_id: str,
+    user_id: str,
+    event_log: "EventLog",
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+) -> "WikiResult":
+    """
+    Run the WikiGen pipeline for a project, logging its progress to event_log.
+
+    Clients follow the log over SSE (GET /wikigen/jobs/{id}/events).
+    """
+    # Imported here: the WikiGen agents import the LLM service, which imports this module
+    from src.services.wikigen.wikigen_jobs import run_wikigen_job
+
+    return await run_wikigen_job(project_id, user_id, event_log, provider=provider, model=model)
@@ -0,0 +1,78 @@
+# backend/src/background/worker.py
+"""
+Background worker that runs jobs from a JobQueue
+
+Runs a fixed number of consumer tasks in the application's event loop, so at
+most `concurrency` jobs execute at once.
+"""
+import asyncio
+import logging
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from src.background.queue import Job, JobQueue, JobStatus, get_job_queue
+
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Consumes jobs from a JobQueue with bounded concurrency."""
+
+    def __init__(self, queue: Optional[JobQueue] = None, concurrency: int = 4):
+        self.queue = queue or get_job_queue()
+        self.concurrency = max(1, concurrency)
+        self._consumers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._consumers)
+
+    async def start(self) -> None:
+        """Start the consumer tasks (no-op if already running)."""
+        if self._consumers:
+            return
+        self._consumers = [
+            asyncio.create_task(self._consume(), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Background worker started with {self.concurrency} consumers")
+
+    async def stop(self, drain: bool = False) -> None:
+        """
+        Stop the consumer tasks.
+
+        Args:
+            drain: Wait for queued jobs to finish first
+        """
+        if drain:
+            await self.queue.join()
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        logger.info("Background worker stopped")
+
+    async def _consume(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run_job(job)
+            finally:
+                self.queue.task_done(job)
+
+    async def run_job(self, job: Job) -> None:
+        """Run a single job, recording its outcome on the job."""
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now(UTC)
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except asyncio.CancelledError:
+            job._finish(JobStatus.CANCELLED, error="cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Background job {job.name} ({job.id}) failed: {e}", exc_info=True)
+            job._finish(JobStatus.FAILED, error=str(e))
+        else:
+            job._finish(JobStatus.SUCCEEDED, result=result)
+            logger.debug(f"Background job {job.name} ({job.id}) succeeded")
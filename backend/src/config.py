@@ -72,6 +72,37 @@ class Settings(BaseSettings):
     PORTKEY_API_KEY: Optional[str] = None
     PORTKEY_VIRTUAL_KEY: Optional[str] = None
     
+    # LLM Streaming Timeouts (in seconds, 0 disables the timeout)
+    LLM_STREAM_FIRST_TOKEN_TIMEOUT: float = 60.0   # Max wait for the first streamed chunk
+    LLM_STREAM_IDLE_TIMEOUT: float = 30.0          # Max gap between consecutive chunks
+    
+    # LLM Stream Hedging - fire a backup request when the first token is slower than usual
+    LLM_STREAM_HEDGING_ENABLED: bool = False
+    LLM_STREAM_HEDGE_PERCENTILE: float = 95.0      # Hedge once TTFT exceeds this percentile
+    LLM_STREAM_HEDGE_MIN_SAMPLES: int = 20         # TTFT samples needed before hedging kicks in
+    
+    # LLM Usage Accounting
+    LLM_USAGE_BATCH_SIZE: int = 50                 # Buffered usage records that trigger a write
+    LLM_USAGE_FLUSH_INTERVAL: float = 10.0         # Seconds between periodic usage writes
+    LLM_BUDGET_WINDOW_DAYS: int = 30               # Rolling window budgets are measured over
+    LLM_DEFAULT_USER_BUDGET_USD: float = 0.0       # Default spend limit per user (0 = unlimited)
+    LLM_DEFAULT_PROJECT_BUDGET_USD: float = 0.0    # Default spend limit per project (0 = unlimited)
+    
+    # LLM Batch API (latency-tolerant bulk workloads)
+    LLM_BATCH_MAX_REQUESTS: int = 500              # Queued requests that trigger an immediate submission
+    LLM_BATCH_MAX_WAIT: float = 30.0               # Seconds to accumulate requests before submitting
+    LLM_BATCH_POLL_INTERVAL: float = 60.0          # Seconds between batch status checks
+    LLM_BATCH_COMPLETION_WINDOW: str = "24h"       # Provider completion window for submitted batches
+    LLM_BATCH_COST_MULTIPLIER: float = 0.5         # Batch pricing relative to interactive pricing
+    
+    # Token Counting
+    TOKENIZER_VOCAB_DIR: Optional[str] = None      # tiktoken cache directory with the BPE vocabularies (see src/utils/tokenizers.py)
+    TOKEN_COUNT_CACHE_SIZE: int = 10_000           # Memoized token counts (by content hash and tokenizer)
+
+    # Background Jobs
+    BACKGROUND_WORKER_CONCURRENCY: int = 4         # Jobs run concurrently by the in-process worker
+    BACKGROUND_QUEUE_MAXSIZE: int = 1000           # Queued jobs before enqueue() waits (0 = unbounded)
+    
     # Security
     ENCRYPTION_KEY: str = "change-me-32-character-key-12345678" # Must be 32 bytes for Fernet
     
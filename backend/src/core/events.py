@@ -0,0 +1,192 @@
+# backend/src/core/events.py
+"""
+Append-only event logs for streaming job progress
+
+Features:
+- One log per job; events get consecutive integer IDs (the SSE event id)
+- Events are stored already encoded as SSE frames, so replaying a log to a
+  reconnecting client is a list slice, not a re-serialization
+- Subscribers replay from any event ID (Last-Event-ID) and then follow live
+  appends, without the producer knowing about them
+- Logs are bounded: the oldest events are dropped past max_events, and the
+  oldest closed logs are evicted past max_logs
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Event types that end a job's log
+TERMINAL_EVENT_TYPES = frozenset({"job_completed", "job_failed", "job_cancelled"})
+
+
+@dataclass(frozen=True)
+class LoggedEvent:
+    """An event as stored in a log."""
+    id: int
+    type: str
+    frame: str          # Encoded SSE frame ("id: ...\nevent: ...\ndata: ...\n\n")
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Decoded event payload."""
+        payload = self.frame.split("data: ", 1)[1].rstrip("\n")
+        return json.loads(payload)
+
+
+def format_sse(event_id: int, event_type: str, data: Dict[str, Any]) -> str:
+    """Encode an event as a Server-Sent Events frame (data is one line of compact JSON)."""
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+class EventLog:
+    """
+    Append-only event log of one job.
+
+    Examples:
+        >>> log = EventLog()
+        >>> log.append("job_started", {"project_id": "p1"}).id
+        1
+        >>> [event.type for event in log.since(0)]
+        ['job_started']
+    """
+
+    def __init__(self, max_events: int = 10_000, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            max_events: Events kept; older ones are dropped (a client reconnecting
+                        from before the oldest kept event resumes at that event)
+            metadata: Free-form log metadata (e.g. the owning user)
+        """
+        self.max_events = max(1, max_events)
+        self.metadata = metadata or {}
+        self.closed = False
+        self._events: List[LoggedEvent] = []
+        self._first_id = 1                  # ID of self._events[0]
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def last_id(self) -> int:
+        """ID of the newest event (0 when empty)."""
+        return self._first_id + len(self._events) - 1
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def append(self, event_type: str, data: Optional[Dict[str, Any]] = None) -> LoggedEvent:
+        """
+        Append an event and wake subscribers.
+
+        A timestamp is added to the payload. Appending a terminal event
+        (job_completed, job_failed, job_cancelled) closes the log.
+
+        Raises:
+            RuntimeError: If the log is closed
+        """
+        if self.closed:
+            raise RuntimeError("Event log is closed")
+        event_id = self.last_id + 1
+        payload = {**(data or {}), "timestamp": datetime.now(UTC).isoformat()}
+        event = LoggedEvent(id=event_id, type=event_type, frame=format_sse(event_id, event_type, payload))
+        self._events.append(event)
+        if len(self._events) > self.max_events:
+            drop = len(self._events) - self.max_events
+            del self._events[:drop]
+            self._first_id += drop
+        if event_type in TERMINAL_EVENT_TYPES:
+            self.closed = True
+        self._notify()
+        return event
+
+    def close(self) -> None:
+        """Close the log without a terminal event (subscribers finish after replaying it)."""
+        self.closed = True
+        self._notify()
+
+    def since(self, last_event_id: int = 0) -> List[LoggedEvent]:
+        """Events after last_event_id, oldest first."""
+        start = max(0, last_event_id + 1 - self._first_id)
+        return self._events[start:]
+
+    async def subscribe(self, last_event_id: int = 0) -> AsyncIterator[LoggedEvent]:
+        """
+        Replay the events after last_event_id, then follow new ones until the log closes.
+
+        Args:
+            last_event_id: ID of the last event the client has (0: from the start)
+        """
+        cursor = last_event_id
+        while True:
+            # Take the wake-up event before reading, so an append in between is not missed
+            changed = self._wait_handle()
+            events = self.since(cursor)
+            for event in events:
+                yield event
+            if events:
+                cursor = events[-1].id
+            if self.closed and cursor >= self.last_id:
+                return
+            if not events:
+                await changed.wait()
+
+    def _wait_handle(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _notify(self) -> None:
+        # Every waiter holds the current handle; setting it wakes them all, and
+        # later waits use a fresh one
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+
+class EventLogStore:
+    """Event logs by key (job ID); the oldest closed logs are evicted past max_logs."""
+
+    def __init__(self, max_logs: int = 1000):
+        self.max_logs = max_logs
+        self._logs: "OrderedDict[str, EventLog]" = OrderedDict()
+
+    def create(self, key: str, **kwargs: Any) -> EventLog:
+        """Create (or replace) the log for a key."""
+        log = EventLog(**kwargs)
+        self.register(key, log)
+        return log
+
+    def register(self, key: str, log: EventLog) -> None:
+        """Store an existing log under a key."""
+        self._logs[key] = log
+        self._logs.move_to_end(key)
+        if len(self._logs) > self.max_logs:
+            for old_key in [k for k, l in self._logs.items() if l.closed][:len(self._logs) - self.max_logs]:
+                del self._logs[old_key]
+
+    def get(self, key: str) -> Optional[EventLog]:
+        return self._logs.get(key)
+
+
+# Global event log store instance
+_event_logs: Optional[EventLogStore] = None
+
+
+def get_event_logs() -> EventLogStore:
+    """Get the global event log store, creating it on first use."""
+    global _event_logs
+    if _event_logs is None:
+        _event_logs = EventLogStore()
+    return _event_logs
+
+
+def reset_event_logs() -> None:
+    """Reset the global event log store (useful for testing)."""
+    global _event_logs
+    _event_logs = None
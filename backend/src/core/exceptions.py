@@ -61,4 +61,28 @@ class LLMError(ShuScribeException):
     
     def __init__(self, provider: str, message: str, details: Optional[Dict[str, Any]] = None):
         full_message = f"LLM Error ({provider}): {message}"
-        super().__init__(full_message, details, status_code=502)
\ No newline at end of file
+        super().__init__(full_message, details, status_code=502)
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when an LLM stream stalls past its first-token or idle timeout"""
+    
+    def __init__(self, provider: str, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(provider, message, details)
+        self.status_code = 504
+
+
+class BudgetExceededError(ShuScribeException):
+    """Raised when a user or project has exhausted its LLM spend budget"""
+    
+    def __init__(self, scope: str, scope_id: str, limit_usd: float, spent_usd: float):
+        message = f"LLM budget exhausted for {scope} '{scope_id}': spent ${spent_usd:.4f} of ${limit_usd:.4f}"
+        details = {"scope": scope, "scope_id": scope_id, "limit_usd": limit_usd, "spent_usd": spent_usd}
+        super().__init__(message, details, status_code=402)
+
+
+class CassetteMissError(LLMError):
+    """Raised when a replayed LLM cassette has no recording for a request"""
+    
+    def __init__(self, provider: str, request_key: str):
+        super().__init__(provider, f"No cassette recording for request {request_key[:12]}", {"request_key": request_key})
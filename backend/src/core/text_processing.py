@@ -0,0 +1,158 @@
+# backend/src/core/text_processing.py
+"""
+Text processing helpers for fitting story text into model context windows
+
+Key Features:
+- Balanced packing of consecutive items (chapters) into the fewest windows,
+  with window sizes evened out instead of leaving a tiny last window
+- Splitting of oversized text at scene breaks, falling back to paragraph breaks
+"""
+
+import math
+import re
+from typing import Callable, List, Sequence, Tuple
+
+# A line made only of 3+ break symbols (***, * * *, ---, ###, ~~~, ⁂, ...), or two or more blank lines
+SCENE_BREAK_PATTERN = re.compile(r"\n[ \t]*(?:[*\-#~=_•·◇◆⁂][ \t]*){3,}\n|\n[ \t]*⁂[ \t]*\n|\n(?:[ \t]*\n){2,}")
+PARAGRAPH_BREAK_PATTERN = re.compile(r"\n(?:[ \t]*\n)+")
+
+
+def _suffix_window_counts(prefix: List[int], capacity: int) -> List[int]:
+    """
+    Fewest windows of at most capacity needed for items i..n-1, for every i.
+
+    Packing each suffix greedily from its start is optimal for contiguous
+    windows, and the furthest reachable end only moves forward with i, so all
+    suffixes are computed in one two-pointer pass.
+    """
+    n = len(prefix) - 1
+    reach = [0] * n
+    end = 0
+    for start in range(n):
+        end = max(end, start + 1)
+        while end < n and prefix[end + 1] - prefix[start] <= capacity:
+            end += 1
+        reach[start] = end
+    counts = [0] * (n + 1)
+    for start in range(n - 1, -1, -1):
+        counts[start] = 1 + counts[reach[start]]
+    return counts
+
+
+def balanced_partition(sizes: Sequence[int], limit: int) -> List[Tuple[int, int]]:
+    """
+    Pack consecutive items into as few windows as a greedy fill needs, with even window sizes.
+
+    The window count is the minimum for the limit. The largest window is then
+    made as small as that count allows (binary search over the capacity), and
+    each window ends at the boundary closest to an even share of what is left,
+    while the rest still fits. An item larger than the limit gets a window of
+    its own, and the runs of items between such items are balanced separately,
+    so no window of several items exceeds the limit.
+
+    Args:
+        sizes: Size (tokens) of each item, in order
+        limit: Maximum total size of a window
+
+    Returns:
+        (start, end) index ranges (end exclusive) of the windows, in order
+
+    Examples:
+        >>> balanced_partition([10, 10, 10, 10, 2], 20)
+        [(0, 1), (1, 3), (3, 5)]
+        >>> balanced_partition([5, 50, 5, 5, 5, 5], 10)
+        [(0, 1), (1, 2), (2, 4), (4, 6)]
+    """
+    windows: List[Tuple[int, int]] = []
+    run_start = 0
+    for index, size in enumerate(sizes):
+        if size > limit:
+            windows.extend(_balanced_run(sizes, run_start, index, limit))
+            windows.append((index, index + 1))
+            run_start = index + 1
+    windows.extend(_balanced_run(sizes, run_start, len(sizes), limit))
+    return windows
+
+
+def _balanced_run(sizes: Sequence[int], first: int, last: int, limit: int) -> List[Tuple[int, int]]:
+    """Balanced windows of sizes[first:last], whose items all fit the limit (see balanced_partition)."""
+    if first >= last:
+        return []
+    prefix = [0]
+    for size in sizes[first:last]:
+        prefix.append(prefix[-1] + size)
+    total = prefix[-1]
+    largest = max(sizes[first:last])
+
+    window_count = _suffix_window_counts(prefix, limit)[0]
+    low, high = max(largest, math.ceil(total / window_count)), limit
+    while low < high:
+        middle = (low + high) // 2
+        if _suffix_window_counts(prefix, middle)[0] <= window_count:
+            high = middle
+        else:
+            low = middle + 1
+    capacity = low
+    remaining_counts = _suffix_window_counts(prefix, capacity)
+
+    windows: List[Tuple[int, int]] = []
+    start, remaining = 0, window_count
+    n = last - first
+    while start < n:
+        target = (total - prefix[start]) / remaining
+        best_end, best_distance = start + 1, math.inf
+        end = start + 1
+        while end <= n and prefix[end] - prefix[start] <= capacity:
+            if remaining_counts[end] <= remaining - 1:
+                distance = abs(prefix[end] - prefix[start] - target)
+                if distance <= best_distance:  # Ties go to the fuller window
+                    best_end, best_distance = end, distance
+            end += 1
+        windows.append((first + start, first + best_end))
+        start, remaining = best_end, remaining - 1
+    return windows
+
+
+def _split_keeping_separators(text: str, pattern: re.Pattern) -> List[str]:
+    """Split text after each separator match, so the pieces concatenate back to text."""
+    pieces: List[str] = []
+    start = 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    pieces.append(text[start:])
+    return [piece for piece in pieces if piece.strip()]
+
+
+def split_text(text: str, max_tokens: int, count: Callable[[str], int]) -> List[str]:
+    """
+    Split text into balanced parts of at most max_tokens at scene breaks.
+
+    Scenes that are still too large are split at paragraph breaks. Text is
+    never cut inside a paragraph, so a single paragraph larger than max_tokens
+    stays one (oversized) part.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per part
+        count: Token counter
+
+    Returns:
+        Parts in order, stripped of surrounding whitespace; [text] if it can't be split
+    """
+    scenes = _split_keeping_separators(text, SCENE_BREAK_PATTERN)
+    if len(scenes) <= 1:
+        pieces = _split_keeping_separators(text, PARAGRAPH_BREAK_PATTERN)
+    else:
+        pieces = []
+        for scene in scenes:
+            if count(scene) > max_tokens:
+                pieces.extend(_split_keeping_separators(scene, PARAGRAPH_BREAK_PATTERN))
+            else:
+                pieces.append(scene)
+    if len(pieces) <= 1:
+        return [text]
+
+    sizes = [count(piece) for piece in pieces]
+    return ["".join(pieces[start:end]).strip() for start, end in balanced_partition(sizes, max_tokens)]
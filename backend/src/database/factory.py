@@ -11,6 +11,8 @@ from src.database.interfaces.document_repository import DocumentRepository
 from src.database.interfaces.file_tree_repository import FileTreeRepository
 from src.database.interfaces.user_repository import IUserRepository
 from src.database.interfaces.tag_repository import TagRepository
+from src.database.interfaces.usage_repository import UsageRepository
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +27,16 @@ class RepositoryContainer:
         file_tree: FileTreeRepository,
         user: IUserRepository,
         tag: TagRepository,
+        usage: UsageRepository,
+        checkpoint: CheckpointRepository,
     ):
         self.project = project
         self.document = document
         self.file_tree = file_tree
         self.user = user
         self.tag = tag
+        self.usage = usage
+        self.checkpoint = checkpoint
 
 
 def create_repositories(backend: str = "database") -> RepositoryContainer:
@@ -49,7 +55,9 @@ def create_repositories(backend: str = "database") -> RepositoryContainer:
             MemoryProjectRepository,
             MemoryDocumentRepository, 
             MemoryFileTreeRepository,
-            MemoryTagRepository
+            MemoryTagRepository,
+            MemoryUsageRepository,
+            MemoryCheckpointRepository
         )
         from src.database.memory import MemoryUserRepository
         return RepositoryContainer(
@@ -58,6 +66,8 @@ def create_repositories(backend: str = "database") -> RepositoryContainer:
             file_tree=MemoryFileTreeRepository(),
             user=MemoryUserRepository(),
             tag=MemoryTagRepository(),
+            usage=MemoryUsageRepository(),
+            checkpoint=MemoryCheckpointRepository(),
         )
     elif backend == "database":
         logger.info("Creating database repositories")
@@ -65,7 +75,9 @@ def create_repositories(backend: str = "database") -> RepositoryContainer:
             DatabaseProjectRepository,
             DatabaseDocumentRepository,
             DatabaseFileTreeRepository,
-            DatabaseTagRepository
+            DatabaseTagRepository,
+            DatabaseUsageRepository,
+            DatabaseCheckpointRepository
         )
         from src.database.memory import MemoryUserRepository  # TODO: Replace with DatabaseUserRepository
         return RepositoryContainer(
@@ -74,6 +86,8 @@ def create_repositories(backend: str = "database") -> RepositoryContainer:
             file_tree=DatabaseFileTreeRepository(),
             user=MemoryUserRepository(),  # TODO: Replace with DatabaseUserRepository
             tag=DatabaseTagRepository(),
+            usage=DatabaseUsageRepository(),
+            checkpoint=DatabaseCheckpointRepository(),
         )
     else:
         raise ValueError(f"Unknown backend: {backend}")
@@ -0,0 +1,27 @@
+# backend/src/database/interfaces/checkpoint_repository.py
+"""
+Agent checkpoint repository interface
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List
+
+from src.database.models import AgentCheckpoint
+
+
+class CheckpointRepository(ABC):
+    """Abstract agent checkpoint repository interface"""
+
+    @abstractmethod
+    async def save(self, namespace: str, run_key: str, step: int, data: Dict[str, Any]) -> AgentCheckpoint:
+        """Create or replace the checkpoint of a step"""
+        pass
+
+    @abstractmethod
+    async def list_steps(self, namespace: str, run_key: str) -> List[AgentCheckpoint]:
+        """List the checkpoints of a run ordered by step"""
+        pass
+
+    @abstractmethod
+    async def delete_run(self, namespace: str, run_key: str) -> int:
+        """Delete all checkpoints of a run, returns the number deleted"""
+        pass
@@ -0,0 +1,74 @@
+# backend/src/database/interfaces/usage_repository.py
+"""
+LLM usage repository interface
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Literal
+
+from src.database.models import LLMUsageRecord
+
+
+# Columns usage can be rolled up by
+UsageGroupBy = Literal["user_id", "project_id", "agent_name", "provider", "model"]
+
+# What a spend budget applies to
+BudgetScope = Literal["user", "project"]
+
+
+class UsageRepository(ABC):
+    """Abstract LLM usage repository interface"""
+
+    @abstractmethod
+    async def create_many(self, records_data: List[Dict[str, Any]]) -> int:
+        """Insert a batch of usage records, returns the number written"""
+        pass
+
+    @abstractmethod
+    async def list_records(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[LLMUsageRecord]:
+        """List usage records (newest first) matching the filters"""
+        pass
+
+    @abstractmethod
+    async def get_totals(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate usage matching the filters
+
+        Returns:
+            Dict with requests, prompt_tokens, completion_tokens, total_tokens, cached_prompt_tokens and cost_usd
+        """
+        pass
+
+    @abstractmethod
+    async def get_rollup(
+        self,
+        group_by: UsageGroupBy,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Aggregate usage grouped by a column, each row has the group key plus the totals fields"""
+        pass
+
+    @abstractmethod
+    async def get_budget(self, scope: BudgetScope, scope_id: str) -> Optional[float]:
+        """Get the stored spend limit for a user or project, None if none is set"""
+        pass
+
+    @abstractmethod
+    async def set_budget(self, scope: BudgetScope, scope_id: str, limit_usd: Optional[float]) -> None:
+        """Store (or delete with None) the spend limit for a user or project"""
+        pass
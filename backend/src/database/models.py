@@ -6,7 +6,7 @@ from datetime import datetime, UTC
 from typing import Optional, Any, Dict, List
 import uuid
 
-from sqlalchemy import String, Text, Integer, Boolean, DateTime, JSON, ForeignKey, CheckConstraint, Index, Table, Column
+from sqlalchemy import String, Text, Integer, Float, Boolean, DateTime, JSON, ForeignKey, CheckConstraint, Index, Table, Column
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from src.config import settings
@@ -229,4 +229,91 @@ class Tag(Base):
     project: Mapped[Optional["Project"]] = relationship("Project")
     projects: Mapped[List["Project"]] = relationship("Project", secondary=project_tags, back_populates="tags")
     documents: Mapped[List["Document"]] = relationship("Document", secondary=document_tags, back_populates="tags")
-    file_tree_items: Mapped[List["FileTreeItem"]] = relationship("FileTreeItem", secondary=file_tree_item_tags, back_populates="tags")
\ No newline at end of file
+    file_tree_items: Mapped[List["FileTreeItem"]] = relationship("FileTreeItem", secondary=file_tree_item_tags, back_populates="tags")
+
+
+class LLMUsageRecord(Base):
+    """Token usage and computed cost of a single LLM call"""
+    __tablename__ = f"{TABLE_PREFIX}llm_usage"
+    
+    # Primary key
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Attribution (no foreign keys - usage must survive project deletion for billing)
+    user_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
+    project_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
+    agent_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    
+    # Model used
+    provider: Mapped[str] = mapped_column(String(50), nullable=False)
+    model: Mapped[str] = mapped_column(String(255), nullable=False)
+    
+    # Token counts
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cached_prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # Prompt tokens read from the provider's prompt cache
+    
+    # Cost in USD computed from the model catalog pricing (0 when pricing is unknown)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    
+    # Request info
+    trace_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    streaming: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    
+    # Indexes for rollups
+    __table_args__ = (
+        Index(f"ix_{TABLE_PREFIX}llm_usage_user_created", "user_id", "created_at"),
+        Index(f"ix_{TABLE_PREFIX}llm_usage_project_created", "project_id", "created_at"),
+        Index(f"ix_{TABLE_PREFIX}llm_usage_agent", "agent_name"),
+    )
+
+
+class LLMBudget(Base):
+    """Rolling-window LLM spend limit for a user or project"""
+    __tablename__ = f"{TABLE_PREFIX}llm_budgets"
+    
+    # Primary key
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Budget owner: "user" or "project" and its ID (no foreign keys, like usage records)
+    scope: Mapped[str] = mapped_column(String(20), nullable=False)
+    scope_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    
+    # Spend limit in USD over the configured budget window
+    limit_usd: Mapped[float] = mapped_column(Float, nullable=False)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    
+    __table_args__ = (
+        Index(f"ix_{TABLE_PREFIX}llm_budgets_scope", "scope", "scope_id", unique=True),
+    )
+
+
+class AgentCheckpoint(Base):
+    """Persisted result of one step of a multi-step agent run (e.g. an arc splitter window)"""
+    __tablename__ = f"{TABLE_PREFIX}agent_checkpoints"
+    
+    # Primary key
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Checkpoint identity: agent namespace, run key (hash of inputs) and step number
+    namespace: Mapped[str] = mapped_column(String(100), nullable=False)
+    run_key: Mapped[str] = mapped_column(String(128), nullable=False)
+    step: Mapped[int] = mapped_column(Integer, nullable=False)
+    
+    # Step payload (JSON-serializable)
+    data: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    
+    __table_args__ = (
+        Index(f"ix_{TABLE_PREFIX}agent_checkpoints_run_step", "namespace", "run_key", "step", unique=True),
+    )
@@ -7,14 +7,16 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, UTC
 import uuid
 
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.database.models import Project, Document, FileTreeItem, Tag
+from src.database.models import Project, Document, FileTreeItem, Tag, LLMUsageRecord, LLMBudget, AgentCheckpoint
 from src.database.connection import get_session_context
 from src.database.interfaces import ProjectRepository, DocumentRepository, FileTreeRepository
 from src.database.interfaces.tag_repository import TagRepository
+from src.database.interfaces.usage_repository import UsageRepository, UsageGroupBy, BudgetScope
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
 
 logger = logging.getLogger(__name__)
 
@@ -881,4 +883,324 @@ class MemoryTagRepository(TagRepository):
             ]
         # Sort by usage count desc, then name
         tags.sort(key=lambda t: (-t.usage_count, t.name))
-        return tags[:limit]
\ No newline at end of file
+        return tags[:limit]
+
+
+# ============================================================================
+# LLM Usage Repository Implementations
+# ============================================================================
+
+def _new_usage_record(record_data: Dict[str, Any]) -> LLMUsageRecord:
+    """Build an LLMUsageRecord from a usage dict"""
+    return LLMUsageRecord(
+        id=record_data.get("id", str(uuid.uuid4())),
+        user_id=record_data.get("user_id"),
+        project_id=record_data.get("project_id"),
+        agent_name=record_data.get("agent_name"),
+        provider=record_data["provider"],
+        model=record_data["model"],
+        prompt_tokens=record_data.get("prompt_tokens", 0),
+        completion_tokens=record_data.get("completion_tokens", 0),
+        total_tokens=record_data.get("total_tokens", 0),
+        cached_prompt_tokens=record_data.get("cached_prompt_tokens", 0),
+        cost_usd=record_data.get("cost_usd", 0.0),
+        trace_id=record_data.get("trace_id"),
+        streaming=record_data.get("streaming", False),
+        created_at=record_data.get("created_at", datetime.now(UTC).replace(tzinfo=None)),
+    )
+
+
+def _usage_filters(
+    user_id: Optional[str],
+    project_id: Optional[str],
+    agent_name: Optional[str],
+    since: Optional[datetime],
+) -> List[Any]:
+    """Build SQLAlchemy where-clauses for usage queries"""
+    filters = []
+    if user_id is not None:
+        filters.append(LLMUsageRecord.user_id == user_id)
+    if project_id is not None:
+        filters.append(LLMUsageRecord.project_id == project_id)
+    if agent_name is not None:
+        filters.append(LLMUsageRecord.agent_name == agent_name)
+    if since is not None:
+        filters.append(LLMUsageRecord.created_at >= since)
+    return filters
+
+
+_USAGE_AGGREGATES = (
+    func.count(LLMUsageRecord.id).label("requests"),
+    func.coalesce(func.sum(LLMUsageRecord.prompt_tokens), 0).label("prompt_tokens"),
+    func.coalesce(func.sum(LLMUsageRecord.completion_tokens), 0).label("completion_tokens"),
+    func.coalesce(func.sum(LLMUsageRecord.total_tokens), 0).label("total_tokens"),
+    func.coalesce(func.sum(LLMUsageRecord.cached_prompt_tokens), 0).label("cached_prompt_tokens"),
+    func.coalesce(func.sum(LLMUsageRecord.cost_usd), 0.0).label("cost_usd"),
+)
+
+
+def _usage_totals(rows: List[Any]) -> Dict[str, Any]:
+    """Aggregate usage records (or row-like objects) in Python"""
+    return {
+        "requests": len(rows),
+        "prompt_tokens": sum(r.prompt_tokens for r in rows),
+        "completion_tokens": sum(r.completion_tokens for r in rows),
+        "total_tokens": sum(r.total_tokens for r in rows),
+        "cached_prompt_tokens": sum(r.cached_prompt_tokens for r in rows),
+        "cost_usd": sum(r.cost_usd for r in rows),
+    }
+
+
+class DatabaseUsageRepository(UsageRepository):
+    """Database-backed LLM usage repository using SQLAlchemy"""
+    
+    async def create_many(self, records_data: List[Dict[str, Any]]) -> int:
+        if not records_data:
+            return 0
+        async with get_session_context() as session:
+            session.add_all([_new_usage_record(data) for data in records_data])
+            await session.flush()
+            return len(records_data)
+    
+    async def list_records(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[LLMUsageRecord]:
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(LLMUsageRecord)
+                .where(*_usage_filters(user_id, project_id, agent_name, since))
+                .order_by(LLMUsageRecord.created_at.desc())
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+    
+    async def get_totals(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(*_USAGE_AGGREGATES).where(*_usage_filters(user_id, project_id, agent_name, since))
+            )
+            row = result.one()
+            return {
+                "requests": row.requests,
+                "prompt_tokens": int(row.prompt_tokens),
+                "completion_tokens": int(row.completion_tokens),
+                "total_tokens": int(row.total_tokens),
+                "cached_prompt_tokens": int(row.cached_prompt_tokens),
+                "cost_usd": float(row.cost_usd),
+            }
+    
+    async def get_rollup(
+        self,
+        group_by: UsageGroupBy,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        group_column = getattr(LLMUsageRecord, group_by)
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(group_column.label("key"), *_USAGE_AGGREGATES)
+                .where(*_usage_filters(user_id, project_id, None, since))
+                .group_by(group_column)
+                .order_by(func.sum(LLMUsageRecord.cost_usd).desc())
+            )
+            return [
+                {
+                    group_by: row.key,
+                    "requests": row.requests,
+                    "prompt_tokens": int(row.prompt_tokens),
+                    "completion_tokens": int(row.completion_tokens),
+                    "total_tokens": int(row.total_tokens),
+                    "cached_prompt_tokens": int(row.cached_prompt_tokens),
+                    "cost_usd": float(row.cost_usd),
+                }
+                for row in result.all()
+            ]
+    
+    async def get_budget(self, scope: BudgetScope, scope_id: str) -> Optional[float]:
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(LLMBudget.limit_usd).where(LLMBudget.scope == scope, LLMBudget.scope_id == scope_id)
+            )
+            return result.scalar_one_or_none()
+    
+    async def set_budget(self, scope: BudgetScope, scope_id: str, limit_usd: Optional[float]) -> None:
+        async with get_session_context() as session:
+            if limit_usd is None:
+                await session.execute(
+                    delete(LLMBudget).where(LLMBudget.scope == scope, LLMBudget.scope_id == scope_id)
+                )
+                return
+            result = await session.execute(
+                select(LLMBudget).where(LLMBudget.scope == scope, LLMBudget.scope_id == scope_id)
+            )
+            budget = result.scalar_one_or_none()
+            if budget is None:
+                session.add(LLMBudget(id=str(uuid.uuid4()), scope=scope, scope_id=scope_id, limit_usd=limit_usd))
+            else:
+                budget.limit_usd = limit_usd
+                budget.updated_at = datetime.now(UTC).replace(tzinfo=None)
+            await session.flush()
+
+
+class MemoryUsageRepository(UsageRepository):
+    """In-memory LLM usage repository for testing"""
+    
+    def __init__(self):
+        self._records: List[LLMUsageRecord] = []
+        self._budgets: Dict[tuple[str, str], float] = {}
+    
+    def _filter(
+        self,
+        user_id: Optional[str],
+        project_id: Optional[str],
+        agent_name: Optional[str],
+        since: Optional[datetime],
+    ) -> List[LLMUsageRecord]:
+        return [
+            r for r in self._records
+            if (user_id is None or r.user_id == user_id)
+            and (project_id is None or r.project_id == project_id)
+            and (agent_name is None or r.agent_name == agent_name)
+            and (since is None or r.created_at >= since)
+        ]
+    
+    async def create_many(self, records_data: List[Dict[str, Any]]) -> int:
+        self._records.extend(_new_usage_record(data) for data in records_data)
+        return len(records_data)
+    
+    async def list_records(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[LLMUsageRecord]:
+        records = self._filter(user_id, project_id, agent_name, since)
+        return sorted(records, key=lambda r: r.created_at, reverse=True)[:limit]
+    
+    async def get_totals(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        return _usage_totals(self._filter(user_id, project_id, agent_name, since))
+    
+    async def get_rollup(
+        self,
+        group_by: UsageGroupBy,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        groups: Dict[Optional[str], List[LLMUsageRecord]] = {}
+        for record in self._filter(user_id, project_id, None, since):
+            groups.setdefault(getattr(record, group_by), []).append(record)
+        
+        rollup = [{group_by: key, **_usage_totals(records)} for key, records in groups.items()]
+        return sorted(rollup, key=lambda row: row["cost_usd"], reverse=True)
+    
+    async def get_budget(self, scope: BudgetScope, scope_id: str) -> Optional[float]:
+        return self._budgets.get((scope, scope_id))
+    
+    async def set_budget(self, scope: BudgetScope, scope_id: str, limit_usd: Optional[float]) -> None:
+        if limit_usd is None:
+            self._budgets.pop((scope, scope_id), None)
+        else:
+            self._budgets[(scope, scope_id)] = limit_usd
+
+
+# ============================================================================
+# Agent Checkpoint Repository Implementations
+# ============================================================================
+
+class DatabaseCheckpointRepository(CheckpointRepository):
+    """Database-backed agent checkpoint repository using SQLAlchemy"""
+    
+    async def save(self, namespace: str, run_key: str, step: int, data: Dict[str, Any]) -> AgentCheckpoint:
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(AgentCheckpoint).where(
+                    AgentCheckpoint.namespace == namespace,
+                    AgentCheckpoint.run_key == run_key,
+                    AgentCheckpoint.step == step,
+                )
+            )
+            checkpoint = result.scalar_one_or_none()
+            if checkpoint is None:
+                checkpoint = AgentCheckpoint(
+                    id=str(uuid.uuid4()), namespace=namespace, run_key=run_key, step=step, data=data
+                )
+                session.add(checkpoint)
+            else:
+                checkpoint.data = data
+                checkpoint.updated_at = datetime.now(UTC).replace(tzinfo=None)
+            await session.flush()
+            await session.refresh(checkpoint)
+            return checkpoint
+    
+    async def list_steps(self, namespace: str, run_key: str) -> List[AgentCheckpoint]:
+        async with get_session_context() as session:
+            result = await session.execute(
+                select(AgentCheckpoint)
+                .where(AgentCheckpoint.namespace == namespace, AgentCheckpoint.run_key == run_key)
+                .order_by(AgentCheckpoint.step)
+            )
+            return list(result.scalars().all())
+    
+    async def delete_run(self, namespace: str, run_key: str) -> int:
+        async with get_session_context() as session:
+            result = await session.execute(
+                delete(AgentCheckpoint).where(
+                    AgentCheckpoint.namespace == namespace, AgentCheckpoint.run_key == run_key
+                )
+            )
+            return result.rowcount or 0
+
+
+class MemoryCheckpointRepository(CheckpointRepository):
+    """In-memory agent checkpoint repository for testing"""
+    
+    def __init__(self):
+        self._checkpoints: Dict[tuple[str, str, int], AgentCheckpoint] = {}
+    
+    async def save(self, namespace: str, run_key: str, step: int, data: Dict[str, Any]) -> AgentCheckpoint:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        existing = self._checkpoints.get((namespace, run_key, step))
+        checkpoint = AgentCheckpoint(
+            id=existing.id if existing else str(uuid.uuid4()),
+            namespace=namespace,
+            run_key=run_key,
+            step=step,
+            data=data,
+            created_at=existing.created_at if existing else now,
+            updated_at=now,
+        )
+        self._checkpoints[(namespace, run_key, step)] = checkpoint
+        return checkpoint
+    
+    async def list_steps(self, namespace: str, run_key: str) -> List[AgentCheckpoint]:
+        return sorted(
+            (c for (ns, key, _), c in self._checkpoints.items() if ns == namespace and key == run_key),
+            key=lambda c: c.step,
+        )
+    
+    async def delete_run(self, namespace: str, run_key: str) -> int:
+        keys = [k for k in self._checkpoints if k[0] == namespace and k[1] == run_key]
+        for key in keys:
+            del self._checkpoints[key]
+        return len(keys)
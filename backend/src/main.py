@@ -91,9 +91,30 @@ async def lifespan(app: FastAPI):
         logging.warning("Falling back to memory backend for development")
         init_repositories(backend="memory")
     
+    # Initialize LLM usage accounting (batched writes to the usage repository)
+    from src.database.factory import get_repositories
+    from src.services.llm.usage_tracker import init_usage_tracker
+    
+    usage_tracker = init_usage_tracker(get_repositories().usage)
+    await usage_tracker.start()
+    
+    # Start the in-process background job worker (batch polling, long-running jobs)
+    from src.background.queue import init_job_queue
+    from src.background.worker import Worker
+    from src.services.llm.batch import get_batch_dispatcher
+    
+    job_worker = Worker(
+        init_job_queue(maxsize=settings.BACKGROUND_QUEUE_MAXSIZE),
+        concurrency=settings.BACKGROUND_WORKER_CONCURRENCY,
+    )
+    await job_worker.start()
+    
     yield
     
     # Shutdown
+    await get_batch_dispatcher().close()
+    await job_worker.stop()
+    await usage_tracker.stop()
     await close_database()
     logging.info("ShuScribe backend shutting down...")
 
@@ -2,10 +2,12 @@
 
 import toml
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from jinja2 import Environment, FileSystemLoader, Template
 
+from src.schemas.llm.models import LLMMessage
+
 class PromptGroup:
     """
     A scoped view into a part of the prompt data tree.
@@ -33,6 +35,20 @@ class PromptGroup:
         """A convenience method to access the main manager's render function."""
         return self._manager.render(template_string, **kwargs)
 
+    def render_messages(self, key: str = "messages", **kwargs: Any) -> List[LLMMessage]:
+        """
+        Renders a list of message templates (role, content and optional cacheable flag).
+        Templates marked `cacheable = true` form the stable prompt prefix shared across calls.
+        """
+        return [
+            LLMMessage(
+                role=template["role"],
+                content=self.render(template["content"], **kwargs),
+                cacheable=template.get("cacheable", False),
+            )
+            for template in self.get(key)
+        ]
+
 class PromptManager:
     """
     Loads all TOML prompt files and provides scoped access via PromptGroup objects.
@@ -55,6 +71,8 @@ class PromptManager:
             lstrip_blocks=True
         )
         self.jinja_env.filters['tojson'] = __import__('json').dumps
+        # Compiled templates by source; agents render the same templates once per chapter or article
+        self._templates: Dict[str, Template] = {}
         self._data = self._load_all_toml_files()
 
     def _load_all_toml_files(self) -> Dict[str, Any]:
@@ -90,5 +108,7 @@ class PromptManager:
 
     def render(self, template_string: str, **kwargs: Any) -> str:
         """The master render function, used by PromptGroup objects."""
-        template: Template = self.jinja_env.from_string(template_string)
+        template = self._templates.get(template_string)
+        if template is None:
+            template = self._templates[template_string] = self.jinja_env.from_string(template_string)
         return template.render(**kwargs)
\ No newline at end of file
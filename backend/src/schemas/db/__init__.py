@@ -2,5 +2,15 @@
 Database schema models package.
 """
 from .writing import AuthorNote, ResearchItem, CharacterProfile
+from .story import (
+    Chapter, ChapterCreate, ChapterUpdate, ChapterStatus,
+    StoryMetadata, StoryMetadataCreate, StoryMetadataUpdate,
+    FullStoryBase,
+)
 
-__all__ = ["AuthorNote", "ResearchItem", "CharacterProfile"]
\ No newline at end of file
+__all__ = [
+    "AuthorNote", "ResearchItem", "CharacterProfile",
+    "Chapter", "ChapterCreate", "ChapterUpdate", "ChapterStatus",
+    "StoryMetadata", "StoryMetadataCreate", "StoryMetadataUpdate",
+    "FullStoryBase",
+]
@@ -0,0 +1,297 @@
+"""
+Database schema models for stories and chapters.
+"""
+import hashlib
+import html
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from pydantic import Field
+
+from src.core.text_processing import balanced_partition, split_text
+from src.schemas.base import BaseSchema
+from src.utils.tokenizers import Tokenizer, content_hash, count_tokens_cached, get_tokenizer
+
+
+# Stories with fewer tokens than this are analyzed as a single unit
+SHORT_STORY_TOKEN_THRESHOLD = 50_000
+
+_NIL_UUID = UUID("00000000-0000-0000-0000-000000000000")
+
+
+class ChapterStatus(str, Enum):
+    """Publication status of a chapter"""
+    DRAFT = "draft"
+    PUBLISHED = "published"
+    ARCHIVED = "archived"
+
+
+class StoryMetadataBase(BaseSchema):
+    """Common story metadata fields"""
+    title: str
+    author: str = ""
+    synopsis: str = ""
+    genres: List[str] = Field(default_factory=list)
+    tags: List[str] = Field(default_factory=list)
+    total_chapters: int = 0
+    publication_status: str = "ongoing"  # ongoing, completed, hiatus
+
+
+class StoryMetadataCreate(StoryMetadataBase):
+    """Story metadata creation model"""
+    workspace_id: UUID
+
+
+class StoryMetadataUpdate(BaseSchema):
+    """Story metadata update model"""
+    title: Optional[str] = None
+    author: Optional[str] = None
+    synopsis: Optional[str] = None
+    genres: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    total_chapters: Optional[int] = None
+    publication_status: Optional[str] = None
+
+
+class StoryMetadata(StoryMetadataBase):
+    """Story metadata model"""
+    id: UUID = Field(default_factory=uuid4)
+    workspace_id: UUID = _NIL_UUID
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: Optional[datetime] = None
+
+
+class ChapterBase(BaseSchema):
+    """Common chapter fields"""
+    chapter_number: int = Field(..., ge=1)
+    title: str
+    content: str
+    status: ChapterStatus = ChapterStatus.PUBLISHED
+    summary: Optional[str] = None
+    tags: List[str] = Field(default_factory=list)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ChapterCreate(ChapterBase):
+    """Chapter creation model"""
+    workspace_id: UUID
+
+
+class ChapterUpdate(BaseSchema):
+    """Chapter update model"""
+    title: Optional[str] = None
+    content: Optional[str] = None
+    status: Optional[ChapterStatus] = None
+    summary: Optional[str] = None
+    tags: Optional[List[str]] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class Chapter(ChapterBase):
+    """Chapter model"""
+    id: UUID = Field(default_factory=uuid4)
+    workspace_id: UUID = _NIL_UUID
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: Optional[datetime] = None
+
+    @property
+    def word_count(self) -> int:
+        return len(self.content.split())
+
+    @property
+    def token_count(self) -> int:
+        return self.count_tokens()
+
+    def count_tokens(self, tokenizer: Optional[Tokenizer] = None) -> int:
+        """Tokens in the content with the given (default: the default) tokenizer, memoized by content hash."""
+        return count_tokens_cached(self.content, tokenizer, text_hash=content_hash(self.content))
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the chapter's number, title and content."""
+        return hashlib.sha256(f"{self.chapter_number}\x00{self.title}\x00{self.content}".encode("utf-8")).hexdigest()
+
+    @property
+    def is_part(self) -> bool:
+        """True for a piece of a chapter that was split to fit a window."""
+        return "part" in self.metadata
+
+    def to_prompt_text(self) -> str:
+        """Chapter as it is sent to agents (XML-tagged with number and escaped title)."""
+        return f'<Chapter number="{self.chapter_number}" title="{html.escape(self.title)}">\n{self.content}\n</Chapter>'
+
+    def split_at_scene_breaks(self, max_tokens: int, tokenizer: Optional[Tokenizer] = None) -> List["Chapter"]:
+        """
+        Split the chapter into parts of at most max_tokens at scene (then paragraph) breaks.
+
+        Parts keep the chapter number, get a "(part i/n)" title suffix and record
+        "part"/"parts" in their metadata.
+
+        Args:
+            max_tokens: Maximum tokens per part
+            tokenizer: Tokenizer of the target model (default: the default tokenizer)
+
+        Returns:
+            The parts in order, or [self] if the chapter fits or has no usable breaks
+        """
+        if self.count_tokens(tokenizer) <= max_tokens:
+            return [self]
+        parts = split_text(self.content, max_tokens, (tokenizer or get_tokenizer()).count)
+        if len(parts) == 1:
+            return [self]
+        return [
+            self.model_copy(update={
+                "content": part,
+                "title": f"{self.title} (part {index}/{len(parts)})",
+                "metadata": {**self.metadata, "part": index, "parts": len(parts)},
+            })
+            for index, part in enumerate(parts, start=1)
+        ]
+
+
+class StoryChunk(BaseSchema):
+    """One context window of story content"""
+    chapters: List[Chapter]  # Chapters (or chapter parts) the window covers
+    tokens: int  # Tokens of chapters
+    overlap: List[Chapter] = Field(default_factory=list)  # Preceding chapters included as context only
+    overlap_tokens: int = 0
+
+    @property
+    def start_chapter(self) -> int:
+        return self.chapters[0].chapter_number
+
+    @property
+    def end_chapter(self) -> int:
+        return self.chapters[-1].chapter_number
+
+    @property
+    def context_start_chapter(self) -> int:
+        """First chapter in the content (before start_chapter when there is overlap)."""
+        return (self.overlap or self.chapters)[0].chapter_number
+
+    @property
+    def content(self) -> str:
+        """Prompt text of the overlap and the chapters."""
+        return "\n\n".join(c.to_prompt_text() for c in self.overlap + self.chapters)
+
+
+class FullStoryBase(BaseSchema):
+    """A story's metadata with all of its chapters, as consumed by the WikiGen agents"""
+    metadata: StoryMetadata
+    chapters: List[Chapter] = Field(default_factory=list)
+
+    def model_post_init(self, __context: Any) -> None:
+        """Keep chapters in reading order"""
+        self.chapters.sort(key=lambda c: c.chapter_number)
+
+    @property
+    def total_chapters(self) -> int:
+        return len(self.chapters)
+
+    @property
+    def word_count(self) -> int:
+        return sum(chapter.word_count for chapter in self.chapters)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(chapter.token_count for chapter in self.chapters)
+
+    @property
+    def is_short_story(self) -> bool:
+        return self.total_tokens < SHORT_STORY_TOKEN_THRESHOLD
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 over all chapter hashes (changes when any chapter is edited, added or removed)."""
+        digest = hashlib.sha256()
+        for chapter in self.chapters:
+            digest.update(chapter.content_hash.encode("ascii"))
+        return digest.hexdigest()
+
+    def get_chapters(self, start_chapter: int, end_chapter: int) -> List[Chapter]:
+        """Chapters numbered start_chapter..end_chapter (inclusive)."""
+        return [c for c in self.chapters if start_chapter <= c.chapter_number <= end_chapter]
+
+    def get_content(self, start_chapter: int, end_chapter: int) -> str:
+        """Prompt text of chapters start_chapter..end_chapter (inclusive)."""
+        return "\n\n".join(c.to_prompt_text() for c in self.get_chapters(start_chapter, end_chapter))
+
+    def count_tokens(self, tokenizer: Optional[Tokenizer] = None) -> int:
+        """Total tokens of all chapters with the given tokenizer."""
+        return sum(chapter.count_tokens(tokenizer) for chapter in self.chapters)
+
+    def pack_windows(
+        self,
+        chunk_token_limit: int,
+        start_chapter: int = 1,
+        tokenizer: Optional[Tokenizer] = None,
+        overlap_chapters: int = 0,
+        overlap_token_limit: Optional[int] = None,
+    ) -> List[StoryChunk]:
+        """
+        Pack the story into balanced windows of whole chapters.
+
+        Uses the fewest windows that fit the token limit, with window sizes as
+        even as possible (see balanced_partition) instead of filling each one
+        greedily and leaving a small remainder for the last. Chapters larger
+        than the limit are split at scene breaks into parts that share the
+        chapter number.
+
+        Args:
+            chunk_token_limit: Maximum tokens of story content per window (excluding overlap)
+            start_chapter: First chapter number to include (earlier chapters are skipped,
+                but can still be overlap)
+            tokenizer: Tokenizer of the target model (default: the default tokenizer)
+            overlap_chapters: Number of preceding chapters (or parts) to repeat as context
+            overlap_token_limit: Maximum overlap tokens per window (default: unlimited)
+
+        Returns:
+            Windows in story order
+        """
+        units: List[Chapter] = []
+        for chapter in self.chapters:
+            if chapter.chapter_number >= start_chapter and chapter.count_tokens(tokenizer) > chunk_token_limit:
+                units.extend(chapter.split_at_scene_breaks(chunk_token_limit, tokenizer))
+            else:
+                units.append(chapter)
+        sizes = [unit.count_tokens(tokenizer) for unit in units]
+        first = next((i for i, unit in enumerate(units) if unit.chapter_number >= start_chapter), len(units))
+
+        windows: List[StoryChunk] = []
+        for start, end in balanced_partition(sizes[first:], chunk_token_limit):
+            start, end = start + first, end + first
+            overlap_start = start
+            overlap_tokens = 0
+            while overlap_start > 0 and start - overlap_start < overlap_chapters:
+                if overlap_token_limit is not None and overlap_tokens + sizes[overlap_start - 1] > overlap_token_limit:
+                    break
+                overlap_start -= 1
+                overlap_tokens += sizes[overlap_start]
+            windows.append(StoryChunk(
+                chapters=units[start:end],
+                tokens=sum(sizes[start:end]),
+                overlap=units[overlap_start:start],
+                overlap_tokens=overlap_tokens,
+            ))
+        return windows
+
+    def get_content_chunks(
+        self, chunk_token_limit: int, start_chapter: int = 1, tokenizer: Optional[Tokenizer] = None
+    ) -> Iterator[Tuple[List[Chapter], str, int]]:
+        """
+        Split the story into balanced windows of whole chapters that fit the token limit.
+
+        See pack_windows, which also supports overlap.
+
+        Args:
+            chunk_token_limit: Maximum tokens of story content per window
+            start_chapter: First chapter number to include (earlier chapters are skipped)
+            tokenizer: Tokenizer of the target model (default: the default tokenizer)
+
+        Yields:
+            (chapters, content, tokens) for each window
+        """
+        for window in self.pack_windows(chunk_token_limit, start_chapter=start_chapter, tokenizer=tokenizer):
+            yield window.chapters, window.content, window.tokens
@@ -11,6 +11,7 @@ class LLMMessage(BaseModel):
     """Standard message format for LLM interactions"""
     role: str  # 'system', 'user', 'assistant'
     content: str
+    cacheable: bool = False  # Part of a stable prompt prefix that providers may cache across calls
 
 
 class ChunkType(str, Enum):
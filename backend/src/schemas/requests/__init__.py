@@ -41,6 +41,9 @@ from .llm import (
     ListProvidersRequest,
     ListModelsRequest
 )
+from .wikigen import (
+    WikiGenJobRequest
+)
 
 __all__ = [
     # Document requests
@@ -78,4 +81,7 @@ __all__ = [
     "DeleteAPIKeyRequest",
     "ListProvidersRequest",
     "ListModelsRequest",
+    
+    # WikiGen requests
+    "WikiGenJobRequest",
 ]
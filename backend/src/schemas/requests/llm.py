@@ -1,7 +1,7 @@
 """
 Request schemas for LLM API endpoints
 """
-from typing import List, Optional, Dict, Any, Type
+from typing import List, Literal, Optional, Dict, Any, Type
 from pydantic import BaseModel, Field
 
 from src.schemas.base import BaseSchema
@@ -67,4 +67,13 @@ class ListModelsRequest(BaseSchema):
     model_config = {"populate_by_name": True}
     
     provider: Optional[PROVIDER_ID] = None  # If None, return models for all providers
-    include_capabilities: bool = Field(default=True)
\ No newline at end of file
+    include_capabilities: bool = Field(default=True)
+
+
+class SetLLMBudgetRequest(BaseSchema):
+    """Request to set (or clear) the current user's or one of their projects' LLM budget"""
+    model_config = {"populate_by_name": True}
+    
+    scope: Literal["user", "project"] = Field(default="user")
+    project_id: Optional[str] = None  # Required for project budgets
+    limit_usd: Optional[float] = Field(default=None, ge=0)  # None clears the budget
@@ -0,0 +1,16 @@
+"""
+Request schemas for WikiGen API endpoints
+"""
+from typing import Optional
+
+from src.schemas.base import BaseSchema
+from src.core.constants import PROVIDER_ID, MODEL_NAME
+
+
+class WikiGenJobRequest(BaseSchema):
+    """Request to generate a project's wiki in the background"""
+    model_config = {"populate_by_name": True}
+    
+    # Optional overrides of every agent's LLM
+    provider: Optional[PROVIDER_ID] = None
+    model: Optional[MODEL_NAME] = None
@@ -50,6 +50,9 @@ from .llm import (
     ListUserAPIKeysResponse,
     LLMUsageStatsResponse
 )
+from .wikigen import (
+    WikiGenJobResponse
+)
 
 __all__ = [
     # Document responses
@@ -100,4 +103,7 @@ __all__ = [
     "DeleteAPIKeyResponse",
     "ListUserAPIKeysResponse",
     "LLMUsageStatsResponse",
+    
+    # WikiGen responses
+    "WikiGenJobResponse",
 ]
\ No newline at end of file
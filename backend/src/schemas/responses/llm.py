@@ -130,14 +130,51 @@ class ListUserAPIKeysResponse(BaseSchema):
     total_keys: int
 
 
+class LLMBudgetStatusResponse(BaseSchema):
+    """Spend against a user or project LLM budget"""
+    model_config = {"populate_by_name": True}
+    
+    scope: str  # "user" or "project"
+    scope_id: str
+    limit_usd: float
+    spent_usd: float
+    remaining_usd: float
+    exceeded: bool
+
+
 class LLMUsageStatsResponse(BaseSchema):
     """Response for LLM usage statistics"""
     model_config = {"populate_by_name": True}
     
     total_requests: int
     total_tokens_used: int
+    cached_prompt_tokens: int = 0  # Prompt tokens served from provider prompt caches
     tokens_by_provider: Dict[str, int] = Field(default_factory=dict)
     requests_by_model: Dict[str, int]
     cost_estimate: Optional[float] = None
     period_start: datetime
-    period_end: datetime
\ No newline at end of file
+    period_end: datetime
+    budgets: List[LLMBudgetStatusResponse] = Field(default_factory=list)
+
+
+class LLMUsageRollupEntry(BaseSchema):
+    """Aggregated usage for one group (user, project, agent, provider or model)"""
+    model_config = {"populate_by_name": True}
+    
+    key: Optional[str] = None  # None groups calls without attribution
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    cached_prompt_tokens: int = 0
+    cost_usd: float
+
+
+class LLMUsageRollupResponse(BaseSchema):
+    """Response for LLM usage grouped by a dimension"""
+    model_config = {"populate_by_name": True}
+    
+    group_by: str
+    entries: List[LLMUsageRollupEntry] = Field(default_factory=list)
+    period_start: datetime
+    period_end: datetime
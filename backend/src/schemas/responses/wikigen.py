@@ -0,0 +1,21 @@
+"""
+Response schemas for WikiGen API endpoints
+"""
+from typing import Optional
+from datetime import datetime
+
+from src.schemas.base import BaseSchema
+
+
+class WikiGenJobResponse(BaseSchema):
+    """A WikiGen job and where to follow its progress"""
+    model_config = {"populate_by_name": True}
+    
+    job_id: str
+    project_id: str
+    status: str
+    events_url: str  # SSE stream of the job's events
+    last_event_id: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,99 @@
+"""
+WikiGen Wiki Schemas
+
+Pydantic schemas for wiki plans, articles, linked chapters and the per-arc
+archives produced by the WikiGen pipeline.
+"""
+
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from src.schemas.wikigen.arc import Arc
+
+
+class ArticlePlan(BaseModel):
+    """Plan for a single wiki article"""
+    title: str = Field(..., min_length=1, description="Article title")
+    article_type: str = Field(default="main", description="main, character, location, concept or event")
+    filename: str = Field(..., min_length=1, description="File path of the article in the wiki")
+    preview: str = Field(default="", description="One-line description of the article")
+    structure: str = Field(default="", description="Planned section outline (markdown headers)")
+    aliases: List[str] = Field(default_factory=list, description="Other names the subject goes by")
+
+
+class WikiPlan(BaseModel):
+    """Articles to create or update for one arc"""
+    arc_id: int = Field(..., ge=1)
+    mode: str = Field(default="fresh", description="fresh or update")
+    articles: List[ArticlePlan] = Field(default_factory=list)
+
+
+class WikiArticle(BaseModel):
+    """A generated wiki article"""
+    title: str
+    filename: str
+    content: str
+    article_type: str = "main"
+    arc_id: int = Field(..., ge=1, description="Latest arc the content is spoiler-safe for")
+    aliases: List[str] = Field(default_factory=list)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class EnhancedChapter(BaseModel):
+    """A chapter with wiki links inserted"""
+    chapter_number: int = Field(..., ge=1)
+    content: str
+    links: List[str] = Field(default_factory=list, description="Titles of linked articles")
+
+
+class ArcSummary(BaseModel):
+    """Summary of an arc"""
+    arc_id: int = Field(..., ge=1)
+    summary_type: str = "progressive"
+    content: str
+
+
+class ChapterSummary(BaseModel):
+    """Summary of a single chapter"""
+    chapter_number: int = Field(..., ge=1)
+    title: str = ""
+    summary_length: str = "standard"
+    content: str
+    content_hash: str = Field(default="", description="Hash of the chapter the summary was made from")
+
+
+class CharacterDevelopmentSummary(BaseModel):
+    """How one character develops over an arc"""
+    character_name: str
+    content: str
+
+
+class ArcArchive(BaseModel):
+    """Everything generated for one arc (the spoiler-safe wiki as of the arc's end)"""
+    arc: Arc
+    summary: Optional[ArcSummary] = None
+    plan: Optional[WikiPlan] = None
+    articles: List[WikiArticle] = Field(default_factory=list)
+    enhanced_chapters: List[EnhancedChapter] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class WikiResult(BaseModel):
+    """Complete WikiGen output for a story"""
+    story_title: str
+    archives: List[ArcArchive] = Field(default_factory=list)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def arcs(self) -> List[Arc]:
+        return [archive.arc for archive in self.archives]
+
+
+class PipelineEvent(BaseModel):
+    """Structured progress event emitted while the WikiGen pipeline runs"""
+    type: str = Field(..., description="task_started, task_completed, task_failed, pipeline_started, pipeline_completed, pipeline_failed or a task-specific event (e.g. window_started, arc_detected, article_done)")
+    stage: Optional[str] = None
+    task_id: Optional[str] = None
+    data: Dict[str, Any] = Field(default_factory=dict)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -0,0 +1,487 @@
+# backend/src/services/llm/batch.py
+"""
+Provider batch-API support for latency-tolerant bulk LLM workloads
+
+Features:
+- BatchDispatcher accumulates chat completion requests per provider/API key and
+  submits them as JSONL batches once enough requests are queued or max_wait passes
+- Every request gets an asyncio future that resolves with its own result
+- Batch status polling runs as short background jobs (one status check per job),
+  so long-running batches never hold a worker slot
+- PortkeyBatchClient talks to the provider's batch endpoint through the gateway;
+  LocalBatchClient is an in-memory batch server for tests and offline development
+
+Batches live only in this process: if it stops before a batch completes, its
+callers' futures are lost (the provider batch ID is logged for recovery).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from portkey_ai import AsyncPortkey
+
+from src.background.queue import JobQueue, get_job_queue
+from src.background.tasks import poll_llm_batch
+from src.config import settings
+from src.core.constants import PROVIDER_ID
+from src.core.exceptions import LLMError
+
+
+logger = logging.getLogger(__name__)
+
+# Providers whose batch endpoints are reachable through the gateway
+BATCH_SUPPORTED_PROVIDERS = frozenset({"openai", "anthropic"})
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Provider batch statuses after which a batch will not change any more
+TERMINAL_BATCH_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Consecutive status-check errors tolerated before a batch is given up on
+MAX_POLL_ERRORS = 5
+
+BatchClientFactory = Callable[[PROVIDER_ID, str], "BatchClient"]
+ResultTransform = Callable[[Dict[str, Any]], Any]
+
+
+# ============================================================================
+# Batch clients
+# ============================================================================
+
+@dataclass
+class BatchStatus:
+    """Status of a submitted batch as reported by the provider."""
+    batch_id: str
+    status: str
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_BATCH_STATUSES
+
+
+class BatchClient(ABC):
+    """Provider batch endpoint: upload a JSONL batch, poll it, download its results."""
+
+    @abstractmethod
+    async def submit(self, jsonl: bytes, metadata: Optional[Dict[str, str]] = None) -> str:
+        """Upload a JSONL request file and create a batch from it, returning the batch ID."""
+        pass
+
+    @abstractmethod
+    async def retrieve(self, batch_id: str) -> BatchStatus:
+        """Get the current status of a batch."""
+        pass
+
+    @abstractmethod
+    async def fetch_results(self, status: BatchStatus) -> List[Dict[str, Any]]:
+        """Download the result lines (successes and errors) of a finished batch."""
+        pass
+
+
+class PortkeyBatchClient(BatchClient):
+    """Batch client for the self-hosted Portkey gateway (OpenAI-compatible batch API)."""
+
+    def __init__(self, provider: PROVIDER_ID, api_key: str, completion_window: Optional[str] = None):
+        self.provider = provider
+        self.completion_window = completion_window or settings.LLM_BATCH_COMPLETION_WINDOW
+        self._client = AsyncPortkey(base_url=settings.PORTKEY_BASE_URL).with_options(
+            provider=provider,
+            Authorization=f"Bearer {api_key}",
+        )
+
+    async def submit(self, jsonl: bytes, metadata: Optional[Dict[str, str]] = None) -> str:
+        input_file = await self._client.files.create(file=("batch.jsonl", jsonl), purpose="batch")
+        batch = await self._client.batches.create(
+            completion_window=self.completion_window,
+            endpoint=BATCH_ENDPOINT,
+            input_file_id=input_file.id,
+            metadata=metadata,
+        )
+        return batch.id
+
+    async def retrieve(self, batch_id: str) -> BatchStatus:
+        batch = await self._client.batches.retrieve(batch_id)
+        return BatchStatus(
+            batch_id=batch.id,
+            status=batch.status,
+            output_file_id=getattr(batch, "output_file_id", None),
+            error_file_id=getattr(batch, "error_file_id", None),
+        )
+
+    async def fetch_results(self, status: BatchStatus) -> List[Dict[str, Any]]:
+        lines: List[Dict[str, Any]] = []
+        for file_id in (status.output_file_id, status.error_file_id):
+            if not file_id:
+                continue
+            content = await self._client.files.content(file_id)
+            lines.extend(parse_jsonl(content.text))
+        return lines
+
+
+class LocalBatchClient(BatchClient):
+    """
+    In-memory batch server for tests and offline development.
+
+    A batch completes on the `polls_until_complete`-th status check. Each request
+    body is answered by `handler`, which returns a chat completion dict (by default
+    an echo of the last message); a handler exception becomes an error result line.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        polls_until_complete: int = 1,
+    ):
+        self.handler = handler or echo_completion
+        self.polls_until_complete = polls_until_complete
+        self.batches: Dict[str, Dict[str, Any]] = {}
+
+    async def submit(self, jsonl: bytes, metadata: Optional[Dict[str, str]] = None) -> str:
+        batch_id = f"batch_{uuid4().hex}"
+        self.batches[batch_id] = {
+            "requests": parse_jsonl(jsonl.decode("utf-8")),
+            "metadata": metadata or {},
+            "polls": 0,
+            "status": "in_progress",
+            "results": [],
+        }
+        return batch_id
+
+    async def retrieve(self, batch_id: str) -> BatchStatus:
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["status"] == "in_progress" and batch["polls"] >= self.polls_until_complete:
+            batch["results"] = [self._answer(request) for request in batch["requests"]]
+            batch["status"] = "completed"
+        return BatchStatus(
+            batch_id=batch_id,
+            status=batch["status"],
+            output_file_id=f"{batch_id}_output" if batch["status"] == "completed" else None,
+        )
+
+    async def fetch_results(self, status: BatchStatus) -> List[Dict[str, Any]]:
+        return list(self.batches[status.batch_id]["results"])
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            body = self.handler(request["body"])
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+        return {
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "body": body},
+            "error": None,
+        }
+
+
+def echo_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Default LocalBatchClient handler: answer with the last message's content."""
+    messages = body.get("messages") or [{}]
+    content = messages[-1].get("content", "")
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(str(content).split())
+    return {
+        "id": f"chatcmpl-{uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def parse_jsonl(text: str) -> List[Dict[str, Any]]:
+    """Parse JSONL text, skipping blank lines."""
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+# ============================================================================
+# Dispatcher
+# ============================================================================
+
+@dataclass
+class _BatchRequest:
+    """A queued request and the future its caller is waiting on."""
+    custom_id: str
+    body: Dict[str, Any]
+    future: asyncio.Future
+    transform: Optional[ResultTransform] = None
+
+
+@dataclass
+class SubmittedBatch:
+    """A batch that has been submitted to a provider and is being polled."""
+    batch_id: str
+    provider: PROVIDER_ID
+    client: BatchClient
+    requests: Dict[str, _BatchRequest]
+    submitted_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    poll_errors: int = 0
+
+
+class BatchDispatcher:
+    """
+    Accumulates chat completion requests into provider batches and resolves each
+    caller's future once its batch completes.
+
+    Requests are grouped per (provider, API key) since a batch is submitted with a
+    single key. A group is submitted when it reaches max_batch_size or max_wait
+    seconds after its first request, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        client_factory: Optional[BatchClientFactory] = None,
+        job_queue: Optional[JobQueue] = None,
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.client_factory: BatchClientFactory = client_factory or PortkeyBatchClient
+        self._job_queue = job_queue
+        self.max_batch_size = max_batch_size or settings.LLM_BATCH_MAX_REQUESTS
+        self.max_wait = settings.LLM_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.poll_interval = settings.LLM_BATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+
+        self._pending: Dict[Tuple[PROVIDER_ID, str], List[_BatchRequest]] = {}
+        self._api_keys: Dict[Tuple[PROVIDER_ID, str], str] = {}
+        self._timers: Dict[Tuple[PROVIDER_ID, str], asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.in_flight: Dict[str, SubmittedBatch] = {}
+
+    @property
+    def job_queue(self) -> JobQueue:
+        return self._job_queue or get_job_queue()
+
+    @property
+    def pending_count(self) -> int:
+        """Number of requests not yet submitted in a batch."""
+        return sum(len(requests) for requests in self._pending.values())
+
+    # ------------------------------------------------------------------
+    # Accumulation
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        provider: PROVIDER_ID,
+        api_key: str,
+        body: Dict[str, Any],
+        transform: Optional[ResultTransform] = None,
+    ) -> asyncio.Future:
+        """
+        Queue a chat completion request for the next batch.
+
+        Must be called from a running event loop.
+
+        Args:
+            provider: Provider ID the batch is submitted to
+            api_key: Provider API key the batch is submitted with
+            body: Chat completion request body (model, messages, ...)
+            transform: Converts the completion body before it resolves the future
+
+        Returns:
+            Future resolving with the (transformed) chat completion body, or
+            failing with LLMError if the request or its batch fails
+        """
+        if provider.lower() not in BATCH_SUPPORTED_PROVIDERS:
+            raise LLMError(provider=provider, message=f"Provider '{provider}' does not support batch requests")
+
+        loop = asyncio.get_running_loop()
+        key = (provider, hashlib.sha256(api_key.encode()).hexdigest())
+        request = _BatchRequest(
+            custom_id=f"req-{uuid4().hex}",
+            body=body,
+            future=loop.create_future(),
+            transform=transform,
+        )
+        self._pending.setdefault(key, []).append(request)
+        self._api_keys[key] = api_key
+
+        if len(self._pending[key]) >= self.max_batch_size:
+            self._spawn(self._flush_key(key))
+        elif key not in self._timers:
+            self._timers[key] = loop.create_task(self._flush_after(key, self.max_wait))
+        return request.future
+
+    async def flush(self) -> List[SubmittedBatch]:
+        """Submit every pending request group now."""
+        batches = await asyncio.gather(*(self._flush_key(key) for key in list(self._pending)))
+        return [batch for batch in batches if batch is not None]
+
+    async def close(self) -> None:
+        """Cancel timers and fail pending and in-flight requests (used on shutdown)."""
+        for task in [*self._timers.values(), *self._tasks]:
+            task.cancel()
+        await asyncio.gather(*self._timers.values(), *self._tasks, return_exceptions=True)
+        self._timers.clear()
+
+        for requests in self._pending.values():
+            self._reject(requests, "Batch dispatcher shut down before submission")
+        self._pending.clear()
+        for batch in self.in_flight.values():
+            logger.warning(f"Abandoning in-flight batch {batch.batch_id} ({batch.provider}) on shutdown")
+            self._reject(batch.requests.values(), f"Batch dispatcher shut down while batch {batch.batch_id} was in flight")
+        self.in_flight.clear()
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_after(self, key: Tuple[PROVIDER_ID, str], delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timers.pop(key, None)
+        await self._flush_key(key)
+
+    async def _flush_key(self, key: Tuple[PROVIDER_ID, str]) -> Optional[SubmittedBatch]:
+        """Submit the pending requests of one group as a batch."""
+        requests = self._pending.pop(key, [])
+        api_key = self._api_keys.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        if not requests or api_key is None:
+            return None
+
+        provider = key[0]
+        jsonl = "\n".join(
+            json.dumps({"custom_id": r.custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": r.body})
+            for r in requests
+        ).encode("utf-8")
+
+        try:
+            client = self.client_factory(provider, api_key)
+            batch_id = await client.submit(jsonl, metadata={"source": "shuscribe"})
+        except Exception as e:
+            logger.error(f"Failed to submit batch of {len(requests)} requests to {provider}: {e}")
+            self._reject(requests, f"Batch submission failed: {e}")
+            return None
+
+        batch = SubmittedBatch(
+            batch_id=batch_id,
+            provider=provider,
+            client=client,
+            requests={r.custom_id: r for r in requests},
+        )
+        self.in_flight[batch_id] = batch
+        logger.info(f"Submitted batch {batch_id} with {len(requests)} requests to {provider}")
+        await self._enqueue_poll(batch)
+        return batch
+
+    # ------------------------------------------------------------------
+    # Polling (runs as background jobs)
+    # ------------------------------------------------------------------
+
+    async def _enqueue_poll(self, batch: SubmittedBatch, delay: float = 0.0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        await self.job_queue.enqueue("poll_llm_batch", poll_llm_batch, self, batch)
+
+    async def poll_batch(self, batch: SubmittedBatch) -> str:
+        """
+        Check a batch once; resolve its futures if it finished, otherwise schedule the next check.
+
+        Returns:
+            The batch status
+        """
+        try:
+            status = await batch.client.retrieve(batch.batch_id)
+        except Exception as e:
+            batch.poll_errors += 1
+            if batch.poll_errors >= MAX_POLL_ERRORS:
+                self.in_flight.pop(batch.batch_id, None)
+                self._reject(batch.requests.values(), f"Could not get status of batch {batch.batch_id}: {e}")
+                raise
+            logger.warning(f"Status check {batch.poll_errors} for batch {batch.batch_id} failed: {e}")
+            self._spawn(self._enqueue_poll(batch, self.poll_interval))
+            return "unknown"
+
+        batch.poll_errors = 0
+        if not status.finished:
+            self._spawn(self._enqueue_poll(batch, self.poll_interval))
+            return status.status
+
+        self.in_flight.pop(batch.batch_id, None)
+        if status.status != "completed":
+            self._reject(batch.requests.values(), f"Batch {batch.batch_id} {status.status}")
+            return status.status
+
+        try:
+            results = await batch.client.fetch_results(status)
+        except Exception as e:
+            self._reject(batch.requests.values(), f"Could not download results of batch {batch.batch_id}: {e}")
+            raise
+
+        self._resolve(batch, results)
+        logger.info(f"Batch {batch.batch_id} completed with {len(results)} results")
+        return status.status
+
+    def _resolve(self, batch: SubmittedBatch, results: List[Dict[str, Any]]) -> None:
+        """Resolve each request's future from its result line."""
+        for line in results:
+            request = batch.requests.get(line.get("custom_id", ""))
+            if request is None or request.future.done():
+                continue
+
+            response = line.get("response") or {}
+            error = line.get("error")
+            if error or response.get("status_code", 200) >= 400 or "body" not in response:
+                message = (error or {}).get("message") or f"status {response.get('status_code')}"
+                request.future.set_exception(LLMError(
+                    provider=batch.provider,
+                    message=f"Batch request failed: {message}",
+                    details={"batch_id": batch.batch_id, "custom_id": request.custom_id},
+                ))
+                continue
+
+            try:
+                result = request.transform(response["body"]) if request.transform else response["body"]
+            except Exception as e:
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(result)
+
+        self._reject(batch.requests.values(), f"Batch {batch.batch_id} returned no result for the request")
+
+    @staticmethod
+    def _reject(requests: Any, message: str) -> None:
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(LLMError(provider="batch", message=message))
+
+
+# Global batch dispatcher instance
+_batch_dispatcher: Optional[BatchDispatcher] = None
+
+
+def init_batch_dispatcher(**kwargs: Any) -> BatchDispatcher:
+    """Initialize the global batch dispatcher."""
+    global _batch_dispatcher
+    _batch_dispatcher = BatchDispatcher(**kwargs)
+    return _batch_dispatcher
+
+
+def get_batch_dispatcher() -> BatchDispatcher:
+    """Get the global batch dispatcher, creating it on first use."""
+    global _batch_dispatcher
+    if _batch_dispatcher is None:
+        _batch_dispatcher = BatchDispatcher()
+    return _batch_dispatcher
+
+
+def reset_batch_dispatcher() -> None:
+    """Reset the global batch dispatcher (useful for testing)."""
+    global _batch_dispatcher
+    _batch_dispatcher = None
@@ -0,0 +1,242 @@
+# backend/src/services/llm/cassette.py
+"""
+Record/replay cassettes for LLM calls
+
+Agents only talk to the LLM through chat_completion, so wrapping the service
+lets agent runs be recorded once against a real provider and replayed offline
+afterwards: deterministic, free, and fast enough for tests and benchmarks.
+
+Features:
+- Requests are keyed by a hash of what determines the answer (provider, model,
+  messages, sampling and output format); credentials, trace IDs and metadata
+  are left out, so a cassette recorded by one user replays for anyone
+- Streamed calls are stored chunk by chunk with the delay before each chunk,
+  so replays can reproduce time-to-first-token and inter-chunk timing
+- Identical requests made several times replay their recordings in order
+- Cassettes are plain JSON files that can be checked in next to test resources
+
+Usage:
+    cassette = LLMCassette.load("arc_splitter.json")
+    llm_service = CassetteLLMService(cassette, mode=CassetteMode.REPLAY, simulate_timing=True)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+from src.core.exceptions import CassetteMissError
+from src.schemas.llm.models import LLMResponse
+
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_FORMAT_VERSION = 1
+
+# chat_completion arguments that don't change the answer
+IGNORED_REQUEST_ARGS = frozenset({
+    "user_id", "api_key", "trace_id", "metadata", "first_token_timeout", "idle_timeout", "hedge",
+})
+
+
+class CassetteMode(str, Enum):
+    """How a CassetteLLMService handles calls."""
+    RECORD = "record"    # Call the LLM and record every answer (replacing earlier recordings of a request)
+    REPLAY = "replay"    # Answer from the cassette only; unknown requests raise CassetteMissError
+    AUTO = "auto"        # Replay recorded requests, call and record the others
+
+
+def _canonical(value: Any) -> Any:
+    """JSON-compatible form of a request argument."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return {"schema": value.__qualname__, "json_schema": value.model_json_schema()}
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def request_key(**kwargs: Any) -> str:
+    """
+    Hash of the chat_completion arguments that determine the answer.
+
+    Examples:
+        >>> request_key(provider="openai", model="gpt-4o", messages=[]) == request_key(
+        ...     provider="openai", model="gpt-4o", messages=[], api_key="sk-other")
+        True
+    """
+    request = {k: _canonical(v) for k, v in sorted(kwargs.items()) if k not in IGNORED_REQUEST_ARGS and v is not None}
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCassette:
+    """
+    Recorded LLM answers by request key.
+
+    A recording is a list of chunks ({"delay": seconds, "response": LLMResponse
+    dict}); a non-streamed answer is a single chunk whose delay is the call latency.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            path: File the cassette is saved to (None: in memory only)
+        """
+        self.path = Path(path) if path is not None else None
+        self.interactions: Dict[str, List[Dict[str, Any]]] = {}    # key -> recordings, in call order
+        self._replayed: Dict[str, int] = {}                          # key -> recordings served
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LLMCassette":
+        """Load a cassette file, or start an empty cassette there if it doesn't exist yet."""
+        cassette = cls(path)
+        if cassette.path is not None and cassette.path.exists():
+            data = json.loads(cassette.path.read_text(encoding="utf-8"))
+            if data.get("version") != CASSETTE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported cassette version {data.get('version')} in {path}")
+            cassette.interactions = data.get("interactions", {})
+        return cassette
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """Write the cassette as JSON (to path, or where it was loaded from)."""
+        target = Path(path) if path is not None else self.path
+        if target is None:
+            raise ValueError("Cassette has no path to save to")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": CASSETTE_FORMAT_VERSION, "interactions": self.interactions}
+        target.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        logger.info(f"📼 Saved {len(self)} LLM recordings to {target}")
+        return target
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.interactions
+
+    def __len__(self) -> int:
+        return sum(len(recordings) for recordings in self.interactions.values())
+
+    def record(self, key: str, request: Dict[str, Any], chunks: List[Dict[str, Any]], append: bool = True) -> None:
+        """Store a recording for a request (after earlier ones, or replacing them)."""
+        recording = {"request": request, "chunks": chunks}
+        if append and key in self.interactions:
+            self.interactions[key].append(recording)
+        else:
+            self.interactions[key] = [recording]
+
+    def next_recording(self, key: str) -> Optional[Dict[str, Any]]:
+        """The next recording of a request (the last one repeats once all were served)."""
+        recordings = self.interactions.get(key)
+        if not recordings:
+            return None
+        served = self._replayed.get(key, 0)
+        self._replayed[key] = served + 1
+        return recordings[min(served, len(recordings) - 1)]
+
+    def rewind(self) -> None:
+        """Replay every request from its first recording again."""
+        self._replayed.clear()
+
+
+class CassetteLLMService:
+    """
+    LLM service wrapper that records answers to a cassette or replays them.
+
+    Everything except chat_completion is delegated to the wrapped service.
+    """
+
+    def __init__(
+        self,
+        cassette: LLMCassette,
+        llm_service: Any = None,
+        mode: CassetteMode = CassetteMode.REPLAY,
+        simulate_timing: bool = False,
+        speed: float = 1.0,
+    ):
+        """
+        Args:
+            cassette: Cassette to record to / replay from
+            llm_service: Service real calls go to (not needed to replay)
+            mode: Record, replay or auto (replay what is recorded, record the rest)
+            simulate_timing: Replay with the recorded delays (time to first chunk and between chunks)
+            speed: Replay speed-up when simulating timing (2.0: delays halved)
+        """
+        if mode != CassetteMode.REPLAY and llm_service is None:
+            raise ValueError(f"Cassette mode '{mode.value}' needs an llm_service to call")
+        self.cassette = cassette
+        self._llm_service = llm_service
+        self.mode = mode
+        self.simulate_timing = simulate_timing
+        self.speed = speed
+        self.usage_tracker = getattr(llm_service, "usage_tracker", None)
+        self.stats = {"replayed": 0, "recorded": 0}
+        self._recorded_keys: set = set()
+
+    def __getattr__(self, name: str) -> Any:
+        if self._llm_service is None:
+            raise AttributeError(name)
+        return getattr(self._llm_service, name)
+
+    async def chat_completion(self, **kwargs: Any) -> Union[LLMResponse, AsyncIterator[LLMResponse]]:
+        key = request_key(**kwargs)
+        stream = bool(kwargs.get("stream"))
+
+        if self.mode == CassetteMode.REPLAY or (self.mode == CassetteMode.AUTO and key in self.cassette):
+            recording = self.cassette.next_recording(key)
+            if recording is None:
+                raise CassetteMissError(str(kwargs.get("provider")), key)
+            self.stats["replayed"] += 1
+            chunks = recording["chunks"]
+            if stream:
+                return self._replay_stream(chunks)
+            if self.simulate_timing:
+                await asyncio.sleep(sum(chunk["delay"] for chunk in chunks) / self.speed)
+            return LLMResponse.model_validate(chunks[-1]["response"])
+
+        request = {"provider": str(kwargs.get("provider")), "model": str(kwargs.get("model")), "stream": stream}
+        started = time.perf_counter()
+        response = await self._llm_service.chat_completion(**kwargs)
+        if stream:
+            return self._record_stream(response, key, request, opened_after=time.perf_counter() - started)
+        self._store(key, request, [{"delay": time.perf_counter() - started, "response": response.model_dump(mode="json")}])
+        return response
+
+    async def _replay_stream(self, chunks: List[Dict[str, Any]]) -> AsyncIterator[LLMResponse]:
+        for chunk in chunks:
+            if self.simulate_timing and chunk["delay"] > 0:
+                await asyncio.sleep(chunk["delay"] / self.speed)
+            yield LLMResponse.model_validate(chunk["response"])
+
+    async def _record_stream(
+        self, stream: AsyncIterator[LLMResponse], key: str, request: Dict[str, Any], opened_after: float
+    ) -> AsyncIterator[LLMResponse]:
+        """
+        Pass a stream through, storing it once it completed (an interrupted stream is not recorded).
+
+        Delays only count time spent waiting on the provider: the clock restarts
+        when the consumer asks for the next chunk, so time the consumer spends
+        on a chunk (or before it starts reading) is not recorded as latency.
+        """
+        chunks: List[Dict[str, Any]] = []
+        # The first chunk also waited for the stream to open
+        last = time.perf_counter() - opened_after
+        async for chunk in stream:
+            chunks.append({"delay": time.perf_counter() - last, "response": chunk.model_dump(mode="json")})
+            yield chunk
+            last = time.perf_counter()
+        self._store(key, request, chunks)
+
+    def _store(self, key: str, request: Dict[str, Any], chunks: List[Dict[str, Any]]) -> None:
+        # Re-recording a request replaces the recordings of earlier sessions; repeats within this one are kept
+        self.cassette.record(key, request, chunks, append=key in self._recorded_keys)
+        self._recorded_keys.add(key)
+        self.stats["recorded"] += 1
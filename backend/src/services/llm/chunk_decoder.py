@@ -0,0 +1,248 @@
+# backend/src/services/llm/chunk_decoder.py
+"""
+Streaming chunk decoding for Portkey chat completion streams
+
+Features:
+- Single pass over a chunk's delta that extracts the text and classifies it
+  (thinking vs. content) at the same time
+- Provider-specific decoders selected once per stream; the Gemini thinking
+  heuristic only runs for Google streams and uses precompiled patterns
+- A slotted StreamChunk for the internal streaming path, so Pydantic models are
+  only built where a response leaves the service
+"""
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.constants import PROVIDER_ID
+from src.schemas.llm.models import ChunkType
+
+
+# Block kinds found while decoding content_blocks
+_THINKING = 1
+_CONTENT = 2
+
+
+class StreamChunk:
+    """Decoded streaming chunk (lightweight internal representation)."""
+
+    __slots__ = ("content", "chunk_type", "model", "usage", "request_id")
+
+    def __init__(
+        self,
+        content: str,
+        chunk_type: ChunkType,
+        model: Optional[str] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None,
+    ):
+        self.content = content
+        self.chunk_type = chunk_type
+        self.model = model
+        self.usage = usage
+        self.request_id = request_id
+
+    def __repr__(self) -> str:
+        return f"StreamChunk(chunk_type={self.chunk_type.value}, content={self.content!r})"
+
+
+# ============================================================================
+# Gemini thinking heuristic (precompiled)
+# ============================================================================
+
+# Any of these substrings (matched against lowercased content - cheaper than
+# re.IGNORECASE) marks Gemini content as thinking: markdown headers
+# (**Framing Narrative Arcs**), explicit thinking phrases and process
+# descriptions seen in Gemini's reasoning output
+_GEMINI_THINKING_RE = re.compile(
+    "|".join(re.escape(p) for p in (
+        "**",
+        "i'm currently focused on", "i've been analyzing", "i am now",
+        "i'm now", "i need to consider", "let me think", "let me analyze",
+        "i should consider", "i'll now", "i'm leaning towards",
+        "structuring", "mapping", "defining", "analyzing", "outlining",
+        "framing", "revising", "finalizing", "determining",
+    ))
+)
+
+# Two or more distinct first-person reasoning phrases also mark thinking
+_FIRST_PERSON_RE = re.compile(
+    "|".join(re.escape(p) for p in (
+        "i'm", "i've", "i am", "i need", "i should", "i'll", "my focus", "my current",
+    ))
+)
+
+
+def is_gemini_thinking_content(content: str) -> bool:
+    """
+    Detect if content from Gemini appears to be thinking/reasoning content.
+
+    Args:
+        content: The content string to analyze
+
+    Returns:
+        True if content appears to be thinking/reasoning content
+    """
+    if not content or content.isspace():
+        return False
+    content_lower = content.lower()
+    if _GEMINI_THINKING_RE.search(content_lower):
+        return True
+    return len(set(_FIRST_PERSON_RE.findall(content_lower))) >= 2
+
+
+# ============================================================================
+# Delta decoding
+# ============================================================================
+
+def _attr(obj: Any, name: str) -> Any:
+    """
+    Read an optional attribute of a Portkey response object.
+
+    Portkey models allow extra fields, and getattr() on a missing attribute goes
+    through pydantic's __getattr__ and raises internally, which dominates decoding
+    time. Declared fields live in __dict__ and extras in __pydantic_extra__, so
+    they are read directly.
+    """
+    fields = getattr(obj, "__dict__", None)
+    if fields is None:
+        return getattr(obj, name, None)
+    value = fields.get(name)
+    if value is None:
+        extra = getattr(obj, "__pydantic_extra__", None)
+        if extra:
+            value = extra.get(name)
+    return value
+
+
+def _decode_block(block: Any) -> Tuple[str, int]:
+    """
+    Extract the text and kind of a single content block.
+
+    Blocks are dicts when Portkey passes them through as extra fields, or objects
+    with the same attributes.
+
+    Returns:
+        (text, kind) where kind is _THINKING, _CONTENT or 0 if unknown
+    """
+    if isinstance(block, dict):
+        block_type = block.get("type")
+        thinking = block.get("thinking")
+        text = block.get("text")
+        content = block.get("content")
+        delta = block.get("delta")
+    else:
+        block_type = _attr(block, "type")
+        thinking = _attr(block, "thinking")
+        text = _attr(block, "text")
+        content = _attr(block, "content")
+        delta = _attr(block, "delta")
+
+    # Anthropic thinking mode nests the text in a delta: {'index': 0, 'delta': {'thinking': '...'}}
+    if not (thinking or text or content) and delta:
+        if isinstance(delta, dict):
+            text = delta.get("text")
+            thinking = delta.get("thinking")
+        else:
+            text = _attr(delta, "text")
+            thinking = _attr(delta, "thinking")
+        if text:
+            return str(text), _CONTENT
+        if thinking:
+            return str(thinking), _THINKING
+        return "", 0
+
+    value = thinking or text or content
+    if block_type == "thinking":
+        kind = _THINKING
+    elif block_type in ("text", "content"):
+        kind = _CONTENT
+    elif thinking:
+        kind = _THINKING
+    elif text or content:
+        kind = _CONTENT
+    else:
+        kind = 0
+    return (str(value) if value else ""), kind
+
+
+def decode_delta(delta: Any, gemini_thinking_heuristic: bool = False) -> Tuple[str, ChunkType]:
+    """
+    Extract the text of a streaming delta and classify it in a single pass.
+
+    Args:
+        delta: choices[0].delta of a streaming chunk
+        gemini_thinking_heuristic: Classify plain content that looks like Gemini
+                                   reasoning as thinking
+
+    Returns:
+        (content, chunk_type)
+    """
+    content_blocks = _attr(delta, "content_blocks")
+    if content_blocks:
+        parts = []
+        kinds = 0
+        for block in content_blocks:
+            text, kind = _decode_block(block)
+            if text:
+                parts.append(text)
+            kinds |= kind
+
+        # Mixed thinking and content is reported as thinking
+        if kinds & _THINKING:
+            chunk_type = ChunkType.THINKING
+        elif kinds & _CONTENT:
+            chunk_type = ChunkType.CONTENT
+        else:
+            chunk_type = ChunkType.UNKNOWN
+        return "".join(parts), chunk_type
+
+    thinking = _attr(delta, "thinking")
+    if thinking:
+        return str(thinking), ChunkType.THINKING
+
+    text = _attr(delta, "content") or _attr(delta, "text")
+    if text:
+        text = str(text)
+        if gemini_thinking_heuristic and is_gemini_thinking_content(text):
+            return text, ChunkType.THINKING
+        return text, ChunkType.CONTENT
+
+    return "", ChunkType.UNKNOWN
+
+
+class ChunkDecoder:
+    """Decodes Portkey ChatCompletionChunks for one provider."""
+
+    __slots__ = ("provider", "gemini_thinking_heuristic")
+
+    def __init__(self, provider: PROVIDER_ID, gemini_thinking_heuristic: bool = False):
+        self.provider = provider
+        self.gemini_thinking_heuristic = gemini_thinking_heuristic
+
+    def decode(self, chunk: Any) -> StreamChunk:
+        """Decode a streaming chunk into a StreamChunk."""
+        choices = chunk.choices
+        delta = choices[0].delta if choices else None
+        if delta is not None:
+            content, chunk_type = decode_delta(delta, self.gemini_thinking_heuristic)
+        else:
+            content, chunk_type = "", ChunkType.UNKNOWN
+
+        usage = chunk.usage
+        return StreamChunk(
+            content=content,
+            chunk_type=chunk_type,
+            model=chunk.model,
+            usage=usage.model_dump() if usage else None,
+            request_id=chunk.id,
+        )
+
+
+def get_chunk_decoder(provider: PROVIDER_ID) -> ChunkDecoder:
+    """
+    Get the chunk decoder for a provider (chosen once per stream).
+
+    Google streams may inline thinking in plain content, so they use the Gemini
+    heuristic; other providers mark thinking explicitly via content_blocks.
+    """
+    return ChunkDecoder(provider, gemini_thinking_heuristic=provider.lower() == "google")
@@ -9,9 +9,11 @@ Features:
 - Comprehensive error handling and logging
 - Support for multiple LLM providers (OpenAI, Anthropic, Google, etc.)
 - Thinking effort support with model-specific budget token conversion
+- Prompt prefix caching for messages marked cacheable
 """
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any, AsyncIterator, Type, Union, cast
+from typing import Dict, List, Optional, Any, AsyncIterator, Awaitable, Callable, Type, Union, cast
 from uuid import UUID
 from portkey_ai.api_resources.types.chat_complete_type import ChatCompletionChunk, ChatCompletions
 from pydantic import BaseModel
@@ -40,7 +42,12 @@ from src.database.interfaces.user_repository import IUserRepository
 from src.schemas.llm.models import LLMMessage, LLMResponse, ChunkType, ThinkingEffort
 from src.schemas.llm.config import LLMCapability, HostedModelInstance, LLMProvider, AIModelFamily
 from src.core.encryption import decrypt_api_key
-from src.utils import json_schema_to_prompt_instructions
+from src.services.llm.batch import BATCH_SUPPORTED_PROVIDERS, BatchDispatcher, get_batch_dispatcher
+from src.services.llm.chunk_decoder import decode_delta, get_chunk_decoder, is_gemini_thinking_content
+from src.services.llm.prompt_cache import to_provider_messages
+from src.services.llm.schema_cache import compile_response_format, simplify_schema_for_google
+from src.services.llm.streaming import guard_stream, ttft_tracker
+from src.services.llm.usage_tracker import UsageTracker, get_usage_tracker
 
 
 logger = logging.getLogger(__name__)
@@ -59,11 +66,22 @@ class LLMService:
     - Self-hosted Portkey Gateway for privacy
     - Multi-provider support (OpenAI, Anthropic, Google, etc.)
     - Thinking effort support with model-specific budget token conversion
+    - Token usage and cost accounting (including final usage of streams and prompt cache hits)
+    - Prompt prefix caching (cache_control breakpoints for messages marked cacheable)
+    - Provider batch-API submission for latency-tolerant bulk workloads
     - Comprehensive logging and error handling
     """
     
-    def __init__(self, user_repository: Optional[IUserRepository] = None):
+    def __init__(
+        self,
+        user_repository: Optional[IUserRepository] = None,
+        usage_tracker: Optional[UsageTracker] = None,
+        batch_dispatcher: Optional[BatchDispatcher] = None,
+    ):
         self.user_repository = user_repository
+        # Fall back to the application-wide tracker (None when usage tracking isn't initialized)
+        self.usage_tracker = usage_tracker if usage_tracker is not None else get_usage_tracker()
+        self._batch_dispatcher = batch_dispatcher
         
         # Validate self-hosted Portkey Gateway is configured
         if not settings.PORTKEY_BASE_URL:
@@ -202,34 +220,14 @@ class LLMService:
         Returns:
             Simplified schema without unsupported validation constraints
         """
-        def remove_validation_constraints(obj: Any) -> Any:
-            if isinstance(obj, dict):
-                # Create a new dict without validation constraints
-                cleaned = {}
-                for key, value in obj.items():
-                    # Skip validation constraint keys
-                    if key in ['minimum', 'maximum', 'minLength', 'maxLength', 
-                              'minItems', 'maxItems', 'pattern', 'format']:
-                        continue
-                    # Recursively clean nested objects
-                    cleaned[key] = remove_validation_constraints(value)
-                return cleaned
-            elif isinstance(obj, list):
-                # Recursively clean list items
-                return [remove_validation_constraints(item) for item in obj]
-            else:
-                # Return primitive values as-is
-                return obj
-        
-        return remove_validation_constraints(schema)
+        return simplify_schema_for_google(schema)
 
     def _determine_chunk_type_from_content_blocks(self, chunk: ChatCompletionChunk) -> ChunkType:
         """
         Determine chunk type using Portkey's built-in content_blocks structure for thinking models.
         
-        For thinking/reasoning models, Portkey provides content in content_blocks array:
-        - thinking content: content_blocks with type "thinking" or "thinking" field
-        - regular content: content_blocks with type "text"/"content" or regular content field
+        Streams are decoded with a provider-specific ChunkDecoder; this provider-agnostic
+        helper is kept for callers handling individual chunks.
         
         Args:
             chunk: The streaming chunk from Portkey
@@ -237,159 +235,21 @@ class LLMService:
         Returns:
             ChunkType indicating whether this is thinking or content
         """
-        try:
-            # Check if this chunk has content_blocks (thinking models)
-            if (hasattr(chunk, 'choices') and chunk.choices and 
-                hasattr(chunk.choices[0], 'delta') and chunk.choices[0].delta):
-                
-                delta = chunk.choices[0].delta
-                
-                # Check for content_blocks array (thinking models)
-                content_blocks = getattr(delta, 'content_blocks', None)
-                if content_blocks:
-                    # DEBUG: Log content_blocks structure for the first few chunks
-                    if len(content_blocks) <= 2:  # Only log first couple chunks to avoid spam
-                        logger.debug(f"Content blocks structure: {len(content_blocks)} blocks")
-                        for i, block in enumerate(content_blocks):
-                            if hasattr(block, '__dict__'):
-                                logger.debug(f"  Block {i} attributes: {list(block.__dict__.keys())}")
-                            elif isinstance(block, dict):
-                                logger.debug(f"  Block {i} dict keys: {list(block.keys())}")
-                            logger.debug(f"  Block {i} type: {type(block)}, repr: {repr(block)[:200]}...")
-                    
-                    # Process each content block to determine type
-                    has_thinking = False
-                    has_content = False
-                    
-                    for content_block in content_blocks:
-                        # Check for explicit type field
-                        if hasattr(content_block, 'type'):
-                            if content_block.type == 'thinking':
-                                has_thinking = True
-                            elif content_block.type in ['text', 'content']:
-                                has_content = True
-                        # Check for thinking field presence
-                        elif hasattr(content_block, 'thinking') and content_block.thinking:
-                            has_thinking = True
-                        elif hasattr(content_block, 'text') and content_block.text:
-                            has_content = True
-                        elif hasattr(content_block, 'content') and content_block.content:
-                            has_content = True
-                        # Check for delta field (Anthropic thinking mode)
-                        elif hasattr(content_block, 'delta') and content_block.delta:
-                            if hasattr(content_block.delta, 'thinking') and content_block.delta.thinking:
-                                has_thinking = True
-                            elif hasattr(content_block.delta, 'text') and content_block.delta.text:
-                                has_content = True
-                        # Handle dict structure
-                        elif isinstance(content_block, dict):
-                            if 'type' in content_block:
-                                if content_block['type'] == 'thinking':
-                                    has_thinking = True
-                                elif content_block['type'] in ['text', 'content']:
-                                    has_content = True
-                            elif 'thinking' in content_block and content_block['thinking']:
-                                has_thinking = True
-                            elif 'text' in content_block and content_block['text']:
-                                has_content = True
-                            elif 'content' in content_block and content_block['content']:
-                                has_content = True
-                            # Handle Anthropic delta structure: {'index': 0, 'delta': {'thinking': '...'}}
-                            elif 'delta' in content_block and content_block['delta']:
-                                delta = content_block['delta']
-                                if isinstance(delta, dict):
-                                    if 'thinking' in delta and delta['thinking']:
-                                        has_thinking = True
-                                    elif 'text' in delta and delta['text']:
-                                        has_content = True
-                    
-                    # Return type based on what we found
-                    if has_thinking and not has_content:
-                        return ChunkType.THINKING
-                    elif has_content and not has_thinking:
-                        return ChunkType.CONTENT
-                    elif has_thinking and has_content:
-                        # Mixed content - return THINKING to indicate this chunk has reasoning
-                        return ChunkType.THINKING
-                    else:
-                        logger.debug(f"No thinking or content detected in {len(content_blocks)} content_blocks")
-                        return ChunkType.UNKNOWN
-                
-                # Regular content (non-thinking models) or fallback for Gemini
-                if hasattr(delta, 'content') and delta.content:
-                    # GEMINI FALLBACK: Check if the content looks like thinking based on patterns
-                    content_str = str(delta.content)
-                    if self._is_gemini_thinking_content(content_str):
-                        logger.debug(f"Detected Gemini thinking content via pattern matching")
-                        return ChunkType.THINKING
-                    else:
-                        return ChunkType.CONTENT
-            
-            return ChunkType.UNKNOWN
-            
-        except Exception as e:
-            logger.debug(f"Error determining chunk type from content_blocks: {e}")
+        if not chunk.choices or not chunk.choices[0].delta:
             return ChunkType.UNKNOWN
+        return decode_delta(chunk.choices[0].delta, gemini_thinking_heuristic=True)[1]
 
     def _is_gemini_thinking_content(self, content: str) -> bool:
         """
         Detect if content from Gemini appears to be thinking/reasoning content.
         
-        Gemini thinking models often use specific patterns in their reasoning.
-        
         Args:
             content: The content string to analyze
             
         Returns:
             True if content appears to be thinking/reasoning content
         """
-        if not content or not content.strip():
-            return False
-        
-        content_lower = content.lower().strip()
-        
-        # Gemini thinking patterns (based on the logs)
-        gemini_thinking_patterns = [
-            # Headers with asterisks (common in thinking)
-            "***", "**",
-            # Explicit thinking phrases
-            "i'm currently focused on", "i've been analyzing", "i am now",
-            "i'm now", "i need to consider", "let me think", "let me analyze",
-            "i should consider", "i'll now", "i'm leaning towards",
-            # Process descriptions
-            "structuring", "mapping", "defining", "analyzing", "outlining",
-            "framing", "revising", "finalizing", "determining",
-            # Gemini-specific thinking headers seen in logs
-            "framing narrative", "mapping story", "structuring narrative",
-            "defining arc", "analyzing story", "outlining arc", "revising story"
-        ]
-        
-        # Check for thinking patterns
-        for pattern in gemini_thinking_patterns:
-            if pattern in content_lower:
-                return True
-        
-        # Check for structured thinking with headers (like "**Framing Narrative Arcs**")
-        if content.strip().startswith("**") and content.count("**") >= 2:
-            return True
-        
-        # Check if it looks like a reasoning process (first-person analysis)
-        first_person_reasoning = [
-            "i'm", "i've", "i am", "i need", "i should", "i'll", "my focus", "my current"
-        ]
-        
-        # If it contains first-person reasoning language, likely thinking
-        first_person_count = sum(1 for phrase in first_person_reasoning if phrase in content_lower)
-        if first_person_count >= 2:  # Multiple first-person reasoning phrases
-            return True
-        
-        # Check if it contains JSON-like structured output (likely final content, not thinking)
-        stripped_content = content.strip()
-        if (stripped_content.startswith("{") and "}" in stripped_content) or \
-           (stripped_content.startswith("[") and "]" in stripped_content):
-            return False  # Structured output is content, not thinking
-        
-        return False
+        return is_gemini_thinking_content(content)
 
     def _extract_content_from_chunk(self, chunk: ChatCompletionChunk) -> str:
         """
@@ -397,7 +257,6 @@ class LLMService:
         
         For thinking models, content is in content_blocks array with different types.
         We extract ALL content (both thinking and regular) and return it as a single string.
-        The chunk type determination happens separately.
         
         Args:
             chunk: The streaming chunk from Portkey
@@ -405,112 +264,9 @@ class LLMService:
         Returns:
             String content from the chunk
         """
-        try:
-            if (hasattr(chunk, 'choices') and chunk.choices and 
-                hasattr(chunk.choices[0], 'delta') and chunk.choices[0].delta):
-                
-                delta = chunk.choices[0].delta
-                
-                # Check for content_blocks array (thinking models like Gemini, Anthropic)
-                content_blocks = getattr(delta, 'content_blocks', None)
-                if content_blocks:
-                    # DEBUG: Log actual content_blocks structure for Anthropic (first few chunks only)
-                    if not content_blocks or len(content_blocks) == 0:
-                        logger.debug(f"Empty content_blocks array: {content_blocks}")
-                    elif len(content_blocks) <= 3:  # Only log first few chunks to avoid spam
-                        # Log structure of first content block for debugging
-                        first_block = content_blocks[0]
-                        if hasattr(first_block, '__dict__'):
-                            logger.debug(f"Content block attributes: {list(first_block.__dict__.keys())}")
-                        elif isinstance(first_block, dict):
-                            logger.debug(f"Content block dict keys: {list(first_block.keys())}")
-                        logger.debug(f"Content block type: {type(first_block)}, repr: {repr(first_block)}")
-                    
-                    # Extract content from all content blocks
-                    content_parts = []
-                    for content_block in content_blocks:
-                        # Handle different content block structures
-                        content_found = False
-                        
-                        # Try common Anthropic thinking field names
-                        if hasattr(content_block, 'thinking') and content_block.thinking:
-                            content_parts.append(str(content_block.thinking))
-                            content_found = True
-                        elif hasattr(content_block, 'text') and content_block.text:
-                            content_parts.append(str(content_block.text))
-                            content_found = True
-                        elif hasattr(content_block, 'content') and content_block.content:
-                            content_parts.append(str(content_block.content))
-                            content_found = True
-                        # Try additional Anthropic-specific fields
-                        elif hasattr(content_block, 'delta') and content_block.delta:
-                            if hasattr(content_block.delta, 'text') and content_block.delta.text:
-                                content_parts.append(str(content_block.delta.text))
-                                content_found = True
-                            elif hasattr(content_block.delta, 'thinking') and content_block.delta.thinking:
-                                content_parts.append(str(content_block.delta.thinking))
-                                content_found = True
-                        # Handle content_block as dict
-                        elif isinstance(content_block, dict):
-                            if 'thinking' in content_block and content_block['thinking']:
-                                content_parts.append(str(content_block['thinking']))
-                                content_found = True
-                            elif 'text' in content_block and content_block['text']:
-                                content_parts.append(str(content_block['text']))
-                                content_found = True
-                            elif 'content' in content_block and content_block['content']:
-                                content_parts.append(str(content_block['content']))
-                                content_found = True
-                            elif 'delta' in content_block and content_block['delta']:
-                                delta = content_block['delta']
-                                if isinstance(delta, dict):
-                                    if 'text' in delta and delta['text']:
-                                        content_parts.append(str(delta['text']))
-                                        content_found = True
-                                    elif 'thinking' in delta and delta['thinking']:
-                                        content_parts.append(str(delta['thinking']))
-                                        content_found = True
-                        
-                        if not content_found:
-                            # DEBUG: Log unhandled content block structure (limit spam)
-                            logger.debug(f"Unhandled content block: type={type(content_block)}, "
-                                        f"is_dict={isinstance(content_block, dict)}, "
-                                        f"repr={repr(content_block)[:100]}...")
-                    
-                    if content_parts:
-                        return ''.join(content_parts)
-                    else:
-                        # DEBUG: Log when no content was extracted
-                        logger.debug(f"No content extracted from {len(content_blocks)} content_blocks")
-                        return ""
-                
-                # Try additional fallback patterns for Anthropic thinking mode
-                # Check for direct delta fields that might contain thinking/content
-                thinking_content = getattr(delta, 'thinking', None)
-                if thinking_content:
-                    logger.debug(f"Found thinking content in delta.thinking: {len(str(thinking_content))} chars")
-                    return str(thinking_content)
-                
-                text_content = getattr(delta, 'text', None)
-                if text_content:
-                    logger.debug(f"Found content in delta.text: {len(str(text_content))} chars")
-                    return str(text_content)
-                
-                # Regular content (non-thinking models)
-                if hasattr(delta, 'content') and delta.content:
-                    return str(delta.content)
-                
-                # DEBUG: Log when no content sources found (once per stream)
-                has_content_blocks = content_blocks is not None
-                has_regular_content = hasattr(delta, 'content') and delta.content
-                logger.debug(f"No content found: has_content_blocks={has_content_blocks}, "
-                           f"has_regular_content={has_regular_content}")
-            
-            return ""
-            
-        except Exception as e:
-            logger.debug(f"Error extracting content from chunk: {e}")
+        if not chunk.choices or not chunk.choices[0].delta:
             return ""
+        return decode_delta(chunk.choices[0].delta)[0]
 
     def _determine_chunk_type(self, content: str, provider: str, model: str, chunk_metadata: Optional[Dict[str, Any]] = None) -> ChunkType:
         """
@@ -565,6 +321,37 @@ class LLMService:
         # Default to content for most cases
         return ChunkType.CONTENT
 
+    async def _resolve_api_key(
+        self,
+        provider: PROVIDER_ID,
+        model: MODEL_NAME,
+        user_id: Optional[UUID],
+        api_key: Optional[str],
+    ) -> str:
+        """
+        Get the provider API key for a request: the direct key if given, otherwise
+        the user's stored key, decrypted in memory only.
+        
+        Raises:
+            ValidationError: If no key can be found
+        """
+        if api_key:
+            logger.info(f"Using direct API key for provider={provider}, model={model}")
+            return api_key
+        
+        # Get user's encrypted API key from database
+        if not self.user_repository:
+            raise ValidationError("UserRepository is required when using user_id for API key lookup.")
+        if not user_id:
+            raise ValidationError("user_id is required when not using direct API key.")
+        
+        user_api_key_record = await self.user_repository.get_api_key(user_id, provider)
+        if not user_api_key_record:
+            raise ValidationError(f"No API key found for provider '{provider}' for user '{user_id}'. Please add it via settings.")
+        
+        logger.info(f"Using database API key for provider={provider}, model={model}, user={user_id}")
+        return decrypt_api_key(str(user_api_key_record.encrypted_api_key))
+    
     async def chat_completion(
         self,
         provider: PROVIDER_ID, # The provider ID (e.g., 'openai')
@@ -579,6 +366,9 @@ class LLMService:
         metadata: Optional[Dict[str, Any]] = None,
         stream: bool = False,
         response_format: Optional[Type[BaseModel]] = None,
+        first_token_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        hedge: Optional[bool] = None,
         
         **kwargs
     ) -> Union[LLMResponse, AsyncIterator[LLMResponse]]:
@@ -604,9 +394,16 @@ class LLMService:
             max_tokens: Maximum tokens to generate
             thinking: Thinking effort for models that support thinking modes
             trace_id: Optional trace ID for debugging
-            metadata: Optional metadata for the request
+            metadata: Optional metadata for the request; `project_id` and `agent` keys
+                      are used to attribute usage
             stream: Whether to return a stream of responses
             response_format: Optional pydantic model type for structured output
+            first_token_timeout: Streaming only - max seconds to wait for the first chunk
+                                 (defaults to settings.LLM_STREAM_FIRST_TOKEN_TIMEOUT, 0 disables)
+            idle_timeout: Streaming only - max seconds between chunks
+                          (defaults to settings.LLM_STREAM_IDLE_TIMEOUT, 0 disables)
+            hedge: Streaming only - fire a backup request when the first token is slower
+                   than the recent p95 (defaults to settings.LLM_STREAM_HEDGING_ENABLED)
             **kwargs: Additional parameters for the LLM
                      For thinking/reasoning models (e.g., claude-3-7-sonnet-latest), 
                      include thinking={type: "enabled", budget_tokens: 2030} and
@@ -618,6 +415,7 @@ class LLMService:
             
         Raises:
             LLMError: If the LLM request fails
+            LLMTimeoutError: If a stream produces no first token / stalls past its timeouts
             ValidationError: If user/keys are invalid or model not found
             
         Examples:
@@ -659,24 +457,7 @@ class LLMService:
         decrypted_key = None
         try:
             # 1. Get API key (either direct or from database)
-            if api_key:
-                # Use direct API key
-                decrypted_key = api_key
-                logger.info(f"Using direct API key for provider={provider}, model={model}")
-            else:
-                # Get user's encrypted API key from database
-                if not self.user_repository:
-                    raise ValidationError("UserRepository is required when using user_id for API key lookup.")
-                if not user_id:
-                    raise ValidationError("user_id is required when not using direct API key.")
-                
-                user_api_key_record = await self.user_repository.get_api_key(user_id, provider)
-                if not user_api_key_record:
-                    raise ValidationError(f"No API key found for provider '{provider}' for user '{user_id}'. Please add it via settings.")
-                
-                # Decrypt the key (only in memory, temporarily)
-                decrypted_key = decrypt_api_key(str(user_api_key_record.encrypted_api_key))
-                logger.info(f"Using database API key for provider={provider}, model={model}, user={user_id}")
+            decrypted_key = await self._resolve_api_key(provider, model, user_id, api_key)
             
             # 2. Create fresh Portkey client for this request - pointing to self-hosted gateway
             portkey_client = AsyncPortkey(
@@ -720,37 +501,23 @@ class LLMService:
             model_capabilities = get_capabilities_for_hosted_model(provider, model)
             supports_structured_output = LLMCapability.STRUCTURED_OUTPUT in model_capabilities
             
-            # Convert messages to OpenAI format (Portkey's standard for chat completions)
-            openai_messages = [
-                {"role": msg.role, "content": msg.content}
-                for msg in messages
-            ]
+            # Convert messages to OpenAI format (Portkey's standard for chat completions),
+            # with prompt cache breakpoints on cacheable prefixes where the provider needs them
+            openai_messages = to_provider_messages(messages, provider)
             
             # Handle response_format conversion based on model capabilities
+            # (compiled once per model class / provider / capability and cached)
+            compiled_format = None
             if response_format is not None:
-                # Get the base JSON schema
-                base_schema = response_format.model_json_schema()
+                compiled_format = compile_response_format(response_format, provider.lower(), supports_structured_output)
                 
-                if supports_structured_output:
+                if compiled_format.response_format is not None:
                     # Model supports structured output - use response_format parameter
                     logger.info(f"Model {model} supports structured output - using response_format parameter")
-                    
-                    # Simplify schema for Google Gemini (remove validation constraints)
-                    if provider.lower() == "google":
-                        simplified_schema = self._simplify_schema_for_google(base_schema)
-                        logger.info(f"Using simplified schema for Google Gemini (removed validation constraints)")
-                    else:
-                        simplified_schema = base_schema
-                        logger.info(f"Using standard schema for provider: {provider}")
                 else:
                     # Model doesn't support structured output - append instructions to prompt
                     logger.info(f"Model {model} does not support structured output - appending schema instructions to prompt")
-                    
-                    # Generate prompt instructions from schema
-                    schema_instructions = json_schema_to_prompt_instructions(
-                        base_schema, 
-                        response_format.__name__
-                    )
+                    schema_instructions = compiled_format.prompt_instructions or ""
                     
                     # Append instructions to the last message (assuming it's a user message)
                     if openai_messages and openai_messages[-1]["role"] in ["user", "system"]:
@@ -772,6 +539,10 @@ class LLMService:
                 **kwargs,
             }
             
+            # Ask for a final usage chunk so streamed calls can be accounted for
+            if stream and self.usage_tracker is not None:
+                create_kwargs.setdefault("stream_options", {"include_usage": True})
+            
             # Handle temperature based on model support and thinking mode
             if thinking is not None and provider.lower() == "anthropic":
                 # Anthropic requires temperature=1.0 when thinking is enabled
@@ -802,24 +573,8 @@ class LLMService:
                     create_kwargs["max_tokens"] = adjusted_max_tokens
 
             # Only set response_format if model supports structured output
-            if response_format is not None and supports_structured_output:
-                # Get the base JSON schema
-                base_schema = response_format.model_json_schema()
-                
-                # Simplify schema for Google Gemini (remove validation constraints)
-                if provider.lower() == "google":
-                    simplified_schema = self._simplify_schema_for_google(base_schema)
-                else:
-                    simplified_schema = base_schema
-                
-                # Convert Pydantic model to stable JSON schema format
-                create_kwargs["response_format"] = {
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": f"{response_format.__name__.lower()}_schema",
-                        "schema": simplified_schema
-                    }
-                }
+            if compiled_format is not None and compiled_format.response_format is not None:
+                create_kwargs["response_format"] = compiled_format.response_format
 
             # Use stable chat.completions.create() method
             response: ChatCompletions | AsyncIterator[ChatCompletionChunk] = await portkey_client.with_options(
@@ -831,10 +586,25 @@ class LLMService:
                 # For streaming, response should be AsyncIterator[ChatCompletionChunk]
                 # We use cast since we know at runtime this will be the streaming type
                 stream_response = cast(AsyncIterator[ChatCompletionChunk], response)
+                
+                # Backup request for hedging uses a fresh client with identical options
+                async def open_hedge_stream() -> AsyncIterator[ChatCompletionChunk]:
+                    hedge_client = AsyncPortkey(base_url=settings.PORTKEY_BASE_URL)
+                    return await hedge_client.with_options(
+                        **portkey_options
+                    ).chat.completions.create(**create_kwargs)
+                
+                hedging_enabled = settings.LLM_STREAM_HEDGING_ENABLED if hedge is None else hedge
+                
                 return self._stream_response_to_llm_response(
                     stream_response,
                     provider,
-                    trace_id
+                    trace_id,
+                    model=model,
+                    usage_metadata=final_metadata,
+                    first_token_timeout=settings.LLM_STREAM_FIRST_TOKEN_TIMEOUT if first_token_timeout is None else first_token_timeout,
+                    idle_timeout=settings.LLM_STREAM_IDLE_TIMEOUT if idle_timeout is None else idle_timeout,
+                    open_hedge_stream=open_hedge_stream if hedging_enabled else None,
                 )
             else:
                 # Extract content and determine chunk type using Portkey's content_blocks structure
@@ -842,6 +612,9 @@ class LLMService:
                 completion_response = cast(ChatCompletions, response)
                 content, chunk_type = self._extract_content_from_non_streaming_response(completion_response)
                 
+                if response.usage: # type: ignore
+                    self._record_usage(provider, model, response.usage.model_dump(), final_metadata, trace_id, streaming=False) # type: ignore
+                
                 return LLMResponse(
                     content=content,
                     model=response.model, # type: ignore
@@ -885,11 +658,130 @@ class LLMService:
             if decrypted_key is not None and not api_key:
                 del decrypted_key
     
+    @property
+    def batch_dispatcher(self) -> BatchDispatcher:
+        """Batch dispatcher for submit_batch_completion (the application-wide one by default)."""
+        if self._batch_dispatcher is None:
+            self._batch_dispatcher = get_batch_dispatcher()
+        return self._batch_dispatcher
+    
+    async def submit_batch_completion(
+        self,
+        provider: PROVIDER_ID,
+        model: MODEL_NAME,
+        messages: List[LLMMessage],
+        user_id: Optional[UUID] = None,
+        api_key: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        trace_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        response_format: Optional[Type[BaseModel]] = None,
+    ) -> "asyncio.Future[LLMResponse]":
+        """
+        Queue a chat completion on the provider's batch API.
+        
+        Batch requests are cheaper and not subject to interactive rate limits, but
+        may take up to the batch completion window to finish, so this is meant for
+        latency-tolerant bulk work (whole-novel wikigen runs). Requests are grouped
+        into batches by the BatchDispatcher; thinking effort is not supported.
+        
+        Args:
+            provider: LLM provider ID (must support batches, e.g. 'openai', 'anthropic')
+            model: Exact hosted model name to use
+            messages: List of messages for the conversation
+            user_id: UUID of the user making the request (required if using database)
+            api_key: Direct API key (bypasses database lookup if provided)
+            temperature: Sampling temperature (0.0-1.0)
+            max_tokens: Maximum tokens to generate
+            trace_id: Optional trace ID for debugging
+            metadata: Optional metadata; `project_id` and `agent` keys are used to attribute usage
+            response_format: Optional pydantic model type for structured output
+            
+        Returns:
+            Future resolving with the LLMResponse once the batch completes
+            
+        Raises:
+            ValidationError: If the model, provider or API key is invalid
+            
+        Example:
+            futures = [
+                await llm_service.submit_batch_completion("openai", "gpt-4.1-mini", messages, user_id=user_id)
+                for messages in chapter_prompts
+            ]
+            responses = await asyncio.gather(*futures)
+        """
+        if not get_hosted_model_instance(provider, model):
+            raise ValidationError(f"Model '{model}' not found for provider '{provider}' in the LLM catalog.")
+        if provider.lower() not in BATCH_SUPPORTED_PROVIDERS:
+            raise ValidationError(f"Provider '{provider}' does not support batch requests.")
+        if not api_key and not user_id:
+            raise ValidationError("Either 'api_key' or 'user_id' must be provided.")
+        
+        decrypted_key = await self._resolve_api_key(provider, model, user_id, api_key)
+        
+        openai_messages = to_provider_messages(messages, provider)
+        body: Dict[str, Any] = {"model": model, "messages": openai_messages}
+        
+        if response_format is not None:
+            supports_structured_output = LLMCapability.STRUCTURED_OUTPUT in get_capabilities_for_hosted_model(provider, model)
+            compiled_format = compile_response_format(response_format, provider.lower(), supports_structured_output)
+            if compiled_format.response_format is not None:
+                body["response_format"] = compiled_format.response_format
+            elif openai_messages and openai_messages[-1]["role"] in ["user", "system"]:
+                openai_messages[-1]["content"] += compiled_format.prompt_instructions or ""
+            else:
+                openai_messages.append({"role": "system", "content": f"Important: {compiled_format.prompt_instructions}"})
+        
+        if model_supports_temperature(provider, model, False):
+            body["temperature"] = temperature
+        if max_tokens is not None:
+            if should_use_completion_tokens_param(provider, model):
+                body["max_completion_tokens"] = max_tokens
+            else:
+                body["max_tokens"] = max_tokens
+        
+        request_metadata = dict(metadata or {})
+        if user_id:
+            request_metadata["user_id"] = str(user_id)
+        
+        def to_llm_response(completion: Dict[str, Any]) -> LLMResponse:
+            choices = completion.get("choices") or [{}]
+            usage = completion.get("usage")
+            if usage:
+                self._record_usage(
+                    provider, model, usage, request_metadata, trace_id, streaming=False,
+                    cost_multiplier=settings.LLM_BATCH_COST_MULTIPLIER,
+                )
+            return LLMResponse(
+                content=(choices[0].get("message") or {}).get("content") or "",
+                model=completion.get("model") or model,
+                chunk_type=ChunkType.CONTENT,
+                usage=usage,
+                metadata={
+                    "provider": provider,
+                    "gateway": "self-hosted",
+                    "portkey_request_id": completion.get("id"),
+                    "trace_id": trace_id,
+                    "auth_method": "direct_api_key" if api_key else "database_lookup",
+                    "streaming": False,
+                    "batch": True,
+                },
+            )
+        
+        logger.info(f"Queueing batch LLM request: provider={provider}, model={model}")
+        return self.batch_dispatcher.submit(provider, decrypted_key, body, transform=to_llm_response)
+    
     async def _stream_response_to_llm_response(
         self,
         portkey_stream_response: AsyncIterator[ChatCompletionChunk],
         provider: PROVIDER_ID,
         trace_id: Optional[str],
+        model: Optional[MODEL_NAME] = None,
+        first_token_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        open_hedge_stream: Optional[Callable[[], Awaitable[AsyncIterator[ChatCompletionChunk]]]] = None,
+        usage_metadata: Optional[Dict[str, Any]] = None,
     ) -> AsyncIterator[LLMResponse]:
         """
         Converts a Portkey streaming response into an AsyncIterator of LLMResponse objects.
@@ -903,29 +795,92 @@ class LLMService:
             portkey_stream_response: Streaming response from Portkey
             provider: Provider ID for metadata
             trace_id: Optional trace ID for debugging
+            model: Requested model name, used for TTFT statistics and timeout errors
+            first_token_timeout: Max seconds to wait for the first chunk (None/0 disables)
+            idle_timeout: Max seconds between consecutive chunks (None/0 disables)
+            open_hedge_stream: Factory for a backup stream used for hedging slow first tokens
+            usage_metadata: Request metadata used to attribute the stream's final usage
             
         Yields:
             LLMResponse objects with incremental content
-        """
-        async for chunk in portkey_stream_response:
-            # Use Portkey's content_blocks structure for proper chunk handling
-            content = self._extract_content_from_chunk(chunk)
-            chunk_type = self._determine_chunk_type_from_content_blocks(chunk)
             
-            yield LLMResponse(
-                content=content,
-                model=chunk.model, # type: ignore
-                chunk_type=chunk_type,
-                usage=chunk.usage.model_dump() if hasattr(chunk, 'usage') and chunk.usage else None, # Handle optional usage
-                metadata={
-                    "provider": provider,
-                    "gateway": "self-hosted",
-                    "portkey_request_id": getattr(chunk, 'id', None),
-                    "trace_id": trace_id,
-                    "streaming": True,
-                    "chunk": True
-                }
+        Raises:
+            LLMTimeoutError: If the stream stalls past one of its timeouts
+        """
+        guarded_stream = guard_stream(
+            portkey_stream_response,
+            key=(provider, model or "unknown"),
+            first_token_timeout=first_token_timeout,
+            idle_timeout=idle_timeout,
+            tracker=ttft_tracker,
+            open_hedge_stream=open_hedge_stream,
+            hedge_percentile=settings.LLM_STREAM_HEDGE_PERCENTILE,
+        )
+        # Decoder and metadata are resolved once per stream, not per chunk
+        decoder = get_chunk_decoder(provider)
+        base_metadata = {
+            "provider": provider,
+            "gateway": "self-hosted",
+            "portkey_request_id": None,
+            "trace_id": trace_id,
+            "streaming": True,
+            "chunk": True
+        }
+        
+        # Providers report usage on the final chunk (some repeat cumulative usage on
+        # every chunk), so only the last usage seen is recorded once the stream ends
+        final_usage: Optional[Dict[str, Any]] = None
+        try:
+            async for chunk in guarded_stream:
+                decoded = decoder.decode(chunk)
+                if decoded.usage:
+                    final_usage = decoded.usage
+                
+                # Consumers may annotate chunk metadata, so each chunk gets its own dict
+                metadata = base_metadata.copy()
+                metadata["portkey_request_id"] = decoded.request_id
+                yield LLMResponse(
+                    content=decoded.content,
+                    model=decoded.model or model or "",
+                    chunk_type=decoded.chunk_type,
+                    usage=decoded.usage,
+                    metadata=metadata
+                )
+        finally:
+            if final_usage and model:
+                self._record_usage(provider, model, final_usage, usage_metadata or {}, trace_id, streaming=True)
+    
+    def _record_usage(
+        self,
+        provider: PROVIDER_ID,
+        model: MODEL_NAME,
+        usage: Dict[str, Any],
+        request_metadata: Dict[str, Any],
+        trace_id: Optional[str],
+        streaming: bool,
+        cost_multiplier: float = 1.0,
+    ) -> None:
+        """
+        Record a call's usage with the usage tracker, attributed from the request metadata.
+        
+        Accounting must never fail a completion, so errors are logged and swallowed.
+        """
+        if self.usage_tracker is None:
+            return
+        try:
+            self.usage_tracker.record(
+                provider=provider,
+                model=model,
+                usage=usage,
+                user_id=request_metadata.get("user_id"),
+                project_id=request_metadata.get("project_id"),
+                agent_name=request_metadata.get("agent"),
+                trace_id=trace_id,
+                streaming=streaming,
+                cost_multiplier=cost_multiplier,
             )
+        except Exception as e:
+            logger.warning(f"Failed to record LLM usage for {provider}/{model}: {e}")
     
     @staticmethod
     def get_all_llm_providers() -> List[LLMProvider]:
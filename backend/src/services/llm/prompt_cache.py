@@ -0,0 +1,74 @@
+# backend/src/services/llm/prompt_cache.py
+"""
+Prompt prefix caching for repeated story context
+
+Agents that fan out over the same story text (planner, summarizer, one article
+writer call per article) send an identical prompt prefix many times. Messages
+marked cacheable form that prefix; this module turns the marks into what each
+provider needs:
+
+- Anthropic caches only up to explicit cache_control breakpoints, so the last
+  message of each cacheable run gets one (at most MAX_CACHE_BREAKPOINTS)
+- OpenAI and Gemini cache matching prompt prefixes automatically, so their
+  messages are sent as plain text; keeping the prefix first is what matters
+"""
+from typing import Any, Dict, List, Sequence
+
+from src.schemas.llm.models import LLMMessage
+
+
+# Providers that only cache up to explicit cache_control breakpoints
+EXPLICIT_CACHE_PROVIDERS = frozenset({"anthropic"})
+
+# Anthropic allows at most 4 breakpoints per request
+MAX_CACHE_BREAKPOINTS = 4
+
+
+def mark_cacheable_prefix(messages: Sequence[LLMMessage], count: int) -> List[LLMMessage]:
+    """
+    Mark the first count messages as a cacheable prefix.
+
+    Args:
+        messages: Prompt messages in order
+        count: Number of leading messages that are identical across calls
+
+    Returns:
+        Copies of the messages with cacheable set on the prefix (other flags kept)
+    """
+    return [
+        message.model_copy(update={"cacheable": True}) if index < count else message
+        for index, message in enumerate(messages)
+    ]
+
+
+def to_provider_messages(messages: Sequence[LLMMessage], provider: str) -> List[Dict[str, Any]]:
+    """
+    Convert messages to OpenAI-format dicts, with cache breakpoints where the provider needs them.
+
+    The final message is never a breakpoint: it is the part of the prompt that
+    varies between calls (and may get structured output instructions appended).
+
+    Args:
+        messages: Prompt messages in order
+        provider: Provider ID the request goes to
+
+    Returns:
+        Message dicts for chat.completions.create()
+    """
+    provider_messages: List[Dict[str, Any]] = [{"role": msg.role, "content": msg.content} for msg in messages]
+    if provider.lower() not in EXPLICIT_CACHE_PROVIDERS:
+        return provider_messages
+
+    # A breakpoint caches everything before it, so mark where each cacheable run ends
+    last = len(messages) - 1
+    run_ends = [
+        index for index, msg in enumerate(messages[:-1])
+        if msg.cacheable and (index + 1 == last or not messages[index + 1].cacheable)
+    ]
+    for index in run_ends[-MAX_CACHE_BREAKPOINTS:]:
+        provider_messages[index]["content"] = [{
+            "type": "text",
+            "text": messages[index].content,
+            "cache_control": {"type": "ephemeral"},
+        }]
+    return provider_messages
@@ -0,0 +1,97 @@
+# backend/src/services/llm/schema_cache.py
+"""
+Compiled response_format cache for structured LLM output
+
+Building the response_format payload (JSON schema generation, Google schema
+simplification, $ref resolution for prompt instructions) is a pure function of
+the Pydantic model class, the provider and whether the model supports structured
+output, so it is compiled once per combination and reused for every call.
+"""
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from src.utils import json_schema_to_prompt_instructions
+
+
+logger = logging.getLogger(__name__)
+
+# JSON schema keys Google's response_schema format does not support
+GOOGLE_UNSUPPORTED_SCHEMA_KEYS = frozenset({
+    "minimum", "maximum", "minLength", "maxLength",
+    "minItems", "maxItems", "pattern", "format",
+})
+
+
+@dataclass(frozen=True)
+class CompiledResponseFormat:
+    """
+    Precompiled structured-output instructions for one (model class, provider, capability).
+
+    Exactly one of the fields is set. The payloads are shared between calls and
+    must be treated as read-only.
+    """
+    response_format: Optional[Dict[str, Any]] = None  # create() kwarg for structured output models
+    prompt_instructions: Optional[str] = None          # Appended to the prompt for other models
+
+
+def simplify_schema_for_google(schema: Any) -> Any:
+    """
+    Remove validation constraints Google Gemini's response_schema doesn't support.
+
+    Args:
+        schema: JSON schema (or any nested part of it)
+
+    Returns:
+        A copy of the schema without minimum/maximum, length, item count, pattern and format constraints
+    """
+    if isinstance(schema, dict):
+        return {
+            key: simplify_schema_for_google(value)
+            for key, value in schema.items()
+            if key not in GOOGLE_UNSUPPORTED_SCHEMA_KEYS
+        }
+    if isinstance(schema, list):
+        return [simplify_schema_for_google(item) for item in schema]
+    return schema
+
+
+@lru_cache(maxsize=256)
+def compile_response_format(
+    model_class: Type[BaseModel],
+    provider: str,
+    supports_structured_output: bool,
+) -> CompiledResponseFormat:
+    """
+    Compile (once) the structured-output payload for a Pydantic model.
+
+    Args:
+        model_class: Pydantic model the response must match
+        provider: Provider ID (schemas are simplified for Google)
+        supports_structured_output: Whether the target model accepts a response_format
+
+    Returns:
+        CompiledResponseFormat with either the response_format payload or the prompt instructions
+    """
+    base_schema = model_class.model_json_schema()
+
+    if not supports_structured_output:
+        logger.debug(f"Compiled prompt instructions for {model_class.__name__}")
+        return CompiledResponseFormat(
+            prompt_instructions=json_schema_to_prompt_instructions(base_schema, model_class.__name__)
+        )
+
+    schema = simplify_schema_for_google(base_schema) if provider.lower() == "google" else base_schema
+    logger.debug(f"Compiled response_format for {model_class.__name__} ({provider})")
+    return CompiledResponseFormat(
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": f"{model_class.__name__.lower()}_schema",
+                "schema": schema,
+            },
+        }
+    )
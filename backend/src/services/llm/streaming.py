@@ -0,0 +1,262 @@
+# backend/src/services/llm/streaming.py
+"""
+Streaming guards for LLM responses
+
+Features:
+- Time-to-first-token (TTFT) and inter-chunk idle timeouts for provider streams
+- Rolling TTFT statistics per (provider, model)
+- Optional request hedging: when the first token is slower than the recent p95,
+  a backup request is fired and whichever stream produces a chunk first wins
+"""
+import asyncio
+import inspect
+import logging
+import math
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.config import settings
+from src.core.exceptions import LLMTimeoutError
+
+
+logger = logging.getLogger(__name__)
+
+# (provider, model) key used for latency statistics
+StreamKey = Tuple[str, str]
+
+# Sentinel returned when a stream ends before producing a chunk
+_END: Any = object()
+
+
+class TTFTTracker:
+    """
+    Rolling window of time-to-first-token samples per (provider, model).
+
+    Used to decide when a stream is slower than usual and worth hedging.
+    """
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: Dict[StreamKey, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.window_size)
+        )
+
+    def record(self, key: StreamKey, ttft_seconds: float) -> None:
+        """Record a time-to-first-token sample."""
+        self._samples[key].append(ttft_seconds)
+
+    def percentile(self, key: StreamKey, pct: float) -> Optional[float]:
+        """
+        Get the given percentile of recorded TTFTs for a key.
+
+        Returns:
+            The percentile in seconds, or None if there are fewer than min_samples
+        """
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def sample_count(self, key: StreamKey) -> int:
+        """Number of samples currently held for a key."""
+        samples = self._samples.get(key)
+        return len(samples) if samples else 0
+
+    def reset(self) -> None:
+        """Drop all recorded samples."""
+        self._samples.clear()
+
+
+# Shared across LLMService instances (the service is created per request)
+ttft_tracker = TTFTTracker(min_samples=settings.LLM_STREAM_HEDGE_MIN_SAMPLES)
+
+
+async def _close_stream(stream: Any) -> None:
+    """Best-effort close of a provider stream or async iterator."""
+    for method_name in ("aclose", "close"):
+        close = getattr(stream, method_name, None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.debug(f"Error closing stream: {e}")
+        return
+
+
+async def _first_chunk(stream: Any) -> Tuple[Any, Any]:
+    """Wait for the first chunk of a stream, closing it if we are cancelled."""
+    iterator = stream.__aiter__()
+    try:
+        first = await iterator.__anext__()
+    except StopAsyncIteration:
+        first = _END
+    except BaseException:
+        await _close_stream(iterator)
+        await _close_stream(stream)
+        raise
+    return (stream, iterator), first
+
+
+async def _open_and_first_chunk(open_stream: Callable[[], Awaitable[Any]]) -> Tuple[Any, Any]:
+    """Open a new stream and wait for its first chunk."""
+    stream = await open_stream()
+    return await _first_chunk(stream)
+
+
+async def _next_chunk(iterator: Any, timeout: Optional[float], key: StreamKey, phase: str) -> Any:
+    """Get the next chunk, raising LLMTimeoutError if it takes longer than timeout."""
+    try:
+        if timeout:
+            return await asyncio.wait_for(iterator.__anext__(), timeout)
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _END
+    except asyncio.TimeoutError:
+        provider, model = key
+        raise LLMTimeoutError(
+            provider=provider,
+            message=f"No {phase} received from {provider}/{model} within {timeout}s",
+            details={"provider": provider, "model": model, "phase": phase, "timeout_seconds": timeout},
+        )
+
+
+async def _race_with_hedge(
+    stream: Any,
+    open_hedge_stream: Callable[[], Awaitable[Any]],
+    hedge_delay: float,
+    first_token_timeout: Optional[float],
+    key: StreamKey,
+) -> Tuple[Tuple[Any, Any], Any]:
+    """
+    Wait for the primary stream's first chunk; if it is slower than hedge_delay,
+    fire a backup request and keep whichever stream produces a chunk first.
+
+    Returns:
+        ((stream, iterator), first_chunk) of the winning stream
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + first_token_timeout if first_token_timeout else None
+
+    primary_task = asyncio.ensure_future(_first_chunk(stream))
+    done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay)
+    if done:
+        return primary_task.result()
+
+    logger.info(f"Hedging stream for {key[0]}/{key[1]}: no first token after {hedge_delay:.2f}s")
+    backup_task = asyncio.ensure_future(_open_and_first_chunk(open_hedge_stream))
+    pending = {primary_task, backup_task}
+    last_error: Optional[BaseException] = None
+
+    try:
+        while pending:
+            timeout = max(0.0, deadline - loop.time()) if deadline is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                provider, model = key
+                raise LLMTimeoutError(
+                    provider=provider,
+                    message=f"No first token received from {provider}/{model} within {first_token_timeout}s (hedged)",
+                    details={"provider": provider, "model": model, "phase": "first token",
+                             "timeout_seconds": first_token_timeout, "hedged": True},
+                )
+
+            winner = None
+            for task in done:
+                if task.exception() is None and winner is None:
+                    winner = task
+                elif task.exception() is not None:
+                    last_error = task.exception()
+
+            if winner is not None:
+                label = "primary" if winner is primary_task else "backup"
+                logger.info(f"Hedged stream for {key[0]}/{key[1]}: {label} won")
+                # Close any other stream that also finished in this round
+                for task in done:
+                    if task is not winner and task.exception() is None:
+                        (loser_stream, loser_iterator), _ = task.result()
+                        await _close_stream(loser_iterator)
+                        await _close_stream(loser_stream)
+                return winner.result()
+
+        assert last_error is not None
+        raise last_error
+    finally:
+        # Cancel the loser (or both streams on timeout) and let them close their connections
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def guard_stream(
+    stream: Any,
+    key: StreamKey,
+    first_token_timeout: Optional[float] = None,
+    idle_timeout: Optional[float] = None,
+    tracker: Optional[TTFTTracker] = None,
+    open_hedge_stream: Optional[Callable[[], Awaitable[Any]]] = None,
+    hedge_percentile: float = 95.0,
+) -> AsyncIterator[Any]:
+    """
+    Wrap a provider stream with TTFT/idle timeouts and optional hedging.
+
+    Args:
+        stream: Provider stream (async iterable of chunks)
+        key: (provider, model) used for error messages and TTFT statistics
+        first_token_timeout: Max seconds to wait for the first chunk (None/0 disables)
+        idle_timeout: Max seconds between consecutive chunks (None/0 disables)
+        tracker: TTFT statistics; samples are recorded and used for the hedge delay
+        open_hedge_stream: Factory for a backup stream; enables hedging when provided
+        hedge_percentile: TTFT percentile after which the backup request is fired
+
+    Yields:
+        Chunks from whichever stream won
+
+    Raises:
+        LLMTimeoutError: If the first chunk or a subsequent chunk is late
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+
+    hedge_delay = None
+    if open_hedge_stream is not None and tracker is not None:
+        hedge_delay = tracker.percentile(key, hedge_percentile)
+        if hedge_delay is not None and first_token_timeout and hedge_delay >= first_token_timeout:
+            hedge_delay = None
+
+    if hedge_delay is not None:
+        assert open_hedge_stream is not None
+        (stream, iterator), first = await _race_with_hedge(
+            stream, open_hedge_stream, hedge_delay, first_token_timeout, key
+        )
+    else:
+        iterator = stream.__aiter__()
+        try:
+            first = await _next_chunk(iterator, first_token_timeout, key, "first token")
+        except BaseException:
+            await _close_stream(iterator)
+            await _close_stream(stream)
+            raise
+
+    try:
+        if first is _END:
+            return
+        if tracker is not None:
+            tracker.record(key, loop.time() - started_at)
+        yield first
+
+        while True:
+            chunk = await _next_chunk(iterator, idle_timeout, key, "chunk")
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        await _close_stream(iterator)
+        await _close_stream(stream)
@@ -0,0 +1,395 @@
+# backend/src/services/llm/usage_tracker.py
+"""
+LLM usage and cost accounting
+
+Features:
+- Normalizes provider usage payloads and computes cost from the model catalog pricing
+- Tracks prompt-cache hits, billed at the provider's discounted cached-input rate
+- Buffers usage records in memory and batch-writes them to the usage repository
+- Rollups by user, project, agent, provider or model
+- Rolling-window spend budgets per user and per project, stored in the usage repository
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, List, Optional, Set
+
+from src.config import settings
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.core.exceptions import BudgetExceededError
+from src.database.interfaces.usage_repository import UsageRepository, UsageGroupBy, BudgetScope
+from src.utils.catalog import get_hosted_model_instance
+
+
+logger = logging.getLogger(__name__)
+
+# Price of a cached prompt token relative to the regular input price, by provider
+CACHED_INPUT_COST_MULTIPLIERS: Dict[str, float] = {
+    "anthropic": 0.1,
+    "openai": 0.5,
+    "google": 0.25,
+}
+
+
+@dataclass
+class BudgetStatus:
+    """Spend against a budget for a single user or project."""
+    scope: BudgetScope
+    scope_id: str
+    limit_usd: float
+    spent_usd: float
+
+    @property
+    def remaining_usd(self) -> float:
+        return max(0.0, self.limit_usd - self.spent_usd)
+
+    @property
+    def exceeded(self) -> bool:
+        return self.spent_usd >= self.limit_usd
+
+
+def compute_cost(
+    provider: PROVIDER_ID,
+    model: MODEL_NAME,
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_prompt_tokens: int = 0,
+) -> float:
+    """
+    Compute the USD cost of a call from the catalog's per-million-token pricing.
+
+    Args:
+        provider: Provider ID the call was made to
+        model: Model name
+        prompt_tokens: All prompt tokens, including cached ones
+        completion_tokens: Generated tokens
+        cached_prompt_tokens: Prompt tokens read from the provider's prompt cache
+
+    Returns:
+        Cost in USD, or 0.0 if the model has no pricing information
+    """
+    model_instance = get_hosted_model_instance(provider, model)
+    if not model_instance:
+        return 0.0
+
+    input_cost = model_instance.input_cost_per_million_tokens or 0.0
+    output_cost = model_instance.output_cost_per_million_tokens or 0.0
+    cached_prompt_tokens = min(cached_prompt_tokens, prompt_tokens)
+    cached_cost = input_cost * CACHED_INPUT_COST_MULTIPLIERS.get(provider.lower(), 1.0)
+    return (
+        (prompt_tokens - cached_prompt_tokens) * input_cost
+        + cached_prompt_tokens * cached_cost
+        + completion_tokens * output_cost
+    ) / 1_000_000
+
+
+def normalize_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Normalize a provider usage payload to prompt/completion/total token counts.
+
+    Handles OpenAI-style (prompt_tokens/completion_tokens) and Anthropic-style
+    (input_tokens/output_tokens) keys. Prompt tokens include cached tokens.
+    """
+    prompt_tokens = usage.get("prompt_tokens")
+    if prompt_tokens is None:
+        # Anthropic's input_tokens exclude prompt-cache reads and writes
+        prompt_tokens = sum(
+            int(usage.get(key) or 0)
+            for key in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        )
+    completion_tokens = usage.get("completion_tokens")
+    if completion_tokens is None:
+        completion_tokens = usage.get("output_tokens")
+
+    prompt_tokens = int(prompt_tokens or 0)
+    completion_tokens = int(completion_tokens or 0)
+    total_tokens = int(usage.get("total_tokens") or prompt_tokens + completion_tokens)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens,
+    }
+
+
+def cached_prompt_tokens(usage: Dict[str, Any]) -> int:
+    """
+    Prompt tokens served from the provider's prompt cache.
+
+    Handles OpenAI-style (prompt_tokens_details.cached_tokens), Anthropic-style
+    (cache_read_input_tokens) and Gemini-style (cached_content_token_count) keys.
+    """
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens") if isinstance(details, dict) else None
+    for key in ("cache_read_input_tokens", "cached_content_token_count", "cachedContentTokenCount"):
+        if not cached:
+            cached = usage.get(key)
+    return int(cached or 0)
+
+
+class UsageTracker:
+    """
+    Records LLM usage and writes it to the usage repository in batches.
+
+    Recording is synchronous and never touches the database; records are flushed
+    when the buffer reaches batch_size, every flush_interval seconds once started,
+    or on an explicit flush().
+    """
+
+    def __init__(
+        self,
+        repository: UsageRepository,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        budget_window_days: Optional[int] = None,
+    ):
+        self.repository = repository
+        self.batch_size = batch_size or settings.LLM_USAGE_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.LLM_USAGE_FLUSH_INTERVAL
+        self.budget_window = timedelta(days=budget_window_days or settings.LLM_BUDGET_WINDOW_DAYS)
+
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_loop_task: Optional[asyncio.Task] = None
+        self._background_flushes: Set[asyncio.Task] = set()
+        self._budgets: Dict[tuple[BudgetScope, str], Optional[float]] = {}  # Stored limits, None if unset
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(
+        self,
+        provider: PROVIDER_ID,
+        model: MODEL_NAME,
+        usage: Dict[str, Any],
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        trace_id: Optional[str] = None,
+        streaming: bool = False,
+        cost_multiplier: float = 1.0,
+    ) -> Dict[str, Any]:
+        """
+        Record the usage of a single LLM call.
+
+        Args:
+            provider: Provider ID the call was made to
+            model: Model name as requested (used for catalog pricing)
+            usage: Provider usage payload (LLMResponse.usage)
+            user_id: User the call is billed to
+            project_id: Project the call was made for
+            agent_name: Agent that made the call
+            trace_id: Request trace ID
+            streaming: Whether the call was streamed
+            cost_multiplier: Pricing relative to the catalog price (e.g. batch discounts)
+
+        Returns:
+            The usage record as buffered for writing
+        """
+        tokens = normalize_usage(usage)
+        cached_tokens = cached_prompt_tokens(usage)
+        record = {
+            "user_id": user_id,
+            "project_id": project_id,
+            "agent_name": agent_name,
+            "provider": provider,
+            "model": model,
+            **tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "cost_usd": compute_cost(
+                provider, model, tokens["prompt_tokens"], tokens["completion_tokens"], cached_tokens
+            ) * cost_multiplier,
+            "trace_id": trace_id,
+            "streaming": streaming,
+            "created_at": datetime.now(UTC).replace(tzinfo=None),
+        }
+        self._pending.append(record)
+
+        if len(self._pending) >= self.batch_size:
+            self._schedule_flush()
+        return record
+
+    def _schedule_flush(self) -> None:
+        """Flush in the background if an event loop is running."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.flush())
+        self._background_flushes.add(task)
+        task.add_done_callback(self._background_flushes.discard)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of records not yet written."""
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """
+        Write all buffered records to the repository.
+
+        Returns:
+            Number of records written (0 if the write failed; records are kept for retry)
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, []
+            try:
+                written = await self.repository.create_many(batch)
+                logger.debug(f"Flushed {written} LLM usage records")
+                return written
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} LLM usage records: {e}")
+                self._pending = batch + self._pending
+                return 0
+
+    async def start(self) -> None:
+        """Start periodic background flushing."""
+        if self._flush_loop_task is None:
+            self._flush_loop_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write any remaining records."""
+        if self._flush_loop_task is not None:
+            self._flush_loop_task.cancel()
+            await asyncio.gather(self._flush_loop_task, return_exceptions=True)
+            self._flush_loop_task = None
+        if self._background_flushes:
+            await asyncio.gather(*self._background_flushes, return_exceptions=True)
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    # ------------------------------------------------------------------
+    # Rollups
+    # ------------------------------------------------------------------
+
+    async def get_totals(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Aggregate usage (requests, tokens, cost) including records not yet flushed."""
+        await self.flush()
+        return await self.repository.get_totals(user_id, project_id, agent_name, since)
+
+    async def get_rollup(
+        self,
+        group_by: UsageGroupBy,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Aggregate usage grouped by user_id, project_id, agent_name, provider or model."""
+        await self.flush()
+        return await self.repository.get_rollup(group_by, user_id, project_id, since)
+
+    # ------------------------------------------------------------------
+    # Budgets
+    # ------------------------------------------------------------------
+
+    async def set_budget(self, scope: BudgetScope, scope_id: str, limit_usd: Optional[float]) -> None:
+        """Store (or clear with None) the spend limit for a user or project."""
+        await self.repository.set_budget(scope, scope_id, limit_usd)
+        self._budgets[(scope, scope_id)] = limit_usd
+
+    @staticmethod
+    def default_budget(scope: BudgetScope) -> Optional[float]:
+        """The configured spend limit for users or projects without one of their own."""
+        default = settings.LLM_DEFAULT_USER_BUDGET_USD if scope == "user" else settings.LLM_DEFAULT_PROJECT_BUDGET_USD
+        return default or None
+
+    async def get_budget(self, scope: BudgetScope, scope_id: str) -> Optional[float]:
+        """Get the spend limit for a user or project, falling back to the configured default."""
+        key = (scope, scope_id)
+        if key not in self._budgets:
+            self._budgets[key] = await self.repository.get_budget(scope, scope_id)
+
+        limit = self._budgets[key]
+        return limit if limit is not None else self.default_budget(scope)
+
+    async def _spent_since(self, scope: BudgetScope, scope_id: str, since: datetime) -> float:
+        """Spend for a scope from the repository plus unflushed records."""
+        if scope == "user":
+            totals = await self.repository.get_totals(user_id=scope_id, since=since)
+        else:
+            totals = await self.repository.get_totals(project_id=scope_id, since=since)
+
+        key = "user_id" if scope == "user" else "project_id"
+        pending = sum(
+            r["cost_usd"] for r in self._pending
+            if r[key] == scope_id and r["created_at"] >= since
+        )
+        return totals["cost_usd"] + pending
+
+    async def get_budget_status(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> List[BudgetStatus]:
+        """Get spend against every budget that applies to a call."""
+        since = datetime.now(UTC).replace(tzinfo=None) - self.budget_window
+        statuses: List[BudgetStatus] = []
+
+        scopes: List[tuple[BudgetScope, Optional[str]]] = [("user", user_id), ("project", project_id)]
+        for scope, scope_id in scopes:
+            if not scope_id:
+                continue
+            limit = await self.get_budget(scope, scope_id)
+            if limit is None:
+                continue
+            spent = await self._spent_since(scope, scope_id, since)
+            statuses.append(BudgetStatus(scope=scope, scope_id=scope_id, limit_usd=limit, spent_usd=spent))
+
+        return statuses
+
+    async def ensure_within_budget(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> None:
+        """
+        Check that neither the user nor the project has exhausted its budget.
+
+        Raises:
+            BudgetExceededError: If any applicable budget is exhausted
+        """
+        for status in await self.get_budget_status(user_id, project_id):
+            if status.exceeded:
+                raise BudgetExceededError(
+                    scope=status.scope,
+                    scope_id=status.scope_id,
+                    limit_usd=status.limit_usd,
+                    spent_usd=status.spent_usd,
+                )
+
+
+# Global usage tracker (initialized in main.py alongside the repositories)
+_usage_tracker: Optional[UsageTracker] = None
+
+
+def init_usage_tracker(repository: UsageRepository) -> UsageTracker:
+    """Initialize the global usage tracker"""
+    global _usage_tracker
+    _usage_tracker = UsageTracker(repository)
+    logger.info("LLM usage tracker initialized")
+    return _usage_tracker
+
+
+def get_usage_tracker() -> Optional[UsageTracker]:
+    """Get the global usage tracker, or None if usage tracking is not initialized"""
+    return _usage_tracker
+
+
+def reset_usage_tracker() -> None:
+    """Reset the global usage tracker (useful for testing)"""
+    global _usage_tracker
+    _usage_tracker = None
@@ -0,0 +1,12 @@
+"""
+Web search services package
+"""
+from .web_search_service import (
+    FixtureSearchClient,
+    SearchClient,
+    SearchResult,
+    WebSearchService,
+    normalize_query,
+)
+
+__all__ = ["FixtureSearchClient", "SearchClient", "SearchResult", "WebSearchService", "normalize_query"]
@@ -0,0 +1,294 @@
+# backend/src/services/web_search/web_search_service.py
+"""
+Web search service for reference lookup in wiki articles
+
+Features:
+- SearchClient interface for search backends; FixtureSearchClient answers
+  from local fixtures for tests and offline development
+- Query normalization ("  RAGNAROK " and "ragnarok" are one query)
+- Concurrent identical queries share one backend request, so a reference that
+  appears in dozens of articles being written at once is searched once
+- Result cache with a TTL, in memory and optionally persisted in a
+  CheckpointRepository so later runs reuse it
+- Bounded concurrency and a requests-per-second limit towards the backend
+
+Failed searches are never cached; every caller waiting on a failed request
+gets its exception.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
+
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint namespace of cached results (run_key is the hash of client + query, step 0)
+CACHE_NAMESPACE = "web_search"
+
+DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+_WHITESPACE = re.compile(r"\s+")
+# Quotes and sentence punctuation around a query don't change what it asks for
+_EDGE_PUNCTUATION = "\"'“”‘’«»`.,;:!?()[]{}"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a search query: Unicode-normalized, case-folded,
+    whitespace collapsed and surrounding quotes/punctuation removed.
+
+    Examples:
+        >>> normalize_query('  "RAGNAROK"  ')
+        'ragnarok'
+        >>> normalize_query("Norse   myth?")
+        'norse myth'
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return _WHITESPACE.sub(" ", query).strip().strip(_EDGE_PUNCTUATION).strip()
+
+
+# ============================================================================
+# Search clients
+# ============================================================================
+
+@dataclass(frozen=True)
+class SearchResult:
+    """One web search hit."""
+    title: str
+    url: str = ""
+    snippet: str = ""
+
+    def to_dict(self) -> Dict[str, str]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResult":
+        return cls(title=data.get("title", ""), url=data.get("url", ""), snippet=data.get("snippet", ""))
+
+
+class SearchClient(ABC):
+    """Search backend: runs one query."""
+
+    name: str = "search"
+
+    @abstractmethod
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        """Search for a normalized query, returning at most max_results hits."""
+        pass
+
+
+class FixtureSearchClient(SearchClient):
+    """
+    Search backend answering from local fixtures, for tests and offline development.
+
+    Fixtures map queries (normalized on load) to result dicts; unknown queries
+    have no results. Every query asked is recorded in `queries`.
+    """
+
+    name = "fixtures"
+
+    def __init__(self, fixtures: Optional[Dict[str, List[Dict[str, Any]]]] = None, delay: float = 0.0):
+        self.fixtures = {
+            normalize_query(query): [SearchResult.from_dict(result) for result in results]
+            for query, results in (fixtures or {}).items()
+        }
+        self.delay = delay
+        self.queries: List[str] = []
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], **kwargs) -> "FixtureSearchClient":
+        """Load fixtures from a JSON file ({"query": [{"title", "url", "snippet"}, ...]})."""
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")), **kwargs)
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        self.queries.append(query)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.fixtures.get(normalize_query(query), [])[:max_results]
+
+
+# ============================================================================
+# Service
+# ============================================================================
+
+class WebSearchService:
+    """
+    Cached, deduplicating, rate-limited web search.
+
+    Safe to share between concurrent callers (e.g. all articles of a run):
+    each distinct normalized query reaches the backend at most once per TTL.
+    """
+
+    def __init__(
+        self,
+        client: SearchClient,
+        cache: Optional[CheckpointRepository] = None,
+        cache_ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        max_concurrent: int = 4,
+        requests_per_second: Optional[float] = 5.0,
+        max_results: int = 5,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            client: Search backend
+            cache: Store that keeps results across runs (None: this service instance only)
+            cache_ttl_seconds: How long results stay valid
+            max_concurrent: Maximum backend requests in flight
+            requests_per_second: Maximum backend request rate (None: unlimited)
+            max_results: Results kept per query
+            clock: Wall clock used for cache expiry (seconds)
+        """
+        self.client = client
+        self.cache = cache
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_concurrent = max(1, max_concurrent)
+        self.requests_per_second = requests_per_second
+        self.max_results = max_results
+        self.clock = clock
+        self.stats = {"requests": 0, "cache_hits": 0, "shared": 0, "backend_calls": 0}
+
+        self._results: Dict[str, Tuple[float, List[SearchResult]]] = {}    # query -> (fetched_at, results)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Created lazily so they bind to the running event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._rate_lock: Optional[asyncio.Lock] = None
+        self._next_request_at = 0.0
+
+    async def search(self, query: str) -> List[SearchResult]:
+        """
+        Search results for a query, from the cache when fresh.
+
+        Raises:
+            ValueError: If the query is empty after normalization
+            Exception: Whatever the backend raised for this query
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            raise ValueError("Empty search query")
+        self.stats["requests"] += 1
+
+        cached = self._fresh(self._results.get(normalized))
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        in_flight = self._in_flight.get(normalized)
+        if in_flight is not None:
+            self.stats["shared"] += 1
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[normalized] = future
+        try:
+            results = await self._lookup(normalized)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved: there may be no other waiter
+            raise
+        else:
+            future.set_result(results)
+            return results
+        finally:
+            del self._in_flight[normalized]
+
+    async def search_many(self, queries: List[str]) -> Dict[str, Any]:
+        """
+        Run queries concurrently.
+
+        Returns:
+            Results by query as given; a failed query maps to {"error": message}
+        """
+        unique = list(dict.fromkeys(queries))
+        outcomes = await asyncio.gather(*(self.search(query) for query in unique), return_exceptions=True)
+        results: Dict[str, Any] = {}
+        for query, outcome in zip(unique, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning(f"⚠️ Web search failed for '{query}': {outcome}")
+                results[query] = {"error": str(outcome)}
+            else:
+                results[query] = outcome
+        return results
+
+    async def _lookup(self, query: str) -> List[SearchResult]:
+        """Persistent cache, then the backend."""
+        stored = self._fresh(await self._cache_get(query))
+        if stored is not None:
+            self.stats["cache_hits"] += 1
+            return stored
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        async with self._slots:
+            await self._wait_for_rate_limit()
+            self.stats["backend_calls"] += 1
+            results = list(await self.client.search(query, self.max_results))[:self.max_results]
+
+        entry = (self.clock(), results)
+        self._results[query] = entry
+        await self._cache_put(query, entry)
+        return results
+
+    def _fresh(self, entry: Optional[Tuple[float, List[SearchResult]]]) -> Optional[List[SearchResult]]:
+        if entry is None or self.clock() - entry[0] > self.cache_ttl_seconds:
+            return None
+        return entry[1]
+
+    async def _wait_for_rate_limit(self) -> None:
+        """Space backend requests at least 1 / requests_per_second apart."""
+        if not self.requests_per_second:
+            return
+        if self._rate_lock is None:
+            self._rate_lock = asyncio.Lock()
+        async with self._rate_lock:
+            now = time.monotonic()
+            if self._next_request_at > now:
+                await asyncio.sleep(self._next_request_at - now)
+                now = self._next_request_at
+            self._next_request_at = now + 1.0 / self.requests_per_second
+
+    def _cache_key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.client.name}\x00{query}".encode("utf-8")).hexdigest()
+
+    async def _cache_get(self, query: str) -> Optional[Tuple[float, List[SearchResult]]]:
+        """Stored results for a query; a failing store is a cache miss."""
+        if self.cache is None:
+            return None
+        try:
+            steps = await self.cache.list_steps(CACHE_NAMESPACE, self._cache_key(query))
+        except Exception as e:
+            logger.warning(f"⚠️  Could not read the web search cache: {e}")
+            return None
+        if not steps or "results" not in steps[0].data:
+            return None
+        entry = (steps[0].data["fetched_at"], [SearchResult.from_dict(r) for r in steps[0].data["results"]])
+        if self._fresh(entry) is not None:
+            self._results[query] = entry
+        return entry
+
+    async def _cache_put(self, query: str, entry: Tuple[float, List[SearchResult]]) -> None:
+        """Store results; a failing store only costs reuse in later runs."""
+        if self.cache is None:
+            return
+        fetched_at, results = entry
+        try:
+            await self.cache.save(CACHE_NAMESPACE, self._cache_key(query), 0, {
+                "query": query,
+                "fetched_at": fetched_at,
+                "results": [result.to_dict() for result in results],
+            })
+        except Exception as e:
+            logger.warning(f"⚠️  Could not write the web search cache: {e}")
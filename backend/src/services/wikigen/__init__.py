@@ -0,0 +1,6 @@
+"""
+WikiGen services package
+"""
+from .wikigen_jobs import MeteredLLMService, run_wikigen_job, story_from_documents
+
+__all__ = ["MeteredLLMService", "run_wikigen_job", "story_from_documents"]
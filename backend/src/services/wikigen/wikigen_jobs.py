@@ -0,0 +1,336 @@
+# backend/src/services/wikigen/wikigen_jobs.py
+"""
+WikiGen background jobs
+
+Runs the WikiGen pipeline for a project on the background job queue and
+records its progress in the job's EventLog, which clients follow over SSE.
+
+Features:
+- The project's documents become the story's chapters, in file path order
+- Pipeline events (window_started, arc_detected, article_done, task and
+  pipeline events) are logged as they happen
+- Token usage of every LLM call is logged as it arrives (tokens_used, with
+  running totals), including streamed calls
+- The story's entity index is kept per project in the checkpoint repository,
+  so a later run only re-scans the chapters that changed
+- The generated wiki is stored per project too; a later run updates it
+  (update_wiki), reusing the finalized arcs before the first changed chapter
+- Arc splitter windows and chapter summaries are checkpointed in the same
+  repository, so a failed or repeated run resumes instead of starting over
+- job_completed / job_failed / job_cancelled end every log
+"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+from uuid import UUID
+
+from src.agents.wikigen.entity_index import EntityIndex
+from src.agents.wikigen.orchestrator import WikiGenOrchestrator
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.core.events import EventLog
+from src.core.exceptions import NotFoundError, ProcessingError
+from src.database.factory import get_repositories
+from src.database.interfaces.checkpoint_repository import CheckpointRepository
+from src.schemas.db.story import Chapter, FullStoryBase, StoryMetadata
+from src.schemas.wikigen.wiki import PipelineEvent, WikiResult
+from src.services.llm.llm_service import LLMService
+from src.services.llm.usage_tracker import normalize_usage
+from src.services.web_search.web_search_service import WebSearchService
+
+
+logger = logging.getLogger(__name__)
+
+# ProseMirror nodes whose children flow together as one paragraph
+_BLOCK_NODE_TYPES = frozenset({"paragraph", "heading", "blockquote", "listItem", "list_item", "codeBlock", "code_block"})
+
+_NUMBER_PATTERN = re.compile(r"(\d+)")
+
+# Checkpoint namespace of each project's last generated wiki (run key: the project, step 0)
+WIKI_NAMESPACE = "wiki_result"
+
+UsageCallback = Callable[[Dict[str, Any], Dict[str, int]], None]
+# Called with the (metered) LLM service and the keyword arguments entity_index (the
+# project's EntityIndex), checkpoint_repository and web_search_service
+OrchestratorFactory = Callable[..., WikiGenOrchestrator]
+
+
+# ============================================================================
+# Usage metering
+# ============================================================================
+
+class MeteredLLMService:
+    """
+    LLM service wrapper that reports the token usage of every call.
+
+    Everything except chat_completion is delegated to the wrapped service, so
+    agents use it like an LLMService (usage_tracker, budgets, ...).
+    """
+
+    def __init__(self, llm_service: Any, on_usage: UsageCallback):
+        """
+        Args:
+            llm_service: Service the calls go to
+            on_usage: Called with each call's request metadata and normalized token counts
+        """
+        self._llm_service = llm_service
+        self._on_usage = on_usage
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm_service, name)
+
+    async def chat_completion(self, **kwargs: Any) -> Any:
+        response = await self._llm_service.chat_completion(**kwargs)
+        if kwargs.get("stream"):
+            return self._metered_stream(response, kwargs)
+        self._report(kwargs, getattr(response, "usage", None))
+        return response
+
+    async def _metered_stream(self, stream: AsyncIterator[Any], kwargs: Dict[str, Any]) -> AsyncIterator[Any]:
+        async for chunk in stream:
+            # Only the final chunk of a stream carries usage
+            self._report(kwargs, getattr(chunk, "usage", None))
+            yield chunk
+
+    def _report(self, kwargs: Dict[str, Any], usage: Optional[Dict[str, Any]]) -> None:
+        if not usage:
+            return
+        try:
+            self._on_usage(kwargs.get("metadata") or {}, normalize_usage(usage))
+        except Exception as e:
+            logger.warning(f"⚠️ Usage callback failed: {e}")
+
+
+# ============================================================================
+# Project documents as a story
+# ============================================================================
+
+def document_text(content: Dict[str, Any]) -> str:
+    """Plain text of a ProseMirror document, with blank lines between blocks."""
+    blocks: List[str] = []
+
+    def inline_text(node: Dict[str, Any]) -> str:
+        if node.get("type") == "hardBreak":
+            return "\n"
+        return str(node.get("text", "")) + "".join(inline_text(child) for child in node.get("content") or [])
+
+    def walk(node: Dict[str, Any]) -> None:
+        if node.get("type") in _BLOCK_NODE_TYPES and not any(
+            child.get("type") in _BLOCK_NODE_TYPES for child in node.get("content") or []
+        ):
+            text = inline_text(node).strip()
+            if text:
+                blocks.append(text)
+            return
+        if "text" in node and node["text"].strip():
+            blocks.append(node["text"].strip())
+        for child in node.get("content") or []:
+            walk(child)
+
+    walk(content or {})
+    return "\n\n".join(blocks)
+
+
+def _path_sort_key(path: str) -> List[Any]:
+    """Natural sort key ("chapter-2" before "chapter-10")."""
+    return [int(part) if part.isdigit() else part.lower() for part in _NUMBER_PATTERN.split(path)]
+
+
+def story_from_documents(title: str, documents: Iterable[Any], synopsis: str = "") -> FullStoryBase:
+    """
+    Build a story from project documents: each non-empty document is a chapter, in path order.
+
+    Args:
+        title: Story title
+        documents: Documents with title, path and ProseMirror content
+        synopsis: Story synopsis
+
+    Returns:
+        Story with chapters numbered from 1
+    """
+    chapters: List[Chapter] = []
+    for document in sorted(documents, key=lambda d: _path_sort_key(d.path)):
+        text = document_text(document.content)
+        if text:
+            chapters.append(Chapter(chapter_number=len(chapters) + 1, title=document.title, content=text))
+    return FullStoryBase(metadata=StoryMetadata(title=title, synopsis=synopsis), chapters=chapters)
+
+
+# ============================================================================
+# Entity index persistence
+# ============================================================================
+
+def project_key(project_id: str) -> str:
+    """Checkpoint run key of a project's entity index and stored wiki (chapters carry their own content hashes)."""
+    return f"project:{project_id}"
+
+
+async def load_entity_index(repository: CheckpointRepository, project_id: str, story: FullStoryBase) -> EntityIndex:
+    """The project's saved entity index without chapters the story no longer has (empty if it cannot be read)."""
+    try:
+        index = await EntityIndex.load(repository, project_key(project_id))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load the entity index of project {project_id}, rebuilding it: {e}")
+        return EntityIndex()
+    numbers = {chapter.chapter_number for chapter in story.chapters}
+    for number in index.chapters:
+        if number not in numbers:
+            index.remove_chapter(number)
+    return index
+
+
+async def save_entity_index(repository: CheckpointRepository, project_id: str, index: EntityIndex) -> None:
+    """Save the chapters and names that changed; a failing store only costs reuse in later runs."""
+    try:
+        written = await index.save(repository, project_key(project_id))
+        logger.info(f"📇 Saved entity index of project {project_id} ({written} checkpoints)")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save the entity index of project {project_id}: {e}")
+
+
+# ============================================================================
+# Wiki persistence
+# ============================================================================
+
+@dataclass
+class StoredWiki:
+    """A project's last generated wiki and the chapters it was generated from."""
+    result: WikiResult
+    chapter_hashes: Dict[int, str]     # Chapter number -> Chapter.content_hash
+
+    def changed_chapters(self, story: FullStoryBase) -> List[Chapter]:
+        """Chapters of the story that are new or differ from the ones the wiki was generated from."""
+        return [
+            chapter for chapter in story.chapters
+            if self.chapter_hashes.get(chapter.chapter_number) != chapter.content_hash
+        ]
+
+
+async def load_wiki(repository: CheckpointRepository, project_id: str) -> Optional[StoredWiki]:
+    """The project's stored wiki (None if there is none or it cannot be read)."""
+    try:
+        checkpoints = await repository.list_steps(WIKI_NAMESPACE, project_key(project_id))
+        if not checkpoints:
+            return None
+        data = checkpoints[0].data
+        return StoredWiki(
+            result=WikiResult.model_validate(data["result"]),
+            chapter_hashes={int(number): digest for number, digest in data["chapter_hashes"].items()},
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load the stored wiki of project {project_id}, generating a new one: {e}")
+        return None
+
+
+async def save_wiki(repository: CheckpointRepository, project_id: str, story: FullStoryBase, result: WikiResult) -> None:
+    """Store the wiki for later runs to update; a failing store only costs reuse in later runs."""
+    data = {
+        "result": result.model_dump(mode="json"),
+        "chapter_hashes": {str(chapter.chapter_number): chapter.content_hash for chapter in story.chapters},
+    }
+    try:
+        await repository.save(WIKI_NAMESPACE, project_key(project_id), 0, data)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not store the wiki of project {project_id}: {e}")
+
+
+# ============================================================================
+# Job
+# ============================================================================
+
+async def run_wikigen_job(
+    project_id: str,
+    user_id: str,
+    event_log: EventLog,
+    provider: Optional[PROVIDER_ID] = None,
+    model: Optional[MODEL_NAME] = None,
+    orchestrator_factory: OrchestratorFactory = WikiGenOrchestrator,
+    llm_service: Optional[Any] = None,
+    web_search_service: Optional[WebSearchService] = None,
+) -> WikiResult:
+    """
+    Generate (or update, if an earlier run stored one) the wiki of a project, logging progress events.
+
+    Args:
+        project_id: Project whose documents form the story
+        user_id: User the job runs for (their stored API keys are used)
+        event_log: Log the job's events are appended to (closed when the job ends)
+        provider: Optional LLM provider override for every agent
+        model: Optional LLM model override for every agent
+        orchestrator_factory: Builds the orchestrator from the (metered) LLM service and the
+                              entity_index, checkpoint_repository and web_search_service keywords
+        llm_service: LLM service the calls go to (default: one using the user's stored API keys)
+        web_search_service: Web search for article references (None: articles cite none)
+
+    Returns:
+        The generated WikiResult
+
+    Raises:
+        NotFoundError: If the project does not exist for the user
+        ProcessingError: If the project has no text or the pipeline fails
+    """
+    totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+    def tokens_used(metadata: Dict[str, Any], tokens: Dict[str, int]) -> None:
+        for key in totals:
+            totals[key] += tokens.get(key, 0)
+        if not event_log.closed:
+            event_log.append("tokens_used", {"agent": metadata.get("agent"), **tokens, "totals": dict(totals)})
+
+    def pipeline_event(event: PipelineEvent) -> None:
+        if not event_log.closed:
+            event_log.append(event.type, {"stage": event.stage, "task_id": event.task_id, **event.data})
+
+    started = datetime.now()
+    event_log.append("job_started", {"project_id": project_id, "provider": provider, "model": model})
+    try:
+        repos = get_repositories()
+        project = await repos.project.get_by_user_and_id(user_id, project_id)
+        if project is None:
+            raise NotFoundError("Project", project_id)
+        story = story_from_documents(
+            project.title, await repos.document.get_by_project_id(project_id), synopsis=project.description or "",
+        )
+        if not story.chapters:
+            raise ProcessingError(f"Project {project_id} has no text to generate a wiki from")
+        stored = await load_wiki(repos.checkpoint, project_id)
+        changed = stored.changed_chapters(story) if stored is not None else story.chapters
+        event_log.append("story_loaded", {
+            "chapters": story.total_chapters, "words": story.word_count,
+            "update": stored is not None, "changed_chapters": len(changed),
+        })
+
+        entity_index = await load_entity_index(repos.checkpoint, project_id, story)
+        metered = MeteredLLMService(llm_service or LLMService(user_repository=repos.user), tokens_used)
+        orchestrator = orchestrator_factory(
+            metered, entity_index=entity_index, checkpoint_repository=repos.checkpoint,
+            web_search_service=web_search_service,
+        )
+        if stored is None:
+            result = await orchestrator.generate_wiki(
+                story, user_id=UUID(user_id), provider=provider, model=model, on_event=pipeline_event,
+            )
+        else:
+            result = await orchestrator.update_wiki(
+                story, changed, stored.result, user_id=UUID(user_id), provider=provider, model=model,
+                on_event=pipeline_event,
+            )
+        await save_wiki(repos.checkpoint, project_id, story, result)
+        await save_entity_index(repos.checkpoint, project_id, entity_index)
+    except asyncio.CancelledError:
+        event_log.append("job_cancelled", {"tokens": totals})
+        raise
+    except Exception as e:
+        logger.error(f"WikiGen job for project {project_id} failed: {e}")
+        event_log.append("job_failed", {"error": str(e), "tokens": totals})
+        raise
+
+    event_log.append("job_completed", {
+        "arcs": len(result.archives),
+        "articles": sum(len(archive.articles) for archive in result.archives),
+        "tokens": totals,
+        "duration_seconds": (datetime.now() - started).total_seconds(),
+    })
+    return result
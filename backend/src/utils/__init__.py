@@ -6,6 +6,7 @@ from .json_schema_resolver import (
     json_schema_to_prompt_instructions,
 )
 from .json_cleaner import (
+    JSONScanner,
     clean_json_from_llm_response,
     parse_cleaned_json,
 )
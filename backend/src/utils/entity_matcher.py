@@ -0,0 +1,170 @@
+"""
+Entity Mention Matching
+
+Finds mentions of known names (wiki article titles and aliases) in chapter text
+with an Aho-Corasick automaton, so every name is searched for in one pass.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+# Words are matched whole, so the automaton runs over word tokens instead of
+# characters: word boundaries come for free and possessives ("Sarah's" is
+# "sarah" + "s") need no special casing. Apostrophes are ’ or '.
+_WORD_PATTERN = re.compile(r"\w+")
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'"})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _surface_key(text: str) -> str:
+    """Whitespace-collapsed, apostrophe-normalized form of a name, case kept."""
+    return _WHITESPACE.sub(" ", text.translate(_APOSTROPHES)).strip()
+
+
+@dataclass(frozen=True)
+class EntityMention:
+    """A span of text that matches one or more known names"""
+    start: int                  # Character offsets in the text (end exclusive)
+    end: int
+    text: str                   # The mention as written
+    targets: Tuple[str, ...]    # Everything the matched name refers to (article titles)
+    exact_case: bool            # Written with the same capitalization as a known name
+
+    @property
+    def is_ambiguous(self) -> bool:
+        """Refers to several targets, or only matches when ignoring case ("hope" vs "Hope")."""
+        return len(self.targets) != 1 or not self.exact_case
+
+
+class EntityMatcher:
+    """
+    Multi-pattern matcher over names (titles and aliases) with their targets.
+
+    Matching ignores case and apostrophe style, and only matches whole words.
+    Overlapping mentions are resolved leftmost-longest, so "Sarah Chen" wins
+    over "Sarah". Building is linear in the total length of the names and
+    find() is linear in the length of the text plus the mentions found.
+
+    Examples:
+        >>> matcher = EntityMatcher([("Sarah Chen", "Sarah Chen"), ("Sarah", "Sarah Chen")])
+        >>> [(m.text, m.targets) for m in matcher.find("Sarah's sister met Sarah Chen.")]
+        [('Sarah', ('Sarah Chen',)), ('Sarah Chen', ('Sarah Chen',))]
+    """
+
+    def __init__(self, names: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            names: (name, target) pairs; a name may map to several targets
+        """
+        # Trie over lowercased word tokens; node 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Pattern ids ending at each node (including via fail links, merged after building)
+        self._output: List[List[int]] = [[]]
+        self._pattern_length: List[int] = []
+        self._pattern_targets: List[Tuple[str, ...]] = []
+        self._pattern_surfaces: List[frozenset] = []         # Names as written
+        self._pattern_folded: List[frozenset] = []           # ... and lowercased
+
+        patterns: Dict[Tuple[str, ...], Tuple[List[str], set]] = {}
+        for name, target in names:
+            words = tuple(word.lower() for word in _WORD_PATTERN.findall(name.translate(_APOSTROPHES)))
+            if not words:
+                continue
+            targets, surfaces = patterns.setdefault(words, ([], set()))
+            if target not in targets:
+                targets.append(target)
+            surfaces.add(_surface_key(name))
+
+        for words, (targets, surfaces) in patterns.items():
+            node = 0
+            for word in words:
+                child = self._goto[node].get(word)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][word] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = child
+            self._output[node].append(len(self._pattern_length))
+            self._pattern_length.append(len(words))
+            self._pattern_targets.append(tuple(targets))
+            self._pattern_surfaces.append(frozenset(surfaces))
+            self._pattern_folded.append(frozenset(surface.lower() for surface in surfaces))
+        self._build_fail_links()
+
+    def __len__(self) -> int:
+        """Number of distinct names."""
+        return len(self._pattern_length)
+
+    def _build_fail_links(self) -> None:
+        """Breadth-first pass setting each node's fail link to its longest proper suffix in the trie."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for word, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def find(self, text: str) -> List[EntityMention]:
+        """
+        Find non-overlapping mentions of the known names.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Mentions in text order
+        """
+        if not self._pattern_length:
+            return []
+        lowered = text.lower()
+        if len(lowered) != len(text):  # A few characters lowercase to two; keep offsets aligned
+            lowered = "".join(char if len(char.lower()) != 1 else char.lower() for char in text)
+        words = _WORD_PATTERN.findall(lowered)
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._pattern_length
+        root = goto[0]
+
+        # (start token, end token, pattern id) for every pattern ending at every token
+        candidates: List[Tuple[int, int, int]] = []
+        node = 0
+        for index, word in enumerate(words):
+            if node:
+                while node and word not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(word, 0)
+            else:
+                node = root.get(word, 0)
+            if node and output[node]:
+                candidates.extend((index - lengths[pattern] + 1, index, pattern) for pattern in output[node])
+        if not candidates:
+            return []
+        tokens = [match.span() for match in _WORD_PATTERN.finditer(lowered)]
+
+        # Leftmost-longest. The words between tokens must be separated as in the name
+        # itself, so "Sarah. Chen" or a paragraph break is not "Sarah Chen".
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        mentions: List[EntityMention] = []
+        next_free = 0
+        for first, last, pattern in candidates:
+            if first < next_free:
+                continue
+            start, end = tokens[first][0], tokens[last][1]
+            surface = text[start:end]
+            key = _surface_key(surface)
+            if key.lower() not in self._pattern_folded[pattern] or "\n\n" in surface:
+                continue
+            mentions.append(EntityMention(
+                start=start,
+                end=end,
+                text=surface,
+                targets=self._pattern_targets[pattern],
+                exact_case=key in self._pattern_surfaces[pattern],
+            ))
+            next_free = last + 1
+        return mentions
@@ -3,152 +3,413 @@ JSON Cleaning Utilities
 
 Utilities for extracting and cleaning JSON from LLM responses that may contain
 markdown code blocks, extra text, or other formatting artifacts.
+
+Extraction is a single pass over the response (JSONScanner) that tracks code
+fence, string, escape and nesting state, so braces and backticks inside JSON
+strings are handled, no regex has to backtrack over the whole response, and
+only the chosen candidate is parsed. The scanner can be fed a streaming
+response chunk by chunk, and can repair a response that was cut off mid-JSON.
 """
 
 import re
 import json
-from typing import Optional, Union, Dict, Any
+from typing import List, NamedTuple, Optional, Tuple, Union, Dict, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Outside a JSON value: characters where a value or a code fence can start
+_OUTSIDE_PATTERN = re.compile(r"[{\[`]")
+# Where a fence's info string ends: JSON may follow on the same line (```json{"a": 1}```)
+_FENCE_INFO_END = re.compile(r"[{\[\s]")
+# Inside a value, outside strings (a backtick can't occur in JSON; it ends the value)
+_VALUE_PATTERN = re.compile(r'[{}\[\]",:`]')
+# The rest of a string after its opening quote (or a resumed chunk): stops at the closing quote or a trailing backslash
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+# An unfinished \uXXXX escape at the end of a truncated string
+_PARTIAL_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+
+# What the innermost open container expects next
+_KEY, _COLON, _VALUE, _AFTER = range(4)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONCandidate(NamedTuple):
+    """A complete (or repaired) top-level JSON value found in a response."""
+    text: str
+    fence: Optional[str]    # Language of the code fence it was in ("" for an unlabeled fence), None outside fences
+    repaired: bool = False
+
 
-def clean_json_from_llm_response(response: str) -> str:
+class JSONScanner:
+    """
+    Single-pass, incremental extraction of JSON from an LLM response.
+
+    Feed the response in one piece or chunk by chunk as it streams; every
+    character is looked at once. Top-level values are collected as candidates
+    and extract() returns the first valid one, preferring values in ```json
+    fences, then in other fences, then objects in the surrounding text (the
+    order the previous regex strategies tried them in).
+
+    Examples:
+        >>> scanner = JSONScanner()
+        >>> scanner.feed('Here you go:\\n```json\\n{"arcs": [{"id": 1}, ')
+        >>> scanner.feed('{"id": 2}]}\\n```')
+        >>> scanner.extract()
+        '{"arcs": [{"id": 1}, {"id": 2}]}'
+        >>> JSONScanner.scan('{"arcs": [{"id": 1}, {"id": 2').extract(repair=True)
+        '{"arcs": [{"id": 1}]}'
+    """
+
+    def __init__(self) -> None:
+        self.candidates: List[JSONCandidate] = []
+
+        # Code fence state
+        self._in_fence = False
+        self._fence_info: Optional[List[str]] = None    # Info string being read after an opening fence
+        self._fence_language: Optional[str] = None
+        self._backticks = 0                             # Backtick run continuing from the previous chunk
+
+        # Current top-level value
+        self._parts: Optional[List[str]] = None         # Text of the value, None when outside a value
+        self._segment_start: Optional[int] = None       # Where the value starts in the chunk being scanned
+        self._length = 0                                # Length of the text in _parts
+        self._stack: List[str] = []                     # Open containers ("{" or "[")
+        self._expect = _VALUE
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._scalar = False                            # A number or literal is being read
+        self._safe: Tuple[int, Tuple[str, ...]] = (0, ())  # Last cut point that can be closed, with the open containers there
+
+    @classmethod
+    def scan(cls, text: str) -> "JSONScanner":
+        """Scanner that has been fed a complete response."""
+        scanner = cls()
+        scanner.feed(text)
+        return scanner
+
+    @property
+    def in_value(self) -> bool:
+        """True while a top-level value is open (for a finished response: it was truncated)."""
+        return self._parts is not None
+
+    def feed(self, text: str) -> None:
+        """Scan the next piece of the response."""
+        pos, end = 0, len(text)
+        while pos < end:
+            if self._parts is None:
+                pos = self._scan_outside(text, pos)
+            else:
+                pos = self._scan_value(text, pos)
+
+    def extract(self, repair: bool = False) -> str:
+        """
+        The JSON text of the best valid candidate.
+
+        Args:
+            repair: If no complete candidate is valid, close a value the response
+                    was truncated in (see repair())
+
+        Raises:
+            ValueError: If no valid JSON was found
+        """
+        return self._choose(repair)[0].text
+
+    def parse(self, repair: bool = False) -> Any:
+        """The parsed value of the best valid candidate (see extract())."""
+        return self._choose(repair)[1]
+
+    def repair(self) -> Optional[str]:
+        """
+        Close the value the response was truncated in.
+
+        A string value cut off is closed (an unfinished escape is dropped);
+        otherwise the text is cut after the last complete value, dropping a
+        trailing comma, a key without its value, an unfinished number or
+        literal, or an unfinished array element. The open arrays and objects
+        are then closed.
+
+        Returns:
+            Repaired JSON text (not validated), or None if no value is open
+        """
+        if self._parts is None:
+            return None
+        text = "".join(self._parts)
+        if self._in_string and not self._string_is_key:
+            if self._escape:
+                text = text[:-1]
+            text = _PARTIAL_UNICODE_ESCAPE.sub("", text) + '"'
+            stack: Tuple[str, ...] = tuple(self._stack)
+        else:
+            length, stack = self._safe
+            text = text[:length]
+        return text + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+
+    def _scan_outside(self, text: str, pos: int) -> int:
+        """Scan text between values: code fences and the start of the next value."""
+        if self._fence_info is not None:
+            while not self._fence_info and pos < len(text) and text[pos] in " \t":
+                pos += 1  # ``` json
+            match = _FENCE_INFO_END.search(text, pos)
+            if match is None:
+                if pos < len(text):
+                    self._fence_info.append(text[pos:])
+                return len(text)
+            self._fence_info.append(text[pos:match.start()])
+            self._fence_language = "".join(self._fence_info).lower()
+            self._fence_info = None
+            return match.start()
+
+        if self._backticks:
+            return self._count_backticks(text, pos)
+
+        match = _OUTSIDE_PATTERN.search(text, pos)
+        if match is None:
+            return len(text)
+        start = match.start()
+        char = text[start]
+        if char == "`":
+            return self._count_backticks(text, start)
+        if char == "[" and not self._in_fence:
+            return start + 1  # Brackets in prose are not JSON
+        self._start_value(char, text, start)
+        return self._scan_value(text, start + 1)
+
+    def _count_backticks(self, text: str, pos: int) -> int:
+        """Count a backtick run (possibly continuing from the last chunk); three or more toggle a fence."""
+        end = len(text)
+        while pos < end and text[pos] == "`":
+            self._backticks += 1
+            pos += 1
+        if pos < end:
+            if self._backticks >= 3:
+                self._toggle_fence()
+            self._backticks = 0
+        return pos
+
+    def _toggle_fence(self) -> None:
+        if self._in_fence:
+            self._in_fence = False
+            self._fence_language = None
+        else:
+            self._in_fence = True
+            self._fence_info = []
+
+    def _start_value(self, opener: str, text: str, start: int) -> None:
+        self._parts = []
+        self._length = 0
+        self._segment_start = start
+        self._stack = [opener]
+        self._expect = _KEY if opener == "{" else _VALUE
+        self._in_string = self._escape = self._scalar = False
+        self._safe = (1, (opener,))
+
+    def _scan_value(self, text: str, pos: int) -> int:
+        """Scan inside a top-level value until it closes or the text ends."""
+        parts = self._parts
+        assert parts is not None, "_scan_value called outside a value"
+        segment_start = self._segment_start if self._segment_start is not None else pos
+        end = len(text)
+        while pos < end:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    if pos >= end:
+                        break
+                # Plain characters and escape pairs up to the closing quote, in one match
+                rest = _STRING_REST.match(text, pos)
+                assert rest is not None  # The pattern also matches the empty string
+                pos = rest.end()
+                if pos >= end:
+                    break
+                if text[pos] == "\\":  # An escape cut by the end of the chunk
+                    self._escape = True
+                    pos = end
+                    break
+                pos += 1
+                self._in_string = False
+                if self._string_is_key:
+                    self._expect = _COLON
+                else:
+                    self._expect = _AFTER
+                    self._mark_safe(self._offset(segment_start, pos))
+                continue
+
+            match = _VALUE_PATTERN.search(text, pos)
+            stop = match.start() if match is not None else end
+            if self._expect == _VALUE and not self._scalar and text[pos:stop].strip():
+                self._scalar = True
+            if match is None:
+                pos = end
+                break
+            char = match.group()
+            pos = stop + 1
+
+            if char == '"':
+                self._string_is_key = self._stack[-1] == "{" and self._expect == _KEY
+                # Most strings end within the chunk: match them whole
+                rest = _STRING_REST.match(text, pos)
+                assert rest is not None
+                string_end = rest.end()
+                if string_end < end and text[string_end] == '"':
+                    pos = string_end + 1
+                    if self._string_is_key:
+                        self._expect = _COLON
+                    else:
+                        self._expect = _AFTER
+                        self._mark_safe(self._offset(segment_start, pos))
+                else:
+                    self._in_string = True
+            elif char == ":":
+                self._expect = _VALUE
+            elif char == ",":
+                self._end_scalar(self._offset(segment_start, stop))
+                self._expect = _KEY if self._stack[-1] == "{" else _VALUE
+            elif char in "{[":
+                in_array = self._stack[-1] == "["
+                self._stack.append(char)
+                self._expect = _KEY if char == "{" else _VALUE
+                if not in_array:
+                    # An object's key keeps an empty container; an unfinished array element is dropped instead
+                    self._mark_safe(self._offset(segment_start, pos))
+            elif char in "}]":
+                self._end_scalar(self._offset(segment_start, stop))
+                self._stack.pop()
+                if not self._stack:
+                    self._finish_value(text[segment_start:pos])
+                    return pos
+                self._expect = _AFTER
+                self._mark_safe(self._offset(segment_start, pos))
+            else:  # A backtick: not JSON, so the value (and any fence it was in) ends here
+                self._abandon_value()
+                return stop
+
+        parts.append(text[segment_start:pos])
+        self._length += pos - segment_start
+        self._segment_start = None
+        return pos
+
+    def _offset(self, segment_start: int, pos: int) -> int:
+        """Offset within the value's text of a position in the current chunk."""
+        return self._length + pos - segment_start
+
+    def _mark_safe(self, offset: int) -> None:
+        self._safe = (offset, tuple(self._stack))
+
+    def _end_scalar(self, offset: int) -> None:
+        if self._scalar:
+            self._scalar = False
+            self._mark_safe(offset)
+
+    def _finish_value(self, last_segment: str) -> None:
+        assert self._parts is not None
+        self._parts.append(last_segment)
+        self.candidates.append(JSONCandidate("".join(self._parts), self._fence_language if self._in_fence else None))
+        self._parts = None
+        self._segment_start = None
+
+    def _abandon_value(self) -> None:
+        self._parts = None
+        self._segment_start = None
+        self._stack = []
+
+    # ------------------------------------------------------------------
+    # Choosing a candidate
+    # ------------------------------------------------------------------
+
+    def _choose(self, repair: bool) -> Tuple[JSONCandidate, Any]:
+        ranked = sorted(
+            enumerate(self.candidates),
+            key=lambda item: (0 if item[1].fence == "json" else 1 if item[1].fence is not None else 2, item[0]),
+        )
+        for _, candidate in ranked:
+            text = candidate.text.strip()
+            try:
+                value = json.loads(text)
+            except (json.JSONDecodeError, ValueError):
+                continue
+            logger.debug(f"✅ Extracted JSON from {'a ```' + candidate.fence + '``` block' if candidate.fence is not None else 'raw text'}")
+            return candidate._replace(text=text), value
+
+        if repair:
+            repaired = self.repair()
+            if repaired is not None:
+                try:
+                    value = json.loads(repaired)
+                except (json.JSONDecodeError, ValueError):
+                    pass
+                else:
+                    logger.debug("🩹 Repaired truncated JSON")
+                    return JSONCandidate(repaired, self._fence_language if self._in_fence else None, repaired=True), value
+        raise ValueError("Could not extract valid JSON from response")
+
+
+def clean_json_from_llm_response(response: str, repair: bool = False) -> str:
     """
     Extract clean JSON from an LLM response that may contain markdown code blocks or extra text.
-    
+
     This function handles several common LLM response patterns:
     1. JSON wrapped in ```json ``` markdown code blocks (gets outermost blocks)
     2. JSON with nested backticks inside the content
     3. Raw JSON mixed with other text (finds first complete JSON object)
     4. Multiple JSON blocks (returns the first valid one)
-    
+    5. With repair=True, JSON cut off mid-response (see JSONScanner.repair)
+
     Args:
         response: Raw LLM response string that may contain JSON
-        
+        repair: Close truncated JSON if the response has no complete valid JSON
+
     Returns:
         Clean JSON string ready for parsing
-        
+
     Raises:
         ValueError: If no valid JSON could be extracted from the response
-        
+
     Examples:
         >>> clean_json_from_llm_response('```json\\n{"key": "value"}\\n```')
         '{"key": "value"}'
-        
+
         >>> clean_json_from_llm_response('Here is the result: {"key": "value"} Done!')
         '{"key": "value"}'
-        
-        >>> clean_json_from_llm_response('```json\\n{"inner": "```txt\\ncode\\n```"}\\n```')
-        '{"inner": "```txt\\ncode\\n```"}'
+
+        >>> clean_json_from_llm_response('```json\\n{"inner": "```txt\\\\ncode\\\\n```"}\\n```')
+        '{"inner": "```txt\\\\ncode\\\\n```"}'
     """
     if not response or not response.strip():
         raise ValueError("Empty response provided")
-    
-    response = response.strip()
-    
-    # Strategy 1: Look for ```json ``` markdown code blocks
-    json_from_markdown = _extract_json_from_markdown(response)
-    if json_from_markdown:
-        return json_from_markdown
-    
-    # Strategy 2: Look for any ``` code blocks (might be unlabeled JSON)
-    json_from_code_block = _extract_json_from_code_block(response)
-    if json_from_code_block:
-        return json_from_code_block
-    
-    # Strategy 3: Look for raw JSON objects in the text
-    json_from_raw = _extract_raw_json(response)
-    if json_from_raw:
-        return json_from_raw
-    
-    # If all strategies fail, raise an error
-    raise ValueError(f"Could not extract valid JSON from response. Response preview: {response[:200]}...")
 
-
-def _extract_json_from_markdown(response: str) -> Optional[str]:
-    """Extract JSON from ```json ``` markdown code blocks, handling nested backticks."""
-    # Pattern to match ```json at the start of a line, followed by content, then closing ```
-    # Use non-greedy matching and ensure we get the outermost blocks
-    pattern = r'```json\s*\n(.*?)\n```'
-    
-    matches = re.findall(pattern, response, re.DOTALL | re.IGNORECASE)
-    
-    for match in matches:
-        json_candidate = match.strip()
-        if _is_valid_json(json_candidate):
-            logger.debug("✅ Extracted JSON from ```json``` markdown block")
-            return json_candidate
-    
-    return None
-
-
-def _extract_json_from_code_block(response: str) -> Optional[str]:
-    """Extract JSON from generic ``` code blocks that might contain JSON."""
-    # Pattern to match any ``` code block
-    pattern = r'```[a-zA-Z]*\s*\n(.*?)\n```'
-    
-    matches = re.findall(pattern, response, re.DOTALL)
-    
-    for match in matches:
-        json_candidate = match.strip()
-        if _is_valid_json(json_candidate):
-            logger.debug("✅ Extracted JSON from generic code block")
-            return json_candidate
-    
-    return None
-
-
-def _extract_raw_json(response: str) -> Optional[str]:
-    """Extract raw JSON objects from text, finding the first complete { } pair."""
-    # Find all potential JSON objects by looking for { } pairs
-    brace_count = 0
-    start_pos = None
-    
-    for i, char in enumerate(response):
-        if char == '{':
-            if brace_count == 0:
-                start_pos = i
-            brace_count += 1
-        elif char == '}':
-            brace_count -= 1
-            if brace_count == 0 and start_pos is not None:
-                # Found a complete JSON object
-                json_candidate = response[start_pos:i+1]
-                if _is_valid_json(json_candidate):
-                    logger.debug("✅ Extracted JSON from raw text")
-                    return json_candidate
-                # Reset for next potential JSON object
-                start_pos = None
-    
-    return None
-
-
-def _is_valid_json(text: str) -> bool:
-    """Check if a string is valid JSON without raising exceptions."""
     try:
-        json.loads(text)
-        return True
-    except (json.JSONDecodeError, ValueError):
-        return False
+        return JSONScanner.scan(response).extract(repair=repair)
+    except ValueError:
+        raise ValueError(f"Could not extract valid JSON from response. Response preview: {response.strip()[:200]}...")
 
 
-def parse_cleaned_json(response: str) -> Union[Dict[Any, Any], list]:
+def parse_cleaned_json(response: str, repair: bool = False) -> Union[Dict[Any, Any], list]:
     """
     Clean and parse JSON from an LLM response in one step.
-    
+
     Args:
         response: Raw LLM response string
-        
+        repair: Close truncated JSON if the response has no complete valid JSON
+
     Returns:
         Parsed JSON object (dict or list)
-        
+
     Raises:
         ValueError: If JSON could not be extracted or parsed
-        json.JSONDecodeError: If the extracted JSON is malformed
     """
-    cleaned_json = clean_json_from_llm_response(response)
-    return json.loads(cleaned_json)
+    if not response or not response.strip():
+        raise ValueError("Empty response provided")
+    # Candidates start with { or [, so the parsed value is an object or an array
+    parsed: Union[Dict[Any, Any], list] = JSONScanner.scan(response).parse(repair=repair)
+    return parsed
 
 
 # Example usage and test cases
@@ -0,0 +1,140 @@
+"""
+Streaming JSON Utilities
+
+Incremental parsing of JSON that arrives in chunks from a streaming LLM response,
+so completed parts of a structured output can be used before the response ends.
+"""
+
+import json
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Top-level string values can be long (summaries); keys never are
+_MAX_KEY_LENGTH = 128
+
+
+class JSONArrayItemStream:
+    """
+    Emits the items of a top-level array field as soon as each one is complete.
+
+    Fed the text of a response like ``{"summary": "...", "arcs": [{...}, {...}]}``
+    chunk by chunk, it returns each object of ``arcs`` once its closing brace has
+    streamed in. The scan is a single pass over the input that tracks string,
+    escape and nesting state, so braces inside strings are handled and total work
+    is linear in the response length. Text before the first ``{`` (a preamble or
+    a markdown code fence) is ignored.
+
+    Examples:
+        >>> stream = JSONArrayItemStream("arcs")
+        >>> stream.feed('```json\\n{"arcs": [{"id": 1}, {"id"')
+        [{'id': 1}]
+        >>> stream.feed(': 2}]}\\n```')
+        [{'id': 2}]
+    """
+
+    def __init__(self, field: str):
+        """
+        Args:
+            field: Name of the top-level array field whose items are emitted
+        """
+        self.field = field
+        self.items_emitted = 0
+        self.errors: List[str] = []
+
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_chars: List[str] = []  # Current top-level string (candidate key)
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_target = False
+        self._item_parts: Optional[List[str]] = None  # Text of the item being streamed
+        self._item_start = 0  # Start of the current item within the current chunk
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        """True once the target array has been closed."""
+        return self._done
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Scan the next chunk of the response.
+
+        Args:
+            text: Next piece of the streamed response
+
+        Returns:
+            Items completed by this chunk, parsed with json.loads (items that fail
+            to parse are skipped and recorded in self.errors)
+        """
+        completed: List[Any] = []
+        if self._done or not text:
+            return completed
+
+        self._item_start = 0
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._key_chars)
+                elif self._depth == 1 and len(self._key_chars) < _MAX_KEY_LENGTH:
+                    self._key_chars.append(char)
+                continue
+
+            if not self._started:
+                if char != "{":
+                    continue
+                self._started = True
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._key_chars = []
+            elif char == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif char == "," and self._depth == 1:
+                self._current_key = None
+            elif char in "{[":
+                self._depth += 1
+                if self._in_target and self._depth == 3 and char == "{":
+                    self._item_parts = []
+                    self._item_start = i
+                elif self._depth == 2 and char == "[" and self._current_key == self.field:
+                    self._in_target = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._in_target and self._depth == 2 and char == "}" and self._item_parts is not None:
+                    self._item_parts.append(text[self._item_start:i + 1])
+                    item = self._parse_item("".join(self._item_parts))
+                    if item is not None:
+                        completed.append(item)
+                    self._item_parts = None
+                elif self._in_target and self._depth == 1:
+                    self._in_target = False
+                    self._done = True
+                    break
+                if self._depth <= 0:
+                    break
+
+        if self._item_parts is not None and not self._done:
+            self._item_parts.append(text[self._item_start:])
+        return completed
+
+    def _parse_item(self, raw: str) -> Optional[Any]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"Item {self.items_emitted + len(self.errors) + 1} of '{self.field}': {e}")
+            logger.debug(f"Skipping unparseable streamed item of '{self.field}': {e}")
+            return None
+        self.items_emitted += 1
+        return item
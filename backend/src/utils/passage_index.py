@@ -0,0 +1,235 @@
+"""
+Passage Retrieval
+
+In-process BM25 index over story passages, so a prompt about one subject (a
+character, a location) can carry only the passages relevant to it instead of
+the whole arc.
+
+Chapters are cut into passages of whole paragraphs. Term weights are computed
+once at build time and stored per term as arrays of (passage, weight) postings,
+as NumPy arrays when NumPy is available (the "retrieval" extra; a query is
+then a few vectorized additions) and as plain lists otherwise. An optional
+embedding hook adds dense similarity on top of BM25.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.core.text_processing import PARAGRAPH_BREAK_PATTERN
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is not installed
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+# Embeds a batch of texts into vectors (a local model; called once for all passages, then per query)
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+_TERM_PATTERN = re.compile(r"\w+")
+_CHAPTER_PATTERN = re.compile(r'<Chapter number="(\d+)"[^>]*>\n?(.*?)\n?</Chapter>', re.DOTALL)
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i if in into is it its me my no not "
+    "of on or our she so than that the their them then there they this to was we were what when which who "
+    "will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word terms without stopwords ("Sarah's" gives "sarah", "s")."""
+    return [term for term in _TERM_PATTERN.findall(text.lower()) if term not in _STOPWORDS]
+
+
+@dataclass(frozen=True)
+class Passage:
+    """A run of whole paragraphs from one chapter"""
+    chapter_number: int
+    index: int          # Position in the index (story order)
+    text: str
+    tokens: int         # Model tokens, for prompt budgets
+
+    def to_prompt_text(self) -> str:
+        return f'<Passage chapter="{self.chapter_number}">\n{self.text}\n</Passage>'
+
+
+class PassageIndex:
+    """
+    BM25 (Okapi) index over passages, with optional embedding similarity.
+
+    Examples:
+        >>> index = PassageIndex.from_chapters([(1, "Sarah drew her sword.\\n\\nThe city slept.")], passage_tokens=5)
+        >>> [p.text for p, _ in index.search("sarah sword", k=1)]
+        ['Sarah drew her sword.']
+    """
+
+    def __init__(
+        self,
+        passages: List[Passage],
+        k1: float = 1.5,
+        b: float = 0.75,
+        embedder: Optional[Embedder] = None,
+        embedding_weight: float = 0.5
+    ):
+        """
+        Args:
+            passages: Passages in story order
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            embedder: Optional embedding function; scores then mix BM25 and cosine similarity
+            embedding_weight: Share of the embedding similarity in the mixed score (0-1)
+        """
+        self.passages = passages
+        self.embedder = embedder
+        self.embedding_weight = embedding_weight
+
+        term_counts = [Counter(tokenize(passage.text)) for passage in passages]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = (sum(lengths) / len(lengths)) if lengths and sum(lengths) else 1.0
+
+        # term -> ([passage index], [weight]); weight = idf * saturated, length-normalized tf
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for passage_index, (counts, length) in enumerate(zip(term_counts, lengths)):
+            norm = k1 * (1 - b + b * length / average_length)
+            for term, frequency in counts.items():
+                docs, weights = postings.setdefault(term, ([], []))
+                docs.append(passage_index)
+                weights.append(frequency * (k1 + 1) / (frequency + norm))
+        count = len(passages)
+        # Only one of these is filled: arrays when NumPy is available, else lists
+        self._vectorized = np is not None
+        self._postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._arrays: Dict[str, Tuple["NDArray[Any]", "NDArray[Any]"]] = {}
+        for term, (docs, weights) in postings.items():
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scaled = [weight * idf for weight in weights]
+            if self._vectorized:
+                self._arrays[term] = (np.asarray(docs, dtype=np.int32), np.asarray(scaled, dtype=np.float32))
+            else:
+                self._postings[term] = (docs, scaled)
+
+        self._embeddings = self._embed_passages() if embedder is not None else None
+
+    @classmethod
+    def from_chapters(
+        cls,
+        chapters: Sequence[Tuple[int, str]],
+        passage_tokens: int = 300,
+        count: Optional[Callable[[str], int]] = None,
+        **kwargs: Any
+    ) -> "PassageIndex":
+        """
+        Index chapters cut into passages of whole paragraphs.
+
+        Args:
+            chapters: (chapter_number, content) pairs in story order
+            passage_tokens: Target passage size; paragraphs are joined up to it
+                            (a longer paragraph is a passage of its own)
+            count: Token counter (default: word count)
+            **kwargs: Passed to the constructor
+
+        Returns:
+            Index over the passages
+        """
+        count = count or (lambda text: len(text.split()))
+        passages: List[Passage] = []
+        for chapter_number, content in chapters:
+            current: List[str] = []
+            current_tokens = 0
+            for paragraph in PARAGRAPH_BREAK_PATTERN.split(content):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                tokens = count(paragraph)
+                if current and current_tokens + tokens > passage_tokens:
+                    passages.append(Passage(chapter_number, len(passages), "\n\n".join(current), current_tokens))
+                    current, current_tokens = [], 0
+                current.append(paragraph)
+                current_tokens += tokens
+            if current:
+                passages.append(Passage(chapter_number, len(passages), "\n\n".join(current), current_tokens))
+        return cls(passages, **kwargs)
+
+    @classmethod
+    def from_story_text(cls, content: str, **kwargs: Any) -> "PassageIndex":
+        """Index prompt text made of <Chapter number="N"> blocks (as FullStoryBase.get_content returns)."""
+        chapters = [(int(number), body) for number, body in _CHAPTER_PATTERN.findall(content)]
+        return cls.from_chapters(chapters or [(1, content)], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def scores(self, query: str) -> List[float]:
+        """Relevance score of every passage for the query."""
+        scores: List[float]
+        if self._vectorized:
+            totals = np.zeros(len(self.passages), dtype=np.float32)
+            for term, repeats in Counter(term for term in tokenize(query) if term in self._arrays).items():
+                doc_array, weight_array = self._arrays[term]
+                totals[doc_array] += weight_array * repeats  # Passages are unique within a term's postings
+            scores = totals.tolist()
+        else:
+            scores = [0.0] * len(self.passages)
+            for term, repeats in Counter(term for term in tokenize(query) if term in self._postings).items():
+                docs, weights = self._postings[term]
+                for doc, weight in zip(docs, weights):
+                    scores[doc] += weight * repeats
+
+        if self._embeddings is not None and scores:
+            top = max(scores) or 1.0
+            similarities = self._query_similarities(query)
+            w = self.embedding_weight
+            scores = [(1 - w) * score / top + w * similarity for score, similarity in zip(scores, similarities)]
+        return scores
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Passage, float]]:
+        """Top k passages with a positive score, best first."""
+        scored = [(score, passage.index) for passage, score in zip(self.passages, self.scores(query)) if score > 0]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.passages[index], score) for score, index in scored[:k]]
+
+    def select(self, query: str, token_budget: int, k: Optional[int] = None) -> List[Passage]:
+        """
+        The most relevant passages that fit a token budget, in story order.
+
+        Args:
+            query: What the passages should be about
+            token_budget: Maximum total passage tokens
+            k: Optional cap on the number of passages
+
+        Returns:
+            Selected passages in story order (best ones first when choosing)
+        """
+        selected: List[Passage] = []
+        used = 0
+        for passage, _ in self.search(query, k=len(self.passages)):
+            if k is not None and len(selected) >= k:
+                break
+            if used + passage.tokens > token_budget:
+                continue
+            selected.append(passage)
+            used += passage.tokens
+        return sorted(selected, key=lambda passage: passage.index)
+
+    def _embed_passages(self) -> Any:
+        """Unit-length passage embeddings (a matrix with NumPy, else a list of rows)."""
+        assert self.embedder is not None
+        rows = [_normalize(vector) for vector in self.embedder([passage.text for passage in self.passages])]
+        return np.asarray(rows, dtype=np.float32) if self._vectorized else rows
+
+    def _query_similarities(self, query: str) -> List[float]:
+        assert self.embedder is not None and self._embeddings is not None
+        vector = _normalize(self.embedder([query])[0])
+        if self._vectorized:
+            similarities: List[float] = (self._embeddings @ np.asarray(vector, dtype=np.float32)).tolist()
+            return similarities
+        return [sum(a * b for a, b in zip(row, vector)) for row in self._embeddings]
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
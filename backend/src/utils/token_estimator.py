@@ -1,19 +1,22 @@
-def count_tokens(text: str) -> int:
-    """Simple token estimator that estimates the number of tokens based on:
-    
-    1 token ~= 4 chars in English
-    1 token ~= 3/4 words
-    
-    and taking the average of the two.
+from typing import Optional
+
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+from src.utils.tokenizers import count_tokens_cached, get_tokenizer
+
+
+def count_tokens(text: str, provider: Optional[PROVIDER_ID] = None, model: Optional[MODEL_NAME] = None) -> int:
+    """Count the tokens in text with the model's tokenizer.
+
+    Uses the BPE vocabulary of the model's family when available, otherwise
+    the heuristic estimate (average of 1 token ~= 4 chars and 1 token ~= 3/4
+    words). Counts are memoized by content hash (see utils.tokenizers).
 
     Args:
-        text (str): The text to estimate the number of tokens in.
+        text (str): The text to count the tokens in.
+        provider (Optional[PROVIDER_ID]): Provider of the model (None for the default tokenizer).
+        model (Optional[MODEL_NAME]): Model whose tokenizer to use.
 
     Returns:
-        int: The estimated number of tokens in the text.
+        int: The number of tokens in the text.
     """
-    word_count = len(text.split(" "))
-    char_count = len(text)
-    tokens_count_word_est = word_count / 0.75
-    tokens_count_char_est = char_count / 4.0
-    return int((tokens_count_word_est + tokens_count_char_est) / 2) 
\ No newline at end of file
+    return count_tokens_cached(text, get_tokenizer(provider, model))
@@ -0,0 +1,297 @@
+"""
+Tokenizers
+
+Pluggable token counting for chunking stories into model context windows.
+
+Each model family maps to an offline BPE vocabulary (via the optional tiktoken
+package, installed with the "tokenizers" extra). When tiktoken or the
+vocabulary files are unavailable, counting falls back to the character/word
+heuristic in token_estimator. Counts are memoized by content hash, so
+re-chunking the same chapters costs a dictionary lookup.
+
+Vocabularies are only ever read from local files, never downloaded: from
+TOKENIZER_VOCAB_DIR, or tiktoken's cache directory when it is unset. A
+vocabulary file is either the plain <encoding>.tiktoken file or tiktoken's
+cache file, named by the SHA-1 of the vocabulary URL (e.g.
+9b5ad71b2ce5302211f9c61530b329a4922fc6a4 for cl100k_base,
+fb374d419588a4632f3f557e76b4b70aebbca790 for o200k_base). Populate a directory
+once on a machine with network access:
+
+    TIKTOKEN_CACHE_DIR=/path/to/vocab python -c "import tiktoken; [tiktoken.get_encoding(e) for e in ('cl100k_base', 'o200k_base')]"
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from src.core.constants import MODEL_NAME, PROVIDER_ID
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer(ABC):
+    """Counts tokens in text"""
+
+    name: str
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        pass
+
+
+class HeuristicTokenizer(Tokenizer):
+    """Average of the ~4 chars/token and ~0.75 words/token rules of thumb"""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        word_count = len(text.split(" "))
+        char_count = len(text)
+        tokens_count_word_est = word_count / 0.75
+        tokens_count_char_est = char_count / 4.0
+        return int((tokens_count_word_est + tokens_count_char_est) / 2)
+
+
+@dataclass(frozen=True)
+class EncodingSpec:
+    """Where a BPE encoding's vocabulary comes from and how text is split before merging"""
+
+    url: str
+    pat_str: str
+    special_tokens: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def cache_key(self) -> str:
+        """Name of the vocabulary file in tiktoken's cache"""
+        return hashlib.sha1(self.url.encode()).hexdigest()
+
+
+# As defined in tiktoken_ext.openai_public, whose constructors download missing vocabularies
+ENCODINGS: Dict[str, EncodingSpec] = {
+    "cl100k_base": EncodingSpec(
+        url="https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+        pat_str=r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s""",
+        special_tokens={
+            "<|endoftext|>": 100257,
+            "<|fim_prefix|>": 100258,
+            "<|fim_middle|>": 100259,
+            "<|fim_suffix|>": 100260,
+            "<|endofprompt|>": 100276,
+        },
+    ),
+    "o200k_base": EncodingSpec(
+        url="https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+        pat_str="|".join([
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""\p{N}{1,3}""",
+            r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+            r"""\s*[\r\n]+""",
+            r"""\s+(?!\S)""",
+            r"""\s+""",
+        ]),
+        special_tokens={"<|endoftext|>": 199999, "<|endofprompt|>": 200018},
+    ),
+}
+
+
+class BPETokenizer(Tokenizer):
+    """Exact counts with a tiktoken BPE encoding (e.g. cl100k_base, o200k_base)"""
+
+    def __init__(self, encoding_name: str, vocab_dir: Optional[str] = None):
+        """
+        Args:
+            encoding_name: Encoding name (a key of ENCODINGS)
+            vocab_dir: Directory with the vocabulary file (default: TOKENIZER_VOCAB_DIR,
+                       else tiktoken's cache directory)
+
+        Raises:
+            ImportError: If tiktoken is not installed
+            KeyError: If the encoding is unknown
+            FileNotFoundError: If the vocabulary file is not in vocab_dir
+        """
+        import tiktoken
+
+        spec = ENCODINGS[encoding_name]
+        path = _vocab_file(encoding_name, spec, vocab_dir or _vocab_dir())
+        self._encoding = tiktoken.Encoding(
+            name=encoding_name,
+            pat_str=spec.pat_str,
+            mergeable_ranks=_read_ranks(path),
+            special_tokens=spec.special_tokens,
+        )
+        self.name = f"bpe:{encoding_name}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def _vocab_dir() -> str:
+    """TOKENIZER_VOCAB_DIR, else the cache directory tiktoken itself would use"""
+    from src.config import settings
+    return (
+        settings.TOKENIZER_VOCAB_DIR
+        or os.environ.get("TIKTOKEN_CACHE_DIR")
+        or os.environ.get("DATA_GYM_CACHE_DIR")
+        or os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    )
+
+
+def _vocab_file(encoding_name: str, spec: EncodingSpec, vocab_dir: str) -> str:
+    for filename in (f"{encoding_name}.tiktoken", spec.cache_key):
+        path = os.path.join(vocab_dir, filename)
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"No {encoding_name} vocabulary in {vocab_dir}")
+
+
+def _read_ranks(path: str) -> Dict[bytes, int]:
+    """Parse a .tiktoken vocabulary: one base64 token and its rank per line"""
+    ranks: Dict[bytes, int] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+# Model family prefix -> BPE encoding. Families without a public tokenizer use the
+# closest public vocabulary (counts are within a few percent for English prose).
+FAMILY_ENCODINGS: Dict[str, str] = {
+    "gpt-4.1": "o200k_base",
+    "gpt-4o": "o200k_base",
+    "o3": "o200k_base",
+    "o4": "o200k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-3.5": "cl100k_base",
+    "claude": "cl100k_base",
+    "gemini": "o200k_base",
+}
+DEFAULT_ENCODING = "cl100k_base"
+
+TokenizerFactory = Callable[[], Tokenizer]
+
+_custom_factories: Dict[str, TokenizerFactory] = {}
+_tokenizers: Dict[str, Tokenizer] = {}
+_heuristic = HeuristicTokenizer()
+
+
+def register_tokenizer(family_prefix: str, factory: TokenizerFactory) -> None:
+    """
+    Use a custom tokenizer for model families starting with family_prefix.
+
+    Args:
+        family_prefix: Model family ID prefix (e.g. "claude")
+        factory: Creates the tokenizer on first use
+    """
+    _custom_factories[family_prefix] = factory
+    _tokenizers.pop(f"custom:{family_prefix}", None)
+
+
+def _load(key: str, factory: TokenizerFactory) -> Tokenizer:
+    if key not in _tokenizers:
+        try:
+            _tokenizers[key] = factory()
+        except Exception as e:
+            logger.info(f"Tokenizer '{key}' unavailable, using heuristic token counts: {e}")
+            _tokenizers[key] = _heuristic
+    return _tokenizers[key]
+
+
+def _family_id(provider: Optional[PROVIDER_ID], model: Optional[MODEL_NAME]) -> str:
+    if provider and model:
+        from src.utils.catalog import get_hosted_model_instance
+        instance = get_hosted_model_instance(provider, model)
+        if instance:
+            return instance.model_family_id
+    return model or ""
+
+
+def _longest_prefix(family: str, prefixes: Iterable[str]) -> Optional[str]:
+    matches = [prefix for prefix in prefixes if family.startswith(prefix)]
+    return max(matches, key=len) if matches else None
+
+
+def get_tokenizer(provider: Optional[PROVIDER_ID] = None, model: Optional[MODEL_NAME] = None) -> Tokenizer:
+    """
+    Tokenizer for a model, falling back to the heuristic when no BPE vocabulary is available.
+
+    Args:
+        provider: Provider of the model (None for the default tokenizer)
+        model: Model name
+
+    Returns:
+        A shared Tokenizer instance
+    """
+    family = _family_id(provider, model)
+
+    custom = _longest_prefix(family, _custom_factories) if family else None
+    if custom is not None:
+        return _load(f"custom:{custom}", _custom_factories[custom])
+
+    prefix = _longest_prefix(family, FAMILY_ENCODINGS) if family else None
+    encoding = FAMILY_ENCODINGS[prefix] if prefix else DEFAULT_ENCODING
+    return _load(f"bpe:{encoding}", lambda: BPETokenizer(encoding))
+
+
+def get_heuristic_tokenizer() -> Tokenizer:
+    """The dependency-free heuristic tokenizer."""
+    return _heuristic
+
+
+# ----------------------------------------------------------------------
+# Memoized counts
+# ----------------------------------------------------------------------
+
+_count_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def content_hash(text: str) -> str:
+    """Key under which a text's token counts are memoized."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def count_tokens_cached(text: str, tokenizer: Optional[Tokenizer] = None, text_hash: Optional[str] = None) -> int:
+    """
+    Count tokens, memoized by (tokenizer, content hash) in a bounded LRU cache.
+
+    Args:
+        text: Text to count
+        tokenizer: Tokenizer to use (default: get_tokenizer())
+        text_hash: Precomputed content_hash(text), if the caller has one
+
+    Returns:
+        Number of tokens in text
+    """
+    from src.config import settings
+
+    tokenizer = tokenizer or get_tokenizer()
+    key = (tokenizer.name, text_hash or content_hash(text))
+    cached = _count_cache.get(key)
+    if cached is not None:
+        _count_cache.move_to_end(key)
+        cache_stats["hits"] += 1
+        return cached
+
+    cache_stats["misses"] += 1
+    count = tokenizer.count(text)
+    _count_cache[key] = count
+    if len(_count_cache) > settings.TOKEN_COUNT_CACHE_SIZE:
+        _count_cache.popitem(last=False)
+    return count
+
+
+def clear_token_cache() -> None:
+    """Forget memoized counts and loaded tokenizers (for tests and benchmarks)."""
+    _count_cache.clear()
+    _tokenizers.clear()
+    cache_stats.update(hits=0, misses=0)
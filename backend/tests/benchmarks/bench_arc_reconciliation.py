@@ -0,0 +1,150 @@
+"""
+Benchmark for ArcSplitterAgent's parallel window mode against the sequential run
+
+Splits the pokemon_amber test story with small windows, once sequentially and
+once in parallel mode, and reports wall time, LLM calls and the quality drift
+of the reconciled parallel split (arc boundary precision/recall/F1 against the
+sequential split).
+
+By default the LLM is simulated: it answers with a fixed set of ground-truth
+arcs cut to the chapters in each prompt, with latency proportional to the
+chapters it reads. This measures reconciliation logic and concurrency only.
+Pass --live to call a real model and measure actual drift.
+
+Run with: python -m tests.benchmarks.bench_arc_reconciliation [--window-chapters 3] [--overlap 2]
+          python -m tests.benchmarks.bench_arc_reconciliation --live --provider openai --model gpt-4.1-mini --api-key sk-...
+"""
+import argparse
+import asyncio
+import re
+import time
+from pathlib import Path
+from typing import AsyncIterator, Tuple
+from uuid import uuid4
+
+from src.agents.wikigen import arc_splitter
+from src.agents.wikigen.arc_reconciliation import compare_arc_boundaries
+from src.agents.wikigen.arc_splitter import ArcSplitterAgent
+from src.schemas.db.story import Chapter, FullStoryBase, StoryMetadata
+from src.schemas.llm.models import ChunkType, LLMResponse
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+
+
+STORY_DIR = Path(__file__).parent.parent / "resources" / "pokemon_amber" / "story"
+GROUND_TRUTH = [(1, 4), (5, 9), (10, 13), (14, 17)]
+SECONDS_PER_CHAPTER = 0.05
+
+
+def load_story() -> FullStoryBase:
+    """Load the test story from its chapter XML files."""
+    chapters = []
+    for path in STORY_DIR.glob("*.xml"):
+        if not path.stem.isdigit():
+            continue  # _meta.xml
+        text = path.read_text(encoding="utf-8")
+        title = re.search(r'<Chapter title="([^"]*)">', text)
+        content = re.sub(r"</?Chapter[^>]*>", "", text).strip()
+        chapters.append(Chapter(chapter_number=int(path.stem), title=title.group(1) if title else path.stem, content=content))
+    return FullStoryBase(metadata=StoryMetadata(title="Pokemon: Ambertwo", genres=["Fantasy"]), chapters=chapters)
+
+
+class SimulatedLLM:
+    """Answers with GROUND_TRUTH arcs cut to the prompt's chapters, following the is_finalized rules."""
+
+    def __init__(self, total_chapters: int):
+        self.total_chapters = total_chapters
+        self.calls = 0
+
+    async def chat_completion(self, messages, stream=False, **kwargs) -> AsyncIterator[LLMResponse]:
+        prompt = messages[-1].content
+        chapters = [int(n) for n in re.findall(r'<Chapter number="(\d+)"', prompt)]
+        first, last = chapters[0], chapters[-1]
+        continuation = "CONTINUATION MODE" in prompt
+        self.calls += 1
+        await asyncio.sleep(SECONDS_PER_CHAPTER * len(chapters))
+
+        arcs = [
+            Arc(
+                id=arc_id, title=f"Arc {arc_id}",
+                start_chapter=start if continuation else max(start, first), end_chapter=min(end, last),
+                summary="Simulated arc summary.", key_events="Simulated events",
+                is_finalized=not (min(end, last) == last and last != self.total_chapters),
+            )
+            for arc_id, (start, end) in enumerate(GROUND_TRUTH, start=1)
+            if end >= first and start <= last
+        ]
+        payload = ArcAnalysisResult(
+            story_prediction="Simulated prediction of where the story is going next.",
+            growth_assessment="Simulated growth assessment",
+            arc_strategy="Ground-truth arcs",
+            arcs=arcs,
+        ).model_dump_json()
+
+        async def chunks() -> AsyncIterator[LLMResponse]:
+            yield LLMResponse(content=payload, model="simulated", chunk_type=ChunkType.CONTENT)
+
+        return chunks()
+
+
+def window_token_limit(story: FullStoryBase, window_chapters: int) -> int:
+    """Token limit that fits about window_chapters of the story's chapters."""
+    return max(chapter.token_count for chapter in story.chapters) * window_chapters
+
+
+async def run(agent: ArcSplitterAgent, story: FullStoryBase, parallel: bool, **llm_args) -> Tuple[ArcAnalysisResult, float, int]:
+    started = time.perf_counter()
+    result = await agent.analyze_story(story, user_id=uuid4(), parallel=parallel, **llm_args)
+    return result, time.perf_counter() - started, len(agent.get_window_results())
+
+
+def describe(result: ArcAnalysisResult) -> str:
+    return " ".join(f"[{arc.start_chapter}-{arc.end_chapter}]" for arc in result.arcs)
+
+
+async def main(args: argparse.Namespace) -> None:
+    story = load_story()
+    limit = window_token_limit(story, args.window_chapters)
+    # Size the margin budget to fit the requested overlap chapters
+    arc_splitter.PARALLEL_OVERLAP_TOKEN_SHARE = args.overlap / (args.window_chapters + args.overlap)
+    llm_args = {}
+
+    def make_agent() -> ArcSplitterAgent:
+        if args.live:
+            from src.services.llm.llm_service import LLMService
+            agent = ArcSplitterAgent(LLMService(), default_provider=args.provider, default_model=args.model,
+                                     parallel_overlap_chapters=args.overlap)
+        else:
+            agent = ArcSplitterAgent(SimulatedLLM(story.total_chapters), parallel_overlap_chapters=args.overlap)  # type: ignore[arg-type]
+        # Parallel windows reserve part of the budget for their margin; scale up so both modes own the same chapters
+        parallel_limit = int(limit / (1 - arc_splitter.PARALLEL_OVERLAP_TOKEN_SHARE))
+        agent._calculate_chunk_token_limit = (  # type: ignore[method-assign]
+            lambda provider=None, model=None: parallel_limit if agent._parallel else limit
+        )
+        return agent
+
+    if args.live:
+        llm_args = {"api_key": args.api_key}
+
+    sequential, sequential_seconds, sequential_windows = await run(make_agent(), story, parallel=False, **llm_args)
+    parallel, parallel_seconds, parallel_windows = await run(make_agent(), story, parallel=True, **llm_args)
+
+    print(f"story: {story.total_chapters} chapters, ~{args.window_chapters} chapters/window, overlap {args.overlap}")
+    print(f"sequential: {sequential_seconds:7.2f} s  {sequential_windows} windows  {describe(sequential)}")
+    print(f"parallel:   {parallel_seconds:7.2f} s  {parallel_windows} windows  {describe(parallel)}")
+    for tolerance in (0, 1):
+        drift = compare_arc_boundaries(sequential, parallel, tolerance=tolerance)
+        print(
+            f"drift (tolerance {tolerance}): precision {drift['precision']:.2f}  recall {drift['recall']:.2f}  "
+            f"f1 {drift['f1']:.2f}  mean offset {drift['mean_offset']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window-chapters", type=int, default=3)
+    parser.add_argument("--overlap", type=int, default=2)
+    parser.add_argument("--live", action="store_true", help="Call a real model instead of the simulated LLM")
+    parser.add_argument("--provider", default="google")
+    parser.add_argument("--model", default="gemini-2.5-flash-lite-preview-06-17")
+    parser.add_argument("--api-key")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,187 @@
+"""
+Benchmark for ArcSplitterAgent over recorded LLM streams
+
+Runs ArcSplitterAgent over the pokemon_amber test story with its LLM calls
+answered from a cassette (see src/services/llm/cassette.py), so runs are
+offline and deterministic, and reports:
+
+- wall time of the whole split
+- chunk throughput (chunks and characters per second the agent consumed)
+- agent time per chunk (accumulating the stream and parsing arcs incrementally)
+- final parse time (cleaning and validating each window's complete JSON)
+- median time to first token and tokens/s of the windows' streams
+
+Without --cassette, a cassette is recorded first from a simulated LLM that
+streams ground-truth arcs in small chunks. Record a real one with --record
+(needs a provider key), then replay it with --cassette; --simulate-timing
+replays the recorded time-to-first-chunk and inter-chunk delays.
+
+Run with: python -m tests.benchmarks.bench_arc_splitter [--window-chapters 3] [--repeat 5]
+          python -m tests.benchmarks.bench_arc_splitter --record --cassette amber.json --provider openai --model gpt-4.1-mini --api-key sk-...
+          python -m tests.benchmarks.bench_arc_splitter --cassette amber.json --simulate-timing
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import time
+from typing import Any, AsyncIterator, Dict, List
+from uuid import uuid4
+
+from src.agents.wikigen.arc_splitter import ArcSplitterAgent
+from src.schemas.db.story import FullStoryBase
+from src.schemas.llm.models import ChunkType, LLMResponse
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+from src.services.llm.cassette import CassetteLLMService, CassetteMode, LLMCassette
+from src.utils import clean_json_from_llm_response
+from tests.benchmarks.bench_arc_reconciliation import GROUND_TRUTH, load_story, window_token_limit
+
+
+CHARS_PER_CHUNK = 12
+
+
+class SimulatedStreamingLLM:
+    """Streams GROUND_TRUTH arcs cut to the prompt's chapters, CHARS_PER_CHUNK characters at a time."""
+
+    usage_tracker = None
+
+    def __init__(self, total_chapters: int):
+        self.total_chapters = total_chapters
+
+    async def chat_completion(self, messages, stream=False, **kwargs) -> AsyncIterator[LLMResponse]:
+        prompt = messages[-1].content
+        chapters = [int(n) for n in re.findall(r'<Chapter number="(\d+)"', prompt)]
+        first, last = chapters[0], chapters[-1]
+        continuation = "CONTINUATION MODE" in prompt
+        arcs = [
+            Arc(
+                id=arc_id, title=f"Arc {arc_id}",
+                start_chapter=start if continuation else max(start, first), end_chapter=min(end, last),
+                summary="Simulated arc summary covering what happens across these chapters.",
+                key_events="Simulated events, turning points and reveals",
+                is_finalized=not (min(end, last) == last and last != self.total_chapters),
+            )
+            for arc_id, (start, end) in enumerate(GROUND_TRUTH, start=1)
+            if end >= first and start <= last
+        ]
+        payload = ArcAnalysisResult(
+            story_prediction="Simulated prediction of where the story is going next.",
+            growth_assessment="Simulated growth assessment",
+            arc_strategy="Ground-truth arcs",
+            arcs=arcs,
+        ).model_dump_json(indent=2)
+
+        async def chunks() -> AsyncIterator[LLMResponse]:
+            for i in range(0, len(payload), CHARS_PER_CHUNK):
+                yield LLMResponse(content=payload[i:i + CHARS_PER_CHUNK], model="simulated", chunk_type=ChunkType.CONTENT)
+            yield LLMResponse(
+                content="", model="simulated", chunk_type=ChunkType.CONTENT,
+                usage={"prompt_tokens": len(prompt) // 4, "completion_tokens": len(payload) // 4},
+            )
+
+        return chunks()
+
+
+class ChunkTimer:
+    """LLM service wrapper timing how long the agent spends on each streamed chunk."""
+
+    def __init__(self, llm_service: Any):
+        self._llm_service = llm_service
+        self.usage_tracker = None
+        self.chunks = 0
+        self.chars = 0
+        self.agent_seconds = 0.0
+
+    async def chat_completion(self, **kwargs) -> Any:
+        response = await self._llm_service.chat_completion(**kwargs)
+        return self._timed(response) if kwargs.get("stream") else response
+
+    async def _timed(self, stream: AsyncIterator[LLMResponse]) -> AsyncIterator[LLMResponse]:
+        async for chunk in stream:
+            self.chunks += 1
+            self.chars += len(chunk.content)
+            handed_over = time.perf_counter()
+            yield chunk
+            # Back here once the agent has processed the chunk and asks for the next one
+            self.agent_seconds += time.perf_counter() - handed_over
+
+
+def make_agent(llm_service: Any, story: FullStoryBase, window_chapters: int, provider: str, model: str) -> ArcSplitterAgent:
+    agent = ArcSplitterAgent(llm_service, default_provider=provider, default_model=model)
+    limit = window_token_limit(story, window_chapters)
+    agent._calculate_chunk_token_limit = lambda provider=None, model=None: limit  # type: ignore[method-assign]
+    return agent
+
+
+def final_parse_seconds(agent: ArcSplitterAgent) -> float:
+    """Time to clean and validate every window's complete output again."""
+    started = time.perf_counter()
+    for window in agent.get_window_results():
+        content = window.raw_content.content + window.raw_content.unknown
+        ArcAnalysisResult.model_validate_json(clean_json_from_llm_response(content))
+    return time.perf_counter() - started
+
+
+async def record(cassette: LLMCassette, llm_service: Any, story: FullStoryBase, args: argparse.Namespace) -> None:
+    recorder = CassetteLLMService(cassette, llm_service, mode=CassetteMode.RECORD)
+    agent = make_agent(recorder, story, args.window_chapters, args.provider, args.model)
+    await agent.analyze_story(story, user_id=uuid4(), api_key=args.api_key)
+    print(f"recorded {recorder.stats['recorded']} LLM calls")
+
+
+async def replay_once(cassette: LLMCassette, story: FullStoryBase, args: argparse.Namespace) -> Dict[str, Any]:
+    cassette.rewind()
+    timer = ChunkTimer(CassetteLLMService(cassette, mode=CassetteMode.REPLAY, simulate_timing=args.simulate_timing))
+    agent = make_agent(timer, story, args.window_chapters, args.provider, args.model)
+    started = time.perf_counter()
+    result = await agent.analyze_story(story, user_id=uuid4())
+    wall = time.perf_counter() - started
+    streamed = [window.raw_content for window in agent.get_window_results() if window.raw_content.first_chunk_at is not None]
+    return {
+        "wall": wall,
+        "windows": len(agent.get_window_results()),
+        "arcs": len(result.arcs),
+        "chunks": timer.chunks,
+        "chars": timer.chars,
+        "agent": timer.agent_seconds,
+        "parse": final_parse_seconds(agent),
+        "ttft": statistics.median(raw.time_to_first_token for raw in streamed) if streamed else 0.0,
+        "tokens_per_second": statistics.median(raw.tokens_per_second or 0.0 for raw in streamed) if streamed else 0.0,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    story = load_story()
+    if args.cassette is None:
+        cassette = LLMCassette()
+        await record(cassette, SimulatedStreamingLLM(story.total_chapters), story, args)
+    else:
+        cassette = LLMCassette.load(args.cassette)
+        if args.record:
+            from src.services.llm.llm_service import LLMService
+            await record(cassette, LLMService(), story, args)
+            cassette.save()
+
+    runs: List[Dict[str, Any]] = [await replay_once(cassette, story, args) for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run["wall"])
+    median = statistics.median(run["wall"] for run in runs)
+
+    print(f"story: {story.total_chapters} chapters, ~{args.window_chapters} chapters/window, {best['windows']} windows, {best['arcs']} arcs")
+    print(f"wall time:        median {median * 1000:8.1f} ms   best {best['wall'] * 1000:8.1f} ms  ({args.repeat} runs)")
+    print(f"chunk throughput: {best['chunks'] / best['wall']:10.0f} chunks/s  {best['chars'] / best['wall']:12.0f} chars/s  ({best['chunks']} chunks)")
+    print(f"agent per chunk:  {best['agent'] / max(best['chunks'], 1) * 1e6:8.1f} us   ({best['agent'] * 1000:.1f} ms total)")
+    print(f"final parse:      {best['parse'] * 1000:8.2f} ms")
+    print(f"per window:       TTFT {best['ttft'] * 1000:8.1f} ms   {best['tokens_per_second']:10.0f} tokens/s  (median)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window-chapters", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cassette", help="Cassette file to replay (or record to with --record)")
+    parser.add_argument("--record", action="store_true", help="Record the cassette against a real model first")
+    parser.add_argument("--simulate-timing", action="store_true", help="Replay recorded chunk delays")
+    parser.add_argument("--provider", default="google")
+    parser.add_argument("--model", default="gemini-2.5-flash-lite-preview-06-17")
+    parser.add_argument("--api-key")
+    asyncio.run(main(parser.parse_args()))
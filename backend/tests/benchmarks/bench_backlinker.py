@@ -0,0 +1,93 @@
+"""
+Benchmark for ChapterBacklinkerAgent's deterministic linking
+
+Generates a synthetic story (chapters of random prose sprinkled with article
+titles, aliases and lowercase common-word names) and links every chapter
+against a set of wiki articles. Reports wall time, mentions linked without
+the model, and how many LLM calls (and prompt characters) the ambiguous
+mentions needed. The LLM is simulated and declines every ambiguous mention.
+
+Run with: python -m tests.benchmarks.bench_backlinker [--chapters 1000] [--words 3000] [--articles 200]
+"""
+import argparse
+import asyncio
+import random
+import time
+from uuid import uuid4
+
+from src.agents.wikigen.chapter_backlinker import ChapterBacklinkerAgent
+from src.schemas.db.story import Chapter
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.wiki import WikiArticle
+
+FILLER = ("the a of and to in she he was were had walked looked said towards beneath light "
+          "storm river quietly ancient silver door night morning found lost").split()
+COMMON_WORD_TITLES = ["Hope", "Storm", "Silence"]
+
+
+class SimulatedLLMService:
+    usage_tracker = None
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_chars = 0
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        self.calls += 1
+        self.prompt_chars += sum(len(message.content) for message in kwargs["messages"])
+        return LLMResponse(content='{"links": []}', model=kwargs["model"])
+
+
+def make_articles(count: int) -> list:
+    articles = [
+        WikiArticle(title=f"Person{n} Surname{n}", filename=f"p{n}.md", content="...", arc_id=1,
+                    aliases=[f"Person{n}"])
+        for n in range(count - len(COMMON_WORD_TITLES))
+    ]
+    articles += [WikiArticle(title=title, filename=f"{title}.md", content="...", arc_id=1) for title in COMMON_WORD_TITLES]
+    return articles
+
+
+def make_chapters(count: int, words: int, articles: list, rng: random.Random) -> list:
+    names = [name for article in articles for name in [article.title, *article.aliases]]
+    chapters = []
+    for number in range(1, count + 1):
+        tokens = []
+        for _ in range(words):
+            roll = rng.random()
+            if roll < 0.01:
+                tokens.append(rng.choice(names) + rng.choice(["", "'s", ","]))
+            elif roll < 0.012:
+                tokens.append(rng.choice(COMMON_WORD_TITLES).lower())
+            else:
+                tokens.append(rng.choice(FILLER))
+        chapters.append(Chapter(chapter_number=number, title=f"Chapter {number}", content=" ".join(tokens)))
+    return chapters
+
+
+async def main(chapter_count: int, words: int, article_count: int) -> None:
+    rng = random.Random(7)
+    articles = make_articles(article_count)
+    chapters = make_chapters(chapter_count, words, articles, rng)
+    llm = SimulatedLLMService()
+    agent = ChapterBacklinkerAgent(llm)  # type: ignore[arg-type]
+
+    started = time.perf_counter()
+    enhanced = await agent.create_chapter_links(chapters, articles, current_arc_id=1, user_id=uuid4())
+    elapsed = time.perf_counter() - started
+
+    story_chars = sum(len(chapter.content) for chapter in chapters)
+    links = sum(len(chapter.links) for chapter in enhanced)
+    print(f"chapters {chapter_count:,}  words {chapter_count * words:,}  names {len(articles) * 2 - len(COMMON_WORD_TITLES):,}")
+    print(f"linked   {links:,} articles in {elapsed:.2f} s ({chapter_count / elapsed:,.0f} chapters/s)")
+    print(f"llm      {llm.calls:,} calls, {llm.prompt_chars:,} prompt chars "
+          f"({llm.prompt_chars / story_chars:.1%} of the story text)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--articles", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.chapters, args.words, args.articles))
@@ -0,0 +1,166 @@
+"""
+Benchmark for JSON extraction from LLM responses
+
+Compares the single-pass JSONScanner (src/utils/json_cleaner.py) with the
+previous three-strategy extraction (regexes over the whole response, then
+json.loads on every candidate), on:
+
+- responses recorded in an LLM cassette (--cassette, see src/services/llm/cassette.py)
+- by default, ~60 KB arc analyses built from the pokemon_amber test story in
+  the shapes models answer with: a preamble with braces before a ```json fence,
+  a fence whose strings contain nested code fences, and bare JSON
+
+The scanner is measured on the whole response, fed in stream-sized chunks
+(the cost spread over the stream), and for the extraction left once the
+stream has ended (what the agent waits for after the last chunk).
+
+Run with: python -m tests.benchmarks.bench_json_cleaner [--repeat 20] [--cassette amber.json]
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.services.llm.cassette import LLMCassette
+from src.utils.json_cleaner import JSONScanner
+
+
+STORY_DIR = Path(__file__).parent.parent / "resources" / "pokemon_amber" / "story"
+CHARS_PER_CHUNK = 16
+TARGET_CHARS = 60_000
+
+
+# ----------------------------------------------------------------------
+# Previous implementation, kept as the baseline
+# ----------------------------------------------------------------------
+
+def _is_valid_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (json.JSONDecodeError, ValueError):
+        return False
+
+
+def legacy_clean_json(response: str) -> str:
+    response = response.strip()
+    for pattern, flags in ((r'```json\s*\n(.*?)\n```', re.DOTALL | re.IGNORECASE), (r'```[a-zA-Z]*\s*\n(.*?)\n```', re.DOTALL)):
+        for match in re.findall(pattern, response, flags):
+            if _is_valid_json(match.strip()):
+                return match.strip()
+    brace_count, start_pos = 0, None
+    for i, char in enumerate(response):
+        if char == "{":
+            if brace_count == 0:
+                start_pos = i
+            brace_count += 1
+        elif char == "}":
+            brace_count -= 1
+            if brace_count == 0 and start_pos is not None:
+                if _is_valid_json(response[start_pos:i + 1]):
+                    return response[start_pos:i + 1]
+                start_pos = None
+    raise ValueError("Could not extract valid JSON")
+
+
+# ----------------------------------------------------------------------
+# Inputs
+# ----------------------------------------------------------------------
+
+def build_analysis() -> str:
+    """A ~60 KB arc analysis whose text comes from the test story."""
+    text = " ".join(
+        re.sub(r"</?Chapter[^>]*>", "", path.read_text(encoding="utf-8"))
+        for path in sorted(STORY_DIR.glob("*.xml")) if path.stem.isdigit()
+    )
+    arcs = []
+    offset = 0
+    while len(json.dumps(arcs)) < TARGET_CHARS:
+        summary = text[offset:offset + 1200]
+        offset = (offset + 1200) % (len(text) - 1200)
+        arcs.append({
+            "id": len(arcs) + 1, "title": f"Arc {len(arcs) + 1}", "start_chapter": len(arcs) + 1,
+            "end_chapter": len(arcs) + 2, "summary": summary, "key_events": "Battles {and} ```reveals```",
+            "is_finalized": True,
+        })
+    return json.dumps({"story_prediction": "Ash's rival {Gary} returns", "arcs": arcs}, indent=2)
+
+
+def recorded_responses(path: str) -> Dict[str, str]:
+    """Content of every recording in a cassette."""
+    cassette = LLMCassette.load(path)
+    responses = {}
+    for key, recordings in cassette.interactions.items():
+        for number, recording in enumerate(recordings, 1):
+            content = "".join(
+                chunk["response"]["content"] for chunk in recording["chunks"]
+                if chunk["response"].get("chunk_type") in ("content", "unknown", None)
+            )
+            if content.strip():
+                responses[f"{key[:8]}#{number}"] = content
+    return responses
+
+
+def synthetic_responses() -> Dict[str, str]:
+    analysis = build_analysis()
+    return {
+        "preamble + fence": f"Here is the analysis {{as JSON}} you asked for:\n\n```json\n{analysis}\n```\nAnything else?",
+        "nested fences": "```json\n" + analysis.replace('"Arc 1"', '"Arc ```txt\\nOne\\n``` 1"') + "\n```",
+        "bare json": analysis,
+    }
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+def streamed_scanner(response: str) -> JSONScanner:
+    scanner = JSONScanner()
+    for i in range(0, len(response), CHARS_PER_CHUNK):
+        scanner.feed(response[i:i + CHARS_PER_CHUNK])
+    return scanner
+
+
+def scan_streaming(response: str) -> str:
+    return streamed_scanner(response).extract()
+
+
+def measure(extract: Callable[[str], str], response: str, repeat: int) -> Optional[float]:
+    """Median milliseconds per extraction (None if it fails)."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            extract(response)
+        except ValueError:
+            return None
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main(args: argparse.Namespace) -> None:
+    responses = recorded_responses(args.cassette) if args.cassette else synthetic_responses()
+    streamed = {response: streamed_scanner(response) for response in responses.values()}
+    methods = {
+        "legacy": legacy_clean_json,
+        "scanner": lambda response: JSONScanner.scan(response).extract(),
+        "scanner (streamed)": scan_streaming,
+        "after stream end": lambda response: streamed[response].extract(),
+    }
+    print(f"{'response':<22} {'size':>8}  " + "  ".join(f"{name:>20}" for name in methods))
+    for name, response in responses.items():
+        cells = []
+        for method in methods.values():
+            ms = measure(method, response, args.repeat)
+            cells.append(f"{ms:17.2f} ms" if ms is not None else f"{'failed':>20}")
+        print(f"{name:<22} {len(response) / 1024:6.1f}KB  " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cassette", help="Cassette whose recorded responses are extracted")
+    main(parser.parse_args())
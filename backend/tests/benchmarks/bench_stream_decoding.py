@@ -0,0 +1,83 @@
+"""
+Microbenchmark for streamed chunk decoding in LLMService
+
+Replays a 10k-chunk stream built from the pokemon_amber test story through
+LLMService._stream_response_to_llm_response (decode + LLMResponse construction).
+The stream mimics a Gemini thinking stream: the first 20% of chunks are
+content_blocks thinking deltas, the rest plain content deltas, with a final
+usage chunk.
+
+Run with: python -m tests.benchmarks.bench_stream_decoding [--chunks 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+from portkey_ai.api_resources.types.chat_complete_type import ChatCompletionChunk
+
+from src.services.llm.llm_service import LLMService
+
+
+STORY_DIR = Path(__file__).parent.parent / "resources" / "pokemon_amber" / "story"
+CHARS_PER_CHUNK = 16
+
+
+def build_stream(num_chunks: int, model: str = "gemini-2.5-flash") -> List[ChatCompletionChunk]:
+    """Build a deterministic stream of Portkey chunks from the test story."""
+    text = "".join(path.read_text(encoding="utf-8") for path in sorted(STORY_DIR.glob("*.xml")))
+    thinking_chunks = num_chunks // 5
+
+    chunks = []
+    for i in range(num_chunks):
+        start = (i * CHARS_PER_CHUNK) % (len(text) - CHARS_PER_CHUNK)
+        piece = text[start:start + CHARS_PER_CHUNK]
+        if i < thinking_chunks:
+            delta = {"content_blocks": [{"index": 0, "delta": {"thinking": piece}}]}
+        else:
+            delta = {"content": piece}
+        chunks.append(ChatCompletionChunk.model_validate({
+            "id": "chatcmpl-bench", "model": model, "choices": [{"index": 0, "delta": delta}],
+        }))
+
+    chunks.append(ChatCompletionChunk.model_validate({
+        "id": "chatcmpl-bench", "model": model, "choices": [],
+        "usage": {"prompt_tokens": 50_000, "completion_tokens": num_chunks * 4, "total_tokens": 50_000 + num_chunks * 4},
+    }))
+    return chunks
+
+
+async def _replay(chunks: List[ChatCompletionChunk]):
+    for chunk in chunks:
+        yield chunk
+
+
+async def run_once(service: LLMService, chunks: List[ChatCompletionChunk]) -> float:
+    """Consume the stream once, returning elapsed seconds."""
+    started = time.perf_counter()
+    async for _ in service._stream_response_to_llm_response(_replay(chunks), "google", None):
+        pass
+    return time.perf_counter() - started
+
+
+async def main(num_chunks: int, repeat: int) -> None:
+    chunks = build_stream(num_chunks)
+    service = LLMService()
+
+    await run_once(service, chunks)  # warm-up
+    timings = [await run_once(service, chunks) for _ in range(repeat)]
+
+    best = min(timings)
+    print(f"chunks: {len(chunks)}  repeat: {repeat}")
+    print(f"best:   {best * 1000:.1f} ms  ({best / len(chunks) * 1e6:.2f} us/chunk)")
+    print(f"median: {statistics.median(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunks, args.repeat))
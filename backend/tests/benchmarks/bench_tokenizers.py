@@ -0,0 +1,71 @@
+"""
+Benchmark for token counting: heuristic vs BPE tokenizers, and memoization
+
+Counts the tokens of every pokemon_amber chapter with each available tokenizer
+and reports total tokens, per-chapter error against a reference BPE encoding,
+and the time of a cold count versus a memoized recount (as when a story is
+re-chunked). BPE tokenizers need the optional tiktoken package and its cached
+vocab files (see TOKENIZER_VOCAB_DIR); without them only the heuristic runs.
+
+Run with: python -m tests.benchmarks.bench_tokenizers [--reference o200k_base] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+from typing import Dict, List
+
+from src.utils.tokenizers import BPETokenizer, HeuristicTokenizer, Tokenizer, clear_token_cache, count_tokens_cached
+from tests.benchmarks.bench_arc_reconciliation import load_story
+
+
+def available_tokenizers() -> List[Tokenizer]:
+    found: List[Tokenizer] = [HeuristicTokenizer()]
+    for encoding in ("cl100k_base", "o200k_base"):
+        try:
+            found.append(BPETokenizer(encoding))
+        except Exception as e:
+            print(f"skipping bpe:{encoding}: {e}")
+    return found
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of func over repeat runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(reference_encoding: str, repeat: int) -> None:
+    texts = [chapter.content for chapter in load_story().chapters]
+    print(f"chapters: {len(texts)}  chars: {sum(len(t) for t in texts):,}")
+
+    tokenizers = available_tokenizers()
+    counts: Dict[str, List[int]] = {t.name: [t.count(text) for text in texts] for t in tokenizers}
+    reference = counts.get(f"bpe:{reference_encoding}")
+
+    for tokenizer in tokenizers:
+        cold = timed(lambda: [tokenizer.count(text) for text in texts], repeat)
+        clear_token_cache()
+        for text in texts:
+            count_tokens_cached(text, tokenizer)
+        memoized = timed(lambda: [count_tokens_cached(text, tokenizer) for text in texts], repeat)
+
+        line = f"{tokenizer.name:18} tokens {sum(counts[tokenizer.name]):>8,}  cold {cold * 1000:8.2f} ms  memoized {memoized * 1000:6.2f} ms"
+        if reference is not None:
+            errors = [abs(c - r) / r * 100 for c, r in zip(counts[tokenizer.name], reference)]
+            line += f"  error vs {reference_encoding}: mean {statistics.mean(errors):5.1f}%  max {max(errors):5.1f}%"
+        print(line)
+
+    if reference is None:
+        print(f"reference encoding {reference_encoding} unavailable; install tiktoken to measure accuracy")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference", default="o200k_base")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.reference, args.repeat)
@@ -0,0 +1,408 @@
+"""
+Tests for ArcSplitterAgent windowing: checkpoints, resuming and incremental analysis
+"""
+
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import pytest
+
+from src.agents.wikigen import arc_splitter
+from src.agents.wikigen.arc_reconciliation import WindowArcs, compare_arc_boundaries, reconcile_windows
+from src.agents.wikigen.arc_splitter import ArcSplitterAgent, CHECKPOINT_NAMESPACE
+from src.database.repositories import MemoryCheckpointRepository
+from src.schemas.db.story import FullStoryBase, StoryMetadata
+from src.schemas.llm.models import ChunkType, LLMResponse
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+
+
+def _story(chapters: int, extra: str = "") -> FullStoryBase:
+    return FullStoryBase(
+        metadata=StoryMetadata(title="Test Story", genres=["Fantasy"]),
+        chapters=[
+            {"chapter_number": n, "title": f"Chapter {n}", "content": f"Sarah walks through chapter {n}.{extra}"}
+            for n in range(1, chapters + 1)
+        ],
+    )
+
+
+class FakeStreamingLLM:
+    """Streams one arc per window; failures maps a window's start chapter to how many calls fail."""
+
+    def __init__(self, failures: Optional[Dict[int, int]] = None):
+        self.failures = dict(failures or {})
+        self.calls: List[int] = []
+
+    async def chat_completion(self, messages, stream=False, **kwargs) -> AsyncIterator[LLMResponse]:
+        chapters = [int(n) for n in re.findall(r'<Chapter number="(\d+)"', messages[-1].content)]
+        start, end = chapters[0], chapters[-1]
+        self.calls.append(start)
+        if self.failures.get(start, 0) > 0:
+            self.failures[start] -= 1
+            raise ConnectionError("provider unavailable")
+
+        result = ArcAnalysisResult(
+            story_prediction="The story continues along its current path " * 2,
+            growth_assessment="Likely to grow steadily",
+            arc_strategy="One arc per window",
+            arcs=[Arc(
+                id=start, title=f"Arc {start}", start_chapter=start, end_chapter=end,
+                summary="Things happen in this arc.", key_events="Events",
+            )],
+        )
+        payload = result.model_dump_json()
+
+        async def stream() -> AsyncIterator[LLMResponse]:
+            for i in range(0, len(payload), 200):
+                yield LLMResponse(content=payload[i:i + 200], model="fake", chunk_type=ChunkType.CONTENT)
+
+        return stream()
+
+
+def _stream(result: ArcAnalysisResult) -> AsyncIterator[LLMResponse]:
+    payload = result.model_dump_json()
+
+    async def stream() -> AsyncIterator[LLMResponse]:
+        for i in range(0, len(payload), 200):
+            yield LLMResponse(content=payload[i:i + 200], model="fake", chunk_type=ChunkType.CONTENT)
+
+    return stream()
+
+
+def _analysis(arcs: List[Arc]) -> ArcAnalysisResult:
+    return ArcAnalysisResult(
+        story_prediction="The story continues along its current path " * 2,
+        growth_assessment="Likely to grow steadily",
+        arc_strategy="Split at major transitions",
+        arcs=arcs,
+    )
+
+
+class GroundTruthLLM:
+    """Answers with a fixed set of arcs, cut to the chapters in the prompt, following the is_finalized rules."""
+
+    def __init__(self, arcs: List[Tuple[int, int]], total_chapters: int):
+        self.arcs = arcs
+        self.total_chapters = total_chapters
+        self.active = 0
+        self.max_active = 0
+
+    async def chat_completion(self, messages, stream=False, **kwargs) -> AsyncIterator[LLMResponse]:
+        prompt = messages[-1].content
+        chapters = [int(n) for n in re.findall(r'<Chapter number="(\d+)"', prompt)]
+        first, last = chapters[0], chapters[-1]
+        continuation = "CONTINUATION MODE" in prompt
+
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+
+        arcs = [
+            Arc(
+                id=arc_id, title=f"Arc {arc_id}",
+                start_chapter=start if continuation else max(start, first), end_chapter=min(end, last),
+                summary="Things happen in this arc.", key_events="Events",
+                is_finalized=not (min(end, last) == last and last != self.total_chapters),
+            )
+            for arc_id, (start, end) in enumerate(self.arcs, start=1)
+            if end >= first and start <= last
+        ]
+        return _stream(_analysis(arcs))
+
+
+def _agent(llm: FakeStreamingLLM, repository: MemoryCheckpointRepository, retries: int = 0) -> ArcSplitterAgent:
+    agent = ArcSplitterAgent(llm_service=llm, checkpoint_repository=repository, max_window_retries=retries)  # type: ignore[arg-type]
+    # One chapter per window
+    agent._calculate_chunk_token_limit = lambda provider=None, model=None: 1  # type: ignore[method-assign]
+    return agent
+
+
+class TestArcSplitterCheckpoints:
+    """Test checkpointing, resuming and retrying of arc splitter windows"""
+
+    async def test_resume_reruns_only_failed_windows(self):
+        repository = MemoryCheckpointRepository()
+        story = _story(5)
+
+        llm = FakeStreamingLLM(failures={3: 1})
+        with pytest.raises(ValueError, match="Window 3"):
+            await _agent(llm, repository).analyze_story(story, user_id=uuid4())
+        assert llm.calls == [1, 2, 3]  # stops at the failed window
+
+        llm = FakeStreamingLLM()
+        agent = _agent(llm, repository)
+        result = await agent.analyze_story(story, user_id=uuid4())
+
+        assert llm.calls == [3, 4, 5]
+        assert [arc.start_chapter for arc in result.arcs] == [1, 2, 3, 4, 5]
+        assert [w.restored for w in agent.get_window_results()] == [True, True, False, False, False]
+
+    async def test_changed_story_does_not_reuse_checkpoints(self):
+        repository = MemoryCheckpointRepository()
+        await _agent(FakeStreamingLLM(), repository).analyze_story(_story(3), user_id=uuid4())
+
+        llm = FakeStreamingLLM()
+        await _agent(llm, repository).analyze_story(_story(3, extra=" Edited."), user_id=uuid4())
+
+        assert llm.calls == [1, 2, 3]
+
+    async def test_resume_disabled(self):
+        repository = MemoryCheckpointRepository()
+        await _agent(FakeStreamingLLM(), repository).analyze_story(_story(2), user_id=uuid4())
+
+        llm = FakeStreamingLLM()
+        await _agent(llm, repository).analyze_story(_story(2), user_id=uuid4(), resume=False)
+
+        assert llm.calls == [1, 2]
+
+    async def test_failed_window_is_retried(self):
+        llm = FakeStreamingLLM(failures={2: 1})
+        agent = _agent(llm, MemoryCheckpointRepository(), retries=1)
+
+        result = await agent.analyze_story(_story(3), user_id=uuid4())
+
+        assert llm.calls == [1, 2, 2, 3]
+        assert len(result.arcs) == 3
+        assert agent.get_window_results()[1].attempts == 2
+
+    async def test_clear_checkpoints(self):
+        repository = MemoryCheckpointRepository()
+        agent = _agent(FakeStreamingLLM(), repository)
+        await agent.analyze_story(_story(2), user_id=uuid4())
+        run_key = agent._current_run_key
+        assert run_key is not None
+
+        assert await agent.clear_checkpoints() == 2
+        assert await repository.list_steps(CHECKPOINT_NAMESPACE, run_key) == []
+
+
+class TestIncrementalAnalysis:
+    """Test re-analysis of a story that gained new chapters"""
+
+    def _previous(self, trailing_finalized: bool) -> ArcAnalysisResult:
+        return ArcAnalysisResult(
+            story_prediction="The story continues along its current path " * 2,
+            growth_assessment="Likely to grow steadily",
+            arc_strategy="Two arcs so far",
+            arcs=[
+                Arc(id=1, title="Arc 1", start_chapter=1, end_chapter=2, summary="Things happen.", key_events="Events"),
+                Arc(id=2, title="Arc 2", start_chapter=3, end_chapter=4, summary="More happens.", key_events="Events",
+                    is_finalized=trailing_finalized),
+            ],
+        )
+
+    async def test_reopens_unfinalized_trailing_arc(self):
+        llm = FakeStreamingLLM()
+        agent = _agent(llm, MemoryCheckpointRepository())
+
+        result = await agent.analyze_story(_story(6), user_id=uuid4(), previous_result=self._previous(False))
+
+        assert llm.calls == [3, 4, 5, 6]
+        assert [(arc.start_chapter, arc.end_chapter) for arc in result.arcs] == [(1, 2), (3, 3), (4, 4), (5, 5), (6, 6)]
+        assert agent.get_window_results()[0].restored
+
+    async def test_only_new_chapters_when_all_finalized(self):
+        llm = FakeStreamingLLM()
+        agent = _agent(llm, MemoryCheckpointRepository())
+
+        result = await agent.analyze_story(_story(5), user_id=uuid4(), previous_result=self._previous(True))
+
+        assert llm.calls == [5]
+        assert [arc.id for arc in result.arcs] == [1, 2, 5]
+
+    async def test_no_new_chapters(self):
+        llm = FakeStreamingLLM()
+        previous = self._previous(True)
+
+        result = await _agent(llm, MemoryCheckpointRepository()).analyze_story(
+            _story(4), user_id=uuid4(), previous_result=previous
+        )
+
+        assert llm.calls == []
+        assert result.arcs == previous.arcs
+
+
+class TestSplitChapters:
+    """Test windows that split an oversized chapter at scene breaks"""
+
+    async def test_split_chapter_windows_merge_into_contiguous_arcs(self):
+        story = _story(3)
+        long_chapter = "\n\n***\n\n".join(f"Scene {i}: Sarah walks through the long chapter." for i in range(3))
+        story.chapters[1] = story.chapters[1].model_copy(update={"content": long_chapter})
+        llm = FakeStreamingLLM()
+        agent = ArcSplitterAgent(llm_service=llm)  # type: ignore[arg-type]
+        agent._calculate_chunk_token_limit = lambda provider=None, model=None: 20  # type: ignore[method-assign]
+
+        result = await agent.analyze_story(story, user_id=uuid4())
+
+        windows = agent.get_window_results()
+        assert [(w.start_chapter, w.end_chapter) for w in windows] == [(1, 2), (2, 2), (2, 3)]
+        assert [w.is_final_window for w in windows] == [False, False, True]
+        assert [(arc.start_chapter, arc.end_chapter) for arc in result.arcs] == [(1, 2), (3, 3)]
+
+
+class TestParallelAnalysis:
+    """Test concurrent window analysis and seam reconciliation"""
+
+    GROUND_TRUTH = [(1, 3), (4, 6), (7, 8)]
+
+    def _agent(self, llm: GroundTruthLLM, overlap: int, monkeypatch) -> ArcSplitterAgent:
+        # Two chapters per window (7 tokens each), plus the overlap margin
+        monkeypatch.setattr(arc_splitter, "PARALLEL_OVERLAP_TOKEN_SHARE", 0.5)
+        limit = 30 if overlap else 15
+        agent = ArcSplitterAgent(llm_service=llm, parallel_overlap_chapters=overlap)  # type: ignore[arg-type]
+        agent._calculate_chunk_token_limit = lambda provider=None, model=None: limit  # type: ignore[method-assign]
+        return agent
+
+    async def test_parallel_matches_sequential_with_overlap(self, monkeypatch):
+        story = _story(8)
+        sequential = await self._agent(GroundTruthLLM(self.GROUND_TRUTH, 8), 1, monkeypatch).analyze_story(
+            story, user_id=uuid4()
+        )
+
+        llm = GroundTruthLLM(self.GROUND_TRUTH, 8)
+        agent = self._agent(llm, 1, monkeypatch)
+        parallel = await agent.analyze_story(story, user_id=uuid4(), parallel=True)
+
+        assert [(w.context_start_chapter, w.start_chapter, w.end_chapter) for w in agent.get_window_results()] == [
+            (1, 1, 2), (2, 3, 4), (4, 5, 6), (6, 7, 8)
+        ]
+        assert llm.max_active > 1
+        assert [(a.id, a.start_chapter, a.end_chapter) for a in parallel.arcs] == [(1, 1, 3), (2, 4, 6), (3, 7, 8)]
+        assert compare_arc_boundaries(sequential, parallel)["f1"] == 1.0
+
+    async def test_without_overlap_seams_fall_back_to_is_finalized(self, monkeypatch):
+        agent = self._agent(GroundTruthLLM(self.GROUND_TRUTH, 8), 0, monkeypatch)
+
+        parallel = await agent.analyze_story(_story(8), user_id=uuid4(), parallel=True)
+
+        # Window 4 cannot see that an arc ended at chapter 6, so arcs 2 and 3 merge
+        assert [(a.start_chapter, a.end_chapter) for a in parallel.arcs] == [(1, 3), (4, 8)]
+        drift = compare_arc_boundaries(_analysis([
+            Arc(id=i, title="Arc", start_chapter=s, end_chapter=e, summary="Things happen.", key_events="Events")
+            for i, (s, e) in enumerate(self.GROUND_TRUTH, start=1)
+        ]), parallel)
+        assert drift["precision"] == 1.0
+        assert drift["recall"] == 0.5
+
+
+class TestReconcileWindows:
+    """Test seam reconciliation of independently analyzed windows"""
+
+    def _arc(self, start: int, end: int, finalized: bool = True) -> Arc:
+        return Arc(id=1, title=f"Arc {start}", start_chapter=start, end_chapter=end,
+                   summary="Things happen.", key_events="Events", is_finalized=finalized)
+
+    def test_finalized_arc_is_never_continued(self):
+        result = reconcile_windows([
+            WindowArcs(core_start=1, core_end=4, context_start=1, result=_analysis([self._arc(1, 4)])),
+            WindowArcs(core_start=5, core_end=6, context_start=3, result=_analysis([self._arc(3, 6)])),
+        ])
+
+        assert [(a.id, a.start_chapter, a.end_chapter) for a in result.arcs] == [(1, 1, 4), (2, 5, 6)]
+
+    def test_gaps_and_overlaps_are_repaired(self):
+        result = reconcile_windows([
+            # Stops short of its last chapter
+            WindowArcs(core_start=1, core_end=5, context_start=1, result=_analysis([self._arc(1, 2), self._arc(3, 4)])),
+            # Starts inside the margin and stops short of the story's end
+            WindowArcs(core_start=6, core_end=9, context_start=4, result=_analysis([self._arc(4, 7), self._arc(8, 8)])),
+        ])
+
+        assert [(a.id, a.start_chapter, a.end_chapter) for a in result.arcs] == [(1, 1, 2), (2, 3, 5), (3, 6, 7), (4, 8, 9)]
+
+
+class TestStreamedArcs:
+    """Test surfacing arcs while a window is still streaming"""
+
+    async def test_arcs_surface_before_window_ends(self):
+        llm = GroundTruthLLM([(1, 2), (3, 5), (6, 8)], 8)
+        agent = ArcSplitterAgent(llm_service=llm)  # type: ignore[arg-type]
+        agent._calculate_chunk_token_limit = lambda provider=None, model=None: 1000  # type: ignore[method-assign]
+        seen: List[Tuple[int, int]] = []
+        chunks = 0
+
+        def on_arc(arc: Arc, window) -> None:
+            seen.append((arc.id, chunks))
+
+        tagged = []
+        async for chunk in agent.analyze_story_streaming(_story(8), user_id=uuid4(), on_arc=on_arc):
+            chunks += 1
+            tagged.extend(arc["id"] for arc in chunk.metadata.get("completed_arcs", []))
+
+        assert [arc_id for arc_id, _ in seen] == [1, 2, 3] == tagged
+        assert seen[0][1] < chunks - 1  # The first arc arrived well before the last chunk
+        assert len(agent.get_final_result().arcs) == 3
+
+
+class TieredLLM:
+    """One arc per window; the cheap model's answers for the given start chapters are flawed."""
+
+    def __init__(self, flawed: Dict[int, str]):
+        self.flawed = flawed
+        self.calls: List[Tuple[int, str]] = []
+
+    async def chat_completion(self, messages, stream=False, model=None, **kwargs) -> AsyncIterator[LLMResponse]:
+        chapters = [int(n) for n in re.findall(r'<Chapter number="(\d+)"', messages[-1].content)]
+        start, end = chapters[0], chapters[-1]
+        self.calls.append((start, model))
+        arcs = [Arc(id=1, title="Arc", start_chapter=start, end_chapter=end, summary="Things happen in this arc.", key_events="Events")]
+        flaw = self.flawed.get(start) if model != "gemini-2.5-pro" else None
+        if flaw == "gap":
+            # An earlier arc that leaves a gap fails ArcAnalysisResult's gap check
+            gap_arc = arcs[0].model_copy(update={"id": 0, "start_chapter": start, "end_chapter": start})
+            payload = json.dumps({**_analysis(arcs).model_dump(exclude={"arcs"}), "arcs": [gap_arc.model_dump(), {**arcs[0].model_dump(), "id": 1, "start_chapter": end + 2, "end_chapter": end + 2}]})
+
+            async def stream() -> AsyncIterator[LLMResponse]:
+                yield LLMResponse(content=payload, model=model, chunk_type=ChunkType.CONTENT)
+
+            return stream()
+        if flaw == "short":
+            arcs[0].end_chapter = start
+        return _stream(_analysis(arcs))
+
+
+class TestModelEscalation:
+    """Test escalating windows whose cheap-model output fails validation"""
+
+    def _agent(self, llm: TieredLLM, **kwargs) -> ArcSplitterAgent:
+        agent = ArcSplitterAgent(llm_service=llm, escalation_model="gemini-2.5-pro", **kwargs)  # type: ignore[arg-type]
+        agent._calculate_chunk_token_limit = lambda provider=None, model=None: 1  # type: ignore[method-assign]
+        return agent
+
+    async def test_only_failing_windows_are_escalated(self):
+        llm = TieredLLM({2: "gap"})
+        agent = self._agent(llm, max_window_retries=0)
+
+        result = await agent.analyze_story(_story(4), user_id=uuid4())
+
+        cheap = "gemini-2.5-flash-lite-preview-06-17"
+        assert llm.calls == [(1, cheap), (2, cheap), (2, "gemini-2.5-pro"), (3, cheap), (4, cheap)]
+        assert [w.escalated for w in agent.get_window_results()] == [False, True, False, False]
+        assert [arc.start_chapter for arc in result.arcs] == [1, 2, 3, 4]
+        assert agent.cascade_report()["window"] == {"items": 4, "escalated": 1, "recovered": 1, "escalation_rate": 0.25}
+
+    async def test_arcs_stopping_short_are_escalated(self):
+        story = _story(4)
+        llm = TieredLLM({1: "short"})
+        agent = ArcSplitterAgent(llm_service=llm, escalation_model="gemini-2.5-pro")  # type: ignore[arg-type]
+        agent._calculate_chunk_token_limit = lambda provider=None, model=None: 1000  # type: ignore[method-assign]
+
+        result = await agent.analyze_story(story, user_id=uuid4())
+
+        assert [model for _, model in llm.calls] == ["gemini-2.5-flash-lite-preview-06-17", "gemini-2.5-pro"]
+        assert result.arcs[-1].end_chapter == 4
+
+    async def test_without_escalation_model_short_arcs_are_accepted(self):
+        llm = TieredLLM({1: "short"})
+        agent = ArcSplitterAgent(llm_service=llm)  # type: ignore[arg-type]
+        agent._calculate_chunk_token_limit = lambda provider=None, model=None: 1000  # type: ignore[method-assign]
+
+        await agent.analyze_story(_story(4), user_id=uuid4())
+
+        assert len(llm.calls) == 1
+        assert agent.cascade_report()["window"]["escalated"] == 0
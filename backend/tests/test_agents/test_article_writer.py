@@ -0,0 +1,362 @@
+"""
+Tests for the ArticleWriterAgent's staged article pipeline
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+import pytest
+
+from src.agents.wikigen import article_writer
+from src.agents.wikigen.article_writer import ArticleWriterAgent
+from src.core.exceptions import ProcessingError
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.wiki import ArticlePlan, WikiPlan
+from src.services.web_search.web_search_service import FixtureSearchClient, SearchResult, WebSearchService
+
+
+DELAY = 0.05
+
+
+def _plan(count: int) -> WikiPlan:
+    return WikiPlan(arc_id=1, articles=[
+        ArticlePlan(title=f"Article {n}", filename=f"articles/article-{n}.md", structure="# Overview")
+        for n in range(1, count + 1)
+    ])
+
+
+class FakeLLMService:
+    """Answers each article prompt after a delay, failing the titles in fail_times a number of times"""
+    usage_tracker = None
+
+    def __init__(self, fail_times: Optional[Dict[str, int]] = None, delays: Optional[Dict[str, float]] = None):
+        self.fail_times = dict(fail_times or {})
+        self.delays = delays or {}
+        self.calls: List[str] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        title = next(self._titles(kwargs["messages"]))
+        self.calls.append(title)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(title, DELAY))
+            if self.fail_times.get(title, 0) > 0:
+                self.fail_times[title] -= 1
+                raise RuntimeError("provider hiccup")
+            return LLMResponse(content=f"```markdown\n# {title}\n\nText.\n```", model=kwargs["model"])
+        finally:
+            self.active -= 1
+
+    @staticmethod
+    def _titles(messages):
+        for message in messages:
+            if 'wiki article titled "' in message.content:
+                yield message.content.split('wiki article titled "', 1)[1].split('"', 1)[0]
+
+
+class FakeSearch:
+    search_many = WebSearchService.search_many
+
+    def __init__(self):
+        self.queries: List[str] = []
+
+    async def search(self, query: str):
+        self.queries.append(query)
+        if query == "broken":
+            raise RuntimeError("search down")
+        return [
+            {"title": f"{query} (wiki)", "url": f"https://example.org/{query}", "snippet": f"All about\n{query}."},
+            {"title": "Shared page", "url": "https://example.org/shared", "snippet": ""},
+            {"title": "Third hit", "url": f"https://example.org/{query}/3", "snippet": "not cited"},
+        ]
+
+
+def _agent(llm: FakeLLMService, **kwargs) -> ArticleWriterAgent:
+    return ArticleWriterAgent(llm, **kwargs)  # type: ignore[arg-type]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(article_writer, "RETRY_BACKOFF_SECONDS", 0)
+
+
+class TestArticlePipeline:
+    """Test concurrency, ordering and formatting of write_articles"""
+
+    async def test_articles_run_concurrently_within_limit(self):
+        llm = FakeLLMService()
+        agent = _agent(llm, max_concurrent_articles=8)
+
+        started = time.perf_counter()
+        articles = await agent.write_articles(_plan(40), "story", {}, user_id=uuid4())
+        elapsed = time.perf_counter() - started
+
+        assert [a.title for a in articles] == [f"Article {n}" for n in range(1, 41)]
+        assert llm.max_active == 8
+        assert elapsed < 40 * DELAY / 2  # Far closer to 5 rounds than to 40 sequential calls
+
+    async def test_limit_is_shared_across_calls(self):
+        llm = FakeLLMService()
+        agent = _agent(llm, max_concurrent_articles=3)
+
+        await asyncio.gather(*(agent.write_articles(_plan(4), "story", {}, user_id=uuid4()) for _ in range(3)))
+
+        assert llm.max_active == 3
+
+    async def test_articles_are_formatted(self):
+        agent = _agent(FakeLLMService())
+
+        [article] = await agent.write_articles(_plan(1), "story", {}, user_id=uuid4())
+
+        assert article.content == "# Article 1\n\nText.\n"
+        assert article.arc_id == 1 and article.filename == "articles/article-1.md"
+        assert article.metadata["attempts"]["generate"] == 1
+
+    async def test_empty_draft_is_escalated(self):
+        class CheapEmptyLLM(FakeLLMService):
+            async def chat_completion(self, **kwargs) -> LLMResponse:
+                response = await super().chat_completion(**kwargs)
+                return response.model_copy(update={"content": ""}) if kwargs["model"] == "gemini-2.0-flash-001" else response
+
+        llm = CheapEmptyLLM()
+        agent = _agent(llm, escalation_model="gemini-2.5-pro")
+
+        articles = await agent.write_articles(_plan(2), "story", {}, user_id=uuid4())
+
+        assert [a.content for a in articles] == ["# Article 1\n\nText.\n", "# Article 2\n\nText.\n"]
+        assert agent.cascade_report()["article"]["recovered"] == 2
+        assert all(a.metadata["attempts"]["generate"] == 1 for a in articles)
+
+    async def test_prompt_prefix_uses_context_plan(self):
+        llm = FakeLLMService()
+        agent = _agent(llm)
+        recorded = []
+        original = llm.chat_completion
+
+        async def record(**kwargs):
+            recorded.append([m for m in kwargs["messages"] if m.cacheable])
+            return await original(**kwargs)
+
+        llm.chat_completion = record  # type: ignore[method-assign]
+        full_plan = _plan(2)
+        for article in full_plan.articles:
+            single = full_plan.model_copy(update={"articles": [article]})
+            await agent.write_articles(single, "story", {}, user_id=uuid4(), context_plan=full_plan)
+
+        assert recorded[0] == recorded[1]
+        assert "Article 2" in recorded[0][-1].content
+
+
+class TestRetriesAndPartialResults:
+    """Test per-article retries, failures and streaming"""
+
+    async def test_failed_generation_is_retried(self):
+        llm = FakeLLMService(fail_times={"Article 2": 1})
+        agent = _agent(llm, max_article_retries=1)
+
+        articles = await agent.write_articles(_plan(3), "story", {}, user_id=uuid4())
+
+        assert len(articles) == 3
+        assert llm.calls.count("Article 2") == 2
+        assert articles[1].metadata["attempts"]["generate"] == 2
+
+    async def test_failure_after_retries_raises(self):
+        agent = _agent(FakeLLMService(fail_times={"Article 2": 5}), max_article_retries=1)
+
+        with pytest.raises(ProcessingError, match="1 of 3") as exc_info:
+            await agent.write_articles(_plan(3), "story", {}, user_id=uuid4())
+
+        assert "Article 2" in exc_info.value.details["failed"]
+
+    async def test_partial_results(self):
+        agent = _agent(FakeLLMService(fail_times={"Article 2": 5}), max_article_retries=0)
+        ready: List[str] = []
+
+        articles = await agent.write_articles(
+            _plan(3), "story", {}, user_id=uuid4(), allow_partial=True, on_article=lambda a: ready.append(a.title),
+        )
+
+        assert [a.title for a in articles] == ["Article 1", "Article 3"]
+        assert sorted(ready) == ["Article 1", "Article 3"]
+
+    async def test_stream_yields_in_completion_order(self):
+        llm = FakeLLMService(delays={"Article 1": DELAY * 4})
+        agent = _agent(llm)
+
+        finished = [job.plan.title async for job in agent.stream_articles(_plan(3), "story", {}, user_id=uuid4())]
+
+        assert finished[-1] == "Article 1"
+
+    async def test_search_failures_do_not_fail_articles(self, monkeypatch):
+        search = FakeSearch()
+        agent = _agent(FakeLLMService(), web_search_service=search)
+
+        async def queries(content, article_type, *args):
+            return ["dragons", "broken"]
+
+        monkeypatch.setattr(agent, "_identify_search_queries", queries)
+        articles = await agent.write_articles(_plan(2), "story", {}, user_id=uuid4())
+
+        assert len(articles) == 2
+        assert sorted(search.queries) == ["broken", "broken", "dragons", "dragons"]
+        assert articles[0].metadata["search_queries"] == ["dragons", "broken"]
+
+        content = articles[0].content
+        assert content.count("## References") == 1
+        assert "- [dragons (wiki)](https://example.org/dragons) (dragons): All about dragons." in content
+        assert content.count("https://example.org/shared") == 1
+        assert "not cited" not in content
+        assert "broken" not in content.split("## References")[1]
+
+    async def test_no_references_section_without_results(self):
+        agent = _agent(FakeLLMService())
+
+        articles = await agent.write_articles(_plan(1), "story", {}, user_id=uuid4())
+
+        assert "## References" not in articles[0].content
+
+    def test_references_extend_existing_section(self):
+        agent = _agent(FakeLLMService())
+        results = {"dragons": [SearchResult("Dragons", "https://example.org/dragons", "")]}
+
+        content = agent._integrate_search_results("Body\n\n## References\n- Book\n", results)
+
+        assert content == "Body\n\n## References\n- Book\n- [Dragons](https://example.org/dragons) (dragons)\n"
+
+    async def test_search_skipped_when_disabled(self):
+        search = FakeSearch()
+        agent = _agent(FakeLLMService(), web_search_service=search)
+
+        await agent.write_articles(_plan(2), "story", {}, user_id=uuid4(), include_web_search=False)
+
+        assert search.queries == []
+
+
+class TestPassageRetrieval:
+    """Test that long arcs are replaced by the passages relevant to each article"""
+
+    STORY = "\n\n".join(
+        f'<Chapter number="{n}">\n' + ("The caravan crossed the dunes in silence. " * 30)
+        + ("\n\nMira bargained with the smugglers." if n == 7 else "") + "\n</Chapter>"
+        for n in range(1, 21)
+    )
+
+    async def _prompts(self, agent: ArticleWriterAgent, plan: WikiPlan):
+        llm = agent.llm_service
+        recorded = []
+        original = llm.chat_completion
+
+        async def record(**kwargs):
+            recorded.append(kwargs["messages"])
+            return await original(**kwargs)
+
+        llm.chat_completion = record  # type: ignore[method-assign]
+        await agent.write_articles(plan, self.STORY, {}, user_id=uuid4())
+        return recorded
+
+    async def test_long_arc_is_replaced_by_relevant_passages(self):
+        agent = _agent(FakeLLMService(), passage_token_budget=500)
+        plan = WikiPlan(arc_id=1, articles=[
+            ArticlePlan(title="Mira", filename="characters/mira.md", article_type="character", preview="A trader"),
+        ])
+
+        [messages] = await self._prompts(agent, plan)
+
+        story = next(m for m in messages if "Mira bargained" in m.content)
+        assert len(story.content) < len(self.STORY) / 10
+        assert '<Passage chapter="7">' in story.content
+        assert not story.cacheable
+        assert messages[0].cacheable
+
+    async def test_main_article_and_short_arcs_get_everything(self):
+        plan = WikiPlan(arc_id=1, articles=[
+            ArticlePlan(title="Overview", filename="main.md", article_type="main"),
+        ])
+
+        for budget in (500, None):
+            [messages] = await self._prompts(_agent(FakeLLMService(), passage_token_budget=budget), plan)
+            assert any(self.STORY in m.content for m in messages)
+
+    async def test_index_is_built_once_per_arc(self, monkeypatch):
+        agent = _agent(FakeLLMService(), passage_token_budget=500)
+        built = []
+        original = article_writer.PassageIndex.from_story_text
+
+        def counting(content, **kwargs):
+            built.append(content)
+            return original(content, **kwargs)
+
+        monkeypatch.setattr(article_writer.PassageIndex, "from_story_text", counting)
+        for article in _plan(3).articles:
+            await agent.write_articles(WikiPlan(arc_id=1, articles=[article]), self.STORY, {}, user_id=uuid4())
+
+        assert len(built) == 1
+
+class TestWebSearch:
+    """Test that articles share the search service's deduplication"""
+
+    async def test_references_are_searched_once_across_articles(self, monkeypatch):
+        client = FixtureSearchClient({"Ragnarok": [{"title": "Ragnarök"}]}, delay=DELAY)
+        agent = _agent(FakeLLMService(), web_search_service=WebSearchService(client, requests_per_second=None))
+
+        async def queries(content, article_type, *args):
+            return ["Ragnarok", "ragnarok", "Excalibur"]
+
+        monkeypatch.setattr(agent, "_identify_search_queries", queries)
+        articles = await agent.write_articles(_plan(12), "story", {}, user_id=uuid4())
+
+        assert len(articles) == 12
+        assert sorted(client.queries) == ["excalibur", "ragnarok"]
+
+
+class ReferenceLLMService(FakeLLMService):
+    """Writes articles like FakeLLMService and answers reference prompts with the given queries"""
+
+    def __init__(self, queries):
+        super().__init__()
+        self.queries = queries
+        self.reference_prompts: List[str] = []
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        prompt = kwargs["messages"][-1].content
+        if "worth a web search" not in prompt:
+            return await super().chat_completion(**kwargs)
+        self.reference_prompts.append(prompt)
+        return LLMResponse(content=f"```json\n{json.dumps({'queries': self.queries})}\n```", model=kwargs["model"])
+
+
+class TestReferenceIdentification:
+    """Test asking the model which references in a draft to look up"""
+
+    async def test_references_are_identified_and_searched(self):
+        llm = ReferenceLLMService(["Ragnarok", " Ragnarok ", "", 7, "Excalibur"])
+        search = FakeSearch()
+        agent = _agent(llm, web_search_service=search)
+
+        [article] = await agent.write_articles(_plan(1), "story", {}, user_id=uuid4())
+
+        assert article.metadata["search_queries"] == ["Ragnarok", "Excalibur"]
+        assert sorted(search.queries) == ["Excalibur", "Ragnarok"]
+        assert "# Article 1" in llm.reference_prompts[0]
+
+    async def test_queries_are_capped(self):
+        agent = _agent(ReferenceLLMService([f"myth {n}" for n in range(20)]))
+
+        queries = await agent._identify_search_queries("# Draft", "character", uuid4())
+
+        assert queries == [f"myth {n}" for n in range(article_writer.MAX_SEARCH_QUERIES)]
+
+    async def test_invalid_answer_drops_references(self):
+        llm = ReferenceLLMService("none")
+        agent = _agent(llm, web_search_service=FakeSearch())
+
+        [article] = await agent.write_articles(_plan(1), "story", {}, user_id=uuid4())
+
+        assert article.metadata["search_queries"] == []
+        assert len(llm.reference_prompts) == 2  # Retried once, then skipped
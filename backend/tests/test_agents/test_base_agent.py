@@ -0,0 +1,189 @@
+"""
+Tests for the streaming window accumulator and model cascade shared by the agents
+"""
+
+from typing import List, Optional, Tuple
+
+import pytest
+
+from src.agents.base_agent import BaseAgent, WindowContentAccumulator
+from src.core.exceptions import AuthenticationError, BudgetExceededError, LLMError
+from src.schemas.llm.models import ChunkType, LLMResponse
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _chunk(content: str, chunk_type: ChunkType = ChunkType.CONTENT, usage=None) -> LLMResponse:
+    return LLMResponse(content=content, model="fake", chunk_type=chunk_type, usage=usage)
+
+
+class TestWindowContentAccumulator:
+    """Test buffered accumulation and stream statistics"""
+
+    def test_text_is_accumulated_by_type(self):
+        raw = WindowContentAccumulator()
+        for piece in ('{"arcs": ', "[1, ", "2]}"):
+            raw.add_chunk(_chunk(piece))
+        raw.add_chunk(_chunk("Let me think.", ChunkType.THINKING))
+        raw.add_chunk(_chunk("?", ChunkType.UNKNOWN))
+
+        assert raw.content == '{"arcs": [1, 2]}'
+        assert raw.thinking == "Let me think."
+        assert raw.unknown == "?"
+
+    def test_reads_between_chunks_see_new_content(self):
+        raw = WindowContentAccumulator()
+        raw.add_chunk(_chunk("ab"))
+        assert raw.content == "ab"
+
+        raw.add_chunk(_chunk("cd"))
+
+        assert raw.content == "abcd"
+        assert raw.chars[ChunkType.CONTENT] == 4
+
+    def test_many_chunks_accumulate_linearly(self):
+        raw = WindowContentAccumulator()
+        for _ in range(50_000):
+            raw.add_chunk(_chunk("token "))
+
+        assert len(raw.content) == raw.chars[ChunkType.CONTENT] == 300_000
+        assert raw.chunk_count == 50_000
+
+    def test_timing_statistics(self):
+        clock = FakeClock()
+        raw = WindowContentAccumulator(clock=clock)
+        clock.now += 0.5
+        raw.add_chunk(_chunk("t" * 400, ChunkType.THINKING))
+        clock.now += 1.0
+        raw.add_chunk(_chunk("c" * 400))
+        clock.now += 1.0
+        raw.add_chunk(_chunk("", usage={"prompt_tokens": 1000, "completion_tokens": 300}))
+
+        assert raw.time_to_first_token == pytest.approx(0.5)
+        # Reported usage wins over the character estimate; the empty usage chunk doesn't extend the stream
+        assert raw.output_tokens == 300
+        assert raw.tokens_per_second == pytest.approx(300.0)
+        assert raw.thinking_ratio == pytest.approx(0.5)
+
+    def test_statistics_without_output(self):
+        raw = WindowContentAccumulator()
+
+        assert raw.content == ""
+        assert raw.time_to_first_token is None
+        assert raw.tokens_per_second is None
+        assert raw.thinking_ratio is None
+        assert raw.stats()["output_tokens"] == 0
+
+    def test_tokens_are_estimated_without_usage(self):
+        raw = WindowContentAccumulator()
+        raw.add_chunk(_chunk("x" * 10))
+
+        assert raw.estimated_tokens(ChunkType.CONTENT) == 3
+        assert raw.output_tokens == 3
+
+
+class CascadeAgent(BaseAgent):
+    """Agent whose items are answered per model from a script."""
+
+    def __init__(self, answers, **kwargs):
+        super().__init__(llm_service=None, **kwargs)  # type: ignore[arg-type]
+        self.answers = answers
+        self.calls: List[Tuple[str, str]] = []
+
+    async def execute(self, *args, **kwargs):
+        pass
+
+    async def run_item(self, provider: str, model: str) -> str:
+        self.calls.append((provider, model))
+        answer = self.answers[model]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def _validate(answer: str) -> Optional[str]:
+    return None if answer == "good" else f"bad answer: {answer}"
+
+
+class TestModelCascade:
+    """Test cheap-first runs with selective escalation"""
+
+    async def test_passing_item_is_not_escalated(self):
+        agent = CascadeAgent({"gemini-2.0-flash-001": "good"}, escalation_model="gemini-2.5-pro")
+
+        assert await agent._run_cascade("item", agent.run_item, _validate) == "good"
+        assert agent.calls == [("google", "gemini-2.0-flash-001")]
+        assert agent.cascade_report()["item"]["escalation_rate"] == 0.0
+
+    async def test_failing_item_is_escalated(self):
+        agent = CascadeAgent({"gemini-2.0-flash-001": "bad", "gemini-2.5-pro": "good"}, escalation_model="gemini-2.5-pro")
+
+        assert await agent._run_cascade("item", agent.run_item, _validate) == "good"
+        assert agent.calls[-1] == ("google", "gemini-2.5-pro")
+        assert agent.cascade_report()["item"] == {"items": 1, "escalated": 1, "recovered": 1, "escalation_rate": 1.0}
+
+    async def test_escalation_rate_is_per_stage(self):
+        agent = CascadeAgent({"gemini-2.0-flash-001": "bad", "gemini-2.5-pro": "good"}, escalation_model="gemini-2.5-pro")
+        await agent._run_cascade("hard", agent.run_item, _validate)
+        for _ in range(3):
+            await agent._run_cascade("easy", agent.run_item, lambda answer: None)
+
+        assert agent.cascade_stats["hard"].escalation_rate == 1.0
+        assert agent.cascade_stats["easy"].escalation_rate == 0.0
+        assert agent.cascade_stats["easy"].items == 3
+
+    async def test_failed_call_is_escalated_and_failed_escalation_keeps_cheap_result(self):
+        agent = CascadeAgent({"gemini-2.0-flash-001": ConnectionError("down"), "gemini-2.5-pro": "good"}, escalation_model="gemini-2.5-pro")
+        assert await agent._run_cascade("item", agent.run_item, _validate) == "good"
+
+        agent = CascadeAgent({"gemini-2.0-flash-001": "bad", "gemini-2.5-pro": ConnectionError("down")}, escalation_model="gemini-2.5-pro")
+        assert await agent._run_cascade("item", agent.run_item, _validate) == "bad"
+        assert agent.cascade_stats["item"].recovered == 0
+
+    async def test_without_escalation_model_result_is_returned_as_is(self):
+        agent = CascadeAgent({"gemini-2.0-flash-001": "bad"})
+
+        assert await agent._run_cascade("item", agent.run_item, _validate) == "bad"
+        agent = CascadeAgent({"gemini-2.0-flash-001": ConnectionError("down")})
+        with pytest.raises(ConnectionError):
+            await agent._run_cascade("item", agent.run_item, _validate)
+
+    @pytest.mark.parametrize("error", [
+        BudgetExceededError("user", "u1", 1.0, 1.5),
+        AuthenticationError(),
+    ])
+    async def test_budget_and_auth_errors_are_not_escalated(self, error):
+        agent = CascadeAgent({"gemini-2.0-flash-001": error, "gemini-2.5-pro": "good"}, escalation_model="gemini-2.5-pro")
+
+        with pytest.raises(type(error)):
+            await agent._run_cascade("item", agent.run_item, _validate)
+        assert agent.calls == [("google", "gemini-2.0-flash-001")]
+        assert agent.cascade_stats["item"].escalated == 0
+
+    async def test_rejected_api_key_is_not_escalated(self):
+        class ProviderAuthError(Exception):
+            status_code = 401
+
+        class WrappingAgent(CascadeAgent):
+            async def run_item(self, provider: str, model: str) -> str:
+                self.calls.append((provider, model))
+                try:
+                    raise ProviderAuthError("invalid api key")
+                except ProviderAuthError as e:
+                    raise LLMError(provider, str(e))
+
+        agent = WrappingAgent({}, escalation_model="gemini-2.5-pro")
+
+        with pytest.raises(LLMError):
+            await agent._run_cascade("item", agent.run_item, _validate)
+        assert len(agent.calls) == 1
+
+    def test_unknown_escalation_model_is_rejected(self):
+        with pytest.raises(ValueError, match="Escalation model"):
+            CascadeAgent({}, escalation_model="no-such-model")
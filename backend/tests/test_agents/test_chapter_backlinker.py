@@ -0,0 +1,138 @@
+"""
+Tests for ChapterBacklinkerAgent's deterministic linking with LLM fallback
+"""
+
+import json
+from typing import List, Optional
+from uuid import uuid4
+
+from src.agents.wikigen.chapter_backlinker import ChapterBacklinkerAgent
+from src.schemas.db.story import Chapter
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.wiki import WikiArticle
+
+
+def _article(title: str, arc_id: int = 1, aliases: Optional[List[str]] = None, article_type: str = "character") -> WikiArticle:
+    return WikiArticle(title=title, filename=f"{title}.md", content="...", arc_id=arc_id,
+                       aliases=aliases or [], article_type=article_type)
+
+
+def _chapter(content: str, number: int = 1) -> Chapter:
+    return Chapter(chapter_number=number, title=f"Chapter {number}", content=content)
+
+
+class FakeLLMService:
+    """Answers ambiguous-mention prompts with a fixed JSON reply"""
+    usage_tracker = None
+
+    def __init__(self, reply: str = '{"links": []}'):
+        self.reply = reply
+        self.prompts: List[str] = []
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        self.prompts.append(kwargs["messages"][-1].content)
+        return LLMResponse(content=self.reply, model=kwargs["model"])
+
+
+ARTICLES = [
+    _article("Sarah Chen", aliases=["Sarah"]),
+    _article("Celestial Observatory", article_type="location"),
+    _article("Binding Ritual", arc_id=3, article_type="concept"),
+]
+
+
+async def _link(agent: ChapterBacklinkerAgent, chapters, articles=ARTICLES, **kwargs):
+    return await agent.create_chapter_links(chapters, articles, current_arc_id=2, user_id=uuid4(), **kwargs)
+
+
+class TestDeterministicLinking:
+    """Exact title and alias mentions are linked without the LLM"""
+
+    async def test_links_titles_and_aliases(self):
+        llm = FakeLLMService()
+        agent = ChapterBacklinkerAgent(llm)  # type: ignore[arg-type]
+
+        [chapter] = await _link(agent, [_chapter("Sarah's telescope. The Celestial Observatory gleamed. Sarah left.")])
+
+        assert chapter.content == (
+            "[[Sarah Chen|Sarah]]'s telescope. The [[Celestial Observatory]] gleamed. Sarah left."
+        )
+        assert chapter.links == ["Sarah Chen", "Celestial Observatory"]
+        assert llm.prompts == []
+
+    async def test_spoiler_articles_are_not_linked(self):
+        agent = ChapterBacklinkerAgent(FakeLLMService())  # type: ignore[arg-type]
+
+        [chapter] = await _link(agent, [_chapter("The Binding Ritual began.")])
+
+        assert chapter.links == []
+
+    async def test_max_links_per_chapter(self):
+        agent = ChapterBacklinkerAgent(FakeLLMService())  # type: ignore[arg-type]
+
+        [chapter] = await _link(agent, [_chapter("Sarah saw the Celestial Observatory.")], max_links_per_chapter=1)
+
+        assert chapter.links == ["Sarah Chen"]
+
+    async def test_existing_links_are_kept(self):
+        agent = ChapterBacklinkerAgent(FakeLLMService())  # type: ignore[arg-type]
+
+        [chapter] = await _link(agent, [_chapter("[[Sarah Chen|Sarah]] waved. Sarah ran.")])
+
+        assert chapter.content == "[[Sarah Chen|Sarah]] waved. [[Sarah Chen|Sarah]] ran."
+
+    async def test_adjacent_mention_waits_for_a_later_one(self):
+        agent = ChapterBacklinkerAgent(FakeLLMService())  # type: ignore[arg-type]
+        articles = ARTICLES + [_article("Captain", article_type="concept")]
+
+        [chapter] = await _link(agent, [_chapter("Captain Sarah bowed. Sarah left.")], articles=articles)
+
+        assert chapter.content == "[[Captain]] Sarah bowed. [[Sarah Chen|Sarah]] left."
+
+    def test_validation_rejects_links_inside_words(self):
+        agent = ChapterBacklinkerAgent(FakeLLMService())  # type: ignore[arg-type]
+        original = "Sarahs and Sarah"
+
+        assert agent._validate_link_quality(original, "Sarahs and [[Sarah Chen|Sarah]]", 1)
+        assert not agent._validate_link_quality(original, "[[Sarah Chen|Sarah]]s and Sarah", 1)
+        assert not agent._validate_link_quality("A B", "[[A]] [[B]]", 2)
+
+
+class TestAmbiguousMentions:
+    """Only ambiguous mentions are sent to the LLM"""
+
+    async def test_lowercase_mention_is_resolved_by_llm(self):
+        llm = FakeLLMService(json.dumps({"links": [{"id": 1, "article": "Hope"}]}))
+        agent = ChapterBacklinkerAgent(llm)  # type: ignore[arg-type]
+
+        [chapter] = await _link(agent, [_chapter("There was still hope. Sarah agreed.")],
+                                articles=ARTICLES + [_article("Hope")])
+
+        assert chapter.links == ["Hope", "Sarah Chen"]
+        assert "[[Hope|hope]]" in chapter.content
+        assert len(llm.prompts) == 1 and ">>hope<<" in llm.prompts[0]
+
+    async def test_shared_alias_rejected_answer_is_not_linked(self):
+        llm = FakeLLMService(json.dumps({"links": [{"id": 1, "article": "Someone Else"}]}))
+        agent = ChapterBacklinkerAgent(llm)  # type: ignore[arg-type]
+        articles = [_article("Professor Oak", aliases=["Professor"]), _article("Professor Elm", aliases=["Professor"])]
+
+        [chapter] = await _link(agent, [_chapter("The Professor nodded. The Professor left.")], articles=articles)
+
+        assert chapter.links == []
+        assert llm.prompts[0].count(">>Professor<<") == 1  # Same mention asked about once
+
+    async def test_llm_failure_leaves_mentions_unlinked(self):
+        agent = ChapterBacklinkerAgent(FakeLLMService("not json"))  # type: ignore[arg-type]
+
+        [chapter] = await _link(agent, [_chapter("hope and Sarah")], articles=ARTICLES + [_article("Hope")])
+
+        assert chapter.links == ["Sarah Chen"]
+
+    async def test_resolution_can_be_disabled(self):
+        llm = FakeLLMService()
+        agent = ChapterBacklinkerAgent(llm, resolve_ambiguous=False)  # type: ignore[arg-type]
+
+        await _link(agent, [_chapter("hope")], articles=[_article("Hope")])
+
+        assert llm.prompts == []
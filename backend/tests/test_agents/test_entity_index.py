@@ -0,0 +1,145 @@
+"""
+Tests for the story-level entity index
+"""
+
+from uuid import uuid4
+
+from src.agents.wikigen.chapter_backlinker import ChapterBacklinkerAgent
+from src.agents.wikigen.entity_index import EntityIndex
+from src.agents.wikigen.general_summarizer import GeneralSummarizerAgent
+from src.agents.wikigen.planner import WikiPlannerAgent
+from src.database.repositories import MemoryCheckpointRepository
+from src.schemas.db.story import Chapter
+from src.schemas.wikigen.wiki import WikiArticle
+
+
+def _chapter(number: int, content: str) -> Chapter:
+    return Chapter(chapter_number=number, title=f"Chapter {number}", content=content)
+
+
+def _article(title: str, article_type: str, aliases=(), arc_id: int = 1) -> WikiArticle:
+    return WikiArticle(title=title, filename=f"{title}.md", content="...", article_type=article_type,
+                       aliases=list(aliases), arc_id=arc_id)
+
+
+ARTICLES = [
+    _article("Sarah Chen", "character", ["Sarah"]),
+    _article("Marcus", "character"),
+    _article("Celestial Observatory", "location", ["the Observatory"]),
+]
+
+CHAPTERS = [
+    _chapter(1, "Sarah climbed to the Celestial Observatory.\n\nThe night was cold."),
+    _chapter(2, "Marcus waited below.\n\nSarah and Marcus argued at the Observatory."),
+    _chapter(3, "Marcus left the city alone."),
+]
+
+
+def _index() -> EntityIndex:
+    index = EntityIndex()
+    index.register_articles(ARTICLES)
+    index.update(CHAPTERS)
+    return index
+
+
+class TestEntityIndex:
+    """Mentions, first appearances and co-occurrences"""
+
+    def test_first_appearances_gate_entities_by_chapter(self):
+        index = _index()
+
+        assert index.first_appearances() == {"Sarah Chen": 1, "Celestial Observatory": 1, "Marcus": 2}
+        assert [e.name for e in index.entities(as_of_chapter=1)] == ["Celestial Observatory", "Sarah Chen"]
+        assert len(index.entities()) == 3
+
+    def test_counts_and_co_occurrences(self):
+        index = _index()
+
+        assert index.mention_counts() == {"Sarah Chen": 2, "Marcus": 3, "Celestial Observatory": 2}
+        assert index.mention_counts(start_chapter=3) == {"Marcus": 1}
+        pairs = index.co_occurrences()
+        assert pairs[("Celestial Observatory", "Sarah Chen")] == 2
+        assert pairs[("Celestial Observatory", "Marcus")] == 1
+        assert index.related("Marcus", as_of_chapter=1) == []
+
+    def test_update_only_rescans_stale_chapters(self):
+        index = _index()
+
+        assert index.update(CHAPTERS) == []
+        edited = [CHAPTERS[0], _chapter(2, "Marcus slept."), CHAPTERS[2]]
+        assert index.update(edited) == [2]
+        assert index.register("Lena", entity_type="character")
+        assert index.update(edited) == []  # No chapter mentions Lena
+        assert index.register("Marcus", aliases=["the city"])
+        assert index.update(edited) == [3]
+        assert not index.register("Lena")
+
+    def test_new_names_rescan_only_chapters_mentioning_them(self):
+        index = EntityIndex()
+        arc_1, arc_2 = CHAPTERS[:2], CHAPTERS[2:]
+
+        # Planning arc 1, then registering its articles
+        assert index.update(arc_1) == [1, 2]
+        index.register_articles(ARTICLES[:2])
+        # Planning arc 2 updates the chapters so far: Sarah and Marcus are in 1-2 and Marcus in 3
+        assert index.update(arc_1 + arc_2) == [1, 2, 3]
+        index.register_articles(ARTICLES[2:])
+        # Only chapters 1 and 2 mention the Observatory
+        assert index.update(arc_1 + arc_2) == [1, 2]
+        assert index.update(arc_1 + arc_2) == []
+
+        rebuilt = _index()
+        assert [index.find(c.chapter_number, c.content) for c in CHAPTERS] == [
+            rebuilt.find(c.chapter_number, c.content) for c in CHAPTERS
+        ]
+        assert index.co_occurrences() == rebuilt.co_occurrences()
+
+    async def test_persists_per_chapter(self):
+        repository = MemoryCheckpointRepository()
+        index = _index()
+
+        assert await index.save(repository, "story") == 4
+        index.update([_chapter(3, "Sarah returned.")])
+        assert await index.save(repository, "story") == 2
+
+        loaded = await EntityIndex.load(repository, "story")
+        assert loaded.first_appearances() == index.first_appearances()
+        assert loaded.get("Sarah Chen").aliases == ["Sarah"]
+        assert loaded.update(CHAPTERS[:2]) == []
+        assert loaded.find(1, CHAPTERS[0].content) == index.find(1, CHAPTERS[0].content)
+        loaded.register("Lena")
+        assert loaded.update(CHAPTERS[:2]) == []
+
+
+class TestAgentsShareTheIndex:
+    """Planner, summarizer and backlinker query the index instead of prompting"""
+
+    def test_planner_and_summarizer_queries(self):
+        index = _index()
+        planner = WikiPlannerAgent(None, entity_index=index)  # type: ignore[arg-type]
+        summarizer = GeneralSummarizerAgent(None, entity_index=index)  # type: ignore[arg-type]
+        arc = CHAPTERS[1].content
+
+        assert [(e.name, n) for e, n in planner._analyze_entities(arc)] == [
+            ("Marcus", 2), ("Sarah Chen", 1), ("Celestial Observatory", 1),
+        ]
+        assert planner._identify_cross_references(["Sarah Chen", "Marcus"], as_of_chapter=2) == [
+            ("Marcus", "Sarah Chen", 1),
+        ]
+        elements = summarizer._extract_key_elements(arc, "chapter")
+        assert elements["characters"] == ["Marcus", "Sarah Chen"]
+        assert elements["locations"] == ["Celestial Observatory"]
+
+    async def test_backlinker_uses_indexed_mentions(self, monkeypatch):
+        index = _index()
+        agent = ChapterBacklinkerAgent(None, entity_index=index)  # type: ignore[arg-type]
+        built = []
+        monkeypatch.setattr(agent, "_build_matcher", lambda articles: built.append(articles))
+
+        # Marcus's article is from a later arc, so it is not linked
+        articles = ARTICLES[:1] + [ARTICLES[1].model_copy(update={"arc_id": 2})] + ARTICLES[2:]
+        [chapter] = await agent.create_chapter_links([CHAPTERS[1]], articles, current_arc_id=1, user_id=uuid4())
+
+        assert chapter.links == ["Sarah Chen", "Celestial Observatory"]
+        assert "[[Marcus]]" not in chapter.content
+        assert built == []
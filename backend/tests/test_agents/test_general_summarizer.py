@@ -0,0 +1,200 @@
+"""
+Tests for GeneralSummarizerAgent's cached map-reduce summary tree
+"""
+
+import asyncio
+from typing import List
+from uuid import uuid4
+
+import pytest
+
+from src.agents.wikigen.entity_index import EntityIndex
+from src.agents.wikigen.general_summarizer import GeneralSummarizerAgent
+from src.database.repositories import MemoryCheckpointRepository
+from src.schemas.db.story import Chapter
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.wiki import ArcSummary
+from src.utils.tokenizers import get_tokenizer
+
+
+class FakeLLMService:
+    """Summarizes by echoing the chapter titles (or the numbered inputs) it was given"""
+    usage_tracker = None
+
+    def __init__(self):
+        self.prompts: List[str] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        prompt = kwargs["messages"][-1].content
+        self.prompts.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.active -= 1
+        if "**Story Text (" in prompt:
+            content = "S(" + prompt.split("**Story Text (", 1)[1].split(")", 1)[0] + ")"
+        else:
+            inputs = prompt.split("**Summaries of Consecutive Parts, in Order:**\n", 1)[1].split("\n\n---", 1)[0]
+            content = "C[" + "+".join(line.split("] ", 1)[1] for line in inputs.split("\n\n")) + "]"
+        return LLMResponse(content=content, model=kwargs["model"])
+
+    @property
+    def map_calls(self) -> int:
+        return sum("**Story Text (" in prompt for prompt in self.prompts)
+
+    @property
+    def reduce_calls(self) -> int:
+        return len(self.prompts) - self.map_calls
+
+
+def _chapters(count: int, edited: int = 0) -> List[Chapter]:
+    return [
+        Chapter(chapter_number=n, title=f"Ch{n}", content=f"Chapter {n} text{' (edited)' if n == edited else ''}.")
+        for n in range(1, count + 1)
+    ]
+
+
+def _agent(llm: FakeLLMService, **kwargs) -> GeneralSummarizerAgent:
+    return GeneralSummarizerAgent(llm, reduce_fanout=4, **kwargs)  # type: ignore[arg-type]
+
+
+async def _summarize(agent, chapters, **kwargs) -> ArcSummary:
+    return await agent.summarize_arc(
+        arc_content="", arc_metadata={"id": 1, "title": "Arc 1"}, summary_type="detailed",
+        user_id=uuid4(), chapters=chapters, **kwargs,
+    )
+
+
+class TestSummaryTree:
+    """Chapters are mapped in parallel and reduced level by level"""
+
+    async def test_tree_shape(self):
+        llm = FakeLLMService()
+
+        summary = await _summarize(_agent(llm), _chapters(16))
+
+        assert (llm.map_calls, llm.reduce_calls) == (16, 5)  # 16 leaves, 4 inner nodes, 1 root
+        assert summary.content.startswith("C[C[S(Ch1)+S(Ch2)+S(Ch3)+S(Ch4)]+C[S(Ch5)")
+        assert summary.summary_type == "detailed"
+
+    async def test_small_arc_reduces_once(self):
+        llm = FakeLLMService()
+
+        summary = await _summarize(_agent(llm), _chapters(3))
+
+        assert summary.content == "C[S(Ch1)+S(Ch2)+S(Ch3)]"
+
+    async def test_map_is_parallel_and_bounded(self):
+        llm = FakeLLMService()
+
+        await _summarize(_agent(llm, max_concurrent_summaries=3), _chapters(12))
+
+        assert llm.max_active == 3
+
+    async def test_oversized_chapter_is_summarized_in_parts(self):
+        llm = FakeLLMService()
+        scene = " ".join(["word"] * 40)
+        chapter = Chapter(chapter_number=1, title="Long", content="\n\n***\n\n".join([scene] * 3))
+        limit = int(get_tokenizer("google", "gemini-2.0-flash-001").count(scene) * 1.5)  # One scene per part
+
+        summary = await _summarize(_agent(llm, chapter_token_limit=limit), [chapter])
+
+        assert llm.map_calls == 3
+        assert summary.content.startswith("C[C[S(Long (part 1/3)")
+
+
+class TestIncrementalUpdates:
+    """Only changed chapters and their ancestors are summarized again"""
+
+    async def test_unchanged_arc_is_fully_cached(self):
+        llm = FakeLLMService()
+        agent = _agent(llm)
+        await _summarize(agent, _chapters(16))
+        llm.prompts.clear()
+
+        await _summarize(agent, _chapters(16))
+
+        assert llm.prompts == []
+
+    async def test_edit_recomputes_path_to_root(self):
+        llm = FakeLLMService()
+        agent = _agent(llm)
+        await _summarize(agent, _chapters(16))
+        llm.prompts.clear()
+
+        await _summarize(agent, _chapters(16, edited=6))
+
+        assert (llm.map_calls, llm.reduce_calls) == (1, 2)  # Chapter 6, its group, the root
+
+    async def test_cache_survives_agent_instances(self):
+        store = MemoryCheckpointRepository()
+        await _summarize(_agent(FakeLLMService(), summary_cache=store), _chapters(8))
+        llm = FakeLLMService()
+
+        await _summarize(_agent(llm, summary_cache=store), _chapters(9))
+
+        assert (llm.map_calls, llm.reduce_calls) == (1, 2)  # New chapter, the last group, the root
+
+    async def test_progressive_root_uses_previous_arcs(self):
+        llm = FakeLLMService()
+        agent = _agent(llm)
+        previous = [ArcSummary(arc_id=1, content="Earlier events.")]
+
+        summary = await agent.summarize_arc(
+            arc_content="", arc_metadata={"id": 2}, summary_type="progressive", user_id=uuid4(),
+            previous_arcs=previous, chapters=_chapters(2),
+        )
+
+        assert summary.arc_id == 2
+        assert "Arc 1: Earlier events." in llm.prompts[-1]
+        assert "story so far" in llm.prompts[-1]
+
+    async def test_root_lists_known_entities(self):
+        index = EntityIndex()
+        index.register("Sarah Chen", aliases=["Sarah"], entity_type="character")
+        index.register("Harbor", entity_type="location")
+        index.register("Hope", entity_type="concept")
+        llm = FakeLLMService()
+        agent = _agent(llm, entity_index=index)
+
+        await agent.summarize_arc(
+            arc_content="Sarah sailed from the Harbor. Sarah Chen had Hope.", arc_metadata={"id": 1},
+            summary_type="detailed", user_id=uuid4(), chapters=_chapters(6),
+        )
+
+        root, inner = llm.prompts[-1], llm.prompts[:-1]
+        assert "- Characters: Sarah Chen\n- Locations: Harbor\n" in root
+        assert "Hope" not in root  # Concepts are not key elements
+        assert not any("Known Names" in prompt for prompt in inner)
+
+
+class TestOtherSummaries:
+    """Chapter and character summaries share the cached tree"""
+
+    async def test_chapter_summaries_reuse_cache(self):
+        llm = FakeLLMService()
+        agent = _agent(llm)
+        chapters = _chapters(3)
+
+        first = await agent.summarize_chapters(chapters, "standard", user_id=uuid4())
+        await _summarize(agent, chapters)
+
+        assert [s.content for s in first] == ["S(Ch1)", "S(Ch2)", "S(Ch3)"]
+        assert first[0].content_hash == chapters[0].content_hash
+        assert llm.map_calls == 3  # The arc summary reused the chapter summaries
+
+    @pytest.mark.parametrize("mentions", [["Sarah smiled.", "Sarah left."], []])
+    async def test_character_development(self, mentions):
+        llm = FakeLLMService()
+
+        summary = await _agent(llm).summarize_character_development(
+            mentions, "Sarah arrived.", "Sarah", user_id=uuid4(),
+        )
+
+        assert summary.character_name == "Sarah"
+        assert "focusing on how Sarah changes" in llm.prompts[0]
+        assert len(llm.prompts) == 1
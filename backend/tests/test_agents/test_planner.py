@@ -0,0 +1,125 @@
+"""
+Tests for WikiPlannerAgent planning
+"""
+
+import json
+from typing import Any, Dict, List
+from uuid import uuid4
+
+import pytest
+
+from src.agents.wikigen.entity_index import EntityIndex, IndexedEntity
+from src.agents.wikigen.planner import WikiPlannerAgent
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.wiki import ArcSummary, WikiArticle
+
+
+ARC = '<Chapter number="2" title="Two">\nSarah Chen met Marcus at the Observatory.\n</Chapter>'
+METADATA = {"title": "Star Fall", "genres": ["Fantasy"]}
+
+
+class FakePlanningLLM:
+    """Answers every planning call with the given articles."""
+
+    usage_tracker = None
+
+    def __init__(self, articles: List[Dict[str, Any]]):
+        self.articles = articles
+        self.prompts: List[str] = []
+
+    async def chat_completion(self, messages, **kwargs) -> LLMResponse:
+        self.prompts.append("\n".join(m.content for m in messages))
+        return LLMResponse(content=f"```json\n{json.dumps({'articles': self.articles})}\n```", model="fake")
+
+
+class TestCreatePlan:
+    """Test turning the model's article list into a wiki plan"""
+
+    async def test_fresh_plan(self):
+        llm = FakePlanningLLM([
+            {"title": "Sarah Chen", "article_type": "character", "preview": "The astronomer", "aliases": ["Sarah"]},
+            {"title": "Star Fall Wiki", "article_type": "main", "structure": "# Synopsis"},
+            {"title": "Sarah Chen", "article_type": "character"},
+        ])
+        planner = WikiPlannerAgent(llm)  # type: ignore[arg-type]
+
+        plan = await planner.create_plan(ARC, METADATA, "fresh", user_id=uuid4(), arc_id=2)
+
+        assert plan.arc_id == 2
+        assert [(a.title, a.filename) for a in plan.articles] == [
+            ("Star Fall Wiki", "Star Fall Wiki.md"),
+            ("Sarah Chen", "characters/Sarah Chen.md"),
+        ]
+        sarah = plan.articles[1]
+        assert sarah.aliases == ["Sarah"]
+        assert sarah.structure.startswith("# Overview")  # The character default outline
+        assert '<Story title="Star Fall" genres="Fantasy">' in llm.prompts[0]
+
+    async def test_main_article_is_always_planned(self):
+        planner = WikiPlannerAgent(FakePlanningLLM([{"title": "Marcus", "article_type": "character"}]))  # type: ignore[arg-type]
+
+        plan = await planner.create_plan(ARC, METADATA, "fresh", user_id=uuid4())
+
+        assert [(a.title, a.article_type) for a in plan.articles] == [("Star Fall Wiki", "main"), ("Marcus", "character")]
+
+    async def test_update_keeps_existing_files_and_uses_the_index(self):
+        index = EntityIndex()
+        index.register("Sarah Chen", aliases=["Sarah"], entity_type="character")
+        index.register("Marcus", entity_type="character")
+        llm = FakePlanningLLM([
+            {"title": "Star Fall Wiki", "article_type": "main"},
+            {"title": "Sarah Chen"},
+            {"title": "Observatory", "article_type": "location"},
+        ])
+        planner = WikiPlannerAgent(llm, entity_index=index)  # type: ignore[arg-type]
+        existing = [
+            WikiArticle(title="Star Fall Wiki", filename="Star Fall Wiki.md", content="...", arc_id=1),
+            WikiArticle(title="Sarah Chen", filename="people/Sarah.md", content="...", article_type="character", arc_id=1),
+        ]
+
+        plan = await planner.create_plan(
+            ARC, METADATA, "update", user_id=uuid4(), arc_id=2,
+            previous_summaries=[ArcSummary(arc_id=1, content="Sarah found a fallen star.")], existing_wiki=existing,
+        )
+
+        assert [(a.title, a.filename, a.article_type) for a in plan.articles] == [
+            ("Star Fall Wiki", "Star Fall Wiki.md", "main"),
+            ("Sarah Chen", "people/Sarah.md", "character"),
+            ("Observatory", "locations/Observatory.md", "location"),
+        ]
+        prompt = llm.prompts[0]
+        assert "Sarah found a fallen star." in prompt
+        assert "- Sarah Chen (character, 1 mentions)" in prompt
+
+    async def test_invalid_answer_raises(self):
+        planner = WikiPlannerAgent(FakePlanningLLM([]))  # type: ignore[arg-type]
+        planner.llm_service.articles = "none"  # type: ignore[attr-defined]
+
+        with pytest.raises(ValueError):
+            await planner.create_plan(ARC, METADATA, "fresh", user_id=uuid4())
+
+    async def test_unusable_plan_is_escalated(self):
+        class CheapFailsLLM(FakePlanningLLM):
+            async def chat_completion(self, messages, **kwargs) -> LLMResponse:
+                if kwargs["model"] == "gemini-2.0-flash-001":
+                    return LLMResponse(content="I could not decide.", model="cheap")
+                return await super().chat_completion(messages, **kwargs)
+
+        planner = WikiPlannerAgent(CheapFailsLLM([{"title": "Marcus", "article_type": "character"}]), escalation_model="gemini-2.5-pro")  # type: ignore[arg-type]
+
+        plan = await planner.create_plan(ARC, METADATA, "fresh", user_id=uuid4())
+
+        assert [a.title for a in plan.articles] == ["Star Fall Wiki", "Marcus"]
+        assert planner.cascade_report()["plan"] == {"items": 1, "escalated": 1, "recovered": 1, "escalation_rate": 1.0}
+
+
+class TestFileOrganization:
+    """Test article file paths"""
+
+    def test_paths_by_type_are_unique(self):
+        planner = WikiPlannerAgent(None)  # type: ignore[arg-type]
+        entities = [IndexedEntity("Ash/Red", entity_type="character"), IndexedEntity("Pallet Town", entity_type="location")]
+
+        paths = planner._create_file_organization(entities, taken=["characters/Ash Red.md"])
+
+        assert paths == {"Ash/Red": "characters/Ash Red (2).md", "Pallet Town": "locations/Pallet Town.md"}
@@ -0,0 +1,116 @@
+"""
+Tests for the versioned, spoiler-safe wiki store
+"""
+
+import json
+import zlib
+
+import pytest
+
+from src.agents.wikigen.wiki_store import WikiStore
+from src.schemas.wikigen.arc import Arc
+from src.schemas.wikigen.wiki import ArcArchive, WikiArticle
+
+
+def _article(filename: str, content: str, arc_id: int = 1) -> WikiArticle:
+    return WikiArticle(title=filename.removesuffix(".md").title(), filename=filename, content=content, arc_id=arc_id)
+
+
+def _arc(arc_id: int, start: int, end: int) -> Arc:
+    return Arc(id=arc_id, title=f"Arc {arc_id}", start_chapter=start, end_chapter=end,
+               summary="A summary of the arc.", key_events="Things happen")
+
+
+def _store() -> WikiStore:
+    """sarah: v1 (arc 1) -> v2 (arc 3); city: arc 2 only; ring: arc 1, removed in arc 3"""
+    store = WikiStore()
+    store.add_arc(_arc(1, 1, 10), [_article("sarah.md", "v1"), _article("ring.md", "ring")])
+    store.add_arc(_arc(2, 11, 20), [_article("city.md", "city", 2), _article("sarah.md", "v1", 2)])
+    store.add_arc(_arc(3, 21, 30), [_article("sarah.md", "v2", 3)], removed=["ring.md"])
+    return store
+
+
+class TestPointInTimeViews:
+    """Readers see each article as of their chapter"""
+
+    def test_article_as_of_chapter(self):
+        store = _store()
+
+        assert store.get("sarah.md", 9) is None
+        assert store.get("sarah.md", 10).content == "v1"
+        assert store.get("sarah.md", 29).content == "v1"
+        assert store.get("sarah.md", 57).content == "v2"
+        assert store.get("sarah.md", 57).arc_id == 3
+
+    def test_whole_wiki_as_of(self):
+        store = _store()
+
+        assert set(store.as_of(15)) == {"sarah.md", "ring.md"}
+        assert set(store.as_of_arc(2)) == {"sarah.md", "ring.md", "city.md"}
+        assert set(store.as_of(30)) == {"sarah.md", "city.md"}
+
+    def test_unchanged_articles_share_a_revision(self):
+        store = _store()
+
+        assert [r.arc_id for r in store.history("sarah.md")] == [1, 3]
+        assert store.revision_count == 5  # sarah x2, ring + its removal, city
+
+    def test_out_of_order_revision_rejected(self):
+        store = _store()
+
+        with pytest.raises(ValueError, match="older than its current revision"):
+            store.add(_article("sarah.md", "v0"), valid_from_chapter=5)
+
+    def test_from_archives(self):
+        archives = [
+            ArcArchive(arc=_arc(2, 11, 20), articles=[_article("sarah.md", "v2", 2)]),
+            ArcArchive(arc=_arc(1, 1, 10), articles=[_article("sarah.md", "v1")]),
+        ]
+
+        store = WikiStore.from_archives(archives)
+
+        assert store.get("sarah.md", 12).content == "v1"
+        assert store.as_of_arc(2)["sarah.md"].content == "v2"
+
+
+class TestDiffs:
+    """Diffs between arcs or chapters"""
+
+    def test_diff_between_arcs(self):
+        diff = _store().diff_arcs(1, 3)
+
+        assert (diff.added, diff.changed, diff.removed) == (["city.md"], ["sarah.md"], ["ring.md"])
+
+    def test_carried_over_article_is_not_a_change(self):
+        diff = _store().diff_arcs(1, 2)
+
+        assert (diff.added, diff.changed, diff.removed) == (["city.md"], [], [])
+
+    def test_no_changes_in_range(self):
+        assert _store().diff(11, 19).is_empty
+
+
+class TestEncoding:
+    """Compact encoding round trip"""
+
+    def test_round_trip(self):
+        store = _store()
+
+        restored = WikiStore.from_bytes(store.to_bytes())
+
+        for chapter in (5, 10, 20, 30):
+            assert restored.as_of(chapter) == store.as_of(chapter)
+        assert restored.diff_arcs(1, 3) == store.diff_arcs(1, 3)
+
+    def test_shared_content_is_encoded_once(self):
+        store = WikiStore()
+        for arc_id in range(1, 21):
+            store.add_arc(_arc(arc_id, arc_id * 10 - 9, arc_id * 10), [
+                _article("sarah.md", "Unchanged since arc 1", arc_id),
+                _article("city.md", f"Revision {(arc_id + 1) // 2}", arc_id),  # Changes every other arc
+            ])
+
+        document = json.loads(zlib.decompress(store.to_bytes()))
+
+        assert len(document["blobs"]) == 1 + 10
+        assert len(document["revisions"]) == 1 + 10
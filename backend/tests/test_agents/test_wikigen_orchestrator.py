@@ -0,0 +1,330 @@
+"""
+Tests for the WikiGen pipeline executor and orchestrator
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+import pytest
+
+from src.agents.wikigen.entity_index import EntityIndex
+from src.agents.wikigen.orchestrator import WikiGenOrchestrator
+from src.agents.wikigen.planner import WikiPlannerAgent
+from src.agents.wikigen.pipeline import DAGExecutor, TaskContext
+from src.core.exceptions import ProcessingError
+from src.schemas.db.story import FullStoryBase, StoryMetadata
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+from src.schemas.wikigen.wiki import ArcSummary, ArticlePlan, EnhancedChapter, WikiArticle, WikiPlan
+from src.services.llm.llm_service import LLMService
+
+
+DELAY = 0.05
+
+
+def _story(chapters: int) -> FullStoryBase:
+    return FullStoryBase(
+        metadata=StoryMetadata(title="Test Story", genres=["Fantasy"]),
+        chapters=[
+            {"chapter_number": n, "title": f"Chapter {n}", "content": f"Sarah walks through chapter {n}."}
+            for n in range(1, chapters + 1)
+        ],
+    )
+
+
+def _arc(arc_id: int, start: int, end: int) -> Arc:
+    return Arc(
+        id=arc_id, title=f"Arc {arc_id}", start_chapter=start, end_chapter=end,
+        summary="A summary of the arc.", key_events="Things happen",
+    )
+
+
+class FakeSplitter:
+    def __init__(self, arcs: List[Arc]):
+        self.arcs = arcs
+        self.calls = 0
+        self.last_kwargs: Dict[str, Any] = {}
+
+    async def analyze_story(self, story, **kwargs) -> ArcAnalysisResult:
+        self.calls += 1
+        self.last_kwargs = kwargs
+        await asyncio.sleep(DELAY)
+        return ArcAnalysisResult(
+            story_prediction="x" * 50, growth_assessment="y" * 20, arc_strategy="z" * 10, arcs=self.arcs,
+        )
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls: List[int] = []
+
+    async def summarize_arc(self, arc_content, arc_metadata, summary_type, previous_arcs=None, **kwargs) -> ArcSummary:
+        self.calls.append(arc_metadata["id"])
+        await asyncio.sleep(DELAY)
+        return ArcSummary(arc_id=arc_metadata["id"], content=f"summary after {len(previous_arcs or [])} arcs")
+
+
+class FakePlanner:
+    def __init__(self, articles_per_arc: int = 3):
+        self.articles_per_arc = articles_per_arc
+        self.calls: List[Dict[str, Any]] = []
+
+    async def create_plan(self, arc_content, story_metadata, mode, previous_summaries=None, existing_wiki=None, **kwargs) -> WikiPlan:
+        arc_id = len(self.calls) + 1
+        self.calls.append({"mode": mode, "summaries": len(previous_summaries or []), "existing": len(existing_wiki or [])})
+        await asyncio.sleep(DELAY)
+        return WikiPlan(arc_id=arc_id, mode=mode, articles=[
+            ArticlePlan(title=f"Article {arc_id}.{n}", filename=f"a{arc_id}_{n}.md")
+            for n in range(1, self.articles_per_arc + 1)
+        ])
+
+
+class FakeWriter:
+    def __init__(self, fail_on: str = ""):
+        self.fail_on = fail_on
+        self.active = 0
+        self.max_active = 0
+
+    async def write_articles(self, wiki_plan, arc_content, story_metadata, **kwargs) -> List[WikiArticle]:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(DELAY)
+            article = wiki_plan.articles[0]
+            if article.title == self.fail_on:
+                raise RuntimeError("writer exploded")
+            return [WikiArticle(title=article.title, filename=article.filename, content="...", arc_id=wiki_plan.arc_id)]
+        finally:
+            self.active -= 1
+
+
+class FakeBacklinker:
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    async def create_chapter_links(self, chapters, wiki_articles, current_arc_id, **kwargs) -> List[EnhancedChapter]:
+        self.calls.append({"arc": current_arc_id, "articles": len(wiki_articles)})
+        await asyncio.sleep(DELAY)
+        return [EnhancedChapter(chapter_number=c.chapter_number, content=c.content) for c in chapters]
+
+
+def _orchestrator(arcs: List[Arc], writer: FakeWriter = None, **kwargs) -> WikiGenOrchestrator:
+    return WikiGenOrchestrator(
+        LLMService(),
+        arc_splitter=FakeSplitter(arcs),
+        summarizer=FakeSummarizer(),
+        article_writer=writer or FakeWriter(),
+        chapter_backlinker=FakeBacklinker(),
+        **{"wiki_planner": FakePlanner(), **kwargs},
+    )
+
+
+class TestDAGExecutor:
+    """Test the generic task graph executor"""
+
+    async def test_dependencies_and_results(self):
+        executor = DAGExecutor()
+
+        async def value(ctx: TaskContext) -> int:
+            return 2
+
+        async def double(ctx: TaskContext) -> int:
+            return ctx.results["a"] * 2
+
+        executor.add_task("a", "s", value)
+        executor.add_task("b", "s", double, deps=["a"])
+        results = await executor.run()
+
+        assert results == {"a": 2, "b": 4}
+
+    async def test_stage_concurrency_is_bounded(self):
+        executor = DAGExecutor(stage_concurrency={"io": 2})
+        active = 0
+        peak = 0
+
+        async def work(ctx: TaskContext) -> None:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        for i in range(6):
+            executor.add_task(f"t{i}", "io", work)
+        await executor.run()
+
+        assert peak == 2
+
+    def test_unknown_dependency_rejected(self):
+        executor = DAGExecutor()
+
+        async def noop(ctx: TaskContext) -> None:
+            return None
+
+        with pytest.raises(ValueError, match="unknown"):
+            executor.add_task("b", "s", noop, deps=["missing"])
+
+    async def test_failure_cancels_graph(self):
+        executor = DAGExecutor()
+        events = []
+
+        async def fail(ctx: TaskContext) -> None:
+            raise ValueError("bad input")
+
+        async def slow(ctx: TaskContext) -> None:
+            await asyncio.sleep(10)
+
+        executor.on_event = events.append
+        executor.add_task("fail", "s", fail)
+        executor.add_task("slow", "s", slow)
+
+        with pytest.raises(ProcessingError, match="'fail' failed: bad input"):
+            await asyncio.wait_for(executor.run(), timeout=2)
+        assert [e.type for e in events][-1] == "pipeline_failed"
+
+    async def test_streaming_backpressure(self):
+        """Tasks wait for a slow consumer once the event queue is full"""
+        executor = DAGExecutor()
+        finished = []
+
+        async def work(ctx: TaskContext) -> None:
+            finished.append(ctx.task_id)
+
+        for i in range(5):
+            executor.add_task(f"t{i}", "s", work)
+
+        stream = executor.run_streaming(event_queue_size=1)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.05)
+        assert first.type == "pipeline_started"
+        assert len(finished) < 5
+
+        events = [first] + [event async for event in stream]
+        assert len(finished) == 5
+        assert events[-1].type == "pipeline_completed"
+
+
+class TestWikiGenOrchestrator:
+    """Test the orchestrated WikiGen pipeline"""
+
+    async def test_generate_wiki_runs_on_critical_path(self):
+        arcs = [_arc(1, 1, 3), _arc(2, 4, 6), _arc(3, 7, 9)]
+        orchestrator = _orchestrator(arcs)
+
+        started = time.perf_counter()
+        result = await orchestrator.generate_wiki(_story(9), uuid4())
+        elapsed = time.perf_counter() - started
+
+        # 3 arcs x (summary + plan + 3 articles + backlink) + split = 19 calls
+        # Critical path: split + 3 x (plan + write) + last backlink = 8 calls
+        assert elapsed < DELAY * 12
+        assert [len(a.articles) for a in result.archives] == [3, 3, 3]
+        assert [len(a.enhanced_chapters) for a in result.archives] == [3, 3, 3]
+        assert result.archives[2].summary.content == "summary after 2 arcs"
+        assert orchestrator.article_writer.max_active == 3
+
+    async def test_generate_wiki_with_the_planner_agent(self):
+        class PlanningLLM:
+            usage_tracker = None
+
+            def __init__(self):
+                self.prompts: List[str] = []
+
+            async def chat_completion(self, messages, **kwargs) -> LLMResponse:
+                self.prompts.append(messages[-1].content)
+                return LLMResponse(content='{"articles": [{"title": "Sarah", "article_type": "character"}]}', model="fake")
+
+        llm = PlanningLLM()
+        index = EntityIndex()
+        orchestrator = _orchestrator(
+            [_arc(1, 1, 2), _arc(2, 3, 4)], wiki_planner=WikiPlannerAgent(llm), entity_index=index,  # type: ignore[arg-type]
+        )
+        result = await orchestrator.generate_wiki(_story(4), uuid4())
+
+        assert [[a.title for a in archive.articles] for archive in result.archives] == [["Test Story Wiki", "Sarah"]] * 2
+        assert [archive.plan.arc_id for archive in result.archives] == [1, 2]
+        assert result.archives[1].plan.mode == "update"
+        # The given (empty) index is the one shared and updated; arc 2 is planned knowing Sarah
+        assert orchestrator.entity_index is index and orchestrator.wiki_planner.entity_index is index
+        assert index.chapters == [1, 2, 3, 4]
+        assert "Known Subjects" not in llm.prompts[0]
+        assert "- Sarah (main, 2 mentions)" in llm.prompts[1]  # The fake writer's articles are "main"
+
+    def test_escalation_model_reaches_default_agents(self):
+        orchestrator = WikiGenOrchestrator(LLMService(), escalation_model="gemini-2.5-pro")
+        agents = [
+            orchestrator.arc_splitter, orchestrator.summarizer, orchestrator.wiki_planner,
+            orchestrator.article_writer, orchestrator.chapter_backlinker,
+        ]
+
+        assert [agent.escalation_model for agent in agents] == ["gemini-2.5-pro"] * 5
+        assert set(orchestrator.cascade_report()) == {type(agent).__name__ for agent in agents}
+
+    async def test_backlinking_overlaps_next_arc_planning(self):
+        orchestrator = _orchestrator([_arc(1, 1, 2), _arc(2, 3, 4)])
+        await orchestrator.generate_wiki(_story(4), uuid4())
+        timings = orchestrator._last_executor.task_timings
+
+        backlink_start, backlink_end = timings["backlink:1"]
+        plan_start, plan_end = timings["plan:2"]
+        assert backlink_start < plan_end and plan_start < backlink_end
+
+    async def test_later_arcs_see_earlier_articles_only(self):
+        orchestrator = _orchestrator([_arc(1, 1, 2), _arc(2, 3, 4)])
+        await orchestrator.generate_wiki(_story(4), uuid4())
+
+        assert orchestrator.wiki_planner.calls == [
+            {"mode": "fresh", "summaries": 0, "existing": 0},
+            {"mode": "update", "summaries": 1, "existing": 3},
+        ]
+        assert sorted(orchestrator.chapter_backlinker.calls, key=lambda c: c["arc"]) == [
+            {"arc": 1, "articles": 3}, {"arc": 2, "articles": 6},
+        ]
+
+    async def test_wiki_store_views_are_spoiler_safe(self):
+        orchestrator = _orchestrator([_arc(1, 1, 2), _arc(2, 3, 4)])
+        await orchestrator.generate_wiki(_story(4), uuid4())
+
+        store = orchestrator.get_wiki_store()
+
+        assert store.as_of(1) == {}
+        assert len(store.as_of(3)) == 3
+        assert len(store.as_of_arc(2)) == 6
+        assert store.diff_arcs(1, 2).added == ["a2_1.md", "a2_2.md", "a2_3.md"]
+
+    async def test_streaming_events(self):
+        orchestrator = _orchestrator([_arc(1, 1, 2)])
+        events = [e async for e in orchestrator.generate_wiki_streaming(_story(2), uuid4())]
+
+        types = [e.type for e in events]
+        assert types[0] == "pipeline_started"
+        assert types[-1] == "pipeline_completed"
+        assert "arcs_split" in types
+        done = sorted(e.data["title"] for e in events if e.type == "article_done")
+        assert done == ["Article 1.1", "Article 1.2", "Article 1.3"]
+        completed = [e.task_id for e in events if e.type == "task_completed"]
+        assert {"split", "plan:1", "write:1:1", "articles:1", "backlink:1"} <= set(completed)
+        assert len(orchestrator.get_final_result().archives) == 1
+
+    async def test_agent_failure_raises_processing_error(self):
+        orchestrator = _orchestrator([_arc(1, 1, 2)], writer=FakeWriter(fail_on="Article 1.2"))
+
+        with pytest.raises(ProcessingError, match="write:1:2"):
+            await orchestrator.generate_wiki(_story(2), uuid4())
+
+    async def test_update_wiki_reuses_finalized_arcs(self):
+        orchestrator = _orchestrator([_arc(1, 1, 2), _arc(2, 3, 4)])
+        existing = await orchestrator.generate_wiki(_story(4), uuid4())
+
+        story = _story(6)
+        orchestrator.arc_splitter.arcs = [_arc(1, 1, 2), _arc(2, 3, 6)]
+        orchestrator.summarizer.calls.clear()
+        updated = await orchestrator.update_wiki(story, story.chapters[4:], existing, uuid4())
+
+        assert orchestrator.summarizer.calls == [2]
+        assert updated.archives[0].articles == existing.archives[0].articles
+        assert updated.archives[1].arc.end_chapter == 6
+        # The split is incremental, starting from the analysis stored with the existing wiki
+        assert orchestrator.arc_splitter.last_kwargs["previous_result"].arcs == existing.arcs
@@ -0,0 +1,156 @@
+"""
+Tests for provider batch-API submission
+"""
+
+import asyncio
+
+import pytest
+
+from src.background.queue import JobQueue, JobStatus
+from src.background.worker import Worker
+from src.core.exceptions import LLMError
+from src.database.repositories import MemoryUsageRepository
+from src.schemas.llm.models import LLMMessage, LLMResponse
+from src.services.llm.batch import BatchDispatcher, LocalBatchClient, echo_completion
+from src.services.llm.llm_service import LLMService
+from src.services.llm.usage_tracker import UsageTracker, compute_cost
+
+
+@pytest.fixture
+async def job_queue():
+    queue = JobQueue()
+    worker = Worker(queue, concurrency=2)
+    await worker.start()
+    yield queue
+    await worker.stop()
+
+
+@pytest.fixture
+def batch_server() -> LocalBatchClient:
+    return LocalBatchClient(polls_until_complete=3)
+
+
+@pytest.fixture
+def dispatcher(job_queue: JobQueue, batch_server: LocalBatchClient) -> BatchDispatcher:
+    return BatchDispatcher(
+        client_factory=lambda provider, api_key: batch_server,
+        job_queue=job_queue,
+        max_batch_size=3,
+        max_wait=0.05,
+        poll_interval=0,
+    )
+
+
+def _body(content: str) -> dict:
+    return {"model": "gpt-4.1-mini", "messages": [{"role": "user", "content": content}]}
+
+
+class TestJobQueue:
+    """Test the background job queue and worker"""
+
+    async def test_job_results_and_failures(self, job_queue: JobQueue):
+        async def add(a: int, b: int) -> int:
+            return a + b
+
+        async def fail() -> None:
+            raise ValueError("boom")
+
+        ok = await job_queue.enqueue("add", add, 1, b=2)
+        bad = await job_queue.enqueue("fail", fail)
+
+        assert await ok.wait(timeout=1) == 3
+        with pytest.raises(RuntimeError, match="boom"):
+            await bad.wait(timeout=1)
+        assert job_queue.get_job(bad.id).status == JobStatus.FAILED
+
+
+class TestBatchDispatcher:
+    """Test batching, polling and result mapping"""
+
+    async def test_full_batch_submits_immediately(self, dispatcher: BatchDispatcher, batch_server: LocalBatchClient):
+        futures = [dispatcher.submit("openai", "sk-test", _body(f"chapter {i}")) for i in range(3)]
+
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=2)
+
+        assert [r["choices"][0]["message"]["content"] for r in results] == ["chapter 0", "chapter 1", "chapter 2"]
+        assert len(batch_server.batches) == 1
+        assert dispatcher.in_flight == {}
+
+    async def test_partial_batch_submits_after_max_wait(self, dispatcher: BatchDispatcher, batch_server: LocalBatchClient):
+        future = dispatcher.submit("openai", "sk-test", _body("alone"))
+        assert dispatcher.pending_count == 1
+
+        result = await asyncio.wait_for(future, timeout=2)
+
+        assert result["choices"][0]["message"]["content"] == "alone"
+        assert dispatcher.pending_count == 0
+
+    async def test_requests_grouped_per_api_key(self, dispatcher: BatchDispatcher, batch_server: LocalBatchClient):
+        futures = [
+            dispatcher.submit("openai", "sk-user-a", _body("a")),
+            dispatcher.submit("openai", "sk-user-b", _body("b")),
+        ]
+        await dispatcher.flush()
+        await asyncio.wait_for(asyncio.gather(*futures), timeout=2)
+
+        assert len(batch_server.batches) == 2
+
+    async def test_failed_lines_fail_only_their_future(self, job_queue: JobQueue):
+        def handler(body: dict) -> dict:
+            if body["messages"][-1]["content"] == "bad":
+                raise ValueError("invalid request")
+            return echo_completion(body)
+
+        server = LocalBatchClient(handler=handler)
+        dispatcher = BatchDispatcher(lambda p, k: server, job_queue=job_queue, max_batch_size=10, max_wait=60, poll_interval=0)
+        good = dispatcher.submit("openai", "sk-test", _body("good"))
+        bad = dispatcher.submit("openai", "sk-test", _body("bad"))
+        await dispatcher.flush()
+
+        assert (await asyncio.wait_for(good, timeout=2))["choices"][0]["message"]["content"] == "good"
+        with pytest.raises(LLMError, match="invalid request"):
+            await asyncio.wait_for(bad, timeout=2)
+
+    async def test_submission_failure_rejects_requests(self, job_queue: JobQueue):
+        class BrokenClient(LocalBatchClient):
+            async def submit(self, jsonl, metadata=None):
+                raise ConnectionError("gateway down")
+
+        dispatcher = BatchDispatcher(lambda p, k: BrokenClient(), job_queue=job_queue, max_wait=60)
+        future = dispatcher.submit("openai", "sk-test", _body("x"))
+        await dispatcher.flush()
+
+        with pytest.raises(LLMError, match="gateway down"):
+            await future
+
+    async def test_unsupported_provider(self, dispatcher: BatchDispatcher):
+        with pytest.raises(LLMError):
+            dispatcher.submit("google", "key", _body("x"))
+
+
+class TestLLMServiceBatch:
+    """Test LLMService.submit_batch_completion"""
+
+    async def test_resolves_llm_response_and_records_discounted_usage(self, dispatcher: BatchDispatcher):
+        tracker = UsageTracker(MemoryUsageRepository())
+        service = LLMService(usage_tracker=tracker, batch_dispatcher=dispatcher)
+
+        future = await service.submit_batch_completion(
+            provider="openai",
+            model="gpt-4.1-mini",
+            messages=[LLMMessage(role="user", content="Summarize chapter one")],
+            api_key="sk-test",
+            max_tokens=100,
+            metadata={"project_id": "p1", "agent": "ChapterSummarizerAgent"},
+        )
+        await dispatcher.flush()
+        response = await asyncio.wait_for(future, timeout=2)
+
+        assert isinstance(response, LLMResponse)
+        assert response.content == "Summarize chapter one"
+        assert response.metadata["batch"] is True
+
+        await tracker.flush()
+        totals = await tracker.get_totals(project_id="p1")
+        assert totals["requests"] == 1
+        assert totals["cost_usd"] == pytest.approx(compute_cost("openai", "gpt-4.1-mini", 3, 3) * 0.5)
@@ -0,0 +1,126 @@
+"""
+Tests for LLM record/replay cassettes
+"""
+
+import time
+from typing import AsyncIterator, List
+
+import pytest
+
+from src.core.exceptions import CassetteMissError
+from src.schemas.llm.models import ChunkType, LLMMessage, LLMResponse
+from src.schemas.wikigen.arc import ArcAnalysisResult
+from src.services.llm.cassette import CassetteLLMService, CassetteMode, LLMCassette, request_key
+
+
+class ScriptedLLM:
+    """Answers 'answer N' for its Nth call, streamed in three chunks 10 ms apart."""
+
+    usage_tracker = None
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        text = f"answer {self.calls}"
+        if not stream:
+            return LLMResponse(content=text, model="scripted", usage={"total_tokens": 3})
+
+        async def chunks() -> AsyncIterator[LLMResponse]:
+            for piece in (text[:3], text[3:6], text[6:]):
+                time.sleep(0.01)
+                yield LLMResponse(content=piece, model="scripted", chunk_type=ChunkType.CONTENT)
+
+        return chunks()
+
+
+def _call(**overrides):
+    return {"provider": "openai", "model": "gpt-4o", "messages": [LLMMessage(role="user", content="Hi")], **overrides}
+
+
+async def _text(stream: AsyncIterator[LLMResponse]) -> str:
+    return "".join([chunk.content async for chunk in stream])
+
+
+class TestRequestKey:
+    """Test which arguments identify a request"""
+
+    def test_credentials_and_metadata_are_ignored(self):
+        assert request_key(**_call()) == request_key(**_call(api_key="sk-x", trace_id="t", metadata={"agent": "a"}))
+
+    def test_prompt_and_output_format_matter(self):
+        assert request_key(**_call()) != request_key(**_call(messages=[LLMMessage(role="user", content="Hello")]))
+        assert request_key(**_call()) != request_key(**_call(response_format=ArcAnalysisResult))
+        assert request_key(**_call()) != request_key(**_call(temperature=0.1))
+
+
+class TestCassetteLLMService:
+    """Test recording and replaying calls"""
+
+    async def test_record_then_replay_stream_offline(self, tmp_path):
+        path = tmp_path / "cassette.json"
+        recorder = CassetteLLMService(LLMCassette(path), ScriptedLLM(), mode=CassetteMode.RECORD)
+        assert await _text(await recorder.chat_completion(**_call(stream=True))) == "answer 1"
+        recorder.cassette.save()
+
+        replayer = CassetteLLMService(LLMCassette.load(path), mode=CassetteMode.REPLAY)
+        chunks: List[LLMResponse] = [c async for c in await replayer.chat_completion(**_call(stream=True, api_key="sk-y"))]
+
+        assert [c.content for c in chunks] == ["ans", "wer", " 1"]
+        assert replayer.stats == {"replayed": 1, "recorded": 0}
+
+    async def test_replay_reproduces_timing(self):
+        cassette = LLMCassette()
+        recorder = CassetteLLMService(cassette, ScriptedLLM(), mode=CassetteMode.RECORD)
+        await _text(await recorder.chat_completion(**_call(stream=True)))
+        delays = [chunk["delay"] for chunk in cassette.interactions[request_key(**_call(stream=True))][0]["chunks"]]
+        assert all(delay >= 0.009 for delay in delays)
+
+        replayer = CassetteLLMService(cassette, mode=CassetteMode.REPLAY, simulate_timing=True, speed=2.0)
+        started = time.perf_counter()
+        await _text(await replayer.chat_completion(**_call(stream=True)))
+
+        assert time.perf_counter() - started >= sum(delays) / 2 * 0.9
+
+    async def test_consumer_time_is_not_recorded(self):
+        cassette = LLMCassette()
+        recorder = CassetteLLMService(cassette, ScriptedLLM(), mode=CassetteMode.RECORD)
+        stream = await recorder.chat_completion(**_call(stream=True))
+        time.sleep(0.05)  # Before reading the stream
+        async for _ in stream:
+            time.sleep(0.05)  # On every chunk
+        delays = [chunk["delay"] for chunk in cassette.interactions[request_key(**_call(stream=True))][0]["chunks"]]
+
+        assert all(0.009 <= delay < 0.04 for delay in delays)
+
+    async def test_repeated_requests_replay_in_order(self):
+        cassette = LLMCassette()
+        recorder = CassetteLLMService(cassette, ScriptedLLM(), mode=CassetteMode.RECORD)
+        for _ in range(2):
+            await recorder.chat_completion(**_call())
+
+        replayer = CassetteLLMService(cassette, mode=CassetteMode.REPLAY)
+        answers = [(await replayer.chat_completion(**_call())).content for _ in range(3)]
+
+        assert answers == ["answer 1", "answer 2", "answer 2"]
+
+    async def test_replay_miss_raises(self):
+        replayer = CassetteLLMService(LLMCassette(), mode=CassetteMode.REPLAY)
+
+        with pytest.raises(CassetteMissError):
+            await replayer.chat_completion(**_call())
+
+    async def test_auto_records_only_missing_requests(self):
+        llm = ScriptedLLM()
+        service = CassetteLLMService(LLMCassette(), llm, mode=CassetteMode.AUTO)
+
+        first = await service.chat_completion(**_call())
+        again = await service.chat_completion(**_call())
+
+        assert first.content == again.content == "answer 1"
+        assert llm.calls == 1
+
+    def test_recording_needs_a_service(self):
+        with pytest.raises(ValueError):
+            CassetteLLMService(LLMCassette(), mode=CassetteMode.RECORD)
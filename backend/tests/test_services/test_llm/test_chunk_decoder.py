@@ -0,0 +1,105 @@
+"""
+Tests for streaming chunk decoding
+"""
+
+from typing import Any, Dict, List, Optional
+
+from portkey_ai.api_resources.types.chat_complete_type import ChatCompletionChunk
+
+from src.database.repositories import MemoryUsageRepository
+from src.schemas.llm.models import ChunkType, LLMResponse
+from src.services.llm.chunk_decoder import decode_delta, get_chunk_decoder, is_gemini_thinking_content
+from src.services.llm.llm_service import LLMService
+from src.services.llm.usage_tracker import UsageTracker
+
+
+def _chunk(delta: Dict[str, Any], usage: Optional[Dict[str, Any]] = None, model: str = "gemini-2.5-flash") -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate({
+        "id": "chatcmpl-1",
+        "model": model,
+        "choices": [{"index": 0, "delta": delta}] if delta else [],
+        "usage": usage,
+    })
+
+
+async def _stream(chunks: List[ChatCompletionChunk]):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestDecodeDelta:
+    """Test single-pass extraction and classification"""
+
+    def test_plain_content(self):
+        chunk = _chunk({"content": "Hello"})
+        assert decode_delta(chunk.choices[0].delta) == ("Hello", ChunkType.CONTENT)
+
+    def test_content_blocks_thinking_and_text(self):
+        """Thinking and text blocks are joined; mixed chunks count as thinking"""
+        thinking = _chunk({"content_blocks": [{"type": "thinking", "thinking": "Hmm. "}]})
+        text = _chunk({"content_blocks": [{"type": "text", "text": "Answer"}]})
+        mixed = _chunk({"content_blocks": [{"thinking": "a"}, {"text": "b"}]})
+
+        assert decode_delta(thinking.choices[0].delta) == ("Hmm. ", ChunkType.THINKING)
+        assert decode_delta(text.choices[0].delta) == ("Answer", ChunkType.CONTENT)
+        assert decode_delta(mixed.choices[0].delta) == ("ab", ChunkType.THINKING)
+
+    def test_anthropic_nested_delta_blocks(self):
+        chunk = _chunk({"content_blocks": [{"index": 0, "delta": {"thinking": "step 1"}}]})
+        assert decode_delta(chunk.choices[0].delta) == ("step 1", ChunkType.THINKING)
+
+    def test_empty_content_blocks_are_unknown(self):
+        chunk = _chunk({"content_blocks": [{"index": 0}]})
+        assert decode_delta(chunk.choices[0].delta) == ("", ChunkType.UNKNOWN)
+
+
+class TestGeminiHeuristic:
+    """Test the precompiled Gemini thinking heuristic"""
+
+    def test_thinking_patterns(self):
+        assert is_gemini_thinking_content("**Framing Narrative Arcs**")
+        assert is_gemini_thinking_content("Let me think about the pacing")
+        assert is_gemini_thinking_content("I'm sure I should check, and I'll do it")
+
+    def test_regular_content(self):
+        assert not is_gemini_thinking_content('{"arcs": [{"id": 1}]}')
+        assert not is_gemini_thinking_content("   ")
+        assert not is_gemini_thinking_content("I'm a trainer.")
+
+    def test_heuristic_only_for_google(self):
+        """Markdown emphasis from other providers stays content"""
+        chunk = _chunk({"content": "**Bold** answer"})
+        assert get_chunk_decoder("google").decode(chunk).chunk_type == ChunkType.THINKING
+        assert get_chunk_decoder("openai").decode(chunk).chunk_type == ChunkType.CONTENT
+
+
+class TestStreamResponse:
+    """Test LLMService stream conversion"""
+
+    async def test_stream_yields_llm_responses_and_records_usage(self):
+        tracker = UsageTracker(MemoryUsageRepository())
+        service = LLMService(usage_tracker=tracker)
+        chunks = [
+            _chunk({"content": "Hel"}, model="gpt-4.1-mini"),
+            _chunk({"content": "lo"}, model="gpt-4.1-mini"),
+            _chunk({}, usage={"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}, model="gpt-4.1-mini"),
+        ]
+
+        responses = [
+            response async for response in service._stream_response_to_llm_response(
+                _stream(chunks), "openai", "trace-1", model="gpt-4.1-mini",
+                usage_metadata={"user_id": "u1", "agent": "ArcSplitterAgent"},
+            )
+        ]
+
+        assert all(isinstance(r, LLMResponse) for r in responses)
+        assert "".join(r.content for r in responses) == "Hello"
+        assert responses[0].metadata == {
+            "provider": "openai", "gateway": "self-hosted", "portkey_request_id": "chatcmpl-1",
+            "trace_id": "trace-1", "streaming": True, "chunk": True,
+        }
+        assert responses[0].metadata is not responses[1].metadata
+
+        totals = await tracker.get_totals(user_id="u1", agent_name="ArcSplitterAgent")
+        assert totals["requests"] == 1
+        assert totals["total_tokens"] == 12
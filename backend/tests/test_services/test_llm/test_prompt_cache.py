@@ -0,0 +1,138 @@
+"""
+Tests for prompt prefix caching and cache-hit accounting
+"""
+
+from uuid import uuid4
+
+import pytest
+
+from src.agents.base_agent import BaseAgent
+from src.database.repositories import MemoryUsageRepository
+from src.prompts import prompt_manager
+from src.schemas.llm.models import LLMMessage, LLMResponse
+from src.services.llm.prompt_cache import MAX_CACHE_BREAKPOINTS, mark_cacheable_prefix, to_provider_messages
+from src.services.llm.usage_tracker import UsageTracker, cached_prompt_tokens, compute_cost, normalize_usage
+
+
+def _messages(*cacheable: bool) -> list:
+    return [LLMMessage(role="user", content=f"message {i}", cacheable=flag) for i, flag in enumerate(cacheable)]
+
+
+class TestProviderMessages:
+    """Test cache breakpoints in provider message payloads"""
+
+    def test_anthropic_breakpoint_ends_cacheable_prefix(self):
+        payload = to_provider_messages(_messages(True, True, False), "anthropic")
+
+        assert payload[0] == {"role": "user", "content": "message 0"}
+        assert payload[1]["content"] == [
+            {"type": "text", "text": "message 1", "cache_control": {"type": "ephemeral"}}
+        ]
+        assert payload[2] == {"role": "user", "content": "message 2"}
+
+    def test_implicit_cache_providers_get_plain_messages(self):
+        for provider in ("openai", "google"):
+            payload = to_provider_messages(_messages(True, False), provider)
+            assert payload == [{"role": "user", "content": "message 0"}, {"role": "user", "content": "message 1"}]
+
+    def test_final_message_is_never_a_breakpoint(self):
+        payload = to_provider_messages(_messages(True, True), "anthropic")
+
+        assert isinstance(payload[0]["content"], list)
+        assert payload[1]["content"] == "message 1"
+
+    def test_breakpoints_are_capped(self):
+        payload = to_provider_messages(_messages(*([True, False] * 6)), "anthropic")
+
+        breakpoints = [i for i, message in enumerate(payload) if isinstance(message["content"], list)]
+        assert breakpoints == [4, 6, 8, 10]
+        assert len(breakpoints) == MAX_CACHE_BREAKPOINTS
+
+    def test_mark_cacheable_prefix(self):
+        messages = _messages(False, False, True)
+
+        marked = mark_cacheable_prefix(messages, 1)
+
+        assert [m.cacheable for m in marked] == [True, False, True]
+        assert not messages[0].cacheable
+
+
+class TestPromptTemplates:
+    """Test that story text leads the fan-out prompts"""
+
+    def test_article_prompt_prefix_is_shared(self):
+        group = prompt_manager.get_group("wikigen.generate_article")
+        context = {"story_content": "STORY", "overall_wiki_plan": "PLAN", "article_type": "character",
+                   "article_file": "a.md", "article_content_structure": "# A"}
+
+        first = group.render_messages(article_title="Alice", **context)
+        second = group.render_messages(article_title="Bob", **context)
+
+        prefix = [m for m in first if m.cacheable]
+        assert prefix == [m for m in second if m.cacheable]
+        assert "STORY" in prefix[-1].content
+        assert first[:len(prefix)] == prefix  # The cacheable messages come first
+
+
+class TestCacheAccounting:
+    """Test cache-hit token tracking and pricing"""
+
+    def test_cached_tokens_from_each_provider_format(self):
+        assert cached_prompt_tokens({"prompt_tokens": 100, "prompt_tokens_details": {"cached_tokens": 80}}) == 80
+        assert cached_prompt_tokens({"input_tokens": 5, "cache_read_input_tokens": 90}) == 90
+        assert cached_prompt_tokens({"prompt_tokens": 100, "cached_content_token_count": 60}) == 60
+        assert cached_prompt_tokens({"prompt_tokens": 100}) == 0
+
+    def test_anthropic_prompt_tokens_include_cache(self):
+        usage = {"input_tokens": 10, "cache_read_input_tokens": 900, "cache_creation_input_tokens": 90, "output_tokens": 5}
+
+        assert normalize_usage(usage) == {"prompt_tokens": 1000, "completion_tokens": 5, "total_tokens": 1005}
+
+    def test_cached_tokens_are_discounted(self):
+        """gpt-4.1-mini input is $0.40 per million tokens, cached input half of that"""
+        full = compute_cost("openai", "gpt-4.1-mini", 1_000_000, 0)
+        cached = compute_cost("openai", "gpt-4.1-mini", 1_000_000, 0, cached_prompt_tokens=1_000_000)
+
+        assert full == pytest.approx(0.40)
+        assert cached == pytest.approx(0.20)
+
+    async def test_cache_hits_are_recorded_and_rolled_up(self):
+        tracker = UsageTracker(MemoryUsageRepository(), batch_size=100, flush_interval=60)
+        usage = {"prompt_tokens": 1000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 800}}
+
+        record = tracker.record("openai", "gpt-4.1-mini", usage, agent_name="ArticleWriterAgent")
+        tracker.record("openai", "gpt-4.1-mini", usage, agent_name="ArticleWriterAgent")
+        await tracker.flush()
+
+        assert record["cached_prompt_tokens"] == 800
+        assert record["cost_usd"] == pytest.approx(compute_cost("openai", "gpt-4.1-mini", 1000, 10, 800))
+        [row] = await tracker.get_rollup("agent_name")
+        assert row["cached_prompt_tokens"] == 1600
+
+
+class _FakeLLMService:
+    usage_tracker = None
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat_completion(self, **kwargs):
+        self.calls.append(kwargs)
+        return LLMResponse(content="ok", model=kwargs["model"])
+
+
+class _EchoAgent(BaseAgent):
+    async def execute(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+class TestAgentCachePrefix:
+    """Test BaseAgent._make_llm_call marking a cacheable prefix"""
+
+    async def test_prefix_is_marked(self):
+        llm_service = _FakeLLMService()
+        agent = _EchoAgent(llm_service, default_provider="anthropic", default_model="claude-sonnet-4-20250514")  # type: ignore
+
+        await agent._make_llm_call(_messages(False, False, False), user_id=uuid4(), cache_prefix_messages=2)
+
+        assert [m.cacheable for m in llm_service.calls[0]["messages"]] == [True, True, False]
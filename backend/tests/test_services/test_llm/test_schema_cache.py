@@ -0,0 +1,78 @@
+"""
+Tests for the compiled response_format cache
+"""
+
+from src.schemas.wikigen.arc import ArcAnalysisResult
+from src.services.llm.schema_cache import compile_response_format, simplify_schema_for_google
+from src.utils import json_schema_to_prompt_instructions
+
+
+class TestCompileResponseFormat:
+    """Test response_format compilation and caching"""
+
+    def setup_method(self):
+        compile_response_format.cache_clear()
+
+    def test_structured_output_payload(self):
+        """Structured output models get a json_schema response_format"""
+        compiled = compile_response_format(ArcAnalysisResult, "openai", True)
+
+        assert compiled.prompt_instructions is None
+        assert compiled.response_format == {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "arcanalysisresult_schema",
+                "schema": ArcAnalysisResult.model_json_schema(),
+            },
+        }
+
+    def test_google_schema_is_simplified(self):
+        """Validation constraints are stripped for Google"""
+        compiled = compile_response_format(ArcAnalysisResult, "google", True)
+        assert compiled.response_format is not None
+
+        schema = compiled.response_format["json_schema"]["schema"]
+        assert schema == simplify_schema_for_google(ArcAnalysisResult.model_json_schema())
+        assert "minLength" not in str(schema)
+
+    def test_prompt_instructions_without_structured_output(self):
+        """Other models get prompt instructions instead of a response_format"""
+        compiled = compile_response_format(ArcAnalysisResult, "anthropic", False)
+
+        assert compiled.response_format is None
+        assert compiled.prompt_instructions == json_schema_to_prompt_instructions(
+            ArcAnalysisResult.model_json_schema(), "ArcAnalysisResult"
+        )
+
+    def test_compiled_once_per_key(self):
+        """Repeated calls reuse the cached compilation"""
+        first = compile_response_format(ArcAnalysisResult, "google", True)
+        second = compile_response_format(ArcAnalysisResult, "google", True)
+        other_provider = compile_response_format(ArcAnalysisResult, "openai", True)
+
+        assert first is second
+        assert first is not other_provider
+        info = compile_response_format.cache_info()
+        assert info.hits == 1
+        assert info.misses == 2
+
+
+class TestSimplifySchemaForGoogle:
+    """Test Google schema simplification"""
+
+    def test_removes_nested_constraints(self):
+        schema = {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "minLength": 1, "pattern": "^a"},
+                "items": {"type": "array", "maxItems": 3, "items": [{"type": "integer", "minimum": 0}]},
+            },
+        }
+
+        assert simplify_schema_for_google(schema) == {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "items": {"type": "array", "items": [{"type": "integer"}]},
+            },
+        }
@@ -0,0 +1,192 @@
+"""
+Tests for LLM stream timeouts and hedging
+"""
+
+import asyncio
+import pytest
+from typing import List, Optional
+
+from src.core.exceptions import LLMTimeoutError
+from src.services.llm.streaming import TTFTTracker, guard_stream
+
+
+KEY = ("openai", "gpt-4o-mini")
+
+
+class FakeStream:
+    """Async stream yielding chunks with configurable delays"""
+
+    def __init__(self, chunks: List[str], first_delay: float = 0.0, delay: float = 0.0, fail: Optional[Exception] = None):
+        self.chunks = chunks
+        self.first_delay = first_delay
+        self.delay = delay
+        self.fail = fail
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self.first_delay)
+        if self.fail:
+            raise self.fail
+        for i, chunk in enumerate(self.chunks):
+            if i:
+                await asyncio.sleep(self.delay)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+def _warm_tracker(ttft: float, samples: int = 20) -> TTFTTracker:
+    tracker = TTFTTracker(min_samples=samples)
+    for _ in range(samples):
+        tracker.record(KEY, ttft)
+    return tracker
+
+
+async def _collect(stream) -> List[str]:
+    return [chunk async for chunk in stream]
+
+
+class TestTTFTTracker:
+    """Test rolling TTFT statistics"""
+
+    def test_percentile_requires_min_samples(self):
+        """No percentile is reported until enough samples are recorded"""
+        tracker = TTFTTracker(min_samples=3)
+        tracker.record(KEY, 1.0)
+        tracker.record(KEY, 2.0)
+        assert tracker.percentile(KEY, 95) is None
+
+        tracker.record(KEY, 3.0)
+        assert tracker.percentile(KEY, 95) == 3.0
+        assert tracker.percentile(KEY, 50) == 2.0
+
+    def test_window_size_drops_old_samples(self):
+        """Only the most recent samples are kept"""
+        tracker = TTFTTracker(window_size=2, min_samples=1)
+        for value in (10.0, 1.0, 2.0):
+            tracker.record(KEY, value)
+        assert tracker.sample_count(KEY) == 2
+        assert tracker.percentile(KEY, 100) == 2.0
+
+
+class TestGuardStream:
+    """Test first-token and idle timeouts"""
+
+    async def test_passes_chunks_through(self):
+        """Chunks are yielded unchanged and TTFT is recorded"""
+        tracker = TTFTTracker(min_samples=1)
+        stream = FakeStream(["a", "b", "c"])
+
+        chunks = await _collect(guard_stream(stream, KEY, first_token_timeout=1, idle_timeout=1, tracker=tracker))
+
+        assert chunks == ["a", "b", "c"]
+        assert tracker.sample_count(KEY) == 1
+        assert stream.closed
+
+    async def test_first_token_timeout(self):
+        """A stream with no first chunk within the timeout raises LLMTimeoutError"""
+        stream = FakeStream(["a"], first_delay=1.0)
+
+        with pytest.raises(LLMTimeoutError) as exc_info:
+            await _collect(guard_stream(stream, KEY, first_token_timeout=0.05))
+
+        assert exc_info.value.status_code == 504
+        assert exc_info.value.details["phase"] == "first token"
+        assert stream.closed
+
+    async def test_idle_timeout(self):
+        """A stream that stalls mid-response raises LLMTimeoutError"""
+        stream = FakeStream(["a", "b"], delay=1.0)
+        received = []
+
+        with pytest.raises(LLMTimeoutError) as exc_info:
+            async for chunk in guard_stream(stream, KEY, idle_timeout=0.05):
+                received.append(chunk)
+
+        assert received == ["a"]
+        assert exc_info.value.details["phase"] == "chunk"
+
+    async def test_zero_timeout_disables(self):
+        """A timeout of 0 means no limit"""
+        stream = FakeStream(["a"], first_delay=0.05)
+        assert await _collect(guard_stream(stream, KEY, first_token_timeout=0)) == ["a"]
+
+
+class TestHedging:
+    """Test hedged backup requests"""
+
+    async def test_no_hedge_without_statistics(self):
+        """Hedging waits until the tracker has enough samples"""
+        opened = []
+
+        async def open_backup():
+            opened.append(True)
+            return FakeStream(["backup"])
+
+        stream = FakeStream(["primary"], first_delay=0.05)
+        chunks = await _collect(guard_stream(stream, KEY, tracker=TTFTTracker(), open_hedge_stream=open_backup))
+
+        assert chunks == ["primary"]
+        assert not opened
+
+    async def test_backup_wins_when_primary_is_slow(self):
+        """A slow primary is hedged and the faster backup is used, the primary is closed"""
+        backup = FakeStream(["backup", "more"])
+
+        async def open_backup():
+            return backup
+
+        primary = FakeStream(["primary"], first_delay=1.0)
+        chunks = await _collect(guard_stream(
+            primary, KEY, first_token_timeout=2, tracker=_warm_tracker(0.01), open_hedge_stream=open_backup
+        ))
+
+        assert chunks == ["backup", "more"]
+        assert primary.closed
+
+    async def test_primary_wins_when_backup_is_slower(self):
+        """The primary is kept if it answers before the backup"""
+        backup = FakeStream(["backup"], first_delay=1.0)
+
+        async def open_backup():
+            return backup
+
+        primary = FakeStream(["primary"], first_delay=0.05)
+        chunks = await _collect(guard_stream(
+            primary, KEY, tracker=_warm_tracker(0.01), open_hedge_stream=open_backup
+        ))
+
+        assert chunks == ["primary"]
+        assert backup.closed
+
+    async def test_failed_backup_falls_back_to_primary(self):
+        """A failing backup does not fail the request"""
+        async def open_backup():
+            return FakeStream([], fail=RuntimeError("backup failed"))
+
+        primary = FakeStream(["primary"], first_delay=0.05)
+        chunks = await _collect(guard_stream(
+            primary, KEY, tracker=_warm_tracker(0.01), open_hedge_stream=open_backup
+        ))
+
+        assert chunks == ["primary"]
+
+    async def test_hedged_first_token_timeout(self):
+        """The first-token timeout still applies when both streams are slow"""
+        backup = FakeStream(["backup"], first_delay=1.0)
+
+        async def open_backup():
+            return backup
+
+        primary = FakeStream(["primary"], first_delay=1.0)
+        with pytest.raises(LLMTimeoutError):
+            await _collect(guard_stream(
+                primary, KEY, first_token_timeout=0.1, tracker=_warm_tracker(0.01), open_hedge_stream=open_backup
+            ))
+
+        assert primary.closed
+        assert backup.closed
@@ -0,0 +1,184 @@
+"""
+Tests for LLM usage and cost accounting
+"""
+
+import pytest
+from datetime import datetime, timedelta, UTC
+from uuid import uuid4
+
+from src.agents.base_agent import BaseAgent
+from src.core.exceptions import BudgetExceededError
+from src.database.repositories import MemoryUsageRepository
+from src.schemas.llm.models import LLMResponse
+from src.services.llm.usage_tracker import UsageTracker, compute_cost, normalize_usage
+
+
+@pytest.fixture
+def usage_repository() -> MemoryUsageRepository:
+    return MemoryUsageRepository()
+
+
+@pytest.fixture
+def usage_tracker(usage_repository: MemoryUsageRepository) -> UsageTracker:
+    return UsageTracker(usage_repository, batch_size=100, flush_interval=60)
+
+
+class TestCostAndNormalization:
+    """Test cost computation and usage normalization"""
+
+    def test_compute_cost_uses_catalog_pricing(self):
+        """gpt-4.1-mini is $0.40 in / $1.60 out per million tokens"""
+        cost = compute_cost("openai", "gpt-4.1-mini", 1_000_000, 500_000)
+        assert cost == pytest.approx(0.40 + 0.80)
+
+    def test_compute_cost_unknown_model_is_free(self):
+        assert compute_cost("openai", "not-a-model", 1000, 1000) == 0.0
+
+    def test_normalize_openai_usage(self):
+        assert normalize_usage({"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}) == {
+            "prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15
+        }
+
+    def test_normalize_anthropic_usage(self):
+        """input/output token keys are mapped and the total is derived"""
+        assert normalize_usage({"input_tokens": 7, "output_tokens": 3}) == {
+            "prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10
+        }
+
+
+class TestUsageTracker:
+    """Test buffering, batch writes and rollups"""
+
+    async def test_records_are_buffered_until_flush(self, usage_tracker: UsageTracker, usage_repository: MemoryUsageRepository):
+        """Recording does not write to the repository until flushed"""
+        usage_tracker.record("openai", "gpt-4.1-mini", {"prompt_tokens": 100, "completion_tokens": 50}, user_id="u1")
+        assert usage_tracker.pending_count == 1
+        assert (await usage_repository.get_totals())["requests"] == 0
+
+        assert await usage_tracker.flush() == 1
+        assert usage_tracker.pending_count == 0
+        assert (await usage_repository.get_totals())["total_tokens"] == 150
+
+    async def test_full_batch_is_written_in_background(self, usage_repository: MemoryUsageRepository):
+        """Reaching batch_size triggers a write and stop() drains the rest"""
+        tracker = UsageTracker(usage_repository, batch_size=2, flush_interval=60)
+        for _ in range(3):
+            tracker.record("openai", "gpt-4.1-mini", {"prompt_tokens": 1, "completion_tokens": 1})
+
+        await tracker.stop()
+
+        assert (await usage_repository.get_totals())["requests"] == 3
+
+    async def test_failed_write_keeps_records(self, usage_tracker: UsageTracker, usage_repository: MemoryUsageRepository, monkeypatch):
+        """Records are retained for the next flush when the write fails"""
+        async def failing_create_many(records_data):
+            raise RuntimeError("database unavailable")
+
+        usage_tracker.record("openai", "gpt-4.1-mini", {"prompt_tokens": 1, "completion_tokens": 1})
+        monkeypatch.setattr(usage_repository, "create_many", failing_create_many)
+
+        assert await usage_tracker.flush() == 0
+        assert usage_tracker.pending_count == 1
+
+    async def test_rollups_by_agent_and_project(self, usage_tracker: UsageTracker):
+        """Rollups aggregate tokens and cost per group"""
+        usage = {"prompt_tokens": 1000, "completion_tokens": 1000}
+        usage_tracker.record("openai", "gpt-4.1-mini", usage, user_id="u1", project_id="p1", agent_name="ArcSplitterAgent")
+        usage_tracker.record("openai", "gpt-4.1-mini", usage, user_id="u1", project_id="p1", agent_name="ArcSplitterAgent")
+        usage_tracker.record("openai", "gpt-4.1", usage, user_id="u1", project_id="p2", agent_name="ArticleWriterAgent")
+
+        by_agent = {row["agent_name"]: row for row in await usage_tracker.get_rollup("agent_name", user_id="u1")}
+        assert by_agent["ArcSplitterAgent"]["requests"] == 2
+        assert by_agent["ArcSplitterAgent"]["total_tokens"] == 4000
+        assert by_agent["ArticleWriterAgent"]["cost_usd"] == pytest.approx(compute_cost("openai", "gpt-4.1", 1000, 1000))
+
+        totals = await usage_tracker.get_totals(project_id="p1")
+        assert totals["requests"] == 2
+
+    async def test_since_filter(self, usage_tracker: UsageTracker):
+        usage_tracker.record("openai", "gpt-4.1-mini", {"prompt_tokens": 1, "completion_tokens": 1}, user_id="u1")
+        future = datetime.now(UTC).replace(tzinfo=None) + timedelta(minutes=1)
+        assert (await usage_tracker.get_totals(user_id="u1", since=future))["requests"] == 0
+
+
+class TestBudgets:
+    """Test budget checks"""
+
+    async def test_no_budget_means_unlimited(self, usage_tracker: UsageTracker):
+        assert await usage_tracker.get_budget_status(user_id="u1", project_id="p1") == []
+        await usage_tracker.ensure_within_budget(user_id="u1", project_id="p1")
+
+    async def test_budget_counts_unflushed_spend(self, usage_tracker: UsageTracker):
+        """Spend not yet written to the repository still counts against the budget"""
+        await usage_tracker.set_budget("project", "p1", 0.001)
+        usage_tracker.record("openai", "gpt-4.1", {"prompt_tokens": 1000, "completion_tokens": 0}, project_id="p1")
+
+        [status] = await usage_tracker.get_budget_status(project_id="p1")
+        assert status.spent_usd == pytest.approx(0.002)
+        assert status.exceeded
+
+        with pytest.raises(BudgetExceededError) as exc_info:
+            await usage_tracker.ensure_within_budget(user_id="u1", project_id="p1")
+        assert exc_info.value.status_code == 402
+        assert exc_info.value.details["scope"] == "project"
+
+    async def test_budgets_are_stored_in_the_repository(self, usage_repository: MemoryUsageRepository):
+        """A budget set on one tracker applies to a new tracker over the same repository"""
+        await UsageTracker(usage_repository).set_budget("user", "u1", 5.0)
+
+        tracker = UsageTracker(usage_repository)
+        assert await tracker.get_budget("user", "u1") == 5.0
+        [status] = await tracker.get_budget_status(user_id="u1")
+        assert status.limit_usd == 5.0
+
+        await tracker.set_budget("user", "u1", None)
+        assert await UsageTracker(usage_repository).get_budget("user", "u1") is None
+
+
+class _FakeLLMService:
+    """Records the model each call was made with"""
+
+    def __init__(self, usage_tracker: UsageTracker):
+        self.usage_tracker = usage_tracker
+        self.calls = []
+
+    async def chat_completion(self, **kwargs):
+        self.calls.append(kwargs)
+        return LLMResponse(content="ok", model=kwargs["model"])
+
+
+class _EchoAgent(BaseAgent):
+    async def execute(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+class TestAgentBudgetPolicy:
+    """Test agents refusing or downgrading when a budget is exhausted"""
+
+    async def test_agent_attributes_usage(self, usage_tracker: UsageTracker):
+        llm_service = _FakeLLMService(usage_tracker)
+        agent = _EchoAgent(llm_service, default_provider="openai", default_model="gpt-4.1")  # type: ignore
+
+        await agent._make_llm_call([], user_id=uuid4(), project_id="p1")
+
+        assert llm_service.calls[0]["metadata"] == {"agent": "_EchoAgent", "project_id": "p1"}
+
+    async def test_agent_refuses_without_fallback(self, usage_tracker: UsageTracker):
+        user_id = uuid4()
+        await usage_tracker.set_budget("user", str(user_id), 0.0)
+        agent = _EchoAgent(_FakeLLMService(usage_tracker), default_provider="openai", default_model="gpt-4.1")  # type: ignore
+
+        with pytest.raises(BudgetExceededError):
+            await agent._make_llm_call([], user_id=user_id)
+
+    async def test_agent_downgrades_to_fallback(self, usage_tracker: UsageTracker):
+        user_id = uuid4()
+        await usage_tracker.set_budget("user", str(user_id), 0.0)
+        llm_service = _FakeLLMService(usage_tracker)
+        agent = _EchoAgent(
+            llm_service, default_provider="openai", default_model="gpt-4.1", budget_fallback_model="gpt-4.1-nano"  # type: ignore
+        )
+
+        response = await agent._make_llm_call([], user_id=user_id)
+
+        assert response.model == "gpt-4.1-nano"
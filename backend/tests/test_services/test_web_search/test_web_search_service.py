@@ -0,0 +1,124 @@
+"""
+Tests for the cached, deduplicating web search service
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.database.repositories import MemoryCheckpointRepository
+from src.services.web_search.web_search_service import (
+    FixtureSearchClient,
+    SearchClient,
+    SearchResult,
+    WebSearchService,
+)
+
+
+FIXTURES = {
+    "Ragnarok": [{"title": "Ragnarök", "url": "https://example.org/ragnarok", "snippet": "End of the world"}],
+    "Excalibur": [{"title": "Excalibur", "url": "https://example.org/excalibur"}],
+}
+
+
+class FailingClient(SearchClient):
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query, max_results):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("search down")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDeduplication:
+    """Normalized queries reach the backend once"""
+
+    async def test_concurrent_duplicates_share_one_request(self):
+        client = FixtureSearchClient(FIXTURES, delay=0.02)
+        service = WebSearchService(client, requests_per_second=None)
+
+        results = await asyncio.gather(*(service.search(q) for q in ["Ragnarok", " ragnarok ", '"RAGNAROK"'] * 10))
+
+        assert client.queries == ["ragnarok"]
+        assert all(r == [SearchResult("Ragnarök", "https://example.org/ragnarok", "End of the world")] for r in results)
+        assert service.stats["backend_calls"] == 1
+        assert service.stats["shared"] == 29
+
+    async def test_later_requests_hit_the_cache(self):
+        client = FixtureSearchClient(FIXTURES)
+        service = WebSearchService(client, requests_per_second=None)
+
+        await service.search("Excalibur")
+        assert await service.search("excalibur.") == [SearchResult("Excalibur", "https://example.org/excalibur")]
+        assert await service.search("Unknown myth") == []
+
+        assert client.queries == ["excalibur", "unknown myth"]
+        assert service.stats["cache_hits"] == 1
+
+    async def test_failures_are_shared_but_not_cached(self):
+        client = FailingClient()
+        service = WebSearchService(client, requests_per_second=None)
+
+        outcomes = await asyncio.gather(service.search("Ragnarok"), service.search("ragnarok"), return_exceptions=True)
+        assert all(isinstance(o, RuntimeError) for o in outcomes)
+        assert client.calls == 1
+
+        assert await service.search_many(["Ragnarok"]) == {"Ragnarok": {"error": "search down"}}
+        assert client.calls == 2
+
+    async def test_empty_query_is_rejected(self):
+        with pytest.raises(ValueError):
+            await WebSearchService(FixtureSearchClient()).search('  "" ')
+
+
+class TestCacheAndLimits:
+    """TTL, persistence and rate limiting"""
+
+    async def test_results_expire_after_ttl(self):
+        clock = FakeClock()
+        client = FixtureSearchClient(FIXTURES)
+        service = WebSearchService(client, cache_ttl_seconds=60, requests_per_second=None, clock=clock)
+
+        await service.search("Ragnarok")
+        clock.now += 30
+        await service.search("Ragnarok")
+        clock.now += 31
+        await service.search("Ragnarok")
+
+        assert client.queries == ["ragnarok", "ragnarok"]
+
+    async def test_persistent_cache_is_shared_across_services(self):
+        repository = MemoryCheckpointRepository()
+        first = FixtureSearchClient(FIXTURES)
+        await WebSearchService(first, cache=repository, requests_per_second=None).search("Ragnarok")
+
+        second = FixtureSearchClient(FIXTURES)
+        results = await WebSearchService(second, cache=repository, requests_per_second=None).search("ragnarok")
+
+        assert second.queries == []
+        assert results[0].title == "Ragnarök"
+
+    async def test_requests_are_rate_limited(self):
+        service = WebSearchService(FixtureSearchClient(FIXTURES), requests_per_second=50)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(service.search(f"query {n}") for n in range(6)))
+
+        assert time.perf_counter() - started >= 5 / 50 * 0.9
+
+    def test_fixtures_from_file(self, tmp_path):
+        path = tmp_path / "search.json"
+        path.write_text(json.dumps(FIXTURES), encoding="utf-8")
+
+        assert "excalibur" in FixtureSearchClient.from_file(path).fixtures
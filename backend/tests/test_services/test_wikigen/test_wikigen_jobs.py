@@ -0,0 +1,251 @@
+"""
+Tests for WikiGen background jobs and their event logs
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.wikigen.orchestrator import WikiGenOrchestrator
+from src.core.events import EventLog
+from src.core.exceptions import NotFoundError
+from src.database.factory import get_repositories, init_repositories, reset_repositories
+from src.schemas.llm.models import LLMResponse
+from src.schemas.wikigen.arc import Arc, ArcAnalysisResult
+from src.schemas.wikigen.wiki import ArcArchive, PipelineEvent, WikiArticle, WikiResult
+from src.services.wikigen import MeteredLLMService, run_wikigen_job, story_from_documents
+from src.services.wikigen.wikigen_jobs import document_text, load_wiki
+
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def _doc(*paragraphs: str) -> dict:
+    return {"type": "doc", "content": [
+        {"type": "paragraph", "content": [{"type": "text", "text": text}]} for text in paragraphs
+    ]}
+
+
+class FakeLLMService:
+    usage_tracker = None
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        return LLMResponse(content="ok", model="fake", usage={"prompt_tokens": 100, "completion_tokens": 20})
+
+
+class ScriptedLLMService:
+    """Answers planning, article and summary prompts the way a model would, with usage."""
+    usage_tracker = None
+
+    async def chat_completion(self, **kwargs) -> LLMResponse:
+        prompt = kwargs["messages"][-1].content
+        if '"articles": [' in prompt:
+            content = '{"articles": [{"title": "Sarah", "article_type": "character", "aliases": []}]}'
+        elif 'wiki article titled "' in prompt:
+            title = prompt.split('wiki article titled "', 1)[1].split('"', 1)[0]
+            content = f"# {title}\n\n[[Sarah]] wakes and runs."
+        else:
+            content = "Sarah woke, then ran."
+        return LLMResponse(content=content, model="fake", usage={"prompt_tokens": 10, "completion_tokens": 5})
+
+
+class OneArcSplitter:
+    """Puts the whole story in one arc without a model call."""
+
+    async def analyze_story(self, story, **kwargs) -> ArcAnalysisResult:
+        arc = Arc(
+            id=1, title="Arc 1", start_chapter=1, end_chapter=story.total_chapters,
+            summary="A summary of the arc.", key_events="Things happen",
+        )
+        return ArcAnalysisResult(story_prediction="x" * 50, growth_assessment="y" * 20, arc_strategy="z" * 10, arcs=[arc])
+
+
+class FakeOrchestrator:
+    """Emits the events of a one-arc run and makes one metered LLM call."""
+
+    def __init__(self, llm_service, fail: bool = False, entity_index=None, **kwargs):
+        self.llm_service = llm_service
+        self.fail = fail
+        self.entity_index = entity_index
+        self.kwargs = kwargs
+        self.story = None
+        self.updated = None
+
+    async def generate_wiki(self, story, user_id, provider=None, model=None, on_event=None) -> WikiResult:
+        self.story = story
+        if self.entity_index is not None:
+            self.entity_index.register("Sarah", entity_type="character")
+            self.scanned = self.entity_index.update(story.chapters)
+        on_event(PipelineEvent(type="window_started", stage="split", task_id="split", data={"window_number": 1}))
+        await self.llm_service.chat_completion(metadata={"agent": "ArcSplitterAgent"})
+        if self.fail:
+            raise RuntimeError("pipeline exploded")
+        arc = Arc(
+            id=1, title="Arc 1", start_chapter=1, end_chapter=story.total_chapters,
+            summary="A summary of the arc.", key_events="Things happen",
+        )
+        on_event(PipelineEvent(type="article_done", stage="write", task_id="write:1:1", data={"title": "Sarah"}))
+        return WikiResult(story_title=story.metadata.title, archives=[
+            ArcArchive(arc=arc, articles=[WikiArticle(title="Sarah", filename="sarah.md", content="...", arc_id=1)])
+        ])
+
+    async def update_wiki(self, story, new_chapters, existing_wiki, user_id, provider=None, model=None, on_event=None) -> WikiResult:
+        self.updated = (new_chapters, existing_wiki)
+        return await self.generate_wiki(story, user_id, provider, model, on_event)
+
+
+class TestStoryFromDocuments:
+    """Test turning project documents into chapters"""
+
+    def test_document_text_joins_blocks(self):
+        content = {"type": "doc", "content": [
+            {"type": "heading", "content": [{"type": "text", "text": "One"}]},
+            {"type": "paragraph", "content": [
+                {"type": "text", "text": "Sarah "},
+                {"type": "text", "text": "ran.", "marks": [{"type": "bold"}]},
+            ]},
+            {"type": "paragraph"},
+        ]}
+
+        assert document_text(content) == "One\n\nSarah ran."
+
+    def test_chapters_follow_natural_path_order_and_skip_empty_documents(self):
+        documents = [
+            SimpleNamespace(title="Ten", path="/chapter-10", content=_doc("Ten.")),
+            SimpleNamespace(title="Two", path="/chapter-2", content=_doc("Two.")),
+            SimpleNamespace(title="Notes", path="/chapter-3", content=_doc()),
+        ]
+
+        story = story_from_documents("Story", documents)
+
+        assert [(c.chapter_number, c.title) for c in story.chapters] == [(1, "Two"), (2, "Ten")]
+
+
+class TestMeteredLLMService:
+    """Test usage reporting of LLM calls"""
+
+    async def test_reports_usage_and_delegates(self):
+        reports = []
+        service = MeteredLLMService(FakeLLMService(), lambda metadata, tokens: reports.append((metadata, tokens)))
+
+        await service.chat_completion(metadata={"agent": "Writer"})
+
+        assert service.usage_tracker is None
+        assert reports == [({"agent": "Writer"}, {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120})]
+
+
+class TestRunWikiGenJob:
+    """Test the job's event sequence"""
+
+    @pytest.fixture(autouse=True)
+    async def setup_repositories(self):
+        reset_repositories()
+        init_repositories(backend="memory")
+        repos = get_repositories()
+        await repos.project.create({"id": "p1", "title": "Amber", "description": "A story", "owner_id": USER_ID})
+        await repos.document.create({"project_id": "p1", "title": "Two", "path": "/2", "content": _doc("Sarah ran.")})
+        await repos.document.create({"project_id": "p1", "title": "One", "path": "/1", "content": _doc("Sarah woke.")})
+        yield
+        reset_repositories()
+
+    async def test_logs_progress_and_tokens(self):
+        log = EventLog()
+        orchestrators = []
+
+        def factory(llm_service, **kwargs):
+            orchestrators.append(FakeOrchestrator(llm_service, **kwargs))
+            return orchestrators[0]
+
+        result = await run_wikigen_job("p1", USER_ID, log, orchestrator_factory=factory, llm_service=FakeLLMService())
+
+        assert [c.title for c in orchestrators[0].story.chapters] == ["One", "Two"]
+        types = [event.type for event in log.since(0)]
+        assert types == ["job_started", "story_loaded", "window_started", "tokens_used", "article_done", "job_completed"]
+        completed = log.since(0)[-1].data
+        assert completed["articles"] == 1
+        assert completed["tokens"]["total_tokens"] == 120
+        assert log.closed
+        assert result.story_title == "Amber"
+
+    async def test_failure_is_logged(self):
+        log = EventLog()
+
+        with pytest.raises(RuntimeError):
+            await run_wikigen_job(
+                "p1", USER_ID, log,
+                orchestrator_factory=lambda llm, **kwargs: FakeOrchestrator(llm, fail=True, **kwargs), llm_service=FakeLLMService(),
+            )
+
+        failed = log.since(0)[-1]
+        assert failed.type == "job_failed"
+        assert failed.data["error"] == "pipeline exploded"
+        assert failed.data["tokens"]["total_tokens"] == 120
+
+    async def test_unknown_project_fails(self):
+        log = EventLog()
+
+        with pytest.raises(NotFoundError):
+            await run_wikigen_job("missing", USER_ID, log, orchestrator_factory=FakeOrchestrator)
+
+        assert [event.type for event in log.since(0)] == ["job_started", "job_failed"]
+
+    async def test_real_pipeline_completes(self):
+        log = EventLog()
+
+        def factory(llm_service, **kwargs):
+            return WikiGenOrchestrator(llm_service, arc_splitter=OneArcSplitter(), **kwargs)
+
+        result = await run_wikigen_job("p1", USER_ID, log, orchestrator_factory=factory, llm_service=ScriptedLLMService())
+
+        [archive] = result.archives
+        assert [a.title for a in archive.plan.articles] == ["Amber Wiki", "Sarah"]
+        assert [a.title for a in archive.articles] == ["Amber Wiki", "Sarah"]
+        assert archive.summary.content == "Sarah woke, then ran."
+        completed = log.since(0)[-1]
+        assert completed.type == "job_completed"
+        assert completed.data["articles"] == 2
+        assert completed.data["tokens"]["total_tokens"] > 0
+
+    async def test_entity_index_is_kept_between_runs(self):
+        orchestrators = []
+
+        def factory(llm_service, **kwargs):
+            orchestrators.append(FakeOrchestrator(llm_service, **kwargs))
+            return orchestrators[-1]
+
+        await run_wikigen_job("p1", USER_ID, EventLog(), orchestrator_factory=factory, llm_service=FakeLLMService())
+        repos = get_repositories()
+        [two] = [document for document in await repos.document.get_by_project_id("p1") if document.title == "Two"]
+        await repos.document.delete(two.id)
+        await run_wikigen_job("p1", USER_ID, EventLog(), orchestrator_factory=factory, llm_service=FakeLLMService())
+
+        first, second = orchestrators
+        assert first.scanned == [1, 2]
+        assert second.entity_index is not first.entity_index
+        assert second.scanned == []  # Loaded with chapter 1 current; the deleted chapter 2 is dropped
+        assert second.entity_index.chapters == [1]
+        assert second.entity_index.get("Sarah") is not None
+
+    async def test_wiki_is_stored_and_updated_on_the_next_run(self):
+        orchestrators = []
+
+        def factory(llm_service, **kwargs):
+            orchestrators.append(FakeOrchestrator(llm_service, **kwargs))
+            return orchestrators[-1]
+
+        first_result = await run_wikigen_job("p1", USER_ID, EventLog(), orchestrator_factory=factory, llm_service=FakeLLMService())
+        repos = get_repositories()
+        stored = await load_wiki(repos.checkpoint, "p1")
+        [two] = [document for document in await repos.document.get_by_project_id("p1") if document.title == "Two"]
+        await repos.document.update(two.id, {"content": _doc("Sarah ran home.")})
+        log = EventLog()
+        await run_wikigen_job("p1", USER_ID, log, orchestrator_factory=factory, llm_service=FakeLLMService())
+
+        first, second = orchestrators
+        assert stored.result == first_result
+        assert first.updated is None
+        assert first.kwargs["checkpoint_repository"] is repos.checkpoint
+        new_chapters, existing_wiki = second.updated
+        assert [c.chapter_number for c in new_chapters] == [2]
+        assert existing_wiki == first_result
+        assert log.since(0)[1].data["changed_chapters"] == 1
@@ -0,0 +1,60 @@
+"""
+Tests for Aho-Corasick entity mention matching
+"""
+
+from src.utils.entity_matcher import EntityMatcher
+
+
+def _found(matcher: EntityMatcher, text: str):
+    return [(m.text, m.targets, m.exact_case) for m in matcher.find(text)]
+
+
+class TestEntityMatcher:
+    """Whole-word, case- and possessive-aware matching"""
+
+    def test_longest_match_wins(self):
+        matcher = EntityMatcher([("Sarah", "Sarah Chen"), ("Sarah Chen", "Sarah Chen"), ("Chen", "Chen Family")])
+
+        assert _found(matcher, "Sarah Chen smiled.") == [("Sarah Chen", ("Sarah Chen",), True)]
+
+    def test_whole_words_only(self):
+        matcher = EntityMatcher([("Ash", "Ash")])
+
+        assert _found(matcher, "Ashes fell; Ash watched the ash.") == [
+            ("Ash", ("Ash",), True), ("ash", ("Ash",), False),
+        ]
+
+    def test_possessives_and_apostrophes(self):
+        matcher = EntityMatcher([("Sarah", "Sarah Chen"), ("Dragon's Teeth", "Dragon's Teeth")])
+
+        found = _found(matcher, "Sarah’s blade reached the Dragon’s Teeth.")
+
+        assert found == [("Sarah", ("Sarah Chen",), True), ("Dragon’s Teeth", ("Dragon's Teeth",), True)]
+
+    def test_shared_alias_is_ambiguous(self):
+        matcher = EntityMatcher([("Professor", "Professor Oak"), ("Professor", "Professor Elm")])
+
+        [mention] = matcher.find("The Professor nodded.")
+
+        assert mention.targets == ("Professor Oak", "Professor Elm")
+        assert mention.is_ambiguous
+
+    def test_punctuation_between_words_breaks_a_match(self):
+        matcher = EntityMatcher([("Sarah Chen", "Sarah Chen"), ("Sarah", "Sarah Chen")])
+
+        assert _found(matcher, "It was Sarah. Chen was gone.") == [("Sarah", ("Sarah Chen",), True)]
+
+    def test_suffix_patterns_are_found(self):
+        """Fail links: 'Oak Grove' is found inside a partial match of 'Old Oak Tree'"""
+        matcher = EntityMatcher([("Old Oak Tree", "Old Oak Tree"), ("Oak Grove", "Oak Grove")])
+
+        assert [m.text for m in matcher.find("the Old Oak Grove")] == ["Oak Grove"]
+
+    def test_offsets(self):
+        matcher = EntityMatcher([("Celestial Observatory", "Celestial Observatory")])
+        text = "The Celestial\nObservatory gleamed."
+
+        [mention] = matcher.find(text)
+
+        assert text[mention.start:mention.end] == "Celestial\nObservatory"
+        assert mention.exact_case
@@ -0,0 +1,123 @@
+"""
+Tests for the append-only job event logs
+"""
+
+import asyncio
+
+import pytest
+
+from src.core.events import EventLog, EventLogStore, format_sse
+
+
+async def _collect(log: EventLog, last_event_id: int = 0):
+    return [event async for event in log.subscribe(last_event_id)]
+
+
+class TestEventLog:
+    """Test appending, replay and live subscription"""
+
+    def test_events_are_encoded_once_as_sse_frames(self):
+        log = EventLog()
+        event = log.append("arc_parsed", {"arc_id": 1})
+
+        assert event.id == 1
+        assert event.frame.startswith("id: 1\nevent: arc_parsed\ndata: {")
+        assert event.frame.endswith("\n\n")
+        assert event.data["arc_id"] == 1
+        assert "timestamp" in event.data
+
+    def test_format_sse_is_compact_single_line(self):
+        frame = format_sse(3, "tokens_used", {"totals": {"total_tokens": 10}})
+
+        assert frame == 'id: 3\nevent: tokens_used\ndata: {"totals":{"total_tokens":10}}\n\n'
+
+    def test_since_resumes_after_last_event_id(self):
+        log = EventLog()
+        for n in range(5):
+            log.append("step", {"n": n})
+
+        assert [event.id for event in log.since(3)] == [4, 5]
+        assert log.since(5) == []
+        assert log.last_id == 5
+
+    def test_terminal_event_closes_log(self):
+        log = EventLog()
+        log.append("job_completed")
+
+        assert log.closed
+        with pytest.raises(RuntimeError):
+            log.append("late")
+
+    def test_oldest_events_are_dropped(self):
+        log = EventLog(max_events=3)
+        for n in range(5):
+            log.append("step", {"n": n})
+
+        assert len(log) == 3
+        assert log.last_id == 5
+        # A client from before the oldest kept event resumes at that event
+        assert [event.id for event in log.since(1)] == [3, 4, 5]
+
+    async def test_subscribe_replays_then_follows_live(self):
+        log = EventLog()
+        log.append("job_started")
+        subscriber = asyncio.create_task(_collect(log))
+        await asyncio.sleep(0)
+
+        log.append("window_started", {"window_number": 1})
+        await asyncio.sleep(0)
+        log.append("job_completed")
+        events = await asyncio.wait_for(subscriber, 1)
+
+        assert [event.type for event in events] == ["job_started", "window_started", "job_completed"]
+
+    async def test_reconnect_receives_only_missed_events(self):
+        log = EventLog()
+        for event_type in ("job_started", "window_started", "arc_detected", "job_completed"):
+            log.append(event_type)
+
+        events = await asyncio.wait_for(_collect(log, last_event_id=2), 1)
+
+        assert [event.type for event in events] == ["arc_detected", "job_completed"]
+
+    async def test_many_subscribers_are_woken(self):
+        log = EventLog()
+        subscribers = [asyncio.create_task(_collect(log)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        log.append("job_failed", {"error": "boom"})
+        results = await asyncio.wait_for(asyncio.gather(*subscribers), 1)
+
+        assert all([event.type for event in events] == ["job_failed"] for events in results)
+
+    async def test_close_ends_subscription(self):
+        log = EventLog()
+        subscriber = asyncio.create_task(_collect(log))
+        await asyncio.sleep(0)
+
+        log.close()
+
+        assert await asyncio.wait_for(subscriber, 1) == []
+
+
+class TestEventLogStore:
+    """Test the per-job log registry"""
+
+    def test_get_registered_log(self):
+        store = EventLogStore()
+        log = store.create("job-1", metadata={"user_id": "u1"})
+
+        assert store.get("job-1") is log
+        assert store.get("job-2") is None
+
+    def test_only_closed_logs_are_evicted(self):
+        store = EventLogStore(max_logs=2)
+        running = store.create("running")
+        finished = store.create("finished")
+        finished.append("job_completed")
+
+        store.create("new")
+
+        assert store.get("running") is running
+        assert store.get("finished") is None
+        assert store.get("new") is not None
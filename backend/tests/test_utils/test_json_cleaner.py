@@ -0,0 +1,112 @@
+"""
+Tests for JSON extraction from LLM responses
+"""
+
+import json
+
+import pytest
+
+from src.utils.json_cleaner import JSONScanner, clean_json_from_llm_response, parse_cleaned_json
+
+
+ARC_JSON = json.dumps({
+    "story_prediction": "Sarah {maybe} wins; see ```code``` and \"quotes\" \\ here",
+    "arcs": [{"id": 1, "title": "Start [1]"}, {"id": 2, "title": "End"}],
+})
+
+
+class TestCleanJson:
+    """Test extraction from complete responses"""
+
+    def test_fenced_json_with_preamble(self):
+        response = f"Sure! Here is the analysis {{as requested}}:\n```json\n{ARC_JSON}\n```\nLet me know."
+
+        assert clean_json_from_llm_response(response) == ARC_JSON
+
+    def test_json_fence_is_preferred_over_earlier_raw_object(self):
+        response = 'Example: {"placeholder": true}\n```json\n{"real": 1}\n```'
+
+        assert clean_json_from_llm_response(response) == '{"real": 1}'
+
+    def test_unlabeled_fence_may_hold_an_array(self):
+        assert clean_json_from_llm_response('```\n[1, 2]\n```') == "[1, 2]"
+
+    def test_raw_object_skips_invalid_brace_pairs(self):
+        response = 'Use {name} as a slot. {"key": "value"} Done!'
+
+        assert clean_json_from_llm_response(response) == '{"key": "value"}'
+
+    def test_stray_brace_does_not_hide_a_later_fence(self):
+        response = 'Objects start with { and\n```json\n{"key": 1}\n```'
+
+        assert clean_json_from_llm_response(response) == '{"key": 1}'
+
+    @pytest.mark.parametrize("response", [
+        '```json{"a":1}```',
+        '```json {"a":1}\n```',
+        'prefix ```json {"a": 1}``` suffix',
+        '``` json\n{"a": 1}\n```',
+    ])
+    def test_json_on_the_fence_line(self, response):
+        assert json.loads(clean_json_from_llm_response(response)) == {"a": 1}
+
+    def test_fence_language_ends_before_the_value(self):
+        candidates = JSONScanner.scan('```json {"a": 1}```').candidates
+
+        assert [candidate.fence for candidate in candidates] == ["json"]
+
+    def test_no_json_raises(self):
+        with pytest.raises(ValueError):
+            clean_json_from_llm_response("No structured output here.")
+        with pytest.raises(ValueError):
+            clean_json_from_llm_response("   ")
+
+    def test_parse_cleaned_json(self):
+        assert parse_cleaned_json(f"```json\n{ARC_JSON}\n```") == json.loads(ARC_JSON)
+
+
+class TestStreamingScanner:
+    """Test feeding the scanner chunk by chunk"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+    def test_any_chunking_gives_the_same_result(self, chunk_size):
+        response = f"Thinking done.\n```json\n{ARC_JSON}\n```"
+        scanner = JSONScanner()
+        for i in range(0, len(response), chunk_size):
+            scanner.feed(response[i:i + chunk_size])
+
+        assert scanner.extract() == ARC_JSON
+        assert not scanner.in_value
+
+    def test_truncated_stream_is_still_open(self):
+        scanner = JSONScanner.scan('```json\n{"arcs": [{"id": 1}')
+
+        assert scanner.in_value
+        with pytest.raises(ValueError):
+            scanner.extract()
+
+
+class TestRepair:
+    """Test closing truncated JSON"""
+
+    @pytest.mark.parametrize("truncated, repaired", [
+        ('{"arcs": [{"id": 1}, {"id": 2', {"arcs": [{"id": 1}]}),
+        ('{"arcs": [1, 2,', {"arcs": [1, 2]}),
+        ('{"a": 1, "b"', {"a": 1}),
+        ('{"a": 1, "b":', {"a": 1}),
+        ('{"a": 1, "b": tr', {"a": 1}),
+        ('{"a": {"b": 1', {"a": {}}),
+        ('{"summary": "Sarah ran', {"summary": "Sarah ran"}),
+        ('{"summary": "line\\', {"summary": "line"}),
+        ('{"summary": "caf\\u00', {"summary": "caf"}),
+        ('{"key', {}),
+    ])
+    def test_common_truncations(self, truncated, repaired):
+        assert json.loads(clean_json_from_llm_response(truncated, repair=True)) == repaired
+
+    def test_complete_json_is_not_repaired(self):
+        assert clean_json_from_llm_response('{"a": 1} and {"b": [', repair=True) == '{"a": 1}'
+
+    def test_repair_is_opt_in(self):
+        with pytest.raises(ValueError):
+            clean_json_from_llm_response('{"a": [1, 2')
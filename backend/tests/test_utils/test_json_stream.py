@@ -0,0 +1,65 @@
+"""
+Tests for incremental parsing of streamed JSON
+"""
+
+import json
+
+import pytest
+
+from src.utils.json_stream import JSONArrayItemStream
+
+
+RESPONSE = (
+    'Here is the analysis:\n```json\n'
+    + json.dumps({
+        "story_prediction": 'Tricky {braces}, "arcs": [ and \\"escapes\\" in a string',
+        "arcs": [
+            {"id": 1, "title": "Arc } one", "tags": ["a", {"nested": [1, 2]}]},
+            {"id": 2, "title": "Arc two"},
+        ],
+        "arc_strategy": "done",
+    })
+    + '\n```'
+)
+
+
+def _feed_in_pieces(stream: JSONArrayItemStream, text: str, size: int) -> list:
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(stream.feed(text[i:i + size]))
+    return items
+
+
+class TestJSONArrayItemStream:
+    """Test emitting array items as they stream in"""
+
+    @pytest.mark.parametrize("size", [1, 2, 7, 64, len(RESPONSE)])
+    def test_items_independent_of_chunking(self, size: int):
+        stream = JSONArrayItemStream("arcs")
+
+        items = _feed_in_pieces(stream, RESPONSE, size)
+
+        assert items == json.loads(RESPONSE.split("```json\n")[1].rstrip("`\n"))["arcs"]
+        assert stream.done
+
+    def test_item_emitted_when_its_brace_closes(self):
+        stream = JSONArrayItemStream("arcs")
+        first_end = RESPONSE.index('}]}, {"id": 2') + 2  # The brace closing item 1
+
+        assert stream.feed(RESPONSE[:first_end]) == []
+        assert [item["id"] for item in stream.feed(RESPONSE[first_end:first_end + 1])] == [1]
+
+    def test_nested_field_with_same_name_is_ignored(self):
+        stream = JSONArrayItemStream("arcs")
+
+        items = stream.feed('{"meta": {"arcs": [{"id": 9}]}, "arcs": [{"id": 1}]}')
+
+        assert items == [{"id": 1}]
+
+    def test_truncated_response_keeps_completed_items(self):
+        stream = JSONArrayItemStream("arcs")
+
+        items = stream.feed('{"arcs": [{"id": 1}, {"id": 2, "title": "cut off')
+
+        assert items == [{"id": 1}]
+        assert not stream.done
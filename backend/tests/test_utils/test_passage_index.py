@@ -0,0 +1,104 @@
+"""
+Tests for BM25 passage retrieval
+"""
+
+import pytest
+
+from src.schemas.db.story import Chapter
+from src.utils import passage_index
+from src.utils.passage_index import PassageIndex
+
+
+CHAPTERS = [
+    (1, "Sarah sharpened her sword by the fire.\n\nThe harbor was quiet that night."),
+    (2, "Merchants argued about grain prices at the harbor.\n\nSarah listened from the shadows."),
+    (3, "The dragon circled the mountain.\n\nIts scales caught the dawn light."),
+]
+
+
+def _index(**kwargs) -> PassageIndex:
+    return PassageIndex.from_chapters(CHAPTERS, passage_tokens=10, **kwargs)
+
+
+class TestPassageIndex:
+    """Chunking, ranking and budgeted selection"""
+
+    def test_passages_are_whole_paragraphs(self):
+        index = PassageIndex.from_chapters(CHAPTERS, passage_tokens=100)
+
+        assert len(index) == 3
+        assert index.passages[0].text == CHAPTERS[0][1]
+        assert [p.chapter_number for p in _index().passages] == [1, 1, 2, 2, 3, 3]
+
+    def test_ranking_prefers_matching_terms(self):
+        results = _index().search("dragon scales", k=2)
+
+        assert [p.chapter_number for p, _ in results] == [3, 3]
+
+    def test_rare_terms_outweigh_common_ones(self):
+        [(best, _)] = _index().search("harbor merchants", k=1)
+
+        assert best.text.startswith("Merchants")
+
+    def test_select_respects_budget_and_story_order(self):
+        index = _index()
+
+        selected = index.select("Sarah harbor", token_budget=20)
+
+        assert sum(p.tokens for p in selected) <= 20
+        assert [p.index for p in selected] == sorted(p.index for p in selected)
+        assert all("Sarah" in p.text or "harbor" in p.text for p in selected)
+        assert index.select("unicorns", token_budget=100) == []
+
+    def test_from_story_text_reads_chapter_blocks(self):
+        content = "\n\n".join(f'<Chapter number="{n}">\n{text}\n</Chapter>' for n, text in CHAPTERS)
+
+        index = PassageIndex.from_story_text(content, passage_tokens=10)
+
+        assert [p.chapter_number for p in index.passages] == [1, 1, 2, 2, 3, 3]
+        assert "<Chapter" not in index.passages[0].text
+
+    def test_from_story_text_reads_titles_with_markup(self):
+        chapters = [
+            Chapter(chapter_number=n, title=f'A -> "B" <{n}>', content=text) for n, text in CHAPTERS
+        ]
+        content = "\n\n".join(chapter.to_prompt_text() for chapter in chapters)
+
+        index = PassageIndex.from_story_text(content, passage_tokens=10)
+
+        assert [p.chapter_number for p in index.passages] == [1, 1, 2, 2, 3, 3]
+        assert all(p.text.startswith(text[:10]) for p, (_, text) in zip(index.passages[::2], CHAPTERS))
+
+    def test_embedder_adds_semantic_matches(self):
+        def embed(texts):
+            # "wyrm" means dragon to this model, which BM25 cannot know
+            return [[1.0, 0.0] if ("dragon" in t.lower() or "wyrm" in t.lower()) else [0.0, 1.0] for t in texts]
+
+        [(best, _)] = _index(embedder=embed, embedding_weight=0.5).search("wyrm", k=1)
+
+        assert best.text.startswith("The dragon")
+
+    def test_pure_python_fallback_matches(self, monkeypatch):
+        expected = [(p.index, round(s, 4)) for p, s in _index().search("Sarah harbor", k=6)]
+
+        monkeypatch.setattr(passage_index, "np", None)
+
+        assert [(p.index, round(s, 4)) for p, s in _index().search("Sarah harbor", k=6)] == expected
+
+    def test_numpy_and_pure_python_scores_agree(self, monkeypatch):
+        pytest.importorskip("numpy")
+
+        def embed(texts):
+            return [[len(t) % 7 + 1.0, t.lower().count("sarah") + 0.5] for t in texts]
+
+        queries = ["Sarah harbor", "harbor harbor grain", "dragon scales dawn", "unicorns"]
+        vectorized = [_index(), _index(embedder=embed)]
+        assert all(index._vectorized for index in vectorized)
+        expected = [index.scores(query) for index in vectorized for query in queries]
+
+        monkeypatch.setattr(passage_index, "np", None)
+        fallback = [_index(), _index(embedder=embed)]
+        assert not any(index._vectorized for index in fallback)
+
+        actual = [index.scores(query) for index in fallback for query in queries]
+        assert actual == [pytest.approx(scores, rel=1e-5, abs=1e-6) for scores in expected]
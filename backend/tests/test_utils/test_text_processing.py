@@ -0,0 +1,151 @@
+"""
+Tests for balanced chapter packing and scene-break splitting
+"""
+
+import random
+
+from src.core.text_processing import balanced_partition, split_text
+from src.schemas.db.story import FullStoryBase, StoryMetadata
+from src.utils.tokenizers import Tokenizer
+
+
+class WordTokenizer(Tokenizer):
+    name = "words"
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def _story(*word_counts: int) -> FullStoryBase:
+    return FullStoryBase(
+        metadata=StoryMetadata(title="Test Story"),
+        chapters=[
+            {"chapter_number": n, "title": f"Chapter {n}", "content": " ".join(["word"] * words)}
+            for n, words in enumerate(word_counts, start=1)
+        ],
+    )
+
+
+class TestBalancedPartition:
+    """Window count stays minimal while sizes are evened out"""
+
+    def test_avoids_tiny_last_window(self):
+        windows = balanced_partition([10, 10, 10, 10, 2], 20)
+
+        assert windows == [(0, 1), (1, 3), (3, 5)]
+
+    def test_uses_as_few_windows_as_greedy(self):
+        sizes = [3, 9, 4, 7, 1, 8, 6, 2, 5, 9, 3, 4]
+
+        windows = balanced_partition(sizes, 15)
+
+        assert len(windows) == 6
+        assert windows[0][0] == 0 and windows[-1][1] == len(sizes)
+        assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+        assert max(sum(sizes[start:end]) for start, end in windows) <= 15
+
+    def test_oversized_item_gets_own_window(self):
+        assert balanced_partition([3, 50, 3], 10) == [(0, 1), (1, 2), (2, 3)]
+
+    def test_oversized_item_does_not_raise_other_windows_over_the_limit(self):
+        assert balanced_partition([30, 15, 15], 20) == [(0, 1), (1, 2), (2, 3)]
+        assert balanced_partition([5, 50, 5, 5, 5, 5], 10) == [(0, 1), (1, 2), (2, 4), (4, 6)]
+
+    def test_multi_item_windows_never_exceed_the_limit(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            sizes = [rng.randint(0, 40) for _ in range(rng.randint(1, 12))]
+            limit = rng.randint(1, 30)
+
+            windows = balanced_partition(sizes, limit)
+
+            assert [i for start, end in windows for i in range(start, end)] == list(range(len(sizes)))
+            assert all(sum(sizes[start:end]) <= limit for start, end in windows if end - start > 1)
+
+    def test_empty(self):
+        assert balanced_partition([], 10) == []
+
+
+class TestSplitText:
+    """Oversized text is split at scene breaks, then paragraph breaks"""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    def test_splits_at_scene_breaks(self):
+        text = "One two three.\n\n* * *\n\nFour five six.\n\n---\nSeven eight nine."
+
+        parts = split_text(text, 6, self.count)
+
+        assert [part.splitlines()[0] for part in parts] == ["One two three.", "Four five six.", "Seven eight nine."]
+
+    def test_falls_back_to_paragraphs(self):
+        text = "One two three.\n\nFour five six.\n\nSeven eight nine."
+
+        parts = split_text(text, 6, self.count)
+
+        assert parts == ["One two three.\n\nFour five six.", "Seven eight nine."]
+
+    def test_single_paragraph_is_not_cut(self):
+        text = "One two three four five six."
+
+        assert split_text(text, 2, self.count) == [text]
+
+
+class TestStoryPacking:
+    """FullStoryBase.pack_windows"""
+
+    def test_balanced_windows(self):
+        story = _story(10, 10, 10, 10, 2)
+
+        windows = story.pack_windows(20, tokenizer=WordTokenizer())
+
+        assert [(w.start_chapter, w.end_chapter, w.tokens) for w in windows] == [(1, 1, 10), (2, 3, 20), (4, 5, 12)]
+
+    def test_overlap_respects_chapter_and_token_limits(self):
+        story = _story(5, 5, 5, 5, 5, 5)
+        tokenizer = WordTokenizer()
+
+        windows = story.pack_windows(10, tokenizer=tokenizer, overlap_chapters=2)
+        assert [w.context_start_chapter for w in windows] == [1, 1, 3]
+        assert windows[1].overlap_tokens == 10
+        assert windows[1].content.startswith('<Chapter number="1"')
+
+        windows = story.pack_windows(10, tokenizer=tokenizer, overlap_chapters=2, overlap_token_limit=5)
+        assert [w.context_start_chapter for w in windows] == [1, 2, 4]
+
+    def test_overlap_reaches_before_start_chapter(self):
+        story = _story(5, 5, 5, 5)
+
+        windows = story.pack_windows(10, start_chapter=3, tokenizer=WordTokenizer(), overlap_chapters=1)
+
+        assert len(windows) == 1
+        assert (windows[0].context_start_chapter, windows[0].start_chapter) == (2, 3)
+
+    def test_oversized_chapter_split_into_parts(self):
+        scenes = "\n\n***\n\n".join(" ".join([f"scene{i}"] * 6) for i in range(3))
+        story = FullStoryBase(
+            metadata=StoryMetadata(title="Test Story"),
+            chapters=[
+                {"chapter_number": 1, "title": "Opening", "content": "short chapter"},
+                {"chapter_number": 2, "title": "Battle", "content": scenes},
+            ],
+        )
+
+        windows = story.pack_windows(8, tokenizer=WordTokenizer())
+
+        parts = [chapter for window in windows for chapter in window.chapters if chapter.is_part]
+        assert [part.title for part in parts] == ["Battle (part 1/3)", "Battle (part 2/3)", "Battle (part 3/3)"]
+        assert all(part.chapter_number == 2 for part in parts)
+        assert all(window.tokens <= 8 for window in windows)
+
+    def test_get_content_chunks_yields_tuples(self):
+        story = _story(3, 3)
+
+        chunks = list(story.get_content_chunks(10, tokenizer=WordTokenizer()))
+
+        assert len(chunks) == 1
+        chapters, content, tokens = chunks[0]
+        assert [c.chapter_number for c in chapters] == [1, 2]
+        assert tokens == 6
+        assert content.count("<Chapter ") == 2
@@ -0,0 +1,126 @@
+"""
+Tests for pluggable tokenizers and memoized token counts
+"""
+
+import base64
+import sys
+
+import pytest
+
+from src.config import settings
+from src.schemas.db.story import FullStoryBase, StoryMetadata
+from src.utils import tokenizers
+from src.utils.tokenizers import (
+    BPETokenizer,
+    HeuristicTokenizer,
+    Tokenizer,
+    clear_token_cache,
+    count_tokens_cached,
+    get_tokenizer,
+    register_tokenizer,
+)
+
+
+class CountingTokenizer(Tokenizer):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text: str) -> int:
+        self.calls += 1
+        return len(text)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(tokenizers, "_custom_factories", {})
+    clear_token_cache()
+    yield
+    clear_token_cache()
+
+
+class TestTokenizerSelection:
+    """Test choosing a tokenizer per model family"""
+
+    def test_heuristic_estimate(self):
+        text = "Sarah walks through the forest, looking for Pokemon."
+        words, chars = len(text.split(" ")), len(text)
+
+        assert HeuristicTokenizer().count(text) == int((words / 0.75 + chars / 4.0) / 2)
+
+    def test_falls_back_to_heuristic_without_tiktoken(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "tiktoken", None)  # import fails
+
+        assert get_tokenizer("openai", "gpt-4.1-mini").name == "heuristic"
+
+    def test_bpe_tokenizer_counts_with_local_vocabulary(self, monkeypatch, tmp_path):
+        pytest.importorskip("tiktoken")
+        # A byte-level vocabulary with a few merges, in tiktoken's file format
+        ranks = {bytes([b]): b for b in range(256)}
+        for merge in (b"th", b"he", b"the", b" the"):
+            ranks[merge] = len(ranks)
+        lines = (f"{base64.b64encode(token).decode()} {rank}" for token, rank in ranks.items())
+        (tmp_path / "o200k_base.tiktoken").write_text("\n".join(lines) + "\n")
+        monkeypatch.setattr(settings, "TOKENIZER_VOCAB_DIR", str(tmp_path))
+        monkeypatch.setattr(tokenizers, "_tokenizers", {})
+
+        tokenizer = get_tokenizer("openai", "gpt-4.1-mini")
+
+        assert isinstance(tokenizer, BPETokenizer)
+        assert tokenizer.name == "bpe:o200k_base"
+        assert tokenizer.count("the") == 1
+        assert tokenizer.count("the the") == 2
+        assert tokenizer.count("tea") == 3
+        assert tokenizer.count("<|endoftext|>") > 1  # Special tokens are counted as text
+
+    def test_missing_vocabulary_is_never_downloaded(self, monkeypatch, tmp_path):
+        tiktoken = pytest.importorskip("tiktoken")
+
+        downloads = []
+        monkeypatch.setattr(tiktoken, "get_encoding", downloads.append)
+        monkeypatch.setattr(settings, "TOKENIZER_VOCAB_DIR", str(tmp_path))
+        monkeypatch.setattr(tokenizers, "_tokenizers", {})
+
+        assert get_tokenizer("openai", "gpt-4.1-mini").name == "heuristic"
+        assert downloads == []
+
+    def test_custom_tokenizer_for_family(self):
+        counting = CountingTokenizer()
+        register_tokenizer("gpt-4.1", lambda: counting)
+
+        assert get_tokenizer("openai", "gpt-4.1-mini") is counting
+        assert get_tokenizer("openai", "o3") is not counting
+
+
+class TestMemoizedCounts:
+    """Test token counts are memoized by content hash"""
+
+    def test_repeated_counts_hit_cache(self):
+        counting = CountingTokenizer()
+
+        assert count_tokens_cached("some chapter text", counting) == 17
+        assert count_tokens_cached("some chapter text", counting) == 17
+        assert counting.calls == 1
+        assert tokenizers.cache_stats == {"hits": 1, "misses": 1}
+
+    def test_rechunking_story_counts_each_chapter_once(self):
+        counting = CountingTokenizer()
+        story = FullStoryBase(
+            metadata=StoryMetadata(title="Test Story"),
+            chapters=[{"chapter_number": n, "title": f"Chapter {n}", "content": f"Chapter {n} text."} for n in range(1, 6)],
+        )
+
+        for limit in (10, 20, 40):
+            list(story.get_content_chunks(limit, tokenizer=counting))
+
+        assert counting.calls == 5
+
+    def test_cache_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(settings, "TOKEN_COUNT_CACHE_SIZE", 2)
+        counting = CountingTokenizer()
+
+        for text in ("a", "b", "c", "a"):
+            count_tokens_cached(text, counting)
+
+        assert counting.calls == 4  # "a" was evicted by "c"